@@ -7,9 +7,10 @@ and initializes the FastAPI application with Mangum for Lambda.
 
 import os
 import sys
-import boto3
 from botocore.exceptions import ClientError
 
+from smart_agent.src.utils.aws_clients import get_client
+
 # SSM Parameter aliases mapping
 parameter_aliases = {
     'APP_PORT': ['app_port', 'port'],
@@ -29,7 +30,7 @@ def get_ssm_parameters(prefix: str) -> dict:
     """
     Load parameters from AWS SSM Parameter Store.
     """
-    ssm = boto3.client('ssm')
+    ssm = get_client('ssm')
     parameters = {}
 
     try:
@@ -100,9 +101,24 @@ load_config()
 # Import FastAPI app after config is loaded
 from mangum import Mangum
 from smart_agent.main import app
+from smart_agent.src.utils.webhook import WEBHOOK_FLUSH_TIMEOUT, flush_webhooks
+
+# Margin left for returning the response after flushing webhooks
+FLUSH_MARGIN_MS = 500
 
 # Create Lambda handler
-handler = Mangum(app, lifespan="off")
+mangum_handler = Mangum(app, lifespan="off")
+
+
+def handler(event, context):
+    """Serve the request, then drain queued webhooks before Lambda freezes the environment."""
+    try:
+        return mangum_handler(event, context)
+    finally:
+        timeout = WEBHOOK_FLUSH_TIMEOUT
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            timeout = min(timeout, max(context.get_remaining_time_in_millis() - FLUSH_MARGIN_MS, 0) / 1000)
+        flush_webhooks(timeout)
 
 
 def lambda_handler(event, context):
@@ -0,0 +1,10 @@
+#!/bin/bash
+# Lambda Web Adapter entry point (response streaming mode).
+# Runs the FastAPI app under uvicorn so /execute/stream can flush SSE events
+# through a RESPONSE_STREAM function URL. Importing lambda_handler loads the
+# SSM configuration before the app is created. There is no handler return to
+# flush webhooks after, so WebhookFlushMiddleware drains them per request.
+
+PATH=$PATH:$LAMBDA_TASK_ROOT/bin \
+  PYTHONPATH=$PYTHONPATH:/opt/python:$LAMBDA_RUNTIME_DIR \
+  exec python -m uvicorn --host 0.0.0.0 --port "${PORT:-8080}" lambda_handler:app
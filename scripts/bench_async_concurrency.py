@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Concurrency benchmark for the /execute request path.
+
+Fires N simultaneous /execute requests at the FastAPI app while the upstream
+model call is replaced by a fake with a fixed latency, and reports
+requests/sec plus the latency of a /health probe sent while they are in flight.
+
+"blocking" is the previous handler shape (an async route calling the
+synchronous execute(), which blocks the event loop); "async" is the current
+route using AsyncAnthropic, async webhooks and offloaded storage calls.
+Job and thread storage use the in-memory fallbacks, so no AWS access is needed.
+The async route is bounded by the job scheduler; --workers sets its pool size
+(default AGENT_EXECUTE_LIMIT) and the queue is sized to admit every request.
+
+Usage (from the project root):
+    python scripts/bench_async_concurrency.py [--requests 20] [--latency 0.5] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+# Every request asks the same first-turn question; measure model calls, not cache hits or lookups
+os.environ.setdefault("RESPONSE_CACHE", "false")
+os.environ.setdefault("BENCHMARK_LOOKUP", "false")
+os.environ.setdefault("AWS_EC2_METADATA_DISABLED", "true")
+
+import httpx  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+import smart_agent.src.utils.temp_db as temp_db  # noqa: E402
+import smart_agent.src.utils.thread_storage as thread_storage  # noqa: E402
+import smart_agent.src.utils.job_scheduler as job_scheduler  # noqa: E402
+from smart_agent.src.controllers.ExecuteController import execute  # noqa: E402
+from smart_agent.src.routes.routes import router  # noqa: E402
+
+ANSWER = "UK family office CEOs earn a median base salary of **£198,001**."
+
+
+def fake_response():
+    return types.SimpleNamespace(
+        content=[types.SimpleNamespace(type="text", text=ANSWER)],
+        usage=types.SimpleNamespace(
+            input_tokens=1000, output_tokens=20,
+            cache_creation_input_tokens=0, cache_read_input_tokens=900
+        )
+    )
+
+
+class SlowMessages:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        return fake_response()
+
+
+class SlowAsyncMessages:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return fake_response()
+
+
+def offline_storage(*args, **kwargs):
+    raise ClientError({"Error": {"Code": "Offline", "Message": "benchmark"}}, "Offline")
+
+
+def build_app():
+    app = FastAPI()
+    app.include_router(router)
+
+    @app.post("/blocking/execute")
+    async def blocking_execute(request: dict):
+        return execute(request)
+
+    return app
+
+
+async def run(app, path, requests, latency):
+    body = {"inputs": [{"name": "payload", "data": "What is the average CEO salary in the UK?"}]}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def probe_health():
+            # Probe once the execute requests are in flight; time from the intended
+            # send time, so a blocked event loop counts against the probe
+            delay = latency / 2
+            scheduled = time.perf_counter() + delay
+            await asyncio.sleep(delay)
+            await client.get("/health")
+            return time.perf_counter() - scheduled
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            probe_health(),
+            *(client.post(path, json=body) for _ in range(requests))
+        )
+        elapsed = time.perf_counter() - started
+
+    failures = sum(1 for response in results[1:] if response.status_code != 200)
+    return requests / elapsed, elapsed, results[0], failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20, help="simultaneous /execute requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake upstream latency in seconds")
+    parser.add_argument("--workers", type=int, default=job_scheduler.AGENT_EXECUTE_LIMIT, help="scheduler workers")
+    args = parser.parse_args()
+
+    job_scheduler._scheduler = job_scheduler.JobScheduler(args.workers, args.requests)
+
+    temp_db.get_storage_backend = offline_storage
+    thread_storage.get_storage_backend = offline_storage
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=SlowMessages(args.latency))
+    base_agent_module.get_async_anthropic_client = lambda: types.SimpleNamespace(
+        messages=SlowAsyncMessages(args.latency)
+    )
+
+    app = build_app()
+    print(f"{args.requests} simultaneous requests, upstream latency {args.latency:.2f}s, {args.workers} workers")
+    for name, path in (("blocking", "/blocking/execute"), ("async", "/execute")):
+        throughput, elapsed, health_latency, failures = asyncio.run(run(app, path, args.requests, args.latency))
+        print(
+            f"{name:9s} {throughput:7.2f} req/s  wall={elapsed:6.2f}s  "
+            f"/health under load={health_latency * 1000:8.1f}ms  failures={failures}"
+        )
+
+
+if __name__ == "__main__":
+    main()
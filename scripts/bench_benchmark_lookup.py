@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Latency and coverage of the single-fact benchmark lookup fast path.
+
+Asks lookup questions ("CFO salary UK") and questions that need the model
+through llm() with no threadId, while the model call is replaced by a fake
+with a fixed --latency, and reports p50/p95 per group. The response cache is
+off, so every lookup is answered from the dataset and every other question
+by the fake model. The script then checks that every salary and bonus row
+with a published figure is answered, with its band in the HTML, when asked
+as "<role> <metric> <region>", that the non-lookup questions all fell back to
+the model, and times GET /benchmark/lookup.
+
+Storage is a temporary SQLite database, so no AWS access is needed.
+
+Usage (from the project root):
+    python scripts/bench_benchmark_lookup.py [--latency 2]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+os.environ["RESPONSE_CACHE"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+from smart_agent.src.agent.benchmark_data import BONUS, SALARY  # noqa: E402
+from smart_agent.src.agent.benchmark_lookup import get_lookup_stats  # noqa: E402
+from smart_agent.src.agent.skill_loader import get_skill_corpus  # noqa: E402
+from smart_agent.src.routes.routes import router  # noqa: E402
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async_concurrency import SlowMessages  # noqa: E402
+
+LOOKUPS = [
+    "CFO salary UK",
+    "What is the average CEO salary in the UK?",
+    "How much does a chief investment officer earn in the USA?",
+    "What's the typical salary for a COO in New York?",
+    "CIO bonus Middle East",
+    "What bonus does a CFO get in the US?",
+    "Investment analyst salary in Dubai",
+    "Typical CEO pay in Australia",
+]
+
+MODEL_QUESTIONS = [
+    "How does UK CFO pay compare to the USA?",
+    "How common are LTIPs in family offices?",
+    "What governance structures do family offices use?",
+    "What is the average CEO salary in the UK for a $1BN AUM office?",
+    "What benefits does a CFO get in the UK?",
+    "Why are CEO salaries in the Middle East so high?",
+]
+
+
+def ask(questions):
+    latencies, usages = [], []
+    for question in questions:
+        start = time.perf_counter()
+        html, _, _, _, usage = base_agent_module.llm(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+        usages.append(usage)
+    return latencies, usages
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    print(f"  {label:15s} p50={statistics.median(ordered):8.1f}ms  p95={p95:8.1f}ms  n={len(latencies)}")
+
+
+def check_coverage(dataset):
+    answered = total = 0
+    for metric in (SALARY, BONUS):
+        for row in dataset.select(metric):
+            role = dataset.columns["role"][row]
+            band = dataset.columns["band"][row]
+            if not role or not any(character.isdigit() for character in band):
+                continue
+            total += 1
+            question = f"{role} {metric} {dataset.columns['region_name'][row]}"
+            html, _, _, _, usage = base_agent_module.llm(question)
+            if usage["output_tokens"] == 0 and band in html:
+                answered += 1
+            else:
+                print(f"    not answered from the dataset: {question!r}")
+    print(f"  coverage: {answered}/{total} published salary and bonus figures answered from the dataset")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=2.0, help="fake model latency in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=SlowMessages(args.latency))
+
+    with tempfile.TemporaryDirectory() as directory:
+        set_storage_backend(SQLiteBackend(os.path.join(directory, "benchmark-lookup.sqlite3")))
+        dataset = get_skill_corpus().benchmarks
+        print(f"{len(dataset)} benchmark rows; model latency {args.latency * 1000:.0f} ms:")
+
+        latencies, usages = ask(LOOKUPS * 3)
+        assert all(usage["output_tokens"] == 0 for usage in usages), "a lookup question reached the model"
+        report("lookups", latencies)
+
+        latencies, usages = ask(MODEL_QUESTIONS)
+        assert all(usage["output_tokens"] > 0 for usage in usages), "a model question was answered as a lookup"
+        report("model questions", latencies)
+
+        check_coverage(dataset)
+
+        client = TestClient(FastAPI())
+        client.app.include_router(router)
+        latencies = []
+        for question in LOOKUPS * 5:
+            start = time.perf_counter()
+            response = client.get("/benchmark/lookup", params={"q": question})
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+        report("/benchmark/lookup", latencies)
+
+        stats = get_lookup_stats()
+        print(f"  lookups={stats['lookups']} answered={stats['answered']} answerRate={stats['answerRate']}")
+
+
+if __name__ == "__main__":
+    main()
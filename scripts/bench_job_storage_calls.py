@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Jobs-table calls per /execute, with and without job contexts.
+
+Runs jobs through the async /execute route and the synchronous execute()
+(the Lambda path), each followed by a /status poll, while the model call is
+replaced by a fake. Every job has a webhook URL pointing at a local HTTP
+server, so all of its callbacks are sent. Each jobs-table call is counted,
+and the calls per job are reported with job contexts enabled and then
+disabled (JOB_CONTEXT_MAX_ENTRIES=0, where webhook delivery reads the job back
+from storage).
+
+Storage is a temporary SQLite database, so no AWS access is needed.
+
+Usage (from the project root):
+    python scripts/bench_job_storage_calls.py [--jobs 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import types
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+# Every request asks the same first-turn question; measure model calls, not cache hits or lookups
+os.environ.setdefault("RESPONSE_CACHE", "false")
+os.environ.setdefault("BENCHMARK_LOOKUP", "false")
+
+import httpx  # noqa: E402
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+import smart_agent.src.utils.job_context as job_context  # noqa: E402
+from smart_agent.src.controllers.ExecuteController import execute  # noqa: E402
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+from smart_agent.src.utils.bounded_cache import BoundedCache  # noqa: E402
+from smart_agent.src.utils.webhook import flush_webhooks  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async_concurrency import SlowAsyncMessages, SlowMessages, build_app  # noqa: E402
+
+JOB_METHODS = ("save_job", "get_job", "update_job_status")
+
+
+class CountingBackend:
+    """Wraps a backend and counts calls to the jobs table."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+        if name not in JOB_METHODS:
+            return method
+
+        def call(*args, **kwargs):
+            self.calls[name] += 1
+            return method(*args, **kwargs)
+
+        return call
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def body(webhook_url):
+    return {
+        "inputs": [{"name": "payload", "data": "What is the average CEO salary in the UK?"}],
+        "webhookUrl": webhook_url
+    }
+
+
+async def run_async(app, jobs, webhook_url):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as c:
+        for _ in range(jobs):
+            response = await c.post("/execute", json=body(webhook_url))
+            status = await c.get("/status", params={"id": response.json()["id"]})
+            assert status.json()["status"] == "completed", status.json()
+
+
+def run_sync(app, jobs, webhook_url):
+    async def poll(job_id):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as c:
+            return (await c.get("/status", params={"id": job_id})).json()
+
+    for _ in range(jobs):
+        result = execute(body(webhook_url))
+        assert asyncio.run(poll(result["id"]))["status"] == "completed"
+
+
+def report(label, calls, jobs):
+    per_job = {name: calls[name] / jobs for name in JOB_METHODS}
+    total = sum(per_job.values())
+    details = "  ".join(f"{name}={value:.1f}" for name, value in per_job.items())
+    print(f"  {label:6s} {total:5.1f} calls/job  {details}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=20, help="jobs per path and mode")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=SlowMessages(0))
+    base_agent_module.get_async_anthropic_client = lambda: types.SimpleNamespace(messages=SlowAsyncMessages(0))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook_url = f"http://127.0.0.1:{server.server_port}/hook"
+    app = build_app()
+
+    totals = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for enabled in (False, True):
+            entries = job_context.JOB_CONTEXT_MAX_ENTRIES if enabled else 0
+            job_context._contexts = BoundedCache(
+                entries, job_context.JOB_CONTEXT_MAX_BYTES, job_context.JOB_CONTEXT_TTL_SECONDS,
+                job_context._context_size
+            )
+            print(f"job contexts {'enabled' if enabled else 'disabled'}:")
+            for label, runner in (("async", lambda: asyncio.run(run_async(app, args.jobs, webhook_url))),
+                                  ("sync", lambda: run_sync(app, args.jobs, webhook_url))):
+                backend = CountingBackend(SQLiteBackend(os.path.join(directory, f"{label}-{enabled}.sqlite3")))
+                set_storage_backend(backend)
+                runner()
+                flush_webhooks(None)
+                totals[(label, enabled)] = report(label, backend.calls, args.jobs)
+
+    server.shutdown()
+    for label in ("async", "sync"):
+        print(f"{label}: {totals[(label, False)] / totals[(label, True)]:.1f}x fewer jobs-table calls per job")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Per-request prompt assembly time and allocations, before and after compiled templates.
+
+"Before" is the previous implementation, reproduced here: the prompt file is
+read and parsed with yaml.safe_load on every request, each variable is
+substituted with a str.replace pass over the template, the messages are cut
+out with regular expressions and the reference data block is formatted for
+every request. "After" is get_prompt_template() rendering the compiled
+template with one join, and build_system_blocks() reusing the assembled
+persona and reference data blocks.
+
+Both paths get the same skill content (selected once per question up front)
+and must produce identical system blocks. For each prompt-caching mode the
+script reports the median time per assembly and the peak memory allocated
+while assembling (tracemalloc).
+
+Usage (from the project root):
+    python scripts/bench_prompt_assembly.py [--iterations 2000]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_agent.src.agent.base_agent import build_system_blocks  # noqa: E402
+from smart_agent.src.agent.prompt_extract import get_prompt_template  # noqa: E402
+from smart_agent.src.agent.skill_loader import load_relevant_skills, get_skill_dir  # noqa: E402
+
+PROMPT_FILE = "Prompt/AgentPrompt.yaml"
+
+QUESTIONS = [
+    "What is the average CEO salary in the UK?",
+    "Compare CFO salaries across the UK, USA, Europe, Asia, Australia and the Middle East",
+    "What governance structures do family offices use?",
+    "How common are LTIPs?",
+]
+
+_legacy_hashes = {}
+
+
+def legacy_extract_message(content, role):
+    match = re.search(rf'<message role="{role}">(.*?)</message>', content, re.DOTALL)
+    return match.group(1).strip() if match else ''
+
+
+def legacy_substitute(content, variables):
+    for key, value in variables.items():
+        content = content.replace(f'{{{{{key}}}}}', str(value) if value is not None else '')
+    return content
+
+
+def legacy_file_hash(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _legacy_hashes.get(key)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:32]
+        _legacy_hashes[key] = digest
+    return digest
+
+
+def legacy_assemble(variables, skill_content, caching):
+    with open(PROMPT_FILE, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    prompt_content = data.get('prompt', '')
+    version = legacy_file_hash(PROMPT_FILE)
+
+    if not caching:
+        system_prompt = legacy_extract_message(legacy_substitute(prompt_content, variables), 'system')
+        return f"{system_prompt}\n\n## Reference Data\n\n{skill_content}", version
+
+    placeholders = [f'{{{{{key}}}}}' for key in variables]
+    static_sections, dynamic_sections = [], []
+    for section in re.split(r'(?m)^(?=## )', legacy_extract_message(prompt_content, 'system')):
+        (dynamic_sections if any(p in section for p in placeholders) else static_sections).append(section)
+    static_prompt = legacy_substitute(''.join(static_sections), variables).strip()
+    dynamic_prompt = legacy_substitute(''.join(dynamic_sections), variables).strip()
+    legacy_substitute(legacy_extract_message(prompt_content, 'user'), variables)
+
+    blocks = [{"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}}]
+    if skill_content:
+        blocks.append({"type": "text", "text": f"## Reference Data\n\n{skill_content}",
+                       "cache_control": {"type": "ephemeral"}})
+    if dynamic_prompt:
+        blocks.append({"type": "text", "text": dynamic_prompt})
+    return blocks, version
+
+
+def compiled_assemble(variables, skill_content, caching):
+    template = get_prompt_template(PROMPT_FILE)
+    if not caching:
+        system_prompt, _ = template.render(variables)
+        return "\n\n".join((system_prompt, "## Reference Data", skill_content)), template.version
+
+    static_prompt, dynamic_prompt, _ = template.render_cacheable(variables)
+    return build_system_blocks(static_prompt, skill_content, dynamic_prompt, template.version), template.version
+
+
+def measure(assemble, cases, caching, iterations):
+    # Warm up: first compile, first block assembly per skill selection
+    for variables, skill_content in cases:
+        assemble(variables, skill_content, caching)
+
+    timings = []
+    for i in range(iterations):
+        variables, skill_content = cases[i % len(cases)]
+        start = time.perf_counter_ns()
+        assemble(variables, skill_content, caching)
+        timings.append(time.perf_counter_ns() - start)
+
+    peaks = []
+    tracemalloc.start()
+    for variables, skill_content in cases:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = assemble(variables, skill_content, caching)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    tracemalloc.stop()
+
+    return statistics.median(timings) / 1000, statistics.mean(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000, help="assemblies timed per path and mode")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    cases = []
+    for question in QUESTIONS:
+        skill_content, _ = load_relevant_skills(get_skill_dir(), question)
+        variables = {"instructions": "Answer the user's question based on the benchmark data.", "payload": question}
+        cases.append((variables, skill_content))
+        for caching in (True, False):
+            assert legacy_assemble(variables, skill_content, caching) == \
+                compiled_assemble(variables, skill_content, caching), f"outputs differ for {question!r}"
+
+    print(f"Prompt assembly per request ({len(cases)} questions, identical output checked):")
+    for caching in (True, False):
+        mode = "PROMPT_CACHING=true" if caching else "PROMPT_CACHING=false"
+        before = measure(legacy_assemble, cases, caching, args.iterations)
+        after = measure(compiled_assemble, cases, caching, args.iterations)
+        print(f"  {mode}")
+        print(f"    before  p50={before[0]:8.1f}us  peak alloc={before[1]:7.1f} KiB")
+        print(f"    after   p50={after[0]:8.1f}us  peak alloc={after[1]:7.1f} KiB"
+              f"  ({before[0] / after[0]:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
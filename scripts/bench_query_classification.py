@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Microbenchmark and precision check for query classification.
+
+Compares the legacy substring classifier against the compiled KeywordMatcher
+on a labelled query set, reporting per-query timing and file-level
+precision/recall.
+
+Usage (from the project root):
+    python scripts/bench_query_classification.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_agent.src.agent.skill_loader import get_skill_corpus  # noqa: E402
+
+# (query, expected reference files)
+LABELLED_QUERIES = [
+    ("What is the average CEO salary in the UK?", {"regional-uk.md"}),
+    ("How does UK CFO pay compare to the USA?", {"regional-uk.md", "regional-usa.md"}),
+    ("Tell us about LTIPs for CIOs in business-focused offices", set()),
+    ("What do CFOs earn?", set()),
+    ("How common are LTIPs?", set()),
+    ("What are typical salaries in Singapore and Hong Kong?", {"regional-asia.md"}),
+    ("Family office governance and succession planning", {"governance.md"}),
+    ("Is there a queue of candidates for roles in Dubai?", {"regional-middleeast.md"}),
+    ("What returns do family offices target on their portfolios?", {"investments.md"}),
+    ("How many offices are hiring this year?", {"recruitment.md"}),
+    ("What is a typical bonus in the US?", {"regional-usa.md"}),
+    ("Compare EU and Australian CEO packages", {"regional-europe.md", "regional-australia.md"}),
+    ("Do family offices with $1BN AUM pay more?", set()),
+    ("What is the focus of NextGen members?", set()),
+    ("Salary for an investment manager in London", {"regional-uk.md", "investments.md"}),
+]
+
+
+# Keywords the legacy SKILL_FILES registry carried that the frontmatter dropped
+LEGACY_EXTRA_KEYWORDS = {"regional-usa.md": ("$",)}
+
+
+def legacy_classify(corpus, query):
+    """Substring classification as implemented before the compiled matcher."""
+    query_lower = query.lower()
+    return {
+        filename for filename, skill_file in corpus.files.items()
+        if any(
+            keyword.lower() in query_lower
+            for keyword in skill_file.keywords + LEGACY_EXTRA_KEYWORDS.get(filename, ())
+        )
+    }
+
+
+def compiled_classify(corpus, query):
+    return {group for group in corpus.matcher.scan(query) if group in corpus.files}
+
+
+def score(classify, corpus):
+    true_positive = false_positive = false_negative = 0
+    for query, expected in LABELLED_QUERIES:
+        predicted = classify(corpus, query)
+        true_positive += len(predicted & expected)
+        false_positive += len(predicted - expected)
+        false_negative += len(expected - predicted)
+    precision = true_positive / max(true_positive + false_positive, 1)
+    recall = true_positive / max(true_positive + false_negative, 1)
+    return precision, recall, false_positive
+
+
+def main():
+    corpus = get_skill_corpus("Skill")
+    queries = [query for query, _ in LABELLED_QUERIES]
+
+    for name, classify in (("legacy substring", legacy_classify), ("compiled matcher", compiled_classify)):
+        precision, recall, false_positive = score(classify, corpus)
+        seconds = timeit.timeit(lambda: [classify(corpus, q) for q in queries], number=2000)
+        per_query_us = seconds / (2000 * len(queries)) * 1e6
+        print(
+            f"{name:18s} precision={precision:.2f} recall={recall:.2f} "
+            f"false_positives={false_positive:2d} time/query={per_query_us:6.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+First-turn answer latency with the response cache: model calls, local hits
+and shared hits.
+
+Asks a set of benchmark questions through llm() with no threadId while the
+model call is replaced by a fake with a fixed --latency. The first round is
+answered by the model. The second repeats each question with different case,
+spacing and punctuation, and is served from the per-process tier. The third
+clears that tier, standing in for another container, and is served from the
+shared table. p50/p95 latency is reported per round together with the hit
+rate. The script then checks that every cached answer created a thread that
+holds the question and the answer, and that editing the prompt template
+makes the next request miss.
+
+Storage is a temporary SQLite database and the prompt template a temporary
+copy, so no AWS access is needed and Prompt/ is left untouched.
+
+Usage (from the project root):
+    python scripts/bench_response_cache.py [--latency 2]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+# Some questions are single-fact lookups; measure the cache, not the lookup fast path
+os.environ.setdefault("BENCHMARK_LOOKUP", "false")
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+import smart_agent.src.utils.response_cache as response_cache  # noqa: E402
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+from smart_agent.src.utils.thread_storage import get_thread_state  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async_concurrency import SlowMessages  # noqa: E402
+
+QUESTIONS = [
+    "What is the average CEO salary in the UK?",
+    "How common are LTIPs in family offices?",
+    "What bonus does a CIO get in the USA?",
+    "How do family office salaries in Asia compare with Europe?",
+    "What governance structures do family offices use?",
+    "What is the typical CFO package in the Middle East?",
+]
+
+
+def rephrase(question):
+    """Same question as a user might type it again: case, spacing and punctuation differ."""
+    return "  " + question.rstrip("?").lower().replace(" ", "  ") + " ?? "
+
+
+def ask(questions):
+    latencies, thread_ids = [], []
+    for question in questions:
+        start = time.perf_counter()
+        _, _, thread_id, _, _ = base_agent_module.llm(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+        thread_ids.append(thread_id)
+    return latencies, thread_ids
+
+
+def report(label, latencies, hits):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    print(
+        f"  {label:13s} p50={statistics.median(ordered):8.1f}ms  p95={p95:8.1f}ms  "
+        f"hits={hits}/{len(latencies)}"
+    )
+
+
+def total_hits():
+    stats = response_cache.get_response_cache_stats()
+    return stats["localHits"] + stats["sharedHits"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=2.0, help="fake model latency in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=SlowMessages(args.latency))
+
+    with tempfile.TemporaryDirectory() as directory:
+        set_storage_backend(SQLiteBackend(os.path.join(directory, "response-cache.sqlite3")))
+        template = os.path.join(directory, "AgentPrompt.yaml")
+        shutil.copy(base_agent_module.get_prompt_file_path("AgentPrompt.yaml"), template)
+        base_agent_module.get_prompt_file_path = lambda filename: template
+
+        print(f"{len(QUESTIONS)} questions, model latency {args.latency * 1000:.0f} ms:")
+        rounds = (
+            ("model", QUESTIONS, False),
+            ("local hits", [rephrase(question) for question in QUESTIONS], False),
+            ("shared hits", QUESTIONS, True),
+        )
+        cached_threads = []
+        for label, questions, clear_local in rounds:
+            if clear_local:
+                response_cache._local_cache.clear()
+            before = total_hits()
+            latencies, thread_ids = ask(questions)
+            report(label, latencies, total_hits() - before)
+            if label != "model":
+                cached_threads.extend(thread_ids)
+
+        # Every cached answer still started a thread a follow-up can continue
+        for thread_id in cached_threads:
+            messages = get_thread_state(thread_id)["messages"]
+            assert [message["role"] for message in messages] == ["user", "assistant"], messages
+        print(f"  {len(cached_threads)} cached answers each created a thread with the question and answer")
+
+        # A template edit changes every key
+        with open(template, "a", encoding="utf-8") as f:
+            f.write("\n# edited\n")
+        before = total_hits()
+        ask(QUESTIONS[:1])
+        assert total_hits() == before, "answer served from the cache after the template changed"
+        print("  template edit: next request answered by the model")
+
+        stats = response_cache.get_response_cache_stats()
+        print(f"  hitRate={stats['hitRate']} lookups={stats['lookups']} stores={stats['stores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Per-request storage latency during a simulated storage outage, with and
+without the per-table circuit breakers.
+
+Each simulated request makes the storage calls of one /execute turn: save the
+job, load the thread, mark the job running, four webhook job reads, save the
+thread and mark the job completed. A turn whose thread history cannot be
+read (storage down and no local copy) ends there with the 503 the API
+returns, after marking the job failed. Requests run in three phases: healthy,
+outage (every storage call stalls for --stall-ms, standing in for the
+timeout and retry chain, then fails) and recovery. The whole run is repeated
+with the breakers disabled (a failure rate above 1 never opens them), and
+p50/p95/max request latency is reported per phase.
+
+Storage is a temporary SQLite database behind the soak test's outage wrapper,
+so no AWS access is needed. STORAGE_BREAKER_OPEN_SECONDS defaults to 1 here so
+that the recovery phase shows breakers closing again.
+
+Usage (from the project root):
+    python scripts/bench_storage_breaker.py [--requests 30] [--stall-ms 100]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("STORAGE_BREAKER_OPEN_SECONDS", "1")
+
+from smart_agent.src import storage  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+from smart_agent.src.utils import temp_db, thread_storage  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from soak_fallback_memory import OutageBackend  # noqa: E402
+
+
+def execute_request(index, thread_id):
+    """Storage calls of one /execute turn; returns the thread id."""
+    job_id = f"bench-{index}-{time.monotonic_ns()}"
+    temp_db.save_job(job_id, {"id": job_id, "webhookUrl": "https://example.invalid/hook"})
+    try:
+        state = thread_storage.get_thread_state(thread_id) if thread_id else thread_storage.empty_thread_state()
+    except thread_storage.ThreadUnavailableError as e:
+        temp_db.update_job_status(job_id, "error", {"error": str(e)}, unless_status=["aborted"])
+        return thread_id
+    temp_db.update_job_status(job_id, "running", unless_status=["aborted"])
+    for _ in range(4):
+        temp_db.get_job(job_id)
+    thread_id = thread_storage.save_thread_state(thread_id, {
+        **state,
+        "messages": state["messages"] + [
+            {"role": "user", "content": f"question {index}"},
+            {"role": "assistant", "content": "The median is £198,001."}
+        ]
+    })
+    temp_db.update_job_status(job_id, "completed", {"answer": "£198,001"}, unless_status=["aborted"])
+    return thread_id
+
+
+def run_phase(backend, down, requests, thread_id):
+    backend.down = down
+    latencies = []
+    for index in range(requests):
+        start = time.perf_counter()
+        thread_id = execute_request(index, thread_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, thread_id
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    print(f"  {label:9s} p50={statistics.median(ordered):8.1f}ms  p95={p95:8.1f}ms  max={ordered[-1]:8.1f}ms")
+
+
+def run(breakers_enabled, args, directory):
+    # A failure rate above 1 can never be reached, so the breakers stay closed
+    storage.STORAGE_BREAKER_FAILURE_RATE = float(os.environ.get("STORAGE_BREAKER_FAILURE_RATE", "0.5")) \
+        if breakers_enabled else 2.0
+    backend = OutageBackend(
+        SQLiteBackend(os.path.join(directory, f"breaker-{breakers_enabled}.sqlite3")),
+        args.stall_ms / 1000
+    )
+    storage.set_storage_backend(backend)
+
+    print(f"breakers {'enabled' if breakers_enabled else 'disabled'}:")
+    thread_id = None
+    for label, down in (("healthy", False), ("outage", True), ("recovery", False)):
+        if label == "recovery":
+            # Storage is back once the open period has passed: the next calls probe it
+            time.sleep(storage.STORAGE_BREAKER_OPEN_SECONDS)
+        latencies, thread_id = run_phase(backend, down, args.requests, thread_id)
+        report(label, latencies)
+    print(f"  breakers  {storage.get_breaker_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=30, help="requests per phase")
+    parser.add_argument("--stall-ms", type=float, default=100, help="time each storage call takes to fail")
+    args = parser.parse_args()
+
+    # Every call fails during the outage; keep the per-call error logs out of the report
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for breakers_enabled in (True, False):
+            run(breakers_enabled, args, directory)
+
+
+if __name__ == "__main__":
+    main()
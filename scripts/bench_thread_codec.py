@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Size and latency benchmark for the thread storage codec.
+
+Builds synthetic 50-turn threads whose answers are assembled from the skill
+reference markdown (tables, figures, headings), then compares:
+- the legacy blob: the whole thread as one json.dumps() string attribute;
+- per-turn items encoded with each codec ("json", "zlib", "lzma").
+
+Sizes are attribute bytes; DynamoDB bills writes per 1 KB and reads per 4 KB,
+so the WCU column is the sum of per-turn write units.
+
+Usage (from the project root):
+    python scripts/bench_thread_codec.py [--threads 20] [--turns 50]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_agent.src.agent.skill_loader import get_skill_corpus  # noqa: E402
+from smart_agent.src.storage.codec import encode_messages, decode_messages  # noqa: E402
+
+QUESTIONS = [
+    "What is the average CEO salary in the UK?",
+    "How does that compare with the USA?",
+    "What bonus levels are typical for a CIO?",
+    "Do family offices offer LTIPs in Asia?",
+    "How large are investment teams in the Middle East?",
+    "What are the main governance structures?",
+]
+
+
+def synthetic_thread(rng, paragraphs, turns):
+    """A thread of `turns` question/answer pairs with 1.5-4 KB markdown answers."""
+    messages = []
+    for _ in range(turns):
+        question = rng.choice(QUESTIONS)
+        answer = []
+        while sum(len(part) for part in answer) < rng.randint(1500, 4000):
+            answer.append(rng.choice(paragraphs))
+        answer_text = "\n\n".join(answer)
+        messages.append({"role": "user", "content": question, "tokens": len(question) // 4 + 1})
+        messages.append({"role": "assistant", "content": answer_text, "tokens": len(answer_text) // 4 + 1})
+    return messages
+
+
+def turn_pairs(messages):
+    return [messages[index:index + 2] for index in range(0, len(messages), 2)]
+
+
+def size(value):
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = get_skill_corpus("Skill")
+    paragraphs = [
+        block.strip()
+        for skill_file in corpus.files.values()
+        for block in skill_file.content.split("\n\n")
+        if len(block.strip()) > 40
+    ]
+    rng = random.Random(7)
+    threads = [synthetic_thread(rng, paragraphs, args.turns) for _ in range(args.threads)]
+    turns = [turn for thread in threads for turn in turn_pairs(thread)]
+
+    blob_sizes = [size(json.dumps(thread, ensure_ascii=False)) for thread in threads]
+    print(f"{args.threads} threads x {args.turns} turns; legacy blob item: "
+          f"avg {sum(blob_sizes) / len(blob_sizes) / 1024:.1f} KB, max {max(blob_sizes) / 1024:.1f} KB "
+          f"(rewritten on every turn)")
+    print(f"{'codec':6s} {'bytes/turn':>10s} {'ratio':>6s} {'WCU/turn':>8s} {'max item':>9s} "
+          f"{'encode':>9s} {'decode':>9s}")
+
+    raw_bytes = sum(size(json.dumps(turn, ensure_ascii=False)) for turn in turns)
+    for codec in ("json", "zlib", "lzma"):
+        encoded = [encode_messages(turn, codec) for turn in turns]
+        assert all(decode_messages(value) == turn for value, turn in zip(encoded, turns))
+
+        sizes = [size(value) for value in encoded]
+        write_units = sum(math.ceil(item_size / 1024) for item_size in sizes) / len(turns)
+        encode_us = timeit.timeit(lambda: [encode_messages(turn, codec) for turn in turns], number=3)
+        decode_us = timeit.timeit(lambda: [decode_messages(value) for value in encoded], number=3)
+        print(
+            f"{codec:6s} {sum(sizes) / len(sizes):10.0f} {raw_bytes / sum(sizes):6.2f} {write_units:8.2f} "
+            f"{max(sizes) / 1024:7.1f}KB {encode_us / (3 * len(turns)) * 1e6:7.1f}us "
+            f"{decode_us / (3 * len(turns)) * 1e6:7.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Job latency against a slow, flaky webhook endpoint, with inline delivery and
+with the background webhook dispatcher.
+
+Runs jobs through the synchronous execute() (the Lambda path) while the model
+call is replaced by a fake. Every job has a webhook URL pointing at a local
+HTTP server. The server answers after --delay seconds and fails a --fail-rate
+share of first attempts with 503. Job latency (p50/p95) is reported for
+inline delivery (WEBHOOK_WORKERS=0) and for the dispatcher, followed by the
+time flush_webhooks() needed to drain the queue. After each run the script
+checks that every job's events arrived in order and ended with "completed",
+and reports the events coalesced and retried.
+
+A third run serves POST /execute through the FastAPI router wrapped in
+WebhookFlushMiddleware, as uvicorn does under the Lambda Web Adapter
+(run.sh). Each request carries an x-amzn-lambda-context deadline, and the
+script checks that the job's events were all delivered before its response
+ended.
+
+Storage is a temporary SQLite database, so no AWS access is needed.
+
+Usage (from the project root):
+    python scripts/bench_webhook_dispatch.py [--jobs 20] [--delay 0.2] [--fail-rate 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+# Every request asks the same first-turn question; measure model calls, not cache hits or lookups
+os.environ.setdefault("RESPONSE_CACHE", "false")
+os.environ.setdefault("BENCHMARK_LOOKUP", "false")
+os.environ.setdefault("WEBHOOK_BACKOFF_SECONDS", "0.05")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+import smart_agent.src.utils.webhook as webhook  # noqa: E402
+from smart_agent.src.controllers.ExecuteController import execute  # noqa: E402
+from smart_agent.src.routes.routes import router  # noqa: E402
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async_concurrency import SlowAsyncMessages, SlowMessages  # noqa: E402
+
+# Order in which a job's events are sent; coalescing may drop the progress message
+EVENT_ORDER = ["progress", "output:explanation", "output:threadId", "completed"]
+
+
+class WebhookServer(ThreadingHTTPServer):
+    def __init__(self, delay, fail_rate):
+        super().__init__(("127.0.0.1", 0), WebhookHandler)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.received = defaultdict(list)
+        self.attempted = set()
+        self.lock = threading.Lock()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        event = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.server.delay)
+        kind = webhook.coalesce_key(event) or event["status"]
+        with self.server.lock:
+            first_attempt = (event["id"], kind) not in self.server.attempted
+            self.server.attempted.add((event["id"], kind))
+            fail = first_attempt and random.random() < self.server.fail_rate
+            if not fail:
+                self.server.received[event["id"]].append(kind)
+        self.send_response(503 if fail else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def check_order(received, job_ids):
+    for job_id in job_ids:
+        kinds = received[job_id]
+        assert kinds and kinds[-1] == "completed", f"job {job_id}: {kinds}"
+        assert [EVENT_ORDER.index(kind) for kind in kinds] == sorted(EVENT_ORDER.index(kind) for kind in kinds), \
+            f"job {job_id} out of order: {kinds}"
+
+
+def run(workers, args, server, directory):
+    webhook._dispatcher = webhook.WebhookDispatcher(workers=workers)
+    set_storage_backend(SQLiteBackend(os.path.join(directory, f"webhooks-{workers}.sqlite3")))
+    server.received.clear()
+    webhook_url = f"http://127.0.0.1:{server.server_port}/hook"
+
+    latencies, job_ids = [], []
+    started = time.perf_counter()
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        result = execute({
+            "inputs": [{"name": "payload", "data": "What is the average CEO salary in the UK?"}],
+            "webhookUrl": webhook_url
+        })
+        latencies.append((time.perf_counter() - start) * 1000)
+        job_ids.append(result["id"])
+    answered = time.perf_counter() - started
+    webhook.flush_webhooks(None)
+    drained = time.perf_counter() - started
+
+    check_order(server.received, job_ids)
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    stats = webhook.get_webhook_stats()
+    label = "inline" if workers <= 0 else f"{workers} workers"
+    print(
+        f"{label:11s} job p50={statistics.median(ordered):7.1f}ms p95={p95:7.1f}ms  "
+        f"all answered {answered:5.2f}s, webhooks drained {drained:5.2f}s  "
+        f"coalesced={stats['coalesced']} retried={stats['retried']} failed={stats['failed']}"
+    )
+
+
+async def run_web_adapter(workers, args, server, directory):
+    webhook._dispatcher = webhook.WebhookDispatcher(workers=workers)
+    set_storage_backend(SQLiteBackend(os.path.join(directory, "webhooks-lwa.sqlite3")))
+    server.received.clear()
+    webhook_url = f"http://127.0.0.1:{server.server_port}/hook"
+
+    app = FastAPI()
+    app.add_middleware(webhook.WebhookFlushMiddleware)
+    app.include_router(router)
+
+    latencies, early = [], 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for _ in range(args.jobs):
+            # Deadline of a 60 s invocation, as the Lambda Web Adapter passes it
+            context = {"request_id": "bench", "deadline": int(time.time() * 1000) + 60000}
+            start = time.perf_counter()
+            response = await client.post(
+                "/execute",
+                json={
+                    "inputs": [{"name": "payload", "data": "What is the average CEO salary in the UK?"}],
+                    "webhookUrl": webhook_url
+                },
+                headers={"x-amzn-lambda-context": json.dumps(context)}
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            job_id = response.json()["id"]
+            with server.lock:
+                kinds = list(server.received[job_id])
+            if not kinds or kinds[-1] != "completed":
+                early += 1
+
+    check_order(server.received, list(server.received))
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    stats = webhook.get_webhook_stats()
+    print(
+        f"web adapter job p50={statistics.median(ordered):7.1f}ms p95={p95:7.1f}ms  "
+        f"responses ended before delivery: {early}/{args.jobs}  "
+        f"coalesced={stats['coalesced']} retried={stats['retried']} failed={stats['failed']}"
+    )
+    assert early == 0, f"{early} responses ended before their webhooks were delivered"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=20, help="jobs per mode")
+    parser.add_argument("--delay", type=float, default=0.2, help="webhook endpoint response time in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="share of first attempts answered with 503")
+    parser.add_argument("--workers", type=int, default=webhook.WEBHOOK_WORKERS, help="dispatcher threads")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.ERROR)
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=SlowMessages(0))
+    base_agent_module.get_async_anthropic_client = lambda: types.SimpleNamespace(messages=SlowAsyncMessages(0))
+
+    server = WebhookServer(args.delay, args.fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"{args.jobs} jobs, webhook endpoint {args.delay * 1000:.0f} ms, {args.fail_rate:.0%} first attempts fail")
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in (0, args.workers):
+            run(workers, args, server, directory)
+        asyncio.run(run_web_adapter(args.workers, args, server, directory))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Build the structured benchmark dataset from the regional skill files.
+
+Parses Skill/references/regional-*.md exactly as the agent does at cold
+start and writes the dataset as columnar JSON (one list per column, NaN as
+null), for review or for loading elsewhere. Lines that look like figures but
+could not be parsed (an unknown role in a salary table, a bonus line without
+a percentage) are listed, and --strict turns them into a non-zero exit so a
+skill edit that breaks a table fails the build.
+
+Usage (from the project root):
+    python scripts/build_benchmark_data.py [--skill-dir Skill] [--output benchmark-data.json] [--strict]
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_agent.src.agent.skill_loader import SkillCorpus  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--skill-dir", default="Skill", help="skill directory")
+    parser.add_argument("--output", help="write the dataset here as JSON (default: summary only)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 if any data line could not be parsed")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    dataset = SkillCorpus(args.skill_dir).benchmarks
+
+    print(f"{len(dataset)} rows from {len(dataset.region_names)} regions:")
+    for metric, ids in sorted(dataset.by_metric.items()):
+        regions = sorted({dataset.columns["region"][row] for row in ids})
+        print(f"  {metric:18s} {len(ids):4d} rows  ({', '.join(regions)})")
+
+    if args.output:
+        columns = {
+            name: [None if isinstance(value, float) and math.isnan(value) else value for value in values.tolist()]
+            if hasattr(values, "tolist") else list(values)
+            for name, values in dataset.columns.items()
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"regions": dict(dataset.region_names), "columns": columns}, f, ensure_ascii=False, indent=1)
+        print(f"Wrote {args.output}")
+
+    if dataset.skipped:
+        print(f"{len(dataset.skipped)} lines not parsed:")
+        for line in dataset.skipped:
+            print(f"  {line}")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Input tokens of tool-use mode (AGENT_TOOLS) against the default skill stuffing.
+
+Each broad comparison question is asked through llm() twice: once with the
+reference content selected by load_relevant_skills() in the system prompt,
+once with only the SKILL.md metadata and the benchmark tools. By default the
+model is replaced by a fake that makes the tool calls a model would make for
+the question (all in one parallel round), then answers. The fake reports the
+estimated input tokens of every request it receives: system prompt, tool
+definitions, messages and tool results, plus the system prompt Anthropic
+adds when tools are sent (TOOL_USE_SYSTEM_TOKENS). Usage is summed over the
+rounds of a turn, as llm() reports it.
+
+Two figures are reported per mode: "reference", the benchmark content the
+model was given (the Reference Data block, or the metadata block plus the
+tool results), and "input", everything sent over all rounds. The persona
+prompt, tool definitions and question are sent again on every round, so the
+input total shrinks much less than the reference content.
+
+With --live the real API is called instead (ANTHROPIC_API_KEY required),
+the model picks its own tool calls and the input column shows the usage the
+API reported, with cache reads and writes included.
+
+Storage is a temporary SQLite database, so no AWS access is needed.
+
+Usage (from the project root):
+    python scripts/compare_tool_tokens.py [--live]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+os.environ["RESPONSE_CACHE"] = "false"
+os.environ["BENCHMARK_LOOKUP"] = "false"
+
+import smart_agent.src.agent.base_agent as base_agent_module  # noqa: E402
+from smart_agent.src.agent.skill_index import estimate_tokens  # noqa: E402
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+
+# System prompt Anthropic adds to requests carrying tools (Claude 4 models, tool_choice auto/none)
+TOOL_USE_SYSTEM_TOKENS = 346
+
+# Question and the tool calls the fake model makes for it
+QUESTIONS = [
+    ("Compare CFO salaries across the UK, USA, Europe, Asia, Australia and the Middle East",
+     [("lookup_salary", {"role": "CFO"})]),
+    ("How do CEO salary and bonus compare between the UK and the USA?",
+     [("lookup_salary", {"role": "CEO", "region": "uk"}), ("lookup_salary", {"role": "CEO", "region": "usa"}),
+      ("get_bonus_structure", {"region": "uk"}), ("get_bonus_structure", {"region": "usa"})]),
+    ("Which region pays investment analysts the most, and how do bonuses differ between regions?",
+     [("lookup_salary", {"role": "Investment Analyst"})]
+     + [("get_bonus_structure", {"region": region})
+        for region in ("asia", "australia", "europe", "middleeast", "uk", "usa")]),
+    ("Compare CIO compensation in Asia, Europe and Australia",
+     [("lookup_salary", {"role": "CIO", "region": region}) for region in ("asia", "europe", "australia")]
+     + [("get_bonus_structure", {"region": region}) for region in ("asia", "europe", "australia")]),
+    ("Compare LTIP prevalence for family office executives in the UK, the USA and the Middle East",
+     [("get_section", {"topic": "LTIP", "region": region}) for region in ("uk", "usa", "middleeast")]),
+    ("What benefits do UK family office employees receive?",
+     [("get_section", {"topic": "benefits", "region": "uk"})]),
+]
+
+ANSWER = "A comparison of the requested figures, citing the tables used. " * 20
+
+
+def _serialize(content):
+    if isinstance(content, str):
+        return content
+    return json.dumps([block if isinstance(block, dict) else vars(block) for block in content], default=str)
+
+
+def reference_tokens(request):
+    """Estimated tokens of benchmark content in a turn's last request."""
+    system = request["system"]
+    blocks = [system] if isinstance(system, str) else [block["text"] for block in system]
+    text = [block.partition("## Reference Data")[2] for block in blocks]
+    text.extend(
+        block["content"] for message in request["messages"] if isinstance(message["content"], list)
+        for block in message["content"] if isinstance(block, dict) and block.get("type") == "tool_result"
+    )
+    return estimate_tokens("\n".join(part for part in text if part))
+
+
+def request_tokens(request):
+    """Estimated input tokens of a Messages API request."""
+    system = request["system"]
+    parts = [system] if isinstance(system, str) else [block["text"] for block in system]
+    parts.extend(_serialize(message["content"]) for message in request["messages"])
+    tokens = estimate_tokens("\n".join(parts))
+    if "tools" in request:
+        tokens += estimate_tokens(json.dumps(request["tools"])) + TOOL_USE_SYSTEM_TOKENS
+    return tokens
+
+
+class RecordingMessages:
+    """Keeps the requests of the real API client."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.plan = []
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return self.messages.create(**request)
+
+
+class PlannedMessages:
+    """Fake model: one round of the planned tool calls, then the answer."""
+
+    def __init__(self):
+        self.plan = []
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        usage = types.SimpleNamespace(
+            input_tokens=request_tokens(request), output_tokens=estimate_tokens(ANSWER),
+            cache_creation_input_tokens=0, cache_read_input_tokens=0
+        )
+        if "tools" in request and len(request["messages"]) == 1:
+            blocks = [types.SimpleNamespace(type="tool_use", id=f"call-{i}", name=name, input=arguments)
+                      for i, (name, arguments) in enumerate(self.plan)]
+            return types.SimpleNamespace(content=blocks, usage=usage, stop_reason="tool_use")
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(type="text", text=ANSWER)], usage=usage, stop_reason="end_turn"
+        )
+
+
+def ask(messages, question, tools):
+    base_agent_module.AGENT_TOOLS = tools
+    messages.requests.clear()
+    _, _, _, _, usage = base_agent_module.llm(question)
+    input_tokens = usage["input_tokens"] + usage["cache_read_input_tokens"] + usage["cache_creation_input_tokens"]
+    last = messages.requests[-1]
+    calls = sum(1 for message in last["messages"] if isinstance(message["content"], list)
+                for block in message["content"] if isinstance(block, dict) and block.get("type") == "tool_result")
+    return reference_tokens(last), input_tokens, calls, len(messages.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--live", action="store_true", help="call the Anthropic API instead of the planned fake")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    if args.live:
+        messages = RecordingMessages(base_agent_module.get_anthropic_client().messages)
+    else:
+        messages = PlannedMessages()
+    base_agent_module.get_anthropic_client = lambda: types.SimpleNamespace(messages=messages)
+
+    with tempfile.TemporaryDirectory() as directory:
+        set_storage_backend(SQLiteBackend(os.path.join(directory, "compare-tool-tokens.sqlite3")))
+        source = "API usage" if args.live else "estimated, planned tool calls"
+        print(f"Tokens per question ({source}); reference = benchmark content, input = all rounds:")
+        print(f"  {'question':50s} {'stuffing ref/input':>19s} {'tools ref/input':>16s} {'calls':>6s} "
+              f"{'ref':>6s} {'input':>6s}")
+
+        totals = [0, 0, 0, 0]
+        for question, plan in QUESTIONS:
+            messages.plan = plan
+            stuffing = ask(messages, question, False)
+            tools = ask(messages, question, True)
+            for position, value in enumerate(stuffing[:2] + tools[:2]):
+                totals[position] += value
+            label = question if len(question) <= 50 else question[:47] + "..."
+            print(f"  {label:50s} {stuffing[0]:9d}/{stuffing[1]:<9d} {tools[0]:6d}/{tools[1]:<9d} "
+                  f"{tools[2]:6d} {stuffing[0] / max(tools[0], 1):5.1f}x {stuffing[1] / tools[1]:5.1f}x")
+
+        print(f"  {'total':50s} {totals[0]:9d}/{totals[1]:<9d} {totals[2]:6d}/{totals[3]:<9d} {'':6s} "
+              f"{totals[0] / totals[2]:5.1f}x {totals[1] / totals[3]:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
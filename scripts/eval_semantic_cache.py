@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+"""
+Precision, hit rate and lookup latency of the near-duplicate response cache.
+
+Each labelled group holds phrasings of one question, labelled with the
+figure it asks for (role, topic, region). The index is populated as in
+production: the first phrasing of every group plus --populate synthetic
+questions built from role x region x topic x phrasing templates, each
+labelled by its template values, so the IDF is fitted on thousands of
+questions and every lookup has many close neighbours. Every other phrasing,
+and every question in UNSEEN, is then looked up. A hit is correct when the
+matched question carries the same label (its own group's question, or a
+synthetic question asking for the same figure) and wrong otherwise: a wrong
+answer served. Groups that differ only in role, metric or region ("CEO
+salary in the UK" / "CFO salary in the UK" / "CEO bonus in the UK") are the
+hard negatives. The scope of each question comes from the real skill
+selection, as in prepare_llm_request, so rephrasings that load different
+skill content cannot match.
+
+Precision and hit rate are reported per threshold twice: with the response
+cache scope alone, and narrowed to the question's roles, metrics and regions
+(semantic_cache.entity_scope), as the cache does. Pick
+SEMANTIC_CACHE_THRESHOLD where the entity-scoped precision is 1.0.
+
+The latency section fills the cache's index with --entries synthetic
+questions, each under its entity scope as add_similar_question() stores it,
+and reports p50/p95 of the full get_similar_response() call: entity
+extraction, embedding and index search. Matched answers are read from an
+in-memory dict standing in for a warm response cache.
+
+Usage (from the project root):
+    python scripts/eval_semantic_cache.py [--populate 3000] [--entries 100000]
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Time lookups as deployed: outside dev mode the skill corpus is not checked for file changes on every call
+os.environ.setdefault("ENVIRONMENT_MODE", "prod")
+
+from smart_agent.src.agent.skill_loader import get_skill_dir, load_relevant_skills  # noqa: E402
+from smart_agent.src.utils.response_cache import content_hash, response_cache_scope  # noqa: E402
+import smart_agent.src.utils.semantic_cache as semantic_cache  # noqa: E402
+from smart_agent.src.utils.semantic_cache import (  # noqa: E402
+    SEMANTIC_REBUILD_PENDING,
+    SemanticIndex,
+    entity_scope,
+    get_similar_response,
+)
+
+THRESHOLDS = (0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95)
+
+# (role, topic, region) asked for, and phrasings of the question; the first is indexed, the rest looked up
+GROUPS = [
+    (("CEO", "salary", "the UK"), [
+        "What is the average CEO salary in the UK?",
+        "average UK CEO salary",
+        "How much does a chief executive officer earn in the United Kingdom?",
+        "what's the average salary for a CEO in the UK",
+        "UK family office CEO average salary?",
+    ]),
+    (("CEO", "salary", "the USA"), [
+        "What is the average CEO salary in the USA?",
+        "average US CEO salary",
+        "How much does a chief executive officer earn in the United States?",
+        "what's the average salary for a CEO in the USA",
+    ]),
+    (("CFO", "salary", "the UK"), [
+        "What is the average CFO salary in the UK?",
+        "average UK CFO salary",
+        "How much does a chief financial officer earn in the United Kingdom?",
+    ]),
+    (("CEO", "bonus", "the UK"), [
+        "What is the average CEO bonus in the UK?",
+        "average UK CEO bonus",
+        "what's the average bonus for a CEO in the UK",
+    ]),
+    (("", "LTIP", ""), [
+        "How common are LTIPs in family offices?",
+        "how common are long term incentive plans in family offices",
+        "Are LTIPs common in family offices?",
+        "how widespread are LTIPs at family offices",
+    ]),
+    (("CIO", "bonus", "the USA"), [
+        "What bonus does a CIO get in the USA?",
+        "typical bonus for a CIO in the USA",
+        "What bonus does a chief investment officer get in the United States?",
+        "CIO bonus USA",
+    ]),
+    (("CIO", "bonus", "Asia"), [
+        "What bonus does a CIO get in Asia?",
+        "typical bonus for a CIO in Asia",
+        "CIO bonus Asia",
+    ]),
+    (("CIO", "salary", "Asia"), [
+        "What salary does a CIO get in Asia?",
+        "typical salary for a CIO in Asia",
+        "CIO salary Asia",
+    ]),
+    (("", "salary", "Asia vs Europe"), [
+        "How do family office salaries in Asia compare with Europe?",
+        "compare family office salaries in Asia and Europe",
+        "family office pay: Asia vs Europe",
+    ]),
+    (("", "governance", ""), [
+        "What governance structures do family offices use?",
+        "which governance structures do family offices have",
+        "family office governance structures",
+    ]),
+    (("CFO", "package", "the Middle East"), [
+        "What is the typical CFO package in the Middle East?",
+        "typical CFO package Middle East",
+        "What does a typical chief financial officer package look like in the Middle East?",
+    ]),
+    (("", "returns", ""), [
+        "What returns do family offices target on their portfolios?",
+        "target portfolio returns of family offices",
+        "what return do family offices aim for on their portfolio",
+    ]),
+]
+
+# Related questions whose figure no group asks for; a hit is correct only on a synthetic question with the same label
+UNSEEN = [
+    (("COO", "salary", "the UK"), "What is the average COO salary in the UK?"),
+    (("CEO", "salary", "Australia"), "What is the average CEO salary in Australia?"),
+    (("CIO", "bonus", "Europe"), "What bonus does a CIO get in Europe?"),
+    (("CFO", "bonus", "the UK"), "What is the average CFO bonus in the UK?"),
+    (("CEO", "bonus", "the USA"), "what's the average bonus for a CEO in the USA"),
+    (("", "LTIP", "Asia"), "How common are LTIPs in multi family offices in Asia?"),
+    (("CFO", "package", "Asia"), "What is the typical CFO package in Asia?"),
+    (("", "hiring", ""), "How many family offices are hiring this year?"),
+    (("", "succession", ""), "What succession planning do family offices do?"),
+]
+
+ROLES = [
+    "CEO", "CFO", "CIO", "COO", "CTO", "general counsel", "head of tax", "portfolio manager",
+    "investment analyst", "family office director", "head of private equity", "chief of staff",
+    "head of real estate", "controller", "risk manager", "head of philanthropy", "executive assistant",
+    "head of direct investments", "treasury manager", "head of operations",
+]
+REGIONS = [
+    "the UK", "the USA", "Europe", "Asia", "Australia", "the Middle East", "London", "New York",
+    "Singapore", "Hong Kong", "Dubai", "Switzerland", "Germany", "Sydney", "California", "Texas",
+    "Geneva", "Zurich", "Paris", "Miami",
+]
+TOPICS = [
+    "base salary", "bonus", "LTIP", "total compensation", "carried interest", "pension",
+    "notice period", "salary increase", "deferred bonus", "benefits package", "sign-on bonus",
+    "co-investment rights", "equity stake", "retention bonus", "car allowance", "relocation package",
+    "health cover", "holiday allowance", "pay range", "bonus cap",
+]
+FORMS = [
+    "What is the typical {topic} for a {role} in {region}?",
+    "How much {topic} does a {role} get in {region}?",
+    "{role} {topic} in {region}",
+    "average {topic} of a family office {role} in {region}",
+    "Is a {topic} usual for a {role} in {region}?",
+    "compare {topic} for a {role} in {region} with the market",
+    "what {topic} should we offer a {role} in {region}",
+    "benchmark the {topic} of a {role} based in {region}",
+    "{region}: {role} {topic} levels",
+    "how is the {topic} of a {role} in {region} structured",
+    "latest data on {role} {topic} in {region}",
+    "{topic} trends for {role} hires in {region}",
+    "do single family offices in {region} pay a {role} a {topic}",
+]
+
+
+# Synthetic topics asking for the same figure as the groups' topics
+TOPIC_LABELS = {"base salary": "salary", "pay range": "salary"}
+
+
+def question_scope(skill_dir, question):
+    """Scope of a question as prepare_llm_request computes it, for a fixed template and model."""
+    skill_content, _ = load_relevant_skills(skill_dir, question)
+    return response_cache_scope(None, content_hash(skill_content), "eval", {})
+
+
+def synthetic_questions(count, seed=None):
+    """Template questions and their (role, topic, region) labels, in template order or sampled with `seed`."""
+    combinations = list(itertools.product(FORMS, TOPICS, ROLES, REGIONS))
+    if seed is not None:
+        combinations = random.Random(seed).sample(combinations, min(count, len(combinations)))
+    for form, topic, role, region in combinations[:count]:
+        yield form.format(topic=topic, role=role, region=region), (role, TOPIC_LABELS.get(topic, topic), region)
+
+
+def evaluate(populate):
+    skill_dir = get_skill_dir()
+    scopes = {}
+
+    def scope_of(question, entities):
+        if question not in scopes:
+            scopes[question] = question_scope(skill_dir, question)
+        return entity_scope(question, scopes[question]) if entities else scopes[question]
+
+    labels = {}
+    seeds = {}
+    indexed = []
+    for number, (label, group) in enumerate(GROUPS):
+        labels[f"group-{number}"] = label
+        seeds[f"group-{number}"] = group[0]
+        indexed.append((f"group-{number}", group[0]))
+    for number, (question, label) in enumerate(synthetic_questions(populate, seed=0)):
+        labels[f"synthetic-{number}"] = label
+        seeds[f"synthetic-{number}"] = question
+        indexed.append((f"synthetic-{number}", question))
+
+    queries = [(label, question) for label, group in GROUPS for question in group[1:]]
+    queries.extend(UNSEEN)
+    positives = sum(len(group) - 1 for _, group in GROUPS)
+    print(f"{len(GROUPS)} group questions and {populate} synthetic questions indexed; "
+          f"{positives} rephrasings and {len(UNSEEN)} unseen questions looked up")
+
+    for entities in (False, True):
+        index = SemanticIndex(max_entries=len(indexed), ttl_seconds=3600, rebuild_pending=len(indexed) + 1,
+                              background=False)
+        for key, question in indexed:
+            index.add(question, scope_of(question, entities), key)
+        index.rebuild()
+
+        # (expected label, matched key, similarity, question)
+        results = []
+        for label, question in queries:
+            key, similarity = index.search(question, scope_of(question, entities))
+            results.append((label, key, similarity, question))
+
+        print(f"\n  {'scope + entities' if entities else 'scope only'}:")
+        print(f"  {'threshold':>9s}  {'hits':>4s}  {'correct':>7s}  {'wrong':>5s}  {'precision':>9s}  {'hit rate':>8s}")
+        for threshold in THRESHOLDS:
+            hits = [(position, labels[key] == label) for position, (label, key, similarity, _) in enumerate(results)
+                    if key and similarity >= threshold]
+            correct = sum(1 for _, right in hits if right)
+            # Rephrasings come first in the results
+            answered = sum(1 for position, right in hits if right and position < positives)
+            precision = correct / len(hits) if hits else 1.0
+            print(
+                f"  {threshold:9.2f}  {len(hits):4d}  {correct:7d}  {len(hits) - correct:5d}  {precision:9.3f}  "
+                f"{answered / positives:8.3f}"
+            )
+
+        print("  closest wrong matches:")
+        wrong = sorted(
+            ((similarity, question, seeds[key]) for label, key, similarity, question in results
+             if key and labels[key] != label),
+            reverse=True
+        )
+        for similarity, question, seed in wrong[:5]:
+            print(f"    {similarity:.3f}  {question!r} -> {seed!r}")
+
+
+def measure_latency(entries):
+    index = SemanticIndex(max_entries=entries, ttl_seconds=3600, rebuild_pending=entries + 1, background=False)
+    answers = {}
+    start = time.perf_counter()
+    for number, (question, _) in enumerate(synthetic_questions(entries)):
+        index.add(question, entity_scope(question, "scope"), f"key-{number}")
+        answers[f"key-{number}"] = {"markdown": question, "html": "", "explanation": ""}
+    index.rebuild()
+    print(f"\n{len(index)} synthetic questions indexed under {index.stats()['scopes']} entity scopes "
+          f"and rebuilt in {time.perf_counter() - start:.1f}s")
+
+    semantic_cache._index = index
+    semantic_cache.read_cached_response = answers.get
+
+    # Questions shaped like the indexed ones but not among them, and rephrasings of indexed ones
+    queries = [f"what does a {role} earn as {topic} in {region} these days"
+               for role, topic, region in zip(ROLES * 3, TOPICS[::-1] * 3, REGIONS[5:] + REGIONS[:5] + REGIONS)]
+    queries.extend(f"what's the typical {topic} for a {role} in {region}"
+                   for role, topic, region in zip(ROLES * 2, TOPICS * 2, REGIONS[::-1] * 2))
+
+    def report(label):
+        latencies = []
+        hits = 0
+        for question in queries * 5:
+            start = time.perf_counter()
+            hits += get_similar_response(question, "scope") is not None
+            latencies.append((time.perf_counter() - start) * 1000)
+        ordered = sorted(latencies)
+        p95 = ordered[int(len(ordered) * 0.95)]
+        print(f"  get_similar_response {label}: p50={statistics.median(ordered):.2f}ms  p95={p95:.2f}ms  "
+              f"({len(latencies)} lookups, {hits} hits)")
+
+    report("after a rebuild")
+
+    # Questions added since the last rebuild are scored directly; just below the rebuild point is the worst case
+    for number, (question, _) in enumerate(synthetic_questions(SEMANTIC_REBUILD_PENDING - 1, seed=1)):
+        index.add(question + " now", entity_scope(question, "scope"), f"pending-{number}")
+        answers[f"pending-{number}"] = answers["key-0"]
+    report(f"with {SEMANTIC_REBUILD_PENDING - 1} pending questions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--populate", type=int, default=3000, help="synthetic questions indexed for the precision run")
+    parser.add_argument("--entries", type=int, default=100000, help="synthetic questions for the latency run")
+    args = parser.parse_args()
+
+    logging.getLogger("agent").setLevel(logging.WARNING)
+    evaluate(args.populate)
+    measure_latency(args.entries)
+
+
+if __name__ == "__main__":
+    main()
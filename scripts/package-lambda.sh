@@ -31,6 +31,7 @@ docker run --rm \
 echo "Copying source files..."
 cp -r "$PROJECT_DIR/smart_agent" "$PROJECT_DIR/package/"
 cp "$PROJECT_DIR/lambda_handler.py" "$PROJECT_DIR/package/"
+cp "$PROJECT_DIR/run.sh" "$PROJECT_DIR/package/"
 cp -r "$PROJECT_DIR/Prompt" "$PROJECT_DIR/package/"
 cp -r "$PROJECT_DIR/Skill" "$PROJECT_DIR/package/"
 
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Soak test of the in-memory storage fallbacks during a simulated outage.
+
+Runs job lifecycles (save, running, completed with result, status read) and
+thread turns through temp_db and thread_storage while every storage call
+fails, sampling traced Python memory as the fallbacks fill up. It asserts
+that memory stays flat once the fallbacks reach their bounds. It then ends
+the outage and runs reconciliation, asserting that every job and thread
+still held is flushed to storage and that nothing was written twice.
+
+Storage is a temporary SQLite database behind a wrapper that raises
+ClientError while the outage lasts, so no AWS access is needed. The bounds
+are lowered (LOCAL_JOBS_MAX_ENTRIES, LOCAL_THREADS_MAX_ENTRIES) so they are
+reached quickly; set them in the environment to soak the production values.
+
+Usage (from the project root):
+    python scripts/soak_fallback_memory.py [--jobs 20000] [--turns 4000] [--samples 20]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LOCAL_JOBS_MAX_ENTRIES", "4000")
+os.environ.setdefault("LOCAL_THREADS_MAX_ENTRIES", "400")
+os.environ.setdefault("FALLBACK_RECONCILE_BATCH", "1000")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from smart_agent.src.storage import set_storage_backend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+from smart_agent.src.utils import temp_db, thread_storage  # noqa: E402
+
+
+class OutageBackend:
+    """Wraps a backend so that every call fails, after `stall_seconds`, while `down` is set."""
+
+    def __init__(self, backend, stall_seconds: float = 0.0):
+        self.backend = backend
+        self.name = backend.name
+        self.stall_seconds = stall_seconds
+        self.down = False
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def call(*args, **kwargs):
+            if self.down:
+                time.sleep(self.stall_seconds)
+                raise ClientError({"Error": {"Code": "ServiceUnavailable", "Message": "soak outage"}}, name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+def job_lifecycle(index):
+    job_id = str(uuid.uuid4())
+    temp_db.save_job(job_id, {"id": job_id, "inputs": [{"name": "payload", "data": f"question {index} " * 20}]})
+    temp_db.update_job_status(job_id, "running", unless_status=["aborted"])
+    temp_db.update_job_status(job_id, "completed", {"answer": "£198,001 " * 50}, unless_status=["aborted"])
+    temp_db.get_job(job_id)
+
+
+def thread_turn(thread_ids, index):
+    # Mostly follow-ups on recent threads, with a steady stream of new ones
+    thread_id = thread_ids[index % len(thread_ids)] if thread_ids and index % 5 else None
+    state = thread_storage.get_thread_state(thread_id) if thread_id else thread_storage.empty_thread_state()
+    question = f"question {index} about family office pay"
+    thread_id = thread_storage.save_thread_state(thread_id, {
+        **state,
+        "messages": state["messages"] + [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": f"Answer to {question}: " + "the median is £198,001. " * 40}
+        ]
+    })
+    if thread_id not in thread_ids[-4:]:
+        thread_ids.append(thread_id)
+        del thread_ids[:-4]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=20000, help="job lifecycles during the outage")
+    parser.add_argument("--turns", type=int, default=4000, help="thread turns during the outage")
+    parser.add_argument("--samples", type=int, default=20, help="memory samples")
+    args = parser.parse_args()
+
+    # Every call fails during the outage; keep the per-call error logs out of the report
+    logging.getLogger("agent").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = OutageBackend(SQLiteBackend(os.path.join(directory, "soak.sqlite3")))
+        set_storage_backend(backend)
+        backend.down = True
+
+        tracemalloc.start()
+        steps = max(args.jobs, args.turns)
+        interval = max(steps // args.samples, 1)
+        thread_ids = []
+        samples = []
+        print(f"outage: {args.jobs} job lifecycles, {args.turns} thread turns")
+        print(f"{'step':>8s} {'traced MB':>10s} {'jobs held':>10s} {'evicted':>8s} {'threads held':>13s} {'evicted':>8s}")
+        for step in range(steps):
+            if step < args.jobs:
+                job_lifecycle(step)
+            turn = step * args.turns // steps
+            if turn != (step + 1) * args.turns // steps:
+                thread_turn(thread_ids, turn)
+            if (step + 1) % interval == 0:
+                current = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+                jobs, threads = temp_db.get_local_job_stats(), thread_storage.get_local_thread_stats()
+                samples.append(current)
+                print(f"{step + 1:8d} {current:10.1f} {jobs['entries']:10d} {jobs['evictions']:8d} "
+                      f"{threads['entries']:13d} {threads['evictions']:8d}")
+
+        # Once the bounds are reached (by the halfway point here), memory must stop growing
+        settled = samples[len(samples) // 2:]
+        growth = max(settled) - settled[0]
+        assert growth < max(0.1 * settled[0], 2.0), f"memory grew {growth:.1f} MB after the fallbacks filled"
+        print(f"memory flat after the fallbacks filled: +{growth:.1f} MB over the second half")
+
+        held_jobs = [job_id for job_id, _ in temp_db._local_db.items()]
+        held_threads = {thread_id: held["state"] for thread_id, held in thread_storage._local_threads.items()}
+
+        backend.down = False
+        # Fresh circuit breakers, as if their open period had passed
+        set_storage_backend(backend)
+        while len(temp_db._local_db):
+            temp_db.reconcile_local_jobs()
+        while len(thread_storage._local_threads):
+            thread_storage.reconcile_local_threads()
+
+        for job_id in held_jobs:
+            job = temp_db.get_job(job_id)
+            assert job is not None and job["status"] == "completed" and job["result"], f"job {job_id} not flushed"
+        for thread_id, state in held_threads.items():
+            stored = thread_storage.get_thread_state(thread_id)["messages"]
+            assert stored == state["messages"], f"thread {thread_id}: {len(stored)} of {len(state['messages'])} messages"
+
+        print(f"recovered: {len(held_jobs)} jobs and {len(held_threads)} threads flushed to storage, none duplicated")
+        print(f"jobs fallback    {temp_db.get_local_job_stats()}")
+        print(f"threads fallback {thread_storage.get_local_thread_stats()}")
+
+
+if __name__ == "__main__":
+    main()
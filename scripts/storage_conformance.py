@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""
+Conformance checks and throughput benchmark shared by every storage backend.
+
+Runs the same checks against each backend: the job lifecycle (including
+status guards), thread turns and headers (including concurrent appends and
+header merges), turn leases, response cache entries (including expiry) and
+latency probes. Then benchmarks the job
+lifecycle the agent performs per request (save, running, completed with
+result, status read) from --workers threads, and thread turn appends and
+loads, reporting jobs/min and per-operation latency.
+
+The sqlite backend runs on a temporary database file. The dynamodb backend
+runs against DynamoDB Local when --endpoint-url is given, otherwise moto's
+in-process mock if moto is installed (moto is far slower than DynamoDB, so
+its throughput is not representative).
+
+Usage (from the project root):
+    python scripts/storage_conformance.py [--backend sqlite|dynamodb|all] [--jobs 2000] [--workers 16]
+        [--threads 200] [--endpoint-url http://localhost:8000]
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+
+from smart_agent.src.config.storage import STORAGE_REGION, STORAGE_TABLES, TableConfig  # noqa: E402
+from smart_agent.src.storage.dynamodb import DynamoDBBackend  # noqa: E402
+from smart_agent.src.storage.sqlite import SQLiteBackend  # noqa: E402
+from smart_agent.src.utils.aws_clients import get_client  # noqa: E402
+
+
+def turn(question):
+    return [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": f"Answer to {question}: the median is **£198,001** (n=42)."}
+    ]
+
+
+# Conformance checks
+
+
+def check_job_lifecycle(backend):
+    job_id = str(uuid.uuid4())
+    assert backend.get_job(job_id) is None
+    backend.save_job(job_id, {"id": job_id, "status": "pending", "webhookUrl": None})
+    record = backend.get_job(job_id)
+    assert record["data"] == {"id": job_id, "status": "pending", "webhookUrl": None}, record
+    assert record["status"] is None and record["result"] is None and record["created_at"], record
+
+    assert backend.update_job_status(job_id, "running") is True
+    assert backend.get_job(job_id)["status"] == "running"
+    assert backend.update_job_status(job_id, "completed", {"answer": "£198,001"}) is True
+    record = backend.get_job(job_id)
+    assert record["status"] == "completed" and record["result"] == {"answer": "£198,001"}, record
+    assert record["updated_at"], record
+
+    # A status update without a result keeps the stored one
+    assert backend.update_job_status(job_id, "completed") is True
+    assert backend.get_job(job_id)["result"] == {"answer": "£198,001"}
+
+    backend.delete_job(job_id)
+    assert backend.get_job(job_id) is None
+
+
+def check_job_status_guard(backend):
+    job_id = str(uuid.uuid4())
+    backend.save_job(job_id, {"id": job_id})
+    assert backend.update_job_status(job_id, "running", unless_status=["aborted"]) is True
+    assert backend.update_job_status(job_id, "aborted") is True
+    assert backend.update_job_status(job_id, "completed", {"answer": "late"}, unless_status=["aborted"]) is False
+    record = backend.get_job(job_id)
+    assert record["status"] == "aborted" and record["result"] is None, record
+
+    # Updating a job that was never saved creates a status-only record
+    missing_id = str(uuid.uuid4())
+    assert backend.update_job_status(missing_id, "aborted", unless_status=["completed"]) is True
+    assert backend.get_job(missing_id)["status"] == "aborted"
+
+
+def check_thread_missing(backend):
+    thread_id = str(uuid.uuid4())
+    assert backend.get_thread_header(thread_id) is None
+    assert backend.get_thread_version(thread_id) is None
+    assert backend.load_turns(thread_id, 1) == []
+
+
+def check_thread_append_and_load(backend):
+    thread_id = str(uuid.uuid4())
+    turns = [turn("Salaire moyen d'un CEO ?"), turn("And in the USA? 🇺🇸")]
+    assert backend.append_turns(thread_id, turns, 0) == (2, 4)
+    # Turns are readable before the header is written
+    assert [item["turn"] for item in backend.load_turns(thread_id, 1)] == [1, 2]
+
+    fields = {"turn_count": 2, "message_count": 4, "summary": "", "summarized_count": 0, "summarized_turns": 0}
+    assert backend.update_thread_header(thread_id, fields, 0) == 1
+    assert backend.get_thread_header(thread_id) == {**fields, "version": 1}
+    assert backend.get_thread_version(thread_id) == 1
+
+    loaded = backend.load_turns(thread_id, 1)
+    assert [item["messages"] for item in loaded] == turns
+    assert [item["first_message"] for item in loaded] == [0, 2]
+    assert [item["turn"] for item in backend.load_turns(thread_id, 2)] == [2]
+
+    assert backend.append_turns(thread_id, [turn("third")], 4) == (3, 6)
+    assert backend.append_turns(thread_id, [], 6) == (3, 6)
+
+
+def check_thread_concurrent_appends(backend):
+    thread_id = str(uuid.uuid4())
+    writers = 8
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        results = list(pool.map(lambda index: backend.append_turns(thread_id, [turn(f"q{index}")], 0), range(writers)))
+
+    assert sorted(turn_count for turn_count, _ in results) == list(range(1, writers + 1)), results
+    loaded = backend.load_turns(thread_id, 1)
+    assert [item["turn"] for item in loaded] == list(range(1, writers + 1))
+    assert [item["first_message"] for item in loaded] == list(range(0, 2 * writers, 2))
+    assert sorted(item["messages"][0]["content"] for item in loaded) == sorted(f"q{index}" for index in range(writers))
+
+
+def check_thread_header_merge(backend):
+    thread_id = str(uuid.uuid4())
+    ahead = {"turn_count": 3, "message_count": 6, "summary": "", "summarized_count": 0, "summarized_turns": 0}
+    summarised = {"turn_count": 2, "message_count": 4, "summary": "Earlier: CEO pay", "summarized_count": 2,
+                  "summarized_turns": 1}
+    assert backend.update_thread_header(thread_id, ahead, 0) == 1
+    # Saved from version 0 too: counts come from the header further ahead, the summary from this save
+    assert backend.update_thread_header(thread_id, summarised, 0) == 2
+    assert backend.get_thread_header(thread_id) == {
+        "turn_count": 3, "message_count": 6, "summary": "Earlier: CEO pay", "summarized_count": 2,
+        "summarized_turns": 1, "version": 2
+    }
+
+
+def check_thread_delete(backend):
+    thread_id = str(uuid.uuid4())
+    backend.append_turns(thread_id, [turn("one"), turn("two")], 0)
+    backend.update_thread_header(
+        thread_id,
+        {"turn_count": 2, "message_count": 4, "summary": "", "summarized_count": 0, "summarized_turns": 0},
+        0
+    )
+    backend.delete_thread(thread_id)
+    assert backend.get_thread_header(thread_id) is None
+    assert backend.load_turns(thread_id, 1) == []
+
+
+def check_thread_leases(backend):
+    thread_id = str(uuid.uuid4())
+    assert backend.acquire_thread_lease(thread_id, "a", 60) is True
+    # A header holding only a lease is not a thread
+    assert backend.get_thread_header(thread_id) is None
+    assert backend.acquire_thread_lease(thread_id, "b", 60) is False
+    assert backend.acquire_thread_lease(thread_id, "a", 60) is True
+
+    backend.release_thread_lease(thread_id, "b")
+    assert backend.acquire_thread_lease(thread_id, "b", 60) is False
+    backend.release_thread_lease(thread_id, "a")
+    assert backend.acquire_thread_lease(thread_id, "b", 60) is True
+
+    # Expired leases can be taken over
+    other_id = str(uuid.uuid4())
+    assert backend.acquire_thread_lease(other_id, "crashed", -5) is True
+    assert backend.acquire_thread_lease(other_id, "c", 60) is True
+
+    # Leases do not disturb the thread stored on the same header
+    fields = {"turn_count": 1, "message_count": 2, "summary": "", "summarized_count": 0, "summarized_turns": 0}
+    backend.append_turns(thread_id, [turn("leased")], 0)
+    assert backend.update_thread_header(thread_id, fields, 0) == 1
+    backend.release_thread_lease(thread_id, "b")
+    assert backend.get_thread_header(thread_id) == {**fields, "version": 1}
+
+
+def check_response_cache(backend):
+    cache_key = str(uuid.uuid4())
+    assert backend.get_cached_response(cache_key) is None
+    entry = {"markdown": "**£198,001**", "html": "<p><strong>£198,001</strong></p>", "explanation": "Survey"}
+    backend.put_cached_response(cache_key, entry, 60)
+    assert backend.get_cached_response(cache_key) == entry
+    backend.put_cached_response(cache_key, {**entry, "markdown": "£200,000"}, 60)
+    assert backend.get_cached_response(cache_key)["markdown"] == "£200,000"
+
+    # Expired entries are not served, even before they are purged
+    expired_key = str(uuid.uuid4())
+    backend.put_cached_response(expired_key, entry, -5)
+    assert backend.get_cached_response(expired_key) is None
+
+
+def check_latency_probe(backend):
+    results = backend.measure_latency(2)
+    assert results and all(result["ok"] for result in results.values()), results
+
+
+CHECKS = [
+    check_job_lifecycle,
+    check_job_status_guard,
+    check_thread_missing,
+    check_thread_append_and_load,
+    check_thread_concurrent_appends,
+    check_thread_header_merge,
+    check_thread_delete,
+    check_thread_leases,
+    check_response_cache,
+    check_latency_probe,
+]
+
+
+def run_checks(backend):
+    failures = 0
+    for check in CHECKS:
+        try:
+            check(backend)
+            print(f"  pass  {check.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"  FAIL  {check.__name__}: {type(e).__name__}: {e}")
+    return failures
+
+
+# Benchmark
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000
+
+
+def benchmark_jobs(backend, jobs, workers):
+    timings = {"save": [], "update": [], "get": []}
+
+    def lifecycle(index):
+        job_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        backend.save_job(job_id, {"id": job_id, "inputs": [{"name": "payload", "data": f"question {index}"}]})
+        saved = time.perf_counter()
+        backend.update_job_status(job_id, "running", unless_status=["aborted"])
+        backend.update_job_status(job_id, "completed", {"answer": "£198,001"}, unless_status=["aborted"])
+        updated = time.perf_counter()
+        backend.get_job(job_id)
+        finished = time.perf_counter()
+        timings["save"].append(saved - started)
+        timings["update"].append((updated - saved) / 2)
+        timings["get"].append(finished - updated)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lifecycle, range(jobs)))
+    elapsed = time.perf_counter() - started
+
+    latencies = "  ".join(
+        f"{name} p50={statistics.median(values) * 1000:.2f}ms p95={percentile(values, 0.95):.2f}ms"
+        for name, values in timings.items()
+    )
+    print(f"  jobs    {jobs} lifecycles, {workers} workers: {jobs / elapsed * 60:,.0f} jobs/min  {latencies}")
+
+
+def benchmark_threads(backend, threads, workers, turns=5):
+    thread_ids = [str(uuid.uuid4()) for _ in range(threads)]
+
+    def converse(thread_id):
+        for index in range(turns):
+            header = backend.get_thread_header(thread_id)
+            version = header["version"] if header else 0
+            backend.load_turns(thread_id, 1)
+            turn_count, message_count = backend.append_turns(thread_id, [turn(f"question {index}")], 2 * index)
+            backend.update_thread_header(thread_id, {
+                "turn_count": turn_count, "message_count": message_count, "summary": "",
+                "summarized_count": 0, "summarized_turns": 0
+            }, version)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(converse, thread_ids))
+    elapsed = time.perf_counter() - started
+    print(f"  threads {threads} threads x {turns} turns, {workers} workers: {threads * turns / elapsed:,.0f} turns/s")
+
+
+# Backends
+
+
+def create_dynamodb_tables(tables):
+    from stress_thread_concurrency import create_turns_table
+
+    config = tables["jobs"]
+    client = get_client("dynamodb", config.region, config.endpoint_url)
+    existing = client.list_tables()["TableNames"]
+    hash_keys = {"jobs": "id", "threads": "thread_id", "response_cache": "cache_key"}
+    for key, hash_key in hash_keys.items():
+        name = tables[key].name
+        if name not in existing:
+            client.create_table(
+                TableName=name,
+                KeySchema=[{"AttributeName": hash_key, "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": hash_key, "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+            client.get_waiter("table_exists").wait(TableName=name)
+    create_turns_table(tables["thread_turns"].name, config.region, config.endpoint_url)
+
+
+@contextlib.contextmanager
+def open_backend(name, endpoint_url):
+    if name == "sqlite":
+        with tempfile.TemporaryDirectory() as directory:
+            yield SQLiteBackend(os.path.join(directory, "conformance.sqlite3"))
+        return
+
+    if endpoint_url:
+        mock = contextlib.nullcontext()
+    else:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            sys.exit("dynamodb needs --endpoint-url (DynamoDB Local) or moto installed (pip install moto)")
+        from stress_thread_concurrency import serialise_moto
+        serialise_moto()
+        mock = mock_aws()
+
+    suffix = uuid.uuid4().hex[:8]
+    tables = {
+        key: TableConfig(f"conformance-{key.replace('_', '-')}-{suffix}", STORAGE_REGION, endpoint_url, config.probe_key)
+        for key, config in STORAGE_TABLES.items()
+    }
+    with mock:
+        create_dynamodb_tables(tables)
+        yield DynamoDBBackend(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["sqlite", "dynamodb", "all"], default="all")
+    parser.add_argument("--jobs", type=int, default=2000, help="job lifecycles to benchmark")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent callers")
+    parser.add_argument("--threads", type=int, default=200, help="threads to benchmark")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint")
+    args = parser.parse_args()
+
+    # Concurrency checks log expected retries and merges
+    logging.getLogger("agent").setLevel(logging.ERROR)
+
+    failures = 0
+    for name in (["sqlite", "dynamodb"] if args.backend == "all" else [args.backend]):
+        with open_backend(name, args.endpoint_url) as backend:
+            print(f"{name}:")
+            failures += run_checks(backend)
+            benchmark_jobs(backend, args.jobs, args.workers)
+            benchmark_threads(backend, args.threads, args.workers)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+Stress test for simultaneous turns on one thread.
+
+Fires N parallel turns at a single thread through the same path as the agent
+(hold_thread -> get_thread_state -> simulated model call -> save_thread_state)
+and asserts that no accepted turn is lost or duplicated, that the header
+counts match the stored turns, and, with the "queue" policy, that every turn
+saw all turns completed before it. Every run also checks that the
+contention never opened the thread storage circuit breaker or sent a turn to
+the in-memory fallback.
+
+With --policy all, or --policy merge, a high-contention case follows: the
+"merge" policy with --hot-turns turns released together and no simulated
+model time, so nearly every save loses conditional writes and retries with
+backoff.
+
+With --backend dynamodb (default) it runs against a local DynamoDB stand-in:
+DynamoDB Local when --endpoint-url is given (e.g. docker run -p 8000:8000
+amazon/dynamodb-local), otherwise moto's in-process mock if moto is installed.
+With --backend sqlite it runs against a temporary SQLite database.
+
+Usage (from the project root):
+    python scripts/stress_thread_concurrency.py [--turns 20] [--policy queue|reject|merge|all]
+        [--latency 0.2] [--hot-turns 40] [--no-cache] [--backend dynamodb|sqlite]
+        [--endpoint-url http://localhost:8000]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def serialise_moto():
+    """
+    Make moto handle one request at a time.
+
+    DynamoDB applies each conditional write atomically; moto's in-process
+    backend does not when called from several threads, which would report
+    races that the real service cannot have.
+    """
+    from moto.core.botocore_stubber import BotocoreStubber
+
+    lock = threading.Lock()
+    handle = BotocoreStubber.__call__
+
+    def locked(self, *args, **kwargs):
+        with lock:
+            return handle(self, *args, **kwargs)
+
+    BotocoreStubber.__call__ = locked
+
+
+def create_turns_table(table_name, region, endpoint_url):
+    from smart_agent.src.utils.aws_clients import get_client
+
+    client = get_client("dynamodb", region, endpoint_url)
+    if table_name in client.list_tables()["TableNames"]:
+        return
+    client.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "thread_id", "KeyType": "HASH"},
+            {"AttributeName": "turn", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "thread_id", "AttributeType": "S"},
+            {"AttributeName": "turn", "AttributeType": "N"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    client.get_waiter("table_exists").wait(TableName=table_name)
+
+
+def run_policy(policy, turns, latency, use_cache, label=None):
+    from smart_agent.src.storage import get_storage_backend, get_table_breaker
+    from smart_agent.src.utils import thread_lock, thread_storage
+    from smart_agent.src.utils.thread_lock import ThreadBusyError, hold_thread
+
+    thread_lock.THREAD_CONCURRENCY = policy
+    thread_storage._thread_cache.clear()
+    thread_storage._thread_cache.max_entries = thread_storage.THREAD_CACHE_MAX_ENTRIES if use_cache else 0
+    breaker = get_table_breaker("thread_turns")
+    breaker.reset()
+    opened = breaker.counters["opened"]
+    fallback_writes = thread_storage.get_local_thread_stats()["fallbackWrites"]
+
+    thread_id = thread_storage.save_thread_state(None, {
+        **thread_storage.empty_thread_state(),
+        "messages": [{"role": "user", "content": "seed"}, {"role": "assistant", "content": "seed answer"}]
+    })
+    rng = random.Random(turns)
+
+    # Release every turn at once when there is no model time to spread them out
+    start = threading.Barrier(turns) if latency == 0 else None
+
+    def turn(index):
+        if start is not None:
+            start.wait()
+        time.sleep(rng.random() * latency / 4)
+        try:
+            with hold_thread(thread_id):
+                state = thread_storage.get_thread_state(thread_id)
+                seen = len(state["messages"])
+                time.sleep(latency)
+                question = f"question {index}"
+                thread_storage.save_thread_state(thread_id, {
+                    **state,
+                    "messages": state["messages"] + [
+                        {"role": "user", "content": question},
+                        {"role": "assistant", "content": f"answer to {question}"}
+                    ]
+                })
+                return index, seen
+        except ThreadBusyError:
+            return index, None
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=turns) as pool:
+        results = list(pool.map(turn, range(turns)))
+    elapsed = time.monotonic() - started
+
+    accepted = sorted(index for index, seen in results if seen is not None)
+    stored = thread_storage.get_thread_state(thread_id)["messages"]
+    header = get_storage_backend().get_thread_header(thread_id)
+
+    questions = [message["content"] for message in stored if message["role"] == "user"][1:]
+    expected = [f"question {index}" for index in accepted]
+    assert sorted(questions) == sorted(expected), f"lost or duplicated turns: {sorted(questions)} vs {expected}"
+    assert len(set(questions)) == len(questions), "duplicated turn"
+    for position in range(0, len(stored), 2):
+        answer = stored[position + 1]["content"]
+        assert answer == f"answer to {stored[position]['content']}" or position == 0, "answer separated from question"
+    assert int(header["turn_count"]) == len(accepted) + 1, f"header turn_count {header['turn_count']}"
+    assert int(header["message_count"]) == len(stored), f"header message_count {header['message_count']}"
+
+    assert breaker.counters["opened"] == opened, f"contention opened the storage breaker: {breaker.stats()}"
+    assert thread_storage.get_local_thread_stats()["fallbackWrites"] == fallback_writes, "turns saved to the fallback"
+
+    if policy == "queue":
+        seen_counts = sorted(seen for _, seen in results)
+        assert seen_counts == [2 + 2 * index for index in range(turns)], f"turns overlapped: {seen_counts}"
+
+    rejected = turns - len(accepted)
+    print(f"{label or policy:6s} {turns} turns: {len(accepted)} stored, {rejected} rejected, none lost "
+          f"({elapsed:.2f}s, {get_storage_backend().name}, cache {'on' if use_cache else 'off'})")
+
+
+def run_all(policies, args):
+    for policy in policies:
+        run_policy(policy, args.turns, args.latency, not args.no_cache)
+    if "merge" in policies and args.hot_turns:
+        run_policy("merge", args.hot_turns, 0, not args.no_cache, label="hot")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--policy", choices=["queue", "reject", "merge", "all"], default="all")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated model call seconds")
+    parser.add_argument("--hot-turns", type=int, default=40, help="Turns of the high-contention merge case (0 skips it)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the warm thread cache")
+    parser.add_argument("--backend", choices=["dynamodb", "sqlite"], default="dynamodb")
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint")
+    args = parser.parse_args()
+
+    table_name = f"stress-thread-turns-{uuid.uuid4().hex[:8]}"
+    os.environ["THREAD_TURNS_TABLE"] = table_name
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+    policies = ["queue", "reject", "merge"] if args.policy == "all" else [args.policy]
+
+    if args.backend == "sqlite":
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ["SQLITE_PATH"] = os.path.join(directory, "stress.sqlite3")
+            run_all(policies, args)
+        return
+
+    if args.endpoint_url:
+        os.environ["DYNAMODB_ENDPOINT_URL"] = args.endpoint_url
+        mock = contextlib.nullcontext()
+    else:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            sys.exit("Needs --endpoint-url (DynamoDB Local) or moto installed (pip install moto)")
+        serialise_moto()
+        mock = mock_aws()
+
+    from smart_agent.src.config.storage import STORAGE_REGION
+
+    with mock:
+        create_turns_table(table_name, STORAGE_REGION, args.endpoint_url)
+        run_all(policies, args)
+
+
+if __name__ == "__main__":
+    main()
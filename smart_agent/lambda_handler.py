@@ -3,13 +3,16 @@ AWS Lambda handler with SSM configuration loading.
 
 Loads configuration from AWS Systems Manager Parameter Store
 and initializes the FastAPI application with Mangum for Lambda.
+Queued webhook callbacks are flushed before each invocation returns, since
+the execution environment is frozen in between.
 """
 
 import os
 import json
-import boto3
 from botocore.exceptions import ClientError
 
+from smart_agent.src.utils.aws_clients import get_client
+
 # SSM Parameter aliases mapping
 parameter_aliases = {
     'APP_PORT': ['app_port', 'port'],
@@ -35,7 +38,7 @@ def get_ssm_parameters(prefix: str) -> dict:
     Returns:
         Dictionary of parameter names to values
     """
-    ssm = boto3.client('ssm')
+    ssm = get_client('ssm')
     parameters = {}
 
     try:
@@ -113,9 +116,23 @@ load_config()
 # Import FastAPI app after config is loaded
 from mangum import Mangum
 from smart_agent.main import app
+from smart_agent.src.utils.webhook import WEBHOOK_FLUSH_TIMEOUT, flush_webhooks
+
+# Margin left for returning the response after flushing webhooks
+FLUSH_MARGIN_MS = 500
+
+mangum_handler = Mangum(app, lifespan="off")
 
-# Create Lambda handler
-handler = Mangum(app, lifespan="off")
+
+def handler(event, context):
+    """Lambda entry point: serve the request, then drain queued webhooks."""
+    try:
+        return mangum_handler(event, context)
+    finally:
+        timeout = WEBHOOK_FLUSH_TIMEOUT
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            timeout = min(timeout, max(context.get_remaining_time_in_millis() - FLUSH_MARGIN_MS, 0) / 1000)
+        flush_webhooks(timeout)
 
 
 def lambda_handler(event, context):
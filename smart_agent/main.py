@@ -15,9 +15,28 @@ load_dotenv()
 
 from smart_agent.src.routes.routes import router
 from smart_agent.src.config.logger import Logger
+from smart_agent.src.agent.skill_loader import get_skill_corpus
+from smart_agent.src.utils.aws_clients import prewarm_aws_clients
+from smart_agent.src.config.storage import (
+    STORAGE_BACKEND,
+    STORAGE_REGION,
+    DYNAMODB_ENDPOINT_URL,
+    STORAGE_LATENCY_CHECK,
+)
+from smart_agent.src.storage import check_storage_latency
+from smart_agent.src.utils.webhook import WEBHOOK_FLUSH_PER_REQUEST, WebhookFlushMiddleware, flush_webhooks
 
 logger = Logger()
 
+# Build the in-memory skill corpus and AWS clients during cold start (also runs under Lambda init)
+get_skill_corpus()
+if STORAGE_BACKEND == "dynamodb":
+    prewarm_aws_clients(STORAGE_REGION, DYNAMODB_ENDPOINT_URL)
+
+# Open the storage connections and warn on slow or cross-region tables
+if STORAGE_LATENCY_CHECK:
+    check_storage_latency()
+
 # Configuration
 APP_HOST = os.environ.get("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.environ.get("APP_PORT", "8000"))
@@ -41,6 +60,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Drain queued webhooks before each response ends (Lambda Web Adapter, see run.sh)
+if WEBHOOK_FLUSH_PER_REQUEST:
+    app.add_middleware(WebhookFlushMiddleware)
+
 # Include routes
 app.include_router(router)
 
@@ -54,6 +77,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down agent")
+    flush_webhooks()
 
 
 # For local development
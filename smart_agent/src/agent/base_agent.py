@@ -7,30 +7,102 @@ conversation history through a thread ID stored in DynamoDB.
 
 Features:
 - Persistent thread storage via DynamoDB
+- Token-budgeted history with a rolling summary of older turns
 - Smart skill loading based on query classification
+- Anthropic prompt caching with a cache-stable system prompt layout
+- Exact-match cache of first-turn answers (see utils/response_cache.py)
+- Single-fact benchmark lookups answered without a model call (see benchmark_lookup.py)
+- Optional tool-use mode reading benchmark data through tools (see benchmark_tools.py)
 - HTML output conversion from markdown
 """
 
+import asyncio
 import os
-from typing import Tuple, Optional, Dict, Any, List
+from typing import Tuple, Optional, Dict, Any, Iterator, List
 
 import anthropic
 import markdown
 
 from smart_agent.src.config.logger import Logger
-from smart_agent.src.utils.webhook import call_webhook_with_error, call_webhook_with_success
-from smart_agent.src.utils.thread_storage import get_thread, save_thread
-from smart_agent.src.agent.prompt_extract import extract_prompts
-from smart_agent.src.agent.skill_loader import load_relevant_skills, get_skill_dir
+from smart_agent.src.utils.webhook import (
+    call_webhook_with_error,
+    call_webhook_with_success,
+    call_webhook_with_error_async,
+    call_webhook_with_success_async,
+)
+from smart_agent.src.utils.thread_storage import ThreadUnavailableError, get_thread_state, save_thread_state
+from smart_agent.src.utils.cancellation import CancellationToken, JobCancelledError
+from smart_agent.src.utils.thread_lock import ThreadBusyError, hold_thread, hold_thread_async
+from smart_agent.src.utils.response_cache import (
+    RESPONSE_CACHE,
+    content_hash,
+    get_cached_response,
+    put_cached_response,
+    response_cache_key,
+    response_cache_scope,
+)
+from smart_agent.src.utils.semantic_cache import add_similar_question, get_similar_response
+from smart_agent.src.utils.bounded_cache import BoundedCache
+from smart_agent.src.agent.prompt_extract import get_prompt_template
+from smart_agent.src.agent.skill_loader import load_relevant_skills, get_skill_corpus, get_skill_dir, scan_query
+from smart_agent.src.agent.keyword_matcher import KeywordMatcher
+from smart_agent.src.agent.skill_index import estimate_tokens
+from smart_agent.src.agent.benchmark_lookup import answer_lookup
+from smart_agent.src.agent.benchmark_tools import (
+    AGENT_TOOLS,
+    TOOL_MAX_ITERATIONS,
+    build_tool_skill_content,
+    continue_request,
+    get_tool_definitions,
+    run_tool_calls,
+    run_tool_calls_async,
+    tool_use_blocks,
+)
+from smart_agent.src.agent.history import (
+    get_history_config,
+    history_load_turns,
+    build_history_messages,
+    fold_history_later,
+)
 from smart_agent.src.agent.agent_config import fetch_agent_config
 
 # Environment mode: "dev" or "prod"
 ENVIRONMENT_MODE = os.environ.get("ENVIRONMENT_MODE", "dev")
 
+# Prompt caching: send the system prompt as ordered, cache-stable content blocks
+PROMPT_CACHING = os.environ.get("PROMPT_CACHING", "true").lower() in ("1", "true", "yes")
+
+# Assembled persona and reference data blocks, reused while the template and skill selection repeat
+SYSTEM_BLOCKS_CACHE_ENTRIES = int(os.environ.get("SYSTEM_BLOCKS_CACHE_ENTRIES", "256"))
+SYSTEM_BLOCKS_CACHE_MAX_BYTES = int(os.environ.get("SYSTEM_BLOCKS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
 logger = Logger()
 
-# Lazy-loaded Anthropic client
+
+def _prefix_size(entry: Tuple[str, Tuple[Dict[str, Any], ...]]) -> int:
+    """Approximate in-memory weight of cached system blocks and the skill content keying them."""
+    skill_content, blocks = entry
+    return len(skill_content) + sum(len(block["text"]) for block in blocks) + 256
+
+
+_system_prefixes = BoundedCache(SYSTEM_BLOCKS_CACHE_ENTRIES, SYSTEM_BLOCKS_CACHE_MAX_BYTES, None, _prefix_size)
+
+# Lazy-loaded Anthropic clients
 _client = None
+_async_client = None
+
+
+# Response topics for the reasoning summary, compiled once into a single matcher
+RESPONSE_TOPIC_MATCHER = KeywordMatcher({
+    "compensation data": ["salary", "salaries", "compensation", "£", "$", "€"],
+    "bonus and incentive structures": ["bonus", "ltip", "incentive"],
+    "regional market analysis": [
+        "uk", "usa", "europe", "european", "asia", "asian", "middle east", "australia", "australian"
+    ],
+    "governance and organizational data": ["governance", "succession", "structure"],
+    "investment strategy insights": ["invest", "investment", "investing", "roi", "allocation", "portfolio"],
+    "recruitment and talent trends": ["hiring", "recruitment", "talent", "team"],
+})
 
 
 def get_anthropic_client():
@@ -47,6 +119,20 @@ def get_anthropic_client():
     return _client
 
 
+def get_async_anthropic_client():
+    """
+    Get or create the AsyncAnthropic client (lazy initialization).
+    Used by the async request path so model calls never block the event loop.
+    """
+    global _async_client
+    if _async_client is None:
+        anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not anthropic_api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable is not set")
+        _async_client = anthropic.AsyncAnthropic(api_key=anthropic_api_key)
+    return _async_client
+
+
 def get_prompt_file_path(filename: str) -> str:
     """
     Get the appropriate path for prompt files based on environment mode.
@@ -92,6 +178,144 @@ def markdown_to_html(text: str) -> str:
     return html
 
 
+class IncrementalMarkdownRenderer:
+    """
+    Render streamed markdown to HTML one completed block at a time.
+
+    Text is buffered until a blank line closes a block (outside fenced code),
+    then the completed blocks are rendered and returned as an HTML fragment.
+    Table rows and list items stay together because they are not separated
+    by blank lines.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._rendered_upto = 0
+
+    def feed(self, delta: str) -> str:
+        """
+        Add streamed text and render any newly completed blocks.
+
+        Args:
+            delta: Text delta from the model
+
+        Returns:
+            HTML fragment for completed blocks, or empty string
+        """
+        self.text += delta
+        pending = self.text[self._rendered_upto:]
+        boundary = pending.rfind("\n\n")
+        if boundary < 0:
+            return ""
+
+        completed = pending[:boundary]
+        # Never split inside a fenced code block
+        if completed.count("```") % 2:
+            return ""
+
+        self._rendered_upto += boundary + 2
+        return markdown_to_html(completed) if completed.strip() else ""
+
+    def flush(self) -> str:
+        """Render whatever remains after the stream has ended."""
+        remaining = self.text[self._rendered_upto:]
+        self._rendered_upto = len(self.text)
+        return markdown_to_html(remaining) if remaining.strip() else ""
+
+
+def build_system_blocks(
+    static_prompt: str,
+    skill_content: str,
+    dynamic_prompt: str,
+    template_version: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build the system prompt as ordered content blocks for prompt caching.
+
+    Layout (most stable first):
+    1. Static persona and guidelines - cache breakpoint
+    2. Skill reference data in deterministic file order - cache breakpoint
+    3. Per-request instructions (never cached)
+
+    The first two blocks are assembled once per (template version, skill
+    content) and shared by later requests, so they must not be modified.
+
+    Args:
+        static_prompt: System prompt sections without per-request variables
+        skill_content: Combined skill file content (may be empty)
+        dynamic_prompt: System prompt sections containing per-request variables
+        template_version: Version of the template static_prompt came from (static_prompt itself if None)
+
+    Returns:
+        List of Anthropic system content blocks
+    """
+    key = (template_version or static_prompt, skill_content)
+    entry = _system_prefixes.get(key)
+    if entry is None:
+        prefix = [{
+            "type": "text",
+            "text": static_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }]
+        if skill_content:
+            prefix.append({
+                "type": "text",
+                "text": f"## Reference Data\n\n{skill_content}",
+                "cache_control": {"type": "ephemeral"}
+            })
+        entry = (skill_content, tuple(prefix))
+        _system_prefixes.put(key, entry)
+
+    blocks = list(entry[1])
+
+    if dynamic_prompt:
+        blocks.append({
+            "type": "text",
+            "text": dynamic_prompt
+        })
+
+    return blocks
+
+
+def extract_response_text(response: Any) -> str:
+    """
+    Join the text blocks of a Messages API response.
+
+    Args:
+        response: Anthropic message response
+
+    Returns:
+        Markdown text of the response, stripped of surrounding whitespace
+    """
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+
+def extract_usage(response: Any) -> Dict[str, int]:
+    """
+    Extract token usage, including prompt-cache counters, from an API response.
+
+    Args:
+        response: Anthropic Messages API response
+
+    Returns:
+        Dictionary of token counts
+    """
+    usage = response.usage
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+    }
+
+
+def add_usage(total: Optional[Dict[str, int]], usage: Dict[str, int]) -> Dict[str, int]:
+    """Add the token usage of one model call to the running total of a turn."""
+    if total is None:
+        return dict(usage)
+    return {name: total[name] + usage[name] for name in total}
+
+
 def extract_reasoning_summary(response_text: str, loaded_files: Optional[List[str]] = None) -> str:
     """
     Extract a reasoning summary from the response.
@@ -101,7 +325,7 @@ def extract_reasoning_summary(response_text: str, loaded_files: Optional[List[st
 
     Args:
         response_text: The LLM's response text
-        loaded_files: List of skill files that were loaded for this query
+        loaded_files: List of skill files (or "file#section" entries) loaded for this query
 
     Returns:
         Explanation string describing data sources
@@ -110,25 +334,7 @@ def extract_reasoning_summary(response_text: str, loaded_files: Optional[List[st
         return "No response generated."
 
     # Check for key topics in the response to create relevant explanation
-    topics = []
-
-    if any(term in response_text.lower() for term in ['salary', 'compensation', '£', '$', '€']):
-        topics.append("compensation data")
-
-    if any(term in response_text.lower() for term in ['bonus', 'ltip', 'incentive']):
-        topics.append("bonus and incentive structures")
-
-    if any(term in response_text.lower() for term in ['uk', 'usa', 'europe', 'asia', 'middle east', 'australia']):
-        topics.append("regional market analysis")
-
-    if any(term in response_text.lower() for term in ['governance', 'succession', 'structure']):
-        topics.append("governance and organizational data")
-
-    if any(term in response_text.lower() for term in ['invest', 'roi', 'allocation', 'portfolio']):
-        topics.append("investment strategy insights")
-
-    if any(term in response_text.lower() for term in ['hiring', 'recruitment', 'talent', 'team']):
-        topics.append("recruitment and talent trends")
+    topics = RESPONSE_TOPIC_MATCHER.match(response_text)
 
     # Build explanation
     base = "2025 Agreus/KPMG Global Family Office Compensation Benchmark Report (585 survey responses, 20 qualitative interviews)"
@@ -138,22 +344,33 @@ def extract_reasoning_summary(response_text: str, loaded_files: Optional[List[st
     else:
         explanation = f"Response based on the {base}."
 
-    # Add loaded files info
+    # Add loaded files info, grouping retrieved sections ("file.md#Heading") under their file
     if loaded_files and len(loaded_files) > 1:
-        file_names = [f.replace('references/', '').replace('.md', '') for f in loaded_files if f != 'SKILL.md']
-        if file_names:
-            explanation += f" Sources: {', '.join(file_names)}."
+        sources: Dict[str, List[str]] = {}
+        for entry in loaded_files:
+            if entry == 'SKILL.md':
+                continue
+            path, _, heading = entry.partition('#')
+            headings = sources.setdefault(path.replace('references/', '').replace('.md', ''), [])
+            if heading:
+                headings.append(heading)
+        if sources:
+            source_names = [
+                f"{name} ({', '.join(headings)})" if headings else name
+                for name, headings in sources.items()
+            ]
+            explanation += f" Sources: {'; '.join(source_names)}."
 
     return explanation
 
 
-def llm(
+def prepare_llm_request(
     payload: str,
     instructions: Optional[str] = None,
     thread_id: Optional[str] = None
-) -> Tuple[str, str, str, List[str]]:
+) -> Dict[str, Any]:
     """
-    Call the Anthropic API with threading support and smart skill loading.
+    Assemble everything needed for an Anthropic call: system prompt, history and model params.
 
     Args:
         payload: The user's question or request
@@ -161,38 +378,48 @@ def llm(
         thread_id: UUID of the conversation thread for continuity
 
     Returns:
-        Tuple of (response_html, explanation, new_thread_id, loaded_skill_files)
-    """
-    # Load prompt template
-    prompt_file_path = get_prompt_file_path('AgentPrompt.yaml')
-    system_prompt, user_prompt_template, model_params = extract_prompts(
-        prompt_file_path,
-        instructions=instructions or "Answer the user's question based on the benchmark data.",
-        payload=payload
-    )
+        Request context consumed by llm(), llm_stream() and finalize_llm_response()
+    """
+    # Load prompt template (compiled once per file version)
+    prompt_template = get_prompt_template(get_prompt_file_path('AgentPrompt.yaml'))
+    prompt_variables = {
+        "instructions": instructions or "Answer the user's question based on the benchmark data.",
+        "payload": payload
+    }
+
+    # Smart skill loading: only load relevant files based on query (served from the in-memory corpus).
+    # In tool-use mode only the skill metadata is sent; the model reads figures through tools
+    if AGENT_TOOLS:
+        skill_content, loaded_files = build_tool_skill_content(get_skill_dir()), ["SKILL.md"]
+    else:
+        skill_content, loaded_files = load_relevant_skills(get_skill_dir(), payload)
 
-    # Smart skill loading: only load relevant files based on query
-    skill_dir = get_skill_dir()
-    loaded_files = []
-    if os.path.exists(skill_dir):
-        skill_content, loaded_files = load_relevant_skills(skill_dir, payload)
-        if skill_content:
-            system_prompt = f"{system_prompt}\n\n## Reference Data\n\n{skill_content}"
+    if PROMPT_CACHING:
+        static_prompt, dynamic_prompt, user_prompt_template = prompt_template.render_cacheable(prompt_variables)
+    else:
+        system_prompt, user_prompt_template = prompt_template.render(prompt_variables)
+    model_params = dict(prompt_template.model_params)
+
+    # Retrieve recent conversation history (and its running summary) from DynamoDB
+    history_config = get_history_config(model_params)
+    thread_state = get_thread_state(thread_id, max_turns=history_load_turns(history_config))
+    summary_section = f"## Conversation Summary\n{thread_state['summary']}" if thread_state.get("summary") else ""
+
+    if PROMPT_CACHING:
+        # The summary changes every few turns, so it stays after the cache breakpoints
+        dynamic_prompt = "\n\n".join(part for part in (summary_section, dynamic_prompt) if part)
+        system_prompt = build_system_blocks(static_prompt, skill_content, dynamic_prompt, prompt_template.version)
+    else:
+        # One join rather than a copy of the whole prompt per appended part
+        reference_parts = ("## Reference Data", skill_content) if skill_content else ()
+        system_prompt = "\n\n".join(
+            part for part in (system_prompt, *reference_parts, summary_section) if part
+        )
 
     logger.info(f"Loaded {len(loaded_files)} skill files for query")
 
-    # Retrieve existing conversation history from DynamoDB
-    conversation_history = get_thread(thread_id)
-
-    # Build messages for Anthropic API
-    messages = []
-
-    # Add conversation history if exists
-    for msg in conversation_history:
-        messages.append({
-            "role": msg.get("role", "user"),
-            "content": msg.get("content", "")
-        })
+    # Build messages for Anthropic API: recent turns verbatim, within the history budget
+    messages = build_history_messages(thread_state, history_config)
 
     # Add current user message
     messages.append({
@@ -201,49 +428,540 @@ def llm(
     })
 
     logger.info(f"Calling Anthropic API with model: {model_params.get('name', 'claude-sonnet-4-20250514')}")
-    logger.info(f"Conversation has {len(messages)} messages")
-
-    # Get Anthropic client (lazy initialization)
-    client = get_anthropic_client()
-
-    # Call Anthropic API
-    response = client.messages.create(
-        model=model_params.get('name', 'claude-sonnet-4-20250514'),
-        max_tokens=model_params.get('max_tokens', 4096),
-        temperature=model_params.get('temperature', 0.7),
-        system=system_prompt,
-        messages=messages
+    logger.info(
+        f"Conversation has {len(messages)} messages "
+        f"({len(thread_state['messages'])} loaded, {thread_state.get('summarized_count', 0)} summarised)"
     )
 
-    # Extract response text (markdown format from LLM)
-    response_markdown = ""
-    for block in response.content:
-        if block.type == "text":
-            response_markdown += block.text
+    request = {
+        "model": model_params.get('name', 'claude-sonnet-4-20250514'),
+        "max_tokens": model_params.get('max_tokens', 4096),
+        "temperature": model_params.get('temperature', 0.7),
+        "system": system_prompt,
+        "messages": messages
+    }
+    if AGENT_TOOLS:
+        request["tools"] = get_tool_definitions()
+
+    # First-turn answers depend only on the question, its skill content, the template and the model
+    cache_scope = cache_key = None
+    if RESPONSE_CACHE and not thread_id:
+        skill_fingerprint = content_hash(skill_content)
+        if AGENT_TOOLS:
+            # Every question gets the same metadata; the files it names keep rephrasings within a region
+            fired = scan_query(payload, get_skill_corpus())
+            skill_fingerprint = content_hash("\n".join([skill_content, *(group for group in fired if group.endswith(".md"))]))
+        cache_scope = response_cache_scope(
+            instructions,
+            skill_fingerprint,
+            prompt_template.version,
+            {name: request[name] for name in ("model", "max_tokens", "temperature", "tools") if name in request}
+        )
+        cache_key = response_cache_key(payload, cache_scope)
+
+    return {
+        "payload": payload,
+        "instructions": instructions,
+        "thread_id": thread_id,
+        "thread_state": thread_state,
+        "history_config": history_config,
+        "loaded_files": loaded_files,
+        "cache_scope": cache_scope,
+        "cache_key": cache_key,
+        "request": request
+    }
+
+
+def finalize_llm_response(
+    context: Dict[str, Any],
+    response_markdown: str,
+    usage: Dict[str, int],
+    explanation: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Persist the completed turn and build the explanation.
 
-    response_markdown = response_markdown.strip()
+    Args:
+        context: Request context from prepare_llm_request()
+        response_markdown: Full response text (markdown) from the model
+        usage: Token usage from extract_usage()
+        explanation: Explanation of a cached answer (built from the response otherwise)
 
+    Returns:
+        Tuple of (explanation, new_thread_id)
+    """
     # Generate explanation with loaded files info
-    explanation = extract_reasoning_summary(response_markdown, loaded_files)
+    explanation = explanation or extract_reasoning_summary(response_markdown, context["loaded_files"])
+
+    # Update stored history with markdown (for context continuity), caching per-message token counts
+    payload = context["payload"]
+    thread_state = context["thread_state"]
+    thread_state = {
+        **thread_state,
+        "messages": thread_state["messages"] + [
+            {"role": "user", "content": payload, "tokens": estimate_tokens(payload)},
+            {
+                "role": "assistant",
+                "content": response_markdown,
+                "tokens": usage["output_tokens"] or estimate_tokens(response_markdown)
+            }
+        ]
+    }
 
-    # Update conversation history with markdown (for context continuity)
-    messages.append({
-        "role": "assistant",
-        "content": response_markdown
-    })
+    # Append the new turn to DynamoDB and get thread UUID
+    new_thread_id = save_thread_state(context["thread_id"], thread_state)
+
+    # Fold turns that left the verbatim window into the running summary, after the answer is returned
+    fold_history_later(new_thread_id, thread_state, context["history_config"], get_anthropic_client())
+
+    logger.info(
+        f"Response generated. Tokens used: {usage['input_tokens']} in, {usage['output_tokens']} out, "
+        f"cache read: {usage['cache_read_input_tokens']}, cache write: {usage['cache_creation_input_tokens']}"
+    )
+
+    return explanation, new_thread_id
+
+
+# Usage reported for answers served without a model call
+CACHED_USAGE = {
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "cache_read_input_tokens": 0,
+}
 
-    # Save updated history to DynamoDB and get thread UUID
-    new_thread_id = save_thread(thread_id, messages)
+
+def find_cached_response(context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Look up a first-turn answer: the same question first, then a rephrasing of it.
+
+    A near-duplicate's answer is also cached under this question's key, so
+    the next identical request is an exact hit.
+
+    Args:
+        context: Request context from prepare_llm_request()
+
+    Returns:
+        {"markdown", "html", "explanation"} or None on a miss
+    """
+    cached = get_cached_response(context["cache_key"])
+    if cached is not None:
+        logger.info("Answer served from the response cache")
+    if cached is not None or context["cache_key"] is None:
+        return cached
+
+    cached = get_similar_response(context["payload"], context["cache_scope"])
+    if cached is not None:
+        put_cached_response(context["cache_key"], cached["markdown"], cached["html"], cached["explanation"])
+    return cached
+
+
+def find_direct_answer(context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Find an answer that needs no model call: a benchmark lookup, else a cached answer.
+
+    Lookups are skipped when the request carries instructions, since a
+    rendered figure cannot follow them.
+
+    Args:
+        context: Request context from prepare_llm_request()
+
+    Returns:
+        {"markdown", "html", "explanation"} or None if the model must answer
+    """
+    lookup = None if context["instructions"] else answer_lookup(context["payload"])
+    if lookup is None:
+        return find_cached_response(context)
+
+    # The answer comes from one table, which is what the client is told was loaded
+    context["loaded_files"] = lookup["loaded_files"]
+    return {
+        "markdown": lookup["markdown"],
+        "html": markdown_to_html(lookup["markdown"]),
+        "explanation": extract_reasoning_summary(lookup["markdown"], lookup["loaded_files"])
+    }
+
+
+def finalize_cached_response(context: Dict[str, Any], cached: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Persist a turn answered without a model call, so follow-ups can use its thread.
+
+    Args:
+        context: Request context from prepare_llm_request()
+        cached: Entry from find_direct_answer()
+
+    Returns:
+        Tuple of (explanation, new_thread_id)
+    """
+    return finalize_llm_response(context, cached["markdown"], dict(CACHED_USAGE), cached["explanation"])
+
+
+def cache_llm_response(
+    context: Dict[str, Any],
+    response: Any,
+    response_markdown: str,
+    response_html: str,
+    explanation: str
+) -> None:
+    """
+    Cache a first-turn answer, unless it was cut off at max_tokens.
+
+    Args:
+        context: Request context from prepare_llm_request()
+        response: Anthropic message response
+        response_markdown: Full response text (markdown)
+        response_html: Response rendered to HTML
+        explanation: Explanation sent with the response
+    """
+    if getattr(response, "stop_reason", None) == "max_tokens":
+        return
+    put_cached_response(context["cache_key"], response_markdown, response_html, explanation)
+    add_similar_question(context["payload"], context["cache_scope"], context["cache_key"])
+
+
+def record_tool_sources(context: Dict[str, Any], sources: List[str]) -> None:
+    """Report the tables and sections read by tool calls in the context's loaded files."""
+    context["loaded_files"] = context["loaded_files"] + [
+        source for source in sources if source not in context["loaded_files"]
+    ]
+
+
+def run_tool_loop(
+    client: Any,
+    context: Dict[str, Any],
+    cancel_token: CancellationToken
+) -> Tuple[Any, str, Dict[str, int]]:
+    """
+    Call the model, running its tool calls until it answers.
+
+    Without tools in the request (the default mode) this is a single call.
+    Each round's tool calls run locally in parallel; after TOOL_MAX_ITERATIONS
+    rounds the model must answer.
+
+    Args:
+        client: Anthropic client
+        context: Request context from prepare_llm_request(); loaded_files gains the sources read
+        cancel_token: Token checked before each round of tool calls
+
+    Returns:
+        Tuple of (final response, markdown of every round, usage summed over the calls)
+    """
+    request = context["request"]
+    texts = []
+    usage = None
+    for rounds in range(TOOL_MAX_ITERATIONS + 1):
+        response = client.messages.create(**request)
+        usage = add_usage(usage, extract_usage(response))
+        texts.append(extract_response_text(response))
+
+        tool_uses = tool_use_blocks(response) if "tools" in request else []
+        if not tool_uses or rounds == TOOL_MAX_ITERATIONS:
+            break
+
+        cancel_token.check()
+        results, sources = run_tool_calls(tool_uses)
+        record_tool_sources(context, sources)
+        request = continue_request(request, response, results, rounds + 1)
+
+    return response, "\n\n".join(text for text in texts if text), usage
+
+
+async def run_tool_loop_async(
+    client: Any,
+    context: Dict[str, Any],
+    cancel_token: CancellationToken
+) -> Tuple[Any, str, Dict[str, int]]:
+    """Async variant of run_tool_loop() using AsyncAnthropic."""
+    request = context["request"]
+    texts = []
+    usage = None
+    for rounds in range(TOOL_MAX_ITERATIONS + 1):
+        response = await client.messages.create(**request)
+        usage = add_usage(usage, extract_usage(response))
+        texts.append(extract_response_text(response))
+
+        tool_uses = tool_use_blocks(response) if "tools" in request else []
+        if not tool_uses or rounds == TOOL_MAX_ITERATIONS:
+            break
+
+        cancel_token.check()
+        results, sources = await run_tool_calls_async(tool_uses)
+        record_tool_sources(context, sources)
+        request = continue_request(request, response, results, rounds + 1)
+
+    return response, "\n\n".join(text for text in texts if text), usage
+
+
+def llm(
+    payload: str,
+    instructions: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[str, str, str, List[str], Dict[str, int]]:
+    """
+    Call the Anthropic API with threading support and smart skill loading.
+
+    Args:
+        payload: The user's question or request
+        instructions: Optional specific instructions for the query
+        thread_id: UUID of the conversation thread for continuity
+        cancel_token: Optional token checked before the model call and before saving the thread
+
+    Returns:
+        Tuple of (response_html, explanation, new_thread_id, loaded_skill_files, usage)
+
+    Raises:
+        JobCancelledError: If the job is aborted between stages
+        ThreadBusyError: If another turn holds the thread (see thread_lock.py)
+    """
+    cancel_token = cancel_token or CancellationToken(None)
+
+    # One turn at a time per thread (THREAD_CONCURRENCY), from loading the history to saving the answer
+    with hold_thread(thread_id, cancel_token):
+        context = prepare_llm_request(payload, instructions, thread_id)
+        cancel_token.check()
+
+        # A lookup or a repeated first-turn question is answered without a model call, but still gets a thread
+        cached = find_direct_answer(context)
+        if cached is not None:
+            explanation, new_thread_id = finalize_cached_response(context, cached)
+            return cached["html"], explanation, new_thread_id, context["loaded_files"], dict(CACHED_USAGE)
+
+        # Get Anthropic client (lazy initialization)
+        client = get_anthropic_client()
+
+        # Call Anthropic API (in tool-use mode, until the model stops calling tools)
+        response, response_markdown, usage = run_tool_loop(client, context, cancel_token)
+
+        # An aborted job's answer is discarded, not appended to the thread
+        cancel_token.check()
+        explanation, new_thread_id = finalize_llm_response(context, response_markdown, usage)
 
     # Convert markdown to HTML for output
     response_html = markdown_to_html(response_markdown)
+    cache_llm_response(context, response, response_markdown, response_html, explanation)
 
-    logger.info(f"Response generated. Tokens used: {response.usage.input_tokens} in, {response.usage.output_tokens} out")
+    return response_html, explanation, new_thread_id, context["loaded_files"], usage
 
-    return response_html, explanation, new_thread_id, loaded_files
 
+async def llm_async(
+    payload: str,
+    instructions: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[str, str, str, List[str], Dict[str, int]]:
+    """
+    Async variant of llm() for the event-loop request path.
+
+    The model call uses AsyncAnthropic; thread storage and skill loading are
+    blocking (boto3, file system) and run in worker threads.
 
-def base_agent(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str]:
+    Args:
+        payload: The user's question or request
+        instructions: Optional specific instructions for the query
+        thread_id: UUID of the conversation thread for continuity
+        cancel_token: Optional token checked before the model call and before saving the thread
+
+    Returns:
+        Tuple of (response_html, explanation, new_thread_id, loaded_skill_files, usage)
+
+    Raises:
+        JobCancelledError: If the job is aborted between stages
+        ThreadBusyError: If another turn holds the thread (see thread_lock.py)
+    """
+    cancel_token = cancel_token or CancellationToken(None)
+
+    async with hold_thread_async(thread_id, cancel_token):
+        context = await asyncio.to_thread(prepare_llm_request, payload, instructions, thread_id)
+        cancel_token.check()
+
+        cached = await asyncio.to_thread(find_direct_answer, context)
+        if cached is not None:
+            explanation, new_thread_id = await asyncio.to_thread(finalize_cached_response, context, cached)
+            return cached["html"], explanation, new_thread_id, context["loaded_files"], dict(CACHED_USAGE)
+
+        client = get_async_anthropic_client()
+        response, response_markdown, usage = await run_tool_loop_async(client, context, cancel_token)
+
+        cancel_token.check()
+        explanation, new_thread_id = await asyncio.to_thread(
+            finalize_llm_response, context, response_markdown, usage
+        )
+
+    response_html = markdown_to_html(response_markdown)
+    await asyncio.to_thread(cache_llm_response, context, response, response_markdown, response_html, explanation)
+
+    return response_html, explanation, new_thread_id, context["loaded_files"], usage
+
+
+def llm_stream(
+    payload: str,
+    instructions: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream an Anthropic response as (event, data) pairs.
+
+    Emits "delta" events with raw text, "html" events with rendered fragments
+    for each completed markdown block, then "explanation", "threadId" and a
+    final "done" event carrying the full HTML, loaded files and token usage.
+    The thread is persisted once the stream has completed. A first-turn
+    question answered from the response cache streams its whole answer as
+    one "delta" and one "html" event.
+
+    Cancelling the token closes the upstream response immediately, which
+    stops generation; the partial answer is not saved to the thread.
+
+    Args:
+        payload: The user's question or request
+        instructions: Optional specific instructions for the query
+        thread_id: UUID of the conversation thread for continuity
+        cancel_token: Optional token that aborts the stream
+
+    Yields:
+        Tuples of (event_name, data_dict)
+
+    Raises:
+        JobCancelledError: If the job is aborted before or during generation
+        ThreadBusyError: If another turn holds the thread (see thread_lock.py)
+    """
+    cancel_token = cancel_token or CancellationToken(None)
+
+    with hold_thread(thread_id, cancel_token):
+        context = prepare_llm_request(payload, instructions, thread_id)
+        cancel_token.check()
+
+        cached = find_direct_answer(context)
+        if cached is not None:
+            # The whole answer arrives as one delta and one HTML fragment
+            yield "delta", {"text": cached["markdown"]}
+            yield "html", {"html": cached["html"]}
+            explanation, new_thread_id = finalize_cached_response(context, cached)
+            yield from stream_final_events(context, explanation, new_thread_id, cached["html"], dict(CACHED_USAGE))
+            return
+
+        client = get_anthropic_client()
+        renderer = IncrementalMarkdownRenderer()
+        request = context["request"]
+        usage = None
+
+        # One stream per round; in tool-use mode rounds continue while the model calls tools
+        for rounds in range(TOOL_MAX_ITERATIONS + 1):
+            with client.messages.stream(**request) as stream:
+                cancel_token.on_cancel(stream.close)
+                try:
+                    for text in stream.text_stream:
+                        cancel_token.check()
+                        yield "delta", {"text": text}
+                        fragment = renderer.feed(text)
+                        if fragment:
+                            yield "html", {"html": fragment}
+                    response = stream.get_final_message()
+                except JobCancelledError:
+                    raise
+                except Exception as e:
+                    # Reading a stream closed by cancel() fails with a transport error
+                    if cancel_token.cancelled:
+                        raise JobCancelledError(cancel_token.job_id) from e
+                    raise
+
+            cancel_token.check()
+            usage = add_usage(usage, extract_usage(response))
+
+            tool_uses = tool_use_blocks(response) if "tools" in request else []
+            if not tool_uses or rounds == TOOL_MAX_ITERATIONS:
+                break
+            results, sources = run_tool_calls(tool_uses)
+            record_tool_sources(context, sources)
+            request = continue_request(request, response, results, rounds + 1)
+
+            if extract_response_text(response):
+                # Text before the tool calls ends its paragraph
+                yield "delta", {"text": "\n\n"}
+                fragment = renderer.feed("\n\n")
+                if fragment:
+                    yield "html", {"html": fragment}
+
+        fragment = renderer.flush()
+        if fragment:
+            yield "html", {"html": fragment}
+
+        response_markdown = renderer.text.strip()
+        explanation, new_thread_id = finalize_llm_response(context, response_markdown, usage)
+
+    response_html = markdown_to_html(response_markdown)
+    cache_llm_response(context, response, response_markdown, response_html, explanation)
+    yield from stream_final_events(context, explanation, new_thread_id, response_html, usage)
+
+
+def stream_final_events(
+    context: Dict[str, Any],
+    explanation: str,
+    thread_id: str,
+    response_html: str,
+    usage: Dict[str, int]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield the "explanation", "threadId" and "done" events that end a stream."""
+    yield "explanation", {"output": {"name": "explanation", "type": "longText", "data": explanation}}
+    yield "threadId", {"output": {"name": "threadId", "type": "shortText", "data": thread_id}}
+    yield "done", {
+        "output": {"name": "output", "type": "longText", "data": response_html},
+        "loadedFiles": context["loaded_files"],
+        "usage": usage
+    }
+
+
+def describe_agent_error(error: Exception) -> Tuple[str, int]:
+    """
+    Map an agent failure to the webhook error message and status code.
+
+    Args:
+        error: Exception raised while running the agent
+
+    Returns:
+        Tuple of (error_message, error_code)
+    """
+    if isinstance(error, ThreadBusyError):
+        return str(error), 409
+    if isinstance(error, ThreadUnavailableError):
+        return str(error), 503
+    if isinstance(error, anthropic.APIConnectionError):
+        return f"Failed to connect to Anthropic API: {str(error)}", 503
+    if isinstance(error, anthropic.RateLimitError):
+        return f"Anthropic API rate limit exceeded: {str(error)}", 429
+    if isinstance(error, anthropic.APIStatusError):
+        return f"Anthropic API error: {str(error)}", error.status_code
+    return f"Error in base_agent: {str(error)}", 500
+
+
+def build_output_update(name: str, output_type: str, data: Any) -> Dict[str, Any]:
+    """Build an in-progress webhook payload carrying a single named output."""
+    return {
+        "status": "inprogress",
+        "data": {
+            "output": {
+                "name": name,
+                "type": output_type,
+                "data": data
+            }
+        }
+    }
+
+
+PROCESSING_UPDATE = {
+    "status": "inprogress",
+    "data": {
+        "title": "Processing...",
+        "info": "Analyzing family office benchmark data..."
+    }
+}
+
+
+def base_agent(
+    payload: Dict[str, Any],
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[Dict[str, Any], str, str]:
     """
     Main agent entry point.
 
@@ -253,9 +971,13 @@ def base_agent(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str]:
             - payload: User's question/request
             - instructions: Optional specific instructions
             - threadId: Optional thread ID for conversation continuity
+        cancel_token: Optional token checked between stages
 
     Returns:
         Tuple of (response_dict, explanation, thread_id)
+
+    Raises:
+        JobCancelledError: If the job is aborted; no error webhook is sent
     """
     job_id = payload.get('id')
     user_payload = payload.get('payload', '')
@@ -264,22 +986,18 @@ def base_agent(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str]:
 
     try:
         # Send progress update
-        call_webhook_with_success(job_id, {
-            "status": "inprogress",
-            "data": {
-                "title": "Processing...",
-                "info": "Analyzing family office benchmark data..."
-            }
-        })
+        call_webhook_with_success(job_id, PROCESSING_UPDATE)
 
         # Call LLM with threading support and smart skill loading
-        response_text, explanation, new_thread_id, loaded_files = llm(
+        response_text, explanation, new_thread_id, loaded_files, usage = llm(
             payload=user_payload,
             instructions=instructions,
-            thread_id=thread_id
+            thread_id=thread_id,
+            cancel_token=cancel_token
         )
 
         logger.info(f"Skill files used: {loaded_files}")
+        logger.info(f"Token usage: {usage}")
 
         # Prepare response
         resp = {
@@ -288,53 +1006,75 @@ def base_agent(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str]:
             "data": response_text
         }
 
-        # Send explanation via webhook
-        call_webhook_with_success(job_id, {
-            "status": "inprogress",
-            "data": {
-                "output": {
-                    "name": "explanation",
-                    "type": "longText",
-                    "data": explanation
-                }
-            }
-        })
-
-        # Send thread ID via webhook
-        call_webhook_with_success(job_id, {
-            "status": "inprogress",
-            "data": {
-                "output": {
-                    "name": "threadId",
-                    "type": "shortText",
-                    "data": new_thread_id
-                }
-            }
-        })
+        # Send explanation and thread ID via webhook
+        call_webhook_with_success(job_id, build_output_update("explanation", "longText", explanation))
+        call_webhook_with_success(job_id, build_output_update("threadId", "shortText", new_thread_id))
 
         logger.info(f"Agent completed successfully for job {job_id}")
         return resp, explanation, new_thread_id
 
-    except anthropic.APIConnectionError as e:
-        error_msg = f"Failed to connect to Anthropic API: {str(e)}"
-        logger.error(error_msg)
-        call_webhook_with_error(job_id, error_msg, 503)
+    except JobCancelledError:
+        # The abort request already notified the webhook
+        logger.info(f"Agent stopped for aborted job {job_id}")
         raise
 
-    except anthropic.RateLimitError as e:
-        error_msg = f"Anthropic API rate limit exceeded: {str(e)}"
+    except Exception as e:
+        error_msg, error_code = describe_agent_error(e)
         logger.error(error_msg)
-        call_webhook_with_error(job_id, error_msg, 429)
+        call_webhook_with_error(job_id, error_msg, error_code)
         raise
 
-    except anthropic.APIStatusError as e:
-        error_msg = f"Anthropic API error: {str(e)}"
-        logger.error(error_msg)
-        call_webhook_with_error(job_id, error_msg, e.status_code)
+
+async def base_agent_async(
+    payload: Dict[str, Any],
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[Dict[str, Any], str, str]:
+    """
+    Async agent entry point, equivalent to base_agent() without blocking the event loop.
+
+    Args:
+        payload: Dictionary containing id, payload, instructions and threadId
+        cancel_token: Optional token checked between stages
+
+    Returns:
+        Tuple of (response_dict, explanation, thread_id)
+
+    Raises:
+        JobCancelledError: If the job is aborted; no error webhook is sent
+    """
+    job_id = payload.get('id')
+
+    try:
+        await call_webhook_with_success_async(job_id, PROCESSING_UPDATE)
+
+        response_text, explanation, new_thread_id, loaded_files, usage = await llm_async(
+            payload=payload.get('payload', ''),
+            instructions=payload.get('instructions'),
+            thread_id=payload.get('threadId'),
+            cancel_token=cancel_token
+        )
+
+        logger.info(f"Skill files used: {loaded_files}")
+        logger.info(f"Token usage: {usage}")
+
+        resp = {
+            "name": "output",
+            "type": "longText",
+            "data": response_text
+        }
+
+        await call_webhook_with_success_async(job_id, build_output_update("explanation", "longText", explanation))
+        await call_webhook_with_success_async(job_id, build_output_update("threadId", "shortText", new_thread_id))
+
+        logger.info(f"Agent completed successfully for job {job_id}")
+        return resp, explanation, new_thread_id
+
+    except JobCancelledError:
+        logger.info(f"Agent stopped for aborted job {job_id}")
         raise
 
     except Exception as e:
-        error_msg = f"Error in base_agent: {str(e)}"
+        error_msg, error_code = describe_agent_error(e)
         logger.error(error_msg)
-        call_webhook_with_error(job_id, error_msg, 500)
+        await call_webhook_with_error_async(job_id, error_msg, error_code)
         raise
@@ -0,0 +1,388 @@
+"""
+Typed, columnar dataset of the figures published in the regional skill files.
+
+The salary bands, bonus ranges and AUM splits of each references/regional-*.md
+file are parsed out of its markdown tables and lists into one table with a
+column per field (metric, role, region, currency, band, low, high, share,
+AUM band, notes, source). Numeric columns are NumPy arrays; missing values
+are NaN. Row ids are indexed by metric, role and region, so a lookup such as
+("salary", "CFO", "uk") is a set intersection of small arrays.
+
+The dataset is built together with the SkillCorpus (once per container, and
+again when dev mode hot-reloads the skill files), so it can never disagree
+with the markdown the model is given. scripts/build_benchmark_data.py dumps
+it as JSON and reports lines that look like data but could not be parsed.
+"""
+
+import math
+import re
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from smart_agent.src.agent.skill_index import normalize_terms
+
+SALARY = "salary"
+BONUS = "bonus"
+CEO_SALARY_BY_AUM = "ceo_salary_by_aum"
+AUM_DISTRIBUTION = "aum_distribution"
+
+METRICS = (SALARY, BONUS, CEO_SALARY_BY_AUM, AUM_DISTRIBUTION)
+
+# Canonical role names as published, and the phrasings that refer to them
+ROLE_ALIASES = {
+    "CEO": ("ceo", "chief executive", "chief executive officer"),
+    "CFO": ("cfo", "chief financial officer"),
+    "CIO": ("cio", "chief investment officer"),
+    "COO": ("coo", "chief operating officer"),
+    "Chair": ("chair", "chairman", "chairwoman", "chairperson"),
+    "Chief of Staff": ("chief of staff",),
+    "Financial Controller": ("financial controller", "controller"),
+    "Investment Manager": ("investment manager",),
+    "Investment Analyst": ("investment analyst", "analyst"),
+    "Legal Counsel": ("legal counsel", "general counsel", "counsel", "lawyer"),
+    "Operations Manager": ("operations manager",),
+    "PA/EA": ("pa/ea", "pa", "ea", "personal assistant", "executive assistant"),
+    "Tax Specialist": ("tax specialist",),
+}
+
+CURRENCY_SYMBOLS = {"£": "GBP", "$": "USD", "€": "EUR"}
+UNIT_MULTIPLIERS = {"k": 1e3, "m": 1e6, "bn": 1e9}
+
+REGIONAL_PREFIX = "regional-"
+TITLE_PATTERN = re.compile(r'^#\s+(.+?)\s+(?:Family Office\s+)?Compensation\s*$', re.MULTILINE)
+HEADING_PATTERN = re.compile(r'^(#{2,3})\s+(.+?)\s*$')
+CURRENCY_CODE_PATTERN = re.compile(r'\(([A-Z]{3})\b')
+AMOUNT_PATTERN = re.compile(r'([£$€])\s?(\d[\d,]*(?:\.\d+)?)\s*(BN|[KkMm])?(\+?)')
+PERCENT_RANGE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*%')
+PERCENT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+SALARY_PERCENT_PATTERN = re.compile(r'%\+?\s+of salary')
+SHARE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)%\s+in this band')
+BULLET_PATTERN = re.compile(r'^-\s+(.+?):\s+(.+)$')
+UPPER_BOUND_PATTERN = re.compile(r'^(?:below|less than|under|up to)\b', re.IGNORECASE)
+
+NAN = float("nan")
+
+_ROLE_BY_TERMS = {
+    " ".join(normalize_terms(alias)): role
+    for role, aliases in ROLE_ALIASES.items()
+    for alias in (role, *aliases)
+}
+
+
+def resolve_role(text: str) -> Optional[str]:
+    """
+    Map a role as written in a table or a request to its canonical name.
+
+    Args:
+        text: Role text, e.g. "CFO", "chief financial officer", "PA/EA"
+
+    Returns:
+        Canonical role name, or None if the text is not a known role
+    """
+    return _ROLE_BY_TERMS.get(" ".join(normalize_terms(text)))
+
+
+def parse_amount(symbol: str, digits: str, unit: Optional[str], plus: str = "") -> float:
+    """Value of a money amount such as ("$", "1", "M", "+")."""
+    return float(digits.replace(",", "")) * UNIT_MULTIPLIERS.get((unit or "").lower(), 1.0)
+
+
+def parse_money_band(text: str, default_currency: str = "") -> Tuple[str, float, float]:
+    """
+    Parse a published salary band.
+
+    "£198,001-£264,000" has both bounds, "Below £99,000" only a high one and
+    "$500,000+" only a low one. Alternatives ("$132,000 or $500,000") and
+    prose ("Wide distribution") keep the text but no bounds.
+
+    Args:
+        text: Band as written in the table
+        default_currency: Currency of the table, used when the band has no symbol
+
+    Returns:
+        Tuple of (currency, low, high), NaN for a missing bound
+    """
+    amounts = AMOUNT_PATTERN.findall(text)
+    if not amounts:
+        return default_currency, NAN, NAN
+
+    currency = CURRENCY_SYMBOLS.get(amounts[0][0], default_currency)
+    values = [parse_amount(*amount) for amount in amounts]
+    if " or " in text or len(values) > 2:
+        return currency, NAN, NAN
+
+    open_ended = amounts[-1][3] == "+"
+    if UPPER_BOUND_PATTERN.match(text.strip()):
+        return currency, NAN, values[0]
+    if len(values) == 1:
+        return (currency, values[0], NAN) if open_ended else (currency, values[0], values[0])
+    return currency, values[0], NAN if open_ended else values[1]
+
+
+def parse_percent_band(text: str) -> Tuple[str, float, float]:
+    """
+    Parse a bonus range such as "21-50% of salary" or "Less than 20% of salary".
+
+    Text with several separate percentages ("from less than 10% to 200%+")
+    is kept whole, without bounds.
+
+    Args:
+        text: Published text
+
+    Returns:
+        Tuple of (band text, low, high), NaN for a missing bound
+    """
+    match = PERCENT_RANGE_PATTERN.search(text)
+    if match:
+        return match.group(0), float(match.group(1)), float(match.group(2))
+
+    percents = PERCENT_PATTERN.findall(text)
+    if len(percents) > 1:
+        return text, NAN, NAN
+    match = PERCENT_PATTERN.search(text)
+    if not match:
+        return "", NAN, NAN
+    value = float(match.group(1))
+    if UPPER_BOUND_PATTERN.search(text[:match.start()].split(":")[-1].strip()):
+        return f"<{match.group(0)}", NAN, value
+    if text[match.end():].startswith("+"):
+        return f"{match.group(0)}+", value, NAN
+    return match.group(0), value, value
+
+
+def _table_cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _is_separator(cells: List[str]) -> bool:
+    return all(set(cell) <= set("-: ") for cell in cells)
+
+
+class BenchmarkDataset:
+    """
+    Immutable columnar table of the regional benchmark figures.
+
+    Args:
+        documents: (path, content) pairs; only references/regional-*.md files are read
+    """
+
+    COLUMNS = ("metric", "role", "region", "region_name", "currency", "band",
+               "low", "high", "share", "aum", "notes", "source")
+
+    def __init__(self, documents: Iterable[Tuple[str, str]]):
+        rows: List[Dict[str, Any]] = []
+        skipped: List[str] = []
+        region_names: Dict[str, str] = {}
+
+        for path, content in documents:
+            filename = path.rsplit("/", 1)[-1]
+            if not filename.startswith(REGIONAL_PREFIX) or not filename.endswith(".md"):
+                continue
+            region = filename[len(REGIONAL_PREFIX):-len(".md")]
+            title = TITLE_PATTERN.search(content)
+            region_names[region] = title.group(1) if title else region.title()
+            rows.extend(self._parse_document(path, region, region_names[region], content, skipped))
+
+        self.region_names: Mapping[str, str] = MappingProxyType(region_names)
+        self.skipped: Tuple[str, ...] = tuple(skipped)
+
+        columns: Dict[str, Any] = {}
+        for name in self.COLUMNS:
+            values = [row.get(name, NAN if name in ("low", "high", "share") else "") for row in rows]
+            if name in ("low", "high", "share"):
+                array = np.array(values, dtype=np.float64)
+                array.flags.writeable = False
+                columns[name] = array
+            else:
+                columns[name] = tuple(values)
+        self.columns: Mapping[str, Any] = MappingProxyType(columns)
+
+        self.by_metric = self._build_index(columns["metric"])
+        self.by_role = self._build_index(columns["role"])
+        self.by_region = self._build_index(columns["region"])
+
+    @staticmethod
+    def _build_index(values: Tuple[str, ...]) -> Mapping[str, np.ndarray]:
+        positions: Dict[str, List[int]] = {}
+        for row, value in enumerate(values):
+            if value:
+                positions.setdefault(value, []).append(row)
+        return MappingProxyType({
+            value: np.array(ids, dtype=np.int32) for value, ids in positions.items()
+        })
+
+    def _parse_document(
+        self,
+        path: str,
+        region: str,
+        region_name: str,
+        content: str,
+        skipped: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Rows from one regional file: role tables, CEO-by-AUM tables and lists, bonus ranges and AUM splits."""
+        rows = []
+        section = subsection = ""
+        table: List[List[str]] = []
+
+        def base(metric: str, heading: str) -> Dict[str, Any]:
+            return {
+                "metric": metric, "region": region, "region_name": region_name,
+                "source": f"{path}#{heading}"
+            }
+
+        def flush_table() -> None:
+            if len(table) < 3 or not _is_separator(table[1]):
+                table.clear()
+                return
+            header, body = table[0], table[2:]
+            currency = next(iter(CURRENCY_CODE_PATTERN.findall(" ".join([section, *header]))), "")
+            for cells in body:
+                cells = cells + [""] * (3 - len(cells))
+                if section.startswith("Salary Ranges by Role"):
+                    role = resolve_role(cells[0])
+                    if role is None:
+                        skipped.append(f"{path}: unknown role {cells[0]!r}")
+                        continue
+                    band_currency, low, high = parse_money_band(cells[1], currency)
+                    share = SHARE_PATTERN.search(cells[2])
+                    rows.append({
+                        **base(SALARY, section), "role": role, "currency": band_currency, "band": cells[1],
+                        "low": low, "high": high, "share": float(share.group(1)) if share else NAN,
+                        "notes": cells[2]
+                    })
+                elif section.startswith("CEO Compensation by AUM"):
+                    band_currency, low, high = parse_money_band(cells[1], currency)
+                    rows.append({
+                        **base(CEO_SALARY_BY_AUM, section), "role": "CEO", "currency": band_currency,
+                        "band": cells[1], "low": low, "high": high, "aum": cells[0]
+                    })
+                else:
+                    skipped.append(f"{path}: table row under {section!r}")
+            table.clear()
+
+        for line in content.splitlines():
+            stripped = line.strip()
+            if stripped.startswith("|"):
+                table.append(_table_cells(stripped))
+                continue
+            if table:
+                flush_table()
+
+            heading = HEADING_PATTERN.match(stripped)
+            if heading:
+                if heading.group(1) == "##":
+                    section, subsection = heading.group(2), ""
+                else:
+                    subsection = heading.group(2)
+                continue
+
+            bullet = BULLET_PATTERN.match(stripped)
+            if not bullet:
+                continue
+            label, value = bullet.groups()
+
+            if subsection.startswith("Bonus") and "Role" in subsection:
+                role = resolve_role(label)
+                band, low, high = parse_percent_band(value)
+                if role is None or not band:
+                    skipped.append(f"{path}: bonus line {stripped!r}")
+                    continue
+                rows.append({
+                    **base(BONUS, subsection), "role": role, "currency": "%", "band": band,
+                    "low": low, "high": high, "notes": value
+                })
+
+            elif section == "Bonus Structure" and not subsection and SALARY_PERCENT_PATTERN.search(value):
+                band, low, high = parse_percent_band(value)
+                rows.append({
+                    **base(BONUS, section), "currency": "%", "band": band, "low": low, "high": high,
+                    "notes": f"{label}: {value}"
+                })
+
+            elif section.startswith("CEO Compensation by AUM") and AMOUNT_PATTERN.search(value):
+                band = value.removesuffix(" range").strip()
+                currency, low, high = parse_money_band(band)
+                rows.append({
+                    **base(CEO_SALARY_BY_AUM, section), "role": "CEO", "currency": currency, "band": band,
+                    "low": low, "high": high, "aum": label
+                })
+
+            elif section.startswith("AUM Distribution"):
+                share = PERCENT_PATTERN.fullmatch(value.strip())
+                rows.append({
+                    **base(AUM_DISTRIBUTION, section), "currency": "%", "band": value, "aum": label,
+                    "share": float(share.group(1)) if share else NAN
+                })
+
+        if table:
+            flush_table()
+        return rows
+
+    def __len__(self) -> int:
+        return len(self.columns["metric"])
+
+    def resolve_region(self, text: str) -> Optional[str]:
+        """
+        Map a region key ("uk", "middleeast") or name ("Middle East") to its key.
+
+        Args:
+            text: Region as given by a client
+
+        Returns:
+            Region key, or None if no regional file matches
+        """
+        wanted = re.sub(r"[\s_-]+", "", text).casefold()
+        for region, name in self.region_names.items():
+            if wanted in (region, re.sub(r"\s+", "", name).casefold()):
+                return region
+        return None
+
+    def select(
+        self,
+        metric: Optional[str] = None,
+        role: Optional[str] = None,
+        region: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Row ids matching every given filter.
+
+        Args:
+            metric: One of METRICS
+            role: Canonical role name
+            region: Region key
+
+        Returns:
+            Sorted row ids
+        """
+        ids: Optional[np.ndarray] = None
+        for index, value in ((self.by_metric, metric), (self.by_role, role), (self.by_region, region)):
+            if value is None:
+                continue
+            matched = index.get(value)
+            if matched is None:
+                return np.empty(0, dtype=np.int32)
+            ids = matched if ids is None else np.intersect1d(ids, matched, assume_unique=True)
+        return np.arange(len(self), dtype=np.int32) if ids is None else ids
+
+    def records(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Rows as JSON-ready dictionaries (NaN becomes None).
+
+        Args:
+            ids: Row ids from select()
+
+        Returns:
+            One dictionary per row
+        """
+        records = []
+        for row in ids:
+            record = {}
+            for name in self.COLUMNS:
+                value = self.columns[name][row]
+                if isinstance(value, (float, np.floating)):
+                    value = None if math.isnan(value) else float(value)
+                record[name] = value
+            records.append(record)
+        return records
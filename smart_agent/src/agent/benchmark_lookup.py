@@ -0,0 +1,272 @@
+"""
+Deterministic fast path for single-fact benchmark lookups.
+
+A large share of questions are pure lookups ("CFO salary UK", "What is the
+average CEO salary in the USA?", "CIO bonus Middle East") whose answer is one
+row of the BenchmarkDataset. Such a question is recognised when it names
+exactly one role, exactly one region (through the regional files' keywords,
+as skill loading does) and one metric (salary or bonus), and every other word
+is filler ("what", "average", "typical", "family office", ...). Anything else
+("compare", a second role, AUM, benefits, a role with no published figure
+or one published only as prose) goes to the model as before.
+
+The answer is rendered from the row as markdown naming the band, the share of
+respondents in it and the source table, so it reads like the model's answer
+and carries the same outputs. BENCHMARK_LOOKUP=false disables the fast path.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from smart_agent.src.agent.benchmark_data import BONUS, REGIONAL_PREFIX, ROLE_ALIASES, SALARY, BenchmarkDataset
+from smart_agent.src.agent.skill_index import normalize_terms
+from smart_agent.src.agent.skill_loader import SkillCorpus, get_skill_corpus, scan_query
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+# Answer single-fact salary and bonus lookups from the dataset without a model call
+BENCHMARK_LOOKUP = os.environ.get("BENCHMARK_LOOKUP", "true").lower() in ("1", "true", "yes")
+
+# Longer questions are never treated as lookups
+MAX_LOOKUP_CHARS = 160
+
+METRIC_WORDS = {
+    SALARY: "salary salaries pay paid earn earns make makes compensation remuneration wage wages",
+    BONUS: "bonus bonuses",
+}
+
+# Words that ask for another figure than the plain salary or bonus ("salary increase", "deferred bonus")
+QUALIFIER_WORDS = """
+increase increases rise raise raises growth deferred deferral retention sign-on signing guaranteed cap capped
+benefits pension allowance carried interest equity stake relocation holiday notice health ltip ltips
+incentive incentives total
+""".split()
+
+# Words that do not change which figure is asked for
+FILLER_WORDS = """
+average typical typically usual usually common commonly most median range ranges band bands
+current currently much family office offices fo get gets s level levels base annual tell please
+give show us know like would look looks figure figures benchmark benchmarks data survey
+""".split()
+
+REGIONS_WITH_ARTICLE = {"UK", "USA", "Middle East"}
+
+SOURCE_REPORT = "2025 Agreus/KPMG Global Family Office Compensation Benchmark Report"
+
+_METRIC_BY_TERM = {term: metric for metric, words in METRIC_WORDS.items() for term in normalize_terms(words)}
+_FILLER_TERMS = frozenset(normalize_terms(" ".join(FILLER_WORDS)))
+_QUALIFIER_TERMS = frozenset(normalize_terms(" ".join(QUALIFIER_WORDS)))
+_ROLE_PHRASES = sorted(
+    ((tuple(normalize_terms(alias)), role) for role, aliases in ROLE_ALIASES.items() for alias in (role, *aliases)),
+    key=lambda phrase: -len(phrase[0])
+)
+
+_counters = {"lookups": 0, "answered": 0}
+_counters_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class LookupMatch:
+    """A question recognised as a single-fact lookup."""
+    metric: str
+    role: str
+    region: str
+
+
+@dataclass(frozen=True)
+class QuestionEntities:
+    """Roles, metrics (salary, bonus), qualifiers and region keys a question names, each sorted."""
+    roles: Tuple[str, ...]
+    metrics: Tuple[str, ...]
+    qualifiers: Tuple[str, ...]
+    regions: Tuple[str, ...]
+
+
+def _scan_entities(question: str, corpus: SkillCorpus) -> Tuple[List[str], List[str], List[bool], Set[str]]:
+    """
+    Find the regions and roles of a question.
+
+    Region keywords are matched as skill loading does; roles are the longest
+    alias phrases among the words left.
+
+    Returns:
+        Tuple of (region keys, terms, whether each term was consumed by a region or role, roles)
+    """
+    fired = scan_query(question, corpus)
+    groups = [group for group in fired if group.startswith(REGIONAL_PREFIX)]
+    regions = [group[len(REGIONAL_PREFIX):-len(".md")] for group in groups]
+
+    terms = normalize_terms(question)
+    consumed = [False] * len(terms)
+    for group in groups:
+        for keyword in fired[group]:
+            for term in normalize_terms(keyword):
+                for position, candidate in enumerate(terms):
+                    if candidate == term:
+                        consumed[position] = True
+
+    # Positions of each term, so a role phrase is only tried where its first term occurs
+    starts: Dict[str, List[int]] = {}
+    for position, term in enumerate(terms):
+        starts.setdefault(term, []).append(position)
+
+    roles = set()
+    for phrase, role in _ROLE_PHRASES:
+        for start in starts.get(phrase[0], ()):
+            span = range(start, start + len(phrase))
+            if tuple(terms[start:start + len(phrase)]) == phrase and not any(consumed[i] for i in span):
+                roles.add(role)
+                for i in span:
+                    consumed[i] = True
+    return regions, terms, consumed, roles
+
+
+def question_entities(question: str) -> QuestionEntities:
+    """
+    Extract the roles, metrics, qualifiers and regions a question names.
+
+    Two questions can share an answer only if these match: "CEO salary in
+    the UK", "CFO salary in the UK" and "CEO salary increase in the UK" are
+    close in wording but ask for different figures.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        The question's entities
+    """
+    regions, terms, consumed, roles = _scan_entities(question, get_skill_corpus())
+    metrics = set()
+    qualifiers = set()
+    for position, term in enumerate(terms):
+        if consumed[position]:
+            continue
+        if term in _METRIC_BY_TERM:
+            metrics.add(_METRIC_BY_TERM[term])
+        elif term in _QUALIFIER_TERMS:
+            qualifiers.add(term)
+    return QuestionEntities(
+        tuple(sorted(roles)), tuple(sorted(metrics)), tuple(sorted(qualifiers)), tuple(sorted(regions))
+    )
+
+
+def match_lookup(question: str, dataset: Optional[BenchmarkDataset] = None) -> Optional[LookupMatch]:
+    """
+    Recognise a single-fact lookup.
+
+    Args:
+        question: The user's question
+        dataset: Dataset to check the figure exists in (defaults to the skill corpus's)
+
+    Returns:
+        The metric, role and region asked for, or None if the question needs the model
+    """
+    if not question or len(question) > MAX_LOOKUP_CHARS:
+        return None
+
+    corpus = get_skill_corpus()
+    dataset = dataset or corpus.benchmarks
+    regions, terms, consumed, roles = _scan_entities(question, corpus)
+    if len(regions) != 1:
+        return None
+    region = regions[0]
+
+    metrics = set()
+    for position, term in enumerate(terms):
+        if consumed[position]:
+            continue
+        if term in _METRIC_BY_TERM:
+            metrics.add(_METRIC_BY_TERM[term])
+        elif term not in _FILLER_TERMS:
+            return None
+
+    if len(roles) != 1 or len(metrics) != 1:
+        return None
+    match = LookupMatch(metrics.pop(), roles.pop(), region)
+    rows = dataset.select(match.metric, match.role, match.region)
+    # Prose bands ("Wide distribution") need the model to explain them
+    if not len(rows) or not any(character.isdigit() for character in dataset.columns["band"][rows[0]]):
+        return None
+    return match
+
+
+def _article(word: str) -> str:
+    return "an" if word[0].lower() in "aeiou" else "a"
+
+
+def render_lookup(match: LookupMatch, dataset: BenchmarkDataset) -> Dict[str, Any]:
+    """
+    Render the answer to a lookup as markdown.
+
+    Args:
+        match: Lookup from match_lookup()
+        dataset: Dataset holding the figure
+
+    Returns:
+        {"markdown", "loaded_files"} where loaded_files names the source table
+    """
+    record = dataset.records(dataset.select(match.metric, match.role, match.region)[:1])[0]
+    name = record["region_name"]
+    region = f"the {name}" if name in REGIONS_WITH_ARTICLE else name
+    role = f"{_article(match.role)} **{match.role}**"
+
+    if match.metric == SALARY:
+        currency = f" ({record['currency']})" if record["currency"] else ""
+        lines = [f"The most common salary band for {role} in {region} is **{record['band']}**{currency}."]
+        if record["share"] is not None:
+            lines.append(f"{record['share']:.0f}% of {match.role} respondents in {region} fall in this band.")
+        elif record["notes"]:
+            lines.append(f"Note: {record['notes']}.")
+    else:
+        lines = [f"The typical bonus for {role} in {region} is **{record['band']} of salary**.",
+                 f"Detail: {record['notes']}."]
+
+    heading = record["source"].partition("#")[2]
+    lines.append(f"\n*Source: {SOURCE_REPORT}, {name}: {heading}.*")
+    return {"markdown": " ".join(lines[:-1]) + "\n" + lines[-1], "loaded_files": ["SKILL.md", record["source"]]}
+
+
+def answer_lookup(question: str) -> Optional[Dict[str, Any]]:
+    """
+    Answer a single-fact lookup from the benchmark dataset.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        {"markdown", "loaded_files"}, or None if the question needs the model
+    """
+    if not BENCHMARK_LOOKUP:
+        return None
+
+    with _counters_lock:
+        _counters["lookups"] += 1
+    dataset = get_skill_corpus().benchmarks
+    match = match_lookup(question, dataset)
+    if match is None:
+        return None
+
+    with _counters_lock:
+        _counters["answered"] += 1
+    logger.info(f"Answered as a benchmark lookup: {match.metric} / {match.role} / {match.region}")
+    return render_lookup(match, dataset)
+
+
+def get_lookup_stats() -> Dict[str, Any]:
+    """
+    Questions checked and answered by the lookup fast path.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "enabled": BENCHMARK_LOOKUP,
+        **counters,
+        "answerRate": round(counters["answered"] / counters["lookups"], 3) if counters["lookups"] else 0.0,
+        "rows": len(get_skill_corpus().benchmarks)
+    }
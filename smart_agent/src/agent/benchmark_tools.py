@@ -0,0 +1,385 @@
+"""
+Tool-use mode: benchmark data served through Anthropic tools.
+
+By default the agent pastes the reference files (or their best sections)
+picked by load_relevant_skills() into the system prompt. With
+AGENT_TOOLS=true the system prompt carries only the SKILL.md metadata (name
+and description), and the model reads what it needs through three tools
+backed by the in-memory SkillCorpus:
+
+- lookup_salary(role, region): salary bands from the BenchmarkDataset
+  (plus the CEO-by-AUM table for CEOs); region omitted means every region
+- get_bonus_structure(region): bonus lines of one regional file
+- get_section(topic, region): best BM25 sections of the SectionIndex within
+  TOOL_SECTION_BUDGET estimated tokens
+
+Tool results are compact text naming their source table or section, and
+those sources are reported in loaded_files like retrieved sections. The
+model-call loop lives in base_agent.py; this module builds the tool
+definitions, executes a round's tool calls (concurrently when there are
+several) and extends the request for the next round. After
+TOOL_MAX_ITERATIONS rounds of tool calls the model must answer.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from smart_agent.src.agent.benchmark_data import BONUS, CEO_SALARY_BY_AUM, REGIONAL_PREFIX, ROLE_ALIASES, SALARY, resolve_role
+from smart_agent.src.agent.skill_index import render_sections
+from smart_agent.src.agent.skill_loader import SkillCorpus, get_skill_corpus
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+# Answer through tools instead of pasting reference content into the system prompt
+AGENT_TOOLS = os.environ.get("AGENT_TOOLS", "false").lower() in ("1", "true", "yes")
+
+# Rounds of tool calls before the model must answer
+TOOL_MAX_ITERATIONS = int(os.environ.get("TOOL_MAX_ITERATIONS", "4"))
+
+# Estimated tokens of section text returned by one get_section call
+TOOL_SECTION_BUDGET = int(os.environ.get("TOOL_SECTION_BUDGET", "800"))
+
+# Worker threads running the tool calls of one round
+TOOL_WORKERS = int(os.environ.get("TOOL_WORKERS", "4"))
+
+TOOL_GUIDANCE = (
+    "Benchmark figures and report sections are not in this prompt. Use the tools to read them; "
+    "request everything a comparison needs in one turn, since independent calls run in parallel. "
+    "Quote figures exactly as returned and name the source table or section."
+)
+
+# Lazy-loaded executor for the tool calls of a round
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_counters = {"rounds": 0, "calls": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+# Tool definitions and the corpus they were built from, rebuilt with it
+_definitions: Optional[Tuple[SkillCorpus, List[Dict[str, Any]]]] = None
+
+
+def get_tool_definitions(corpus: Optional[SkillCorpus] = None) -> List[Dict[str, Any]]:
+    """
+    Anthropic tool definitions, with the corpus's roles and regions as enums.
+
+    Args:
+        corpus: Skill corpus the tools read (defaults to the shared corpus)
+
+    Returns:
+        List of tool definitions for the Messages API "tools" parameter
+    """
+    global _definitions
+    corpus = corpus or get_skill_corpus()
+    cached = _definitions
+    if cached is not None and cached[0] is corpus:
+        return cached[1]
+
+    regions = sorted(corpus.benchmarks.region_names)
+    definitions = [
+        {
+            "name": "lookup_salary",
+            "description": (
+                "Salary bands for a family office role: the most common band and the share of "
+                "respondents in it, per region, with the CEO table by AUM for CEOs. "
+                "Omit region to get every region in one call."
+            ),
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "role": {"type": "string", "enum": list(ROLE_ALIASES)},
+                    "region": {"type": "string", "enum": regions}
+                },
+                "required": ["role"]
+            }
+        },
+        {
+            "name": "get_bonus_structure",
+            "description": (
+                "Bonus structure of one region: bonus as a percentage of salary by role, and "
+                "how bonuses are set (discretionary, formulaic, ranges)."
+            ),
+            "input_schema": {
+                "type": "object",
+                "properties": {"region": {"type": "string", "enum": regions}},
+                "required": ["region"]
+            }
+        },
+        {
+            "name": "get_section",
+            "description": (
+                "Full text of the report sections that best match a topic, e.g. \"LTIP types\", "
+                "\"succession planning\", \"benefits\", \"asset allocation\", \"hiring trends\". "
+                "Give region to search only that region's file."
+            ),
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "topic": {"type": "string", "description": "What the section should cover"},
+                    "region": {"type": "string", "enum": regions}
+                },
+                "required": ["topic"]
+            }
+        }
+    ]
+    _definitions = (corpus, definitions)
+    return definitions
+
+
+def build_tool_skill_content(skill_dir: str) -> str:
+    """
+    System prompt content of tool-use mode: the SKILL.md metadata and how to use the tools.
+
+    Args:
+        skill_dir: Path to the Skill directory
+
+    Returns:
+        Markdown replacing the reference data of the default mode
+    """
+    metadata = get_skill_corpus(skill_dir).metadata
+    return f"# Skill: {metadata['name']}\n{metadata['description']}\n\n{TOOL_GUIDANCE}"
+
+
+def _region(corpus: SkillCorpus, region: Optional[str]) -> Optional[str]:
+    if region is None:
+        return None
+    resolved = corpus.benchmarks.resolve_region(region)
+    if resolved is None:
+        raise ValueError(f"Unknown region {region!r}; expected one of {', '.join(corpus.benchmarks.region_names)}")
+    return resolved
+
+
+def _render_rows(records: List[Dict[str, Any]], label) -> Tuple[str, List[str]]:
+    """Render dataset rows as one line each, followed by their distinct sources."""
+    lines = [f"- {label(record)}: {record['band']}" + (f" ({record['notes']})" if record["notes"] else "")
+             for record in records]
+    sources = list(dict.fromkeys(record["source"] for record in records))
+    lines.append("Sources: " + "; ".join(sources))
+    return "\n".join(lines), sources
+
+
+def lookup_salary(corpus: SkillCorpus, role: str, region: Optional[str] = None) -> Tuple[str, List[str]]:
+    """
+    Salary bands of a role, in one region or all of them.
+
+    Args:
+        corpus: Skill corpus holding the dataset
+        role: Role name or alias
+        region: Region key or name; None for every region
+
+    Returns:
+        Tuple of (tool result text, sources)
+
+    Raises:
+        ValueError: If the role or region is unknown
+    """
+    dataset = corpus.benchmarks
+    resolved = resolve_role(role)
+    if resolved is None:
+        raise ValueError(f"Unknown role {role!r}; expected one of {', '.join(ROLE_ALIASES)}")
+    region = _region(corpus, region)
+
+    records = dataset.records(dataset.select(SALARY, resolved, region))
+    if resolved == "CEO":
+        records += dataset.records(dataset.select(CEO_SALARY_BY_AUM, None, region))
+    if not records:
+        where = dataset.region_names[region] if region else "any region"
+        return f"No published salary figures for {resolved} in {where}.", []
+
+    def label(record):
+        currency = f", {record['currency']}" if record["currency"] else ""
+        if record["metric"] == CEO_SALARY_BY_AUM:
+            return f"{record['region_name']} CEO at AUM {record['aum']}{currency}"
+        return f"{record['region_name']} {resolved}{currency}"
+
+    return _render_rows(records, label)
+
+
+def get_bonus_structure(corpus: SkillCorpus, region: str) -> Tuple[str, List[str]]:
+    """
+    Bonus lines of one region.
+
+    Args:
+        corpus: Skill corpus holding the dataset
+        region: Region key or name
+
+    Returns:
+        Tuple of (tool result text, sources)
+
+    Raises:
+        ValueError: If the region is unknown
+    """
+    dataset = corpus.benchmarks
+    region = _region(corpus, region)
+    records = dataset.records(dataset.select(BONUS, None, region))
+    if not records:
+        return f"No published bonus figures for {dataset.region_names[region]}.", []
+    return _render_rows(records, lambda record: record["role"] or "All roles")
+
+
+def get_section(corpus: SkillCorpus, topic: str, region: Optional[str] = None) -> Tuple[str, List[str]]:
+    """
+    Report sections best matching a topic, within TOOL_SECTION_BUDGET.
+
+    Args:
+        corpus: Skill corpus holding the section index
+        topic: Topic to search for
+        region: Optional region key or name restricting the search to its file
+
+    Returns:
+        Tuple of (tool result text, sources)
+
+    Raises:
+        ValueError: If the region is unknown
+    """
+    region = _region(corpus, region)
+    paths = [f"references/{REGIONAL_PREFIX}{region}.md"] if region else None
+    sections = corpus.index.search(topic, TOOL_SECTION_BUDGET, paths=paths)
+    if not sections:
+        return f"No report section matches {topic!r}.", []
+    return render_sections(sections), [section.provenance for section in sections]
+
+
+TOOL_FUNCTIONS = {
+    "lookup_salary": lookup_salary,
+    "get_bonus_structure": get_bonus_structure,
+    "get_section": get_section,
+}
+
+
+def execute_tool_call(corpus: SkillCorpus, tool_use: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Run one tool_use block.
+
+    An unknown tool or invalid input is returned to the model as an error
+    result, so it can correct the call.
+
+    Args:
+        corpus: Skill corpus the tools read
+        tool_use: tool_use content block of a model response
+
+    Returns:
+        Tuple of (tool_result content block, sources read)
+    """
+    result = {"type": "tool_result", "tool_use_id": tool_use.id}
+    sources: List[str] = []
+    try:
+        function = TOOL_FUNCTIONS.get(tool_use.name)
+        if function is None:
+            raise ValueError(f"Unknown tool {tool_use.name!r}")
+        result["content"], sources = function(corpus, **(tool_use.input or {}))
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Tool call {tool_use.name} failed: {str(e)}")
+        result["content"] = str(e)
+        result["is_error"] = True
+    return result, sources
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Get the shared executor for tool calls (lazy initialization)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
+    return _executor
+
+
+def tool_use_blocks(response: Any) -> List[Any]:
+    """Return the tool_use blocks of a model response."""
+    return [block for block in response.content if block.type == "tool_use"]
+
+
+def _record_round(results: List[Tuple[Dict[str, Any], List[str]]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Count a finished round and split its results from their sources."""
+    with _counters_lock:
+        _counters["rounds"] += 1
+        _counters["calls"] += len(results)
+        _counters["errors"] += sum(1 for result, _ in results if result.get("is_error"))
+    sources = [source for _, round_sources in results for source in round_sources]
+    return [result for result, _ in results], list(dict.fromkeys(sources))
+
+
+def run_tool_calls(tool_uses: List[Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Execute the tool calls of one round, concurrently when there are several.
+
+    Args:
+        tool_uses: tool_use blocks from tool_use_blocks()
+
+    Returns:
+        Tuple of (tool_result blocks in call order, distinct sources read)
+    """
+    corpus = get_skill_corpus()
+    if len(tool_uses) == 1:
+        results = [execute_tool_call(corpus, tool_uses[0])]
+    else:
+        results = list(get_tool_executor().map(lambda tool_use: execute_tool_call(corpus, tool_use), tool_uses))
+    logger.info(f"Ran {len(tool_uses)} tool calls: {[tool_use.name for tool_use in tool_uses]}")
+    return _record_round(results)
+
+
+async def run_tool_calls_async(tool_uses: List[Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Async variant of run_tool_calls(): each call runs in a worker thread.
+
+    Args:
+        tool_uses: tool_use blocks from tool_use_blocks()
+
+    Returns:
+        Tuple of (tool_result blocks in call order, distinct sources read)
+    """
+    corpus = await asyncio.to_thread(get_skill_corpus)
+    results = await asyncio.gather(*(
+        asyncio.to_thread(execute_tool_call, corpus, tool_use) for tool_use in tool_uses
+    ))
+    logger.info(f"Ran {len(tool_uses)} tool calls: {[tool_use.name for tool_use in tool_uses]}")
+    return _record_round(list(results))
+
+
+def continue_request(
+    request: Dict[str, Any],
+    response: Any,
+    results: List[Dict[str, Any]],
+    rounds: int
+) -> Dict[str, Any]:
+    """
+    Build the next request of the tool loop.
+
+    Args:
+        request: Request of the round just answered
+        response: Model response containing the tool calls
+        results: Their tool_result blocks
+        rounds: Rounds of tool calls run so far
+
+    Returns:
+        Request with the assistant turn and the results appended; after
+        TOOL_MAX_ITERATIONS rounds it forbids further tool calls
+    """
+    next_request = {
+        **request,
+        "messages": request["messages"] + [
+            {"role": "assistant", "content": response.content},
+            {"role": "user", "content": results}
+        ]
+    }
+    if rounds >= TOOL_MAX_ITERATIONS:
+        logger.info(f"Tool loop reached {TOOL_MAX_ITERATIONS} rounds; asking for the answer")
+        next_request["tool_choice"] = {"type": "none"}
+    return next_request
+
+
+def get_tool_stats() -> Dict[str, Any]:
+    """
+    Tool rounds, calls and failed calls.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {"enabled": AGENT_TOOLS, "maxIterations": TOOL_MAX_ITERATIONS, **counters}
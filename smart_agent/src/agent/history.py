@@ -0,0 +1,269 @@
+"""
+Token-budgeted conversation history with rolling summarisation.
+
+The full thread is kept in storage, but only the most recent turns are
+replayed verbatim to the model. Older turns are folded into a running summary
+(generated with a cheap model) that is persisted alongside the thread, so
+per-turn input size stays flat however long a thread grows. Turns are folded
+in batches: nothing is summarised until the unsummarised turns overflow the
+window, and then they are folded down to half of it, so the summary model is
+called once every few turns rather than on every turn.
+
+Folding happens after the turn is saved and its answer returned:
+fold_history_later() queues the fold on a background thread, which reloads
+the saved thread, calls the summary model and writes the summary back to the
+header with a conditional update (see thread_storage.save_thread_summary).
+Until it lands, build_history_messages keeps the replayed history within the
+window by dropping the oldest turns.
+
+Thread state handled here is a dictionary:
+    {"messages": [...], "summary": str, "summarized_count": int}
+where the first ``summarized_count`` messages are covered by ``summary``.
+Each stored message caches its token count under "tokens", so budget checks
+never need an extra API call.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from smart_agent.src.agent.skill_index import estimate_tokens
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.thread_storage import get_thread_state, save_thread_summary
+
+logger = Logger()
+
+# Lazy-created executor for background folds, and the threads with a fold queued or running
+_fold_executor: Optional[ThreadPoolExecutor] = None
+_pending_folds: Set[str] = set()
+_fold_lock = threading.Lock()
+
+# Defaults, overridable from the AgentPrompt.yaml `model:` section
+DEFAULT_HISTORY_CONFIG = {
+    "history_turns": 6,
+    "history_token_budget": 8000,
+    "summary_model": "claude-3-5-haiku-20241022",
+    "summary_max_tokens": 512,
+}
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of an advisory conversation about the 2025 "
+    "Agreus/KPMG Global Family Office Compensation Benchmark Report. Merge the "
+    "existing summary with the new exchanges. Keep every figure, region, role and "
+    "user preference that later questions may refer to. Reply with the summary only."
+)
+
+
+def get_history_config(model_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resolve history settings from prompt model parameters.
+
+    Args:
+        model_params: The `model:` section of AgentPrompt.yaml
+
+    Returns:
+        History configuration dictionary
+    """
+    return {key: model_params.get(key, default) for key, default in DEFAULT_HISTORY_CONFIG.items()}
+
+
+def history_load_turns(config: Dict[str, Any]) -> int:
+    """
+    Number of recent turns to load from storage for a new request.
+
+    Twice the verbatim window: enough for build_history_messages plus the
+    unsummarised backlog that compact_history folds.
+
+    Args:
+        config: History configuration
+
+    Returns:
+        Maximum number of turns to load
+    """
+    return max(int(config["history_turns"]), 1) * 2
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Get the token count of a stored message, estimating and caching it if missing.
+
+    Args:
+        message: Stored message dictionary
+
+    Returns:
+        Token count
+    """
+    tokens = message.get("tokens")
+    if not isinstance(tokens, int):
+        tokens = estimate_tokens(message.get("content", ""))
+        message["tokens"] = tokens
+    return tokens
+
+
+def _verbatim_start(messages: List[Dict[str, Any]], start: int, config: Dict[str, Any]) -> int:
+    """
+    Find the first message index of the verbatim tail.
+
+    The tail holds at most `history_turns` turns and `history_token_budget`
+    tokens, and always starts on a user message.
+    """
+    max_messages = max(int(config["history_turns"]), 0) * 2
+    budget = int(config["history_token_budget"])
+
+    index = len(messages)
+    used = 0
+    while index > start:
+        tokens = message_tokens(messages[index - 1])
+        if len(messages) - index + 1 > max_messages or used + tokens > budget:
+            break
+        used += tokens
+        index -= 1
+
+    while index < len(messages) and messages[index].get("role") != "user":
+        index += 1
+
+    return index
+
+
+def _fold_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Window that a fold compacts the verbatim tail down to: half the turns and half the budget."""
+    turns = max(int(config["history_turns"]), 0)
+    return {
+        **config,
+        "history_turns": max(turns // 2, 1) if turns else 0,
+        "history_token_budget": int(config["history_token_budget"]) // 2,
+    }
+
+
+def build_history_messages(thread_state: Dict[str, Any], config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Select the messages to replay verbatim for the next turn.
+
+    Args:
+        thread_state: Thread state with messages, summary and summarized_count
+        config: History configuration
+
+    Returns:
+        List of {"role", "content"} messages within the turn and token budget
+    """
+    messages = thread_state.get("messages", [])
+    start = _verbatim_start(messages, thread_state.get("summarized_count", 0), config)
+    return [
+        {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+        for msg in messages[start:]
+    ]
+
+
+def fold_due(thread_state: Dict[str, Any], config: Dict[str, Any]) -> bool:
+    """
+    Check whether the unsummarised turns overflow the verbatim window.
+
+    Args:
+        thread_state: Thread state with messages, summary and summarized_count
+        config: History configuration
+
+    Returns:
+        True if compact_history would fold turns into the summary
+    """
+    summarized_count = thread_state.get("summarized_count", 0)
+    return _verbatim_start(thread_state.get("messages", []), summarized_count, config) > summarized_count
+
+
+def compact_history(thread_state: Dict[str, Any], config: Dict[str, Any], client: Any) -> Dict[str, Any]:
+    """
+    Fold older turns into the running summary once they overflow the verbatim window.
+
+    While the unsummarised turns fit within `history_turns` and
+    `history_token_budget` nothing is done, so most turns make no summary
+    call. Once they overflow, the oldest are folded until the tail fits in
+    half the window; only those turns are sent to the summary model together
+    with the previous summary, so each fold costs a bounded amount. On failure
+    the state is returned unchanged and build_history_messages still enforces
+    the budget by dropping the oldest turns.
+
+    Args:
+        thread_state: Thread state with messages, summary and summarized_count
+        config: History configuration
+        client: Anthropic client used for the summary model
+
+    Returns:
+        Updated thread state
+    """
+    if not fold_due(thread_state, config):
+        return thread_state
+
+    messages = thread_state.get("messages", [])
+    summarized_count = thread_state.get("summarized_count", 0)
+
+    fold_end = _verbatim_start(messages, summarized_count, _fold_config(config))
+
+    folded = messages[summarized_count:fold_end]
+    transcript = "\n\n".join(f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in folded)
+    previous_summary = thread_state.get("summary") or "(none)"
+
+    try:
+        response = client.messages.create(
+            model=config["summary_model"],
+            max_tokens=int(config["summary_max_tokens"]),
+            temperature=0,
+            system=SUMMARY_SYSTEM_PROMPT,
+            messages=[{
+                "role": "user",
+                "content": f"Existing summary:\n{previous_summary}\n\nNew exchanges:\n{transcript}"
+            }]
+        )
+        summary = "".join(block.text for block in response.content if block.type == "text").strip()
+    except Exception as e:
+        logger.warning(f"History summarisation failed, keeping verbatim history: {e}")
+        return thread_state
+
+    logger.info(f"Folded {len(folded)} messages into thread summary ({len(summary)} chars)")
+
+    return {
+        **thread_state,
+        "summary": summary,
+        "summarized_count": fold_end,
+    }
+
+
+def _fold_saved_thread(thread_id: str, config: Dict[str, Any], client: Any) -> None:
+    """Reload a saved thread, fold its overflowing turns and store the new summary."""
+    try:
+        state = get_thread_state(thread_id, history_load_turns(config))
+        folded = compact_history(state, config, client)
+        if folded is not state and not save_thread_summary(thread_id, folded):
+            logger.warning(f"Summary of thread {thread_id} not saved; the next turn folds again")
+    except Exception as e:
+        logger.warning(f"Background history fold failed for thread {thread_id}: {e}")
+    finally:
+        with _fold_lock:
+            _pending_folds.discard(thread_id)
+
+
+def fold_history_later(thread_id: str, thread_state: Dict[str, Any], config: Dict[str, Any], client: Any) -> bool:
+    """
+    Queue a fold of a just-saved thread on a background thread.
+
+    Nothing is queued while the turns fit the verbatim window, or while a
+    fold of the same thread is still pending.
+
+    Args:
+        thread_id: UUID of the saved thread
+        thread_state: The state that was saved
+        config: History configuration
+        client: Anthropic client used for the summary model
+
+    Returns:
+        True if a fold was queued
+    """
+    global _fold_executor
+    if not fold_due(thread_state, config):
+        return False
+    with _fold_lock:
+        if thread_id in _pending_folds:
+            return False
+        _pending_folds.add(thread_id)
+        if _fold_executor is None:
+            _fold_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-fold")
+    _fold_executor.submit(_fold_saved_thread, thread_id, config, client)
+    return True
@@ -0,0 +1,127 @@
+"""
+Compiled multi-pattern keyword matcher with token-boundary semantics.
+
+Keywords from many groups (e.g. skill file -> keywords) are compiled once into
+a token n-gram table. A text is tokenised with a single regex pass and every
+token position is checked against the table, so matching cost depends on the
+text length, not on how many keywords are registered.
+
+Keywords only match whole tokens: "us" does not match "business" and "eu" does
+not match "queue". Alphabetic keywords of three or more characters also match
+their plural ("ceo" matches "CEOs"). Keywords written in upper case (e.g. "US")
+are matched case-sensitively, which keeps acronyms from matching ordinary words
+such as "us". Symbols are tokens of their own, so "£" matches "£198,001".
+"""
+
+import re
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into word tokens and single-character symbol tokens."""
+    return TOKEN_PATTERN.findall(text)
+
+
+def keyword_variants(keyword: str) -> List[str]:
+    """
+    Expand a keyword into the surface forms it should match.
+
+    Args:
+        keyword: Keyword or phrase
+
+    Returns:
+        The keyword plus its plural forms where applicable
+    """
+    variants = [keyword]
+    last = keyword.split()[-1]
+    if last.isalpha() and len(last) >= 3 and not keyword.isupper():
+        variants.extend([f"{keyword}s", f"{keyword}es"])
+    return variants
+
+
+class KeywordMatcher:
+    """
+    Match many keyword groups against a text in a single tokenising pass.
+
+    Args:
+        groups: Ordered mapping of group name -> keywords
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]]):
+        self.group_names: Tuple[str, ...] = tuple(groups)
+        # first token -> [(token tuple, [(group, keyword)])], split by case sensitivity
+        self._folded: Dict[str, List[Tuple[Tuple[str, ...], List[Tuple[str, str]]]]] = {}
+        self._exact: Dict[str, List[Tuple[Tuple[str, ...], List[Tuple[str, str]]]]] = {}
+
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                keyword = str(keyword).strip()
+                if not keyword:
+                    continue
+                case_sensitive = keyword.isupper()
+                if not case_sensitive:
+                    keyword = keyword.lower()
+                table = self._exact if case_sensitive else self._folded
+
+                for variant in keyword_variants(keyword):
+                    key = tuple(tokenize(variant))
+                    candidates = table.setdefault(key[0], [])
+                    entries = next((e for k, e in candidates if k == key), None)
+                    if entries is None:
+                        entries = []
+                        candidates.append((key, entries))
+                    if (group, keyword) not in entries:
+                        entries.append((group, keyword))
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find every group with at least one matching keyword.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Mapping of group name -> keywords that fired, in registration order of groups
+        """
+        fired: Dict[str, List[str]] = {}
+        if not text:
+            return fired
+
+        tokens = tokenize(text)
+        folded = [token.lower() for token in tokens]
+
+        for start in range(len(tokens)):
+            candidates = self._folded.get(folded[start])
+            if candidates:
+                self._collect(candidates, folded, start, fired)
+            if self._exact:
+                candidates = self._exact.get(tokens[start])
+                if candidates:
+                    self._collect(candidates, tokens, start, fired)
+
+        return {group: fired[group] for group in self.group_names if group in fired}
+
+    @staticmethod
+    def _collect(candidates, tokens: List[str], start: int, fired: Dict[str, List[str]]) -> None:
+        """Record the candidates whose full token sequence starts at tokens[start]."""
+        for key, entries in candidates:
+            if len(key) > 1 and tuple(tokens[start:start + len(key)]) != key:
+                continue
+            for group, keyword in entries:
+                keywords = fired.setdefault(group, [])
+                if keyword not in keywords:
+                    keywords.append(keyword)
+
+    def match(self, text: str) -> List[str]:
+        """
+        Return matching group names in registration order.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            List of group names with at least one matching keyword
+        """
+        return list(self.scan(text))
@@ -1,6 +1,188 @@
-import yaml
+"""
+Prompt templates compiled once per file version.
+
+A prompt file is read, parsed with yaml.safe_load and split into its system
+and user messages once per version (mtime and size, with the content hash
+as the version id). Each message is pre-split at its {{variable}} slots, so
+rendering a request is one join of the literal segments and the values;
+the static part of the system message used for prompt caching is kept as a
+ready string.
+"""
+
+import hashlib
+import os
 import re
-from typing import Tuple, Dict, Any, Optional
+import threading
+import yaml
+from dataclasses import dataclass
+from typing import Tuple, Dict, Any, Iterable, Mapping
+
+DEFAULT_MODEL_PARAMS = {
+    'name': 'claude-sonnet-4-20250514',
+    'temperature': 0.7,
+    'max_tokens': 4096
+}
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+SECTION_PATTERN = re.compile(r'(?m)^(?=## )')
+
+# Compiled templates by path, replaced when the file's mtime or size changes
+_templates: Dict[str, "PromptTemplate"] = {}
+_templates_lock = threading.Lock()
+
+
+class TemplateText:
+    """
+    Text pre-split at its {{variable}} placeholders.
+
+    Args:
+        text: Template text
+    """
+
+    __slots__ = ("text", "parts", "slots")
+
+    def __init__(self, text: str):
+        pieces = PLACEHOLDER_PATTERN.split(text)
+        self.text = text
+        # Literal segments at even positions; slots hold their placeholder until rendered
+        self.parts = [piece if position % 2 == 0 else f'{{{{{piece}}}}}' for position, piece in enumerate(pieces)]
+        self.slots = tuple((position, pieces[position]) for position in range(1, len(pieces), 2))
+
+    def render(self, variables: Mapping[str, Any]) -> str:
+        """
+        Fill the slots in a single join.
+
+        Placeholders of variables that are not given are left as they are.
+
+        Args:
+            variables: Mapping of variable names to values (None becomes empty)
+
+        Returns:
+            Rendered text
+        """
+        if not self.slots:
+            return self.text
+        parts = self.parts.copy()
+        for position, name in self.slots:
+            if name in variables:
+                value = variables[name]
+                parts[position] = str(value) if value is not None else ''
+        return ''.join(parts)
+
+
+@dataclass(frozen=True)
+class CacheableSystem:
+    """System message split for prompt caching, for one set of variable names."""
+    static_prompt: str
+    dynamic: TemplateText
+
+
+class PromptTemplate:
+    """
+    A prompt file compiled into model params and pre-split messages.
+
+    Args:
+        path: Path of the YAML prompt file
+        content: Raw file content
+        stat_key: (mtime_ns, size) of the file when it was read
+    """
+
+    def __init__(self, path: str, content: bytes, stat_key: Tuple[int, int]):
+        data = yaml.safe_load(content.decode('utf-8')) or {}
+        prompt_content = data.get('prompt', '')
+
+        self.path = path
+        self.stat_key = stat_key
+        self.version = hashlib.sha256(content).hexdigest()[:32]
+        self.model_params: Dict[str, Any] = data.get('model', DEFAULT_MODEL_PARAMS)
+        self.system_message = extract_message(prompt_content, 'system')
+        self.system = TemplateText(self.system_message)
+        self.user = TemplateText(extract_message(prompt_content, 'user'))
+        self._cacheable: Dict[frozenset, CacheableSystem] = {}
+
+    def cacheable_system(self, names: Iterable[str]) -> CacheableSystem:
+        """
+        Split the system message for prompt caching, once per set of variable names.
+
+        Markdown sections ("## ...") that reference any of the variables go, in
+        order, to the dynamic part; the rest form a static prefix that is
+        byte-identical across requests.
+
+        Args:
+            names: Names of the variables substituted per request
+
+        Returns:
+            Static prefix and dynamic template
+        """
+        key = frozenset(names)
+        split = self._cacheable.get(key)
+        if split is None:
+            placeholders = [f'{{{{{name}}}}}' for name in key]
+            static_sections = []
+            dynamic_sections = []
+            for section in SECTION_PATTERN.split(self.system_message):
+                if any(placeholder in section for placeholder in placeholders):
+                    dynamic_sections.append(section)
+                else:
+                    static_sections.append(section)
+            split = CacheableSystem(''.join(static_sections).strip(), TemplateText(''.join(dynamic_sections)))
+            self._cacheable[key] = split
+        return split
+
+    def render(self, variables: Mapping[str, Any]) -> Tuple[str, str]:
+        """
+        Render the system and user messages.
+
+        Args:
+            variables: Variables to substitute
+
+        Returns:
+            Tuple of (system_prompt, user_prompt)
+        """
+        return self.system.render(variables).strip(), self.user.render(variables).strip()
+
+    def render_cacheable(self, variables: Mapping[str, Any]) -> Tuple[str, str, str]:
+        """
+        Render the system message split for prompt caching, and the user message.
+
+        Args:
+            variables: Variables to substitute
+
+        Returns:
+            Tuple of (static_system_prompt, dynamic_system_prompt, user_prompt)
+        """
+        split = self.cacheable_system(variables)
+        return split.static_prompt, split.dynamic.render(variables).strip(), self.user.render(variables)
+
+
+def get_prompt_template(yaml_file_path: str) -> PromptTemplate:
+    """
+    Get the compiled template of a prompt file, recompiling when it changes.
+
+    The file is stat'ed on every call; it is re-read only when its mtime or
+    size changed, and recompiled only when its content did.
+
+    Args:
+        yaml_file_path: Path to the YAML prompt file
+
+    Returns:
+        The current PromptTemplate
+    """
+    stat = os.stat(yaml_file_path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    template = _templates.get(yaml_file_path)
+    if template is not None and template.stat_key == stat_key:
+        return template
+
+    with open(yaml_file_path, 'rb') as f:
+        content = f.read()
+    with _templates_lock:
+        if template is not None and template.version == hashlib.sha256(content).hexdigest()[:32]:
+            template.stat_key = stat_key
+        else:
+            template = PromptTemplate(yaml_file_path, content, stat_key)
+            _templates[yaml_file_path] = template
+    return template
 
 
 def extract_prompts(
@@ -17,30 +199,47 @@ def extract_prompts(
     Returns:
         Tuple of (system_prompt, user_prompt, model_params)
     """
-    with open(yaml_file_path, 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
+    template = get_prompt_template(yaml_file_path)
+    system_prompt, user_prompt = template.render(variables)
+    return system_prompt, user_prompt, dict(template.model_params)
 
-    model_params = data.get('model', {
-        'name': 'claude-sonnet-4-20250514',
-        'temperature': 0.7,
-        'max_tokens': 4096
-    })
 
-    prompt_content = data.get('prompt', '')
+def extract_cacheable_prompts(
+    yaml_file_path: str,
+    **variables
+) -> Tuple[str, str, str, Dict[str, Any]]:
+    """
+    Extract the system prompt split into a static prefix and a per-request suffix.
 
-    # Substitute variables using {{variable}} syntax
-    for key, value in variables.items():
-        placeholder = f'{{{{{key}}}}}'
-        if value is not None:
-            prompt_content = prompt_content.replace(placeholder, str(value))
-        else:
-            prompt_content = prompt_content.replace(placeholder, '')
+    Markdown sections ("## ...") of the system message that reference any of the
+    given template variables are moved, in order, to the dynamic suffix. The
+    remaining sections form a prefix that is byte-identical across requests and
+    can therefore be marked as a prompt-cache breakpoint.
 
-    # Extract system and user messages using XML-style tags
-    system_prompt = extract_message(prompt_content, 'system')
-    user_prompt = extract_message(prompt_content, 'user')
+    Args:
+        yaml_file_path: Path to the YAML prompt file
+        **variables: Variables to substitute in the prompts
 
-    return system_prompt, user_prompt, model_params
+    Returns:
+        Tuple of (static_system_prompt, dynamic_system_prompt, user_prompt, model_params)
+    """
+    template = get_prompt_template(yaml_file_path)
+    static_prompt, dynamic_prompt, user_prompt = template.render_cacheable(variables)
+    return static_prompt, dynamic_prompt, user_prompt, dict(template.model_params)
+
+
+def substitute_variables(content: str, variables: Dict[str, Any]) -> str:
+    """
+    Substitute {{variable}} placeholders in content.
+
+    Args:
+        content: Template text
+        variables: Mapping of variable names to values (None becomes empty)
+
+    Returns:
+        Content with placeholders replaced
+    """
+    return TemplateText(content).render(variables)
 
 
 def extract_message(content: str, role: str) -> str:
@@ -63,6 +262,19 @@ def extract_message(content: str, role: str) -> str:
     return ''
 
 
+def prompt_file_hash(yaml_file_path: str) -> str:
+    """
+    Hash of a prompt file's content, re-read only when its mtime or size changes.
+
+    Args:
+        yaml_file_path: Path to the YAML prompt file
+
+    Returns:
+        Hex digest identifying the template version
+    """
+    return get_prompt_template(yaml_file_path).version
+
+
 def load_skill_content(skill_dir: str) -> str:
     """
     Load and concatenate skill reference files for inclusion in the system prompt.
@@ -73,23 +285,9 @@ def load_skill_content(skill_dir: str) -> str:
     Returns:
         Concatenated content from all reference files
     """
-    import os
-
-    content_parts = []
-
-    # Load main SKILL.md
-    skill_md_path = os.path.join(skill_dir, 'SKILL.md')
-    if os.path.exists(skill_md_path):
-        with open(skill_md_path, 'r', encoding='utf-8') as f:
-            content_parts.append(f"# Skill Overview\n{f.read()}")
-
-    # Load reference files
-    references_dir = os.path.join(skill_dir, 'references')
-    if os.path.exists(references_dir):
-        for filename in sorted(os.listdir(references_dir)):
-            if filename.endswith('.md'):
-                filepath = os.path.join(references_dir, filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content_parts.append(f.read())
+    from smart_agent.src.agent.skill_loader import get_skill_corpus
 
-    return '\n\n---\n\n'.join(content_parts)
+    corpus = get_skill_corpus(skill_dir)
+    return '\n\n---\n\n'.join(
+        part for part in (corpus.overview_block, corpus.all_references_content) if part
+    )
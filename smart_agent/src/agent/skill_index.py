@@ -0,0 +1,253 @@
+"""
+Section-level BM25 retrieval over skill files.
+
+SKILL.md and every reference file are split into "## "-delimited sections at
+cold start. A BM25 weight matrix (sections x terms) is precomputed with NumPy,
+so scoring a query is a column gather and a row sum. Retrieval picks the
+highest-scoring sections that fit a token budget and returns them in document
+order, with section-level provenance ("references/regional-uk.md#Benefits").
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from smart_agent.src.agent.keyword_matcher import tokenize
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Sections scoring below this fraction of the best section are never selected
+MIN_RELATIVE_SCORE = 0.35
+
+# Rough characters-per-token ratio used for budget estimates
+CHARS_PER_TOKEN = 4
+
+SECTION_PATTERN = re.compile(r'(?m)^(?=## )')
+TITLE_PATTERN = re.compile(r'(?m)^# (.+)$')
+HEADING_PATTERN = re.compile(r'^## (.+)$', re.MULTILINE)
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how in is it its of on or
+that the their there these this to was what when where which who why will with
+you your our we i me my
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without calling the API."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def normalize_terms(text: str) -> List[str]:
+    """
+    Turn text into index terms: lower-cased word tokens without stopwords,
+    with a light plural strip so "salaries"/"salary" and "CFOs"/"CFO" meet.
+
+    Args:
+        text: Text to normalise
+
+    Returns:
+        List of terms
+    """
+    terms = []
+    for token in tokenize(text.lower()):
+        if not token[0].isalnum() or token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('ies'):
+            token = token[:-3] + 'y'
+        elif len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+@dataclass(frozen=True)
+class Section:
+    """A heading-delimited slice of a skill file."""
+    path: str
+    title: str
+    heading: str
+    text: str
+    tokens: int
+
+    @property
+    def provenance(self) -> str:
+        return f"{self.path}#{self.heading}" if self.heading else self.path
+
+
+def split_sections(path: str, content: str) -> List[Section]:
+    """
+    Split a markdown file into sections at "## " headings.
+
+    Text before the first "## " heading becomes an untitled intro section.
+
+    Args:
+        path: File path relative to the skill directory
+        content: Markdown content (frontmatter already removed)
+
+    Returns:
+        List of sections in document order
+    """
+    title_match = TITLE_PATTERN.search(content)
+    title = title_match.group(1).strip() if title_match else path
+
+    sections = []
+    for chunk in SECTION_PATTERN.split(content):
+        chunk = chunk.strip()
+        if chunk.startswith('# '):
+            # The file title is re-emitted by render_sections
+            chunk = chunk.partition('\n')[2].strip()
+        if not chunk:
+            continue
+        heading_match = HEADING_PATTERN.match(chunk)
+        heading = heading_match.group(1).strip() if heading_match else ""
+        sections.append(Section(
+            path=path,
+            title=title,
+            heading=heading,
+            text=chunk,
+            tokens=estimate_tokens(chunk)
+        ))
+    return sections
+
+
+class SectionIndex:
+    """
+    In-memory BM25 index over skill file sections.
+
+    Args:
+        documents: Iterable of (path, content) pairs in display order
+    """
+
+    def __init__(self, documents: Iterable[Tuple[str, str]]):
+        self.sections: List[Section] = []
+        for path, content in documents:
+            self.sections.extend(split_sections(path, content))
+
+        self.paths: Tuple[str, ...] = tuple(dict.fromkeys(s.path for s in self.sections))
+        self.vocabulary: Dict[str, int] = {}
+
+        rows = []
+        for section in self.sections:
+            counts: Dict[int, int] = {}
+            # Headings carry the section topic; count them twice
+            for term in normalize_terms(f"{section.heading} {section.text}"):
+                term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            rows.append(counts)
+
+        term_frequency = np.zeros((len(self.sections), max(len(self.vocabulary), 1)), dtype=np.float32)
+        for row, counts in enumerate(rows):
+            if counts:
+                term_frequency[row, list(counts)] = list(counts.values())
+
+        document_length = term_frequency.sum(axis=1)
+        average_length = float(document_length.mean()) if len(self.sections) else 1.0
+        document_frequency = (term_frequency > 0).sum(axis=0)
+        idf = np.log1p((len(self.sections) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * document_length / max(average_length, 1e-9))
+
+        # Precomputed per-(section, term) BM25 contribution
+        self.weights = (idf * term_frequency * (BM25_K1 + 1) / (term_frequency + norm[:, None])).astype(np.float32)
+        self.path_ids = np.array([self.paths.index(s.path) for s in self.sections], dtype=np.int32)
+        self.section_tokens = np.array([s.tokens for s in self.sections], dtype=np.int32)
+
+    def score(self, query: str, exclude_terms: Iterable[str] = ()) -> np.ndarray:
+        """
+        Score every section against a query.
+
+        Args:
+            query: Query text
+            exclude_terms: Query words to ignore (e.g. keywords already used to pick files)
+
+        Returns:
+            Array of BM25 scores, one per section
+        """
+        excluded = set(normalize_terms(' '.join(exclude_terms)))
+        term_ids = [
+            self.vocabulary[term] for term in normalize_terms(query)
+            if term in self.vocabulary and term not in excluded
+        ]
+        if not term_ids:
+            return np.zeros(len(self.sections), dtype=np.float32)
+        return self.weights[:, term_ids].sum(axis=1)
+
+    def search(
+        self,
+        query: str,
+        token_budget: int,
+        paths: Optional[Sequence[str]] = None,
+        exclude_terms: Iterable[str] = (),
+        cover_paths: bool = False
+    ) -> List[Section]:
+        """
+        Select the best-scoring sections that fit within a token budget.
+
+        With cover_paths, each requested path's best section is taken first so
+        comparison queries cover every requested file. Sections scoring below
+        MIN_RELATIVE_SCORE of the best match are skipped so weakly related
+        sections do not fill the budget.
+
+        Args:
+            query: Query text
+            token_budget: Maximum estimated tokens of selected section text
+            paths: Optional subset of file paths to search
+            exclude_terms: Query words to ignore when scoring
+            cover_paths: Guarantee one section per requested path when it scores at all
+
+        Returns:
+            Selected sections in document order
+        """
+        scores = self.score(query, exclude_terms)
+        path_ids = None
+        if paths is not None:
+            path_ids = [self.paths.index(p) for p in paths if p in self.paths]
+            scores = np.where(np.isin(self.path_ids, path_ids), scores, 0.0)
+
+        order = np.argsort(-scores, kind='stable')
+        cutoff = float(scores.max(initial=0.0)) * MIN_RELATIVE_SCORE
+
+        candidates = []
+        if cover_paths and path_ids:
+            # First pass: best positive-scoring section of every requested path
+            best = {}
+            for position in order:
+                path_id = int(self.path_ids[position])
+                if path_id in path_ids and path_id not in best and scores[position] > 0:
+                    best[path_id] = int(position)
+            candidates.extend(best.values())
+        candidates.extend(int(position) for position in order if scores[position] > cutoff)
+
+        selected = []
+        remaining = token_budget
+        for position in candidates:
+            tokens = int(self.section_tokens[position])
+            if position not in selected and tokens <= remaining:
+                selected.append(position)
+                remaining -= tokens
+
+        return [self.sections[position] for position in sorted(selected)]
+
+
+def render_sections(sections: Sequence[Section]) -> str:
+    """
+    Render selected sections grouped under their file titles.
+
+    Args:
+        sections: Sections in document order
+
+    Returns:
+        Markdown content with one "# Title" per source file
+    """
+    parts = []
+    current_path = None
+    for section in sections:
+        if section.path != current_path:
+            parts.append(f"# {section.title}")
+            current_path = section.path
+        parts.append(section.text)
+    return '\n\n'.join(parts)
@@ -5,57 +5,39 @@ Implements a two-tier approach inspired by Anthropic's Agent Skills pattern:
 1. Level 1: Skill metadata (from SKILL.md frontmatter) always loaded
 2. Level 2: Relevant reference files loaded based on query classification
 
-Since this is a single-turn API agent (not agentic with tool use), we use
-keyword matching to determine which skill files are relevant to the query.
+By default the agent makes a single model call (tool-use mode, AGENT_TOOLS,
+is in benchmark_tools.py), so we use keyword matching to determine which
+skill files are relevant to the query.
+All keywords are compiled into one token-boundary KeywordMatcher per corpus.
+Broad queries (no file keyword, or matched files over the token budget) are
+served from a section-level BM25 index instead of whole files.
+
+All skill files are read once per container into an immutable SkillCorpus.
+Per-file keywords and descriptions come from each reference file's YAML
+frontmatter, so new reference files need no code changes. In dev mode the
+corpus is rebuilt when any file's mtime changes (hot-reload from /tmp/Skill).
 """
 
 import os
 import re
+import sys
+import threading
 import yaml
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+from smart_agent.src.agent.benchmark_data import BenchmarkDataset
+from smart_agent.src.agent.keyword_matcher import KeywordMatcher
+from smart_agent.src.agent.skill_index import SectionIndex, estimate_tokens, render_sections
 from smart_agent.src.config.logger import Logger
 
 logger = Logger()
 
-# Skill file metadata with keywords for matching
-SKILL_FILES = {
-    "regional-uk.md": {
-        "keywords": ["uk", "united kingdom", "britain", "british", "london", "gbp", "£"],
-        "description": "UK family office compensation data"
-    },
-    "regional-europe.md": {
-        "keywords": ["europe", "european", "eu", "germany", "france", "switzerland", "eur", "€"],
-        "description": "Continental Europe compensation data"
-    },
-    "regional-usa.md": {
-        "keywords": ["usa", "us", "united states", "america", "american", "usd", "$", "new york", "california"],
-        "description": "USA family office compensation data"
-    },
-    "regional-asia.md": {
-        "keywords": ["asia", "asian", "singapore", "hong kong", "china", "japan", "india"],
-        "description": "Asia family office compensation data"
-    },
-    "regional-australia.md": {
-        "keywords": ["australia", "australian", "sydney", "melbourne", "aud"],
-        "description": "Australia family office compensation data"
-    },
-    "regional-middleeast.md": {
-        "keywords": ["middle east", "uae", "dubai", "saudi", "arabia", "qatar", "gulf"],
-        "description": "Middle East family office compensation data"
-    },
-    "governance.md": {
-        "keywords": ["governance", "succession", "structure", "board", "family council", "next gen", "professionalisation"],
-        "description": "Family office governance and succession planning"
-    },
-    "investments.md": {
-        "keywords": ["investment", "invest", "portfolio", "allocation", "asset", "roi", "return", "equity", "real estate", "private"],
-        "description": "Investment strategies and asset allocation"
-    },
-    "recruitment.md": {
-        "keywords": ["recruit", "hiring", "hire", "talent", "team", "staff", "employee", "headcount", "remote", "turnover"],
-        "description": "Recruitment trends and talent management"
-    }
-}
+# Environment mode: "dev" enables mtime-based hot-reload of skill files
+ENVIRONMENT_MODE = os.environ.get("ENVIRONMENT_MODE", "dev")
+
+# Estimated token budget for reference content (SKILL.md overview excluded)
+SKILL_TOKEN_BUDGET = int(os.environ.get("SKILL_TOKEN_BUDGET", "4000"))
 
 # Keywords that indicate compensation-related queries (load all regional files)
 COMPENSATION_KEYWORDS = ["salary", "salaries", "compensation", "pay", "bonus", "ltip", "incentive", "benefits", "package"]
@@ -63,83 +45,258 @@ COMPENSATION_KEYWORDS = ["salary", "salaries", "compensation", "pay", "bonus", "
 # Role keywords (may need multiple regional files for comparison)
 ROLE_KEYWORDS = ["ceo", "cfo", "cio", "chief", "director", "manager", "analyst", "head of"]
 
+# Matcher group names for the intent keyword lists above (file groups end in ".md")
+COMPENSATION_GROUP = "intent:compensation"
+ROLE_GROUP = "intent:role"
+
+FRONTMATTER_PATTERN = re.compile(r'^---\s*\n(.*?)\n---\s*\n?', re.DOTALL)
+
+
+@dataclass(frozen=True)
+class SkillFile:
+    """A single reference file with metadata parsed from its frontmatter."""
+    filename: str
+    path: str
+    description: str
+    keywords: Tuple[str, ...]
+    content: str
+    tokens: int
+
+
+def split_frontmatter(text: str) -> Tuple[Dict, str]:
+    """
+    Split YAML frontmatter from markdown content.
+
+    Args:
+        text: Raw file content
+
+    Returns:
+        Tuple of (frontmatter dict, body without frontmatter)
+    """
+    match = FRONTMATTER_PATTERN.match(text)
+    if not match:
+        return {}, text
+
+    try:
+        metadata = yaml.safe_load(match.group(1)) or {}
+    except yaml.YAMLError:
+        return {}, text
+
+    if not isinstance(metadata, dict):
+        return {}, text
+
+    return metadata, text[match.end():]
+
+
+class SkillCorpus:
+    """
+    Immutable in-memory snapshot of a Skill directory.
+
+    Reads SKILL.md and every references/*.md file once, interning their
+    content, and exposes O(1) lookups by filename plus pre-joined content
+    for the overview and the full reference set. The figures of the regional
+    files are also parsed into a columnar BenchmarkDataset.
+    """
+
+    def __init__(self, skill_dir: str):
+        self.skill_dir = skill_dir
+        self.signature = self._compute_signature(skill_dir)
+
+        overview = ""
+        metadata = {"name": "Unknown Skill", "description": ""}
+        skill_md_path = os.path.join(skill_dir, 'SKILL.md')
+        if os.path.exists(skill_md_path):
+            with open(skill_md_path, 'r', encoding='utf-8') as f:
+                overview = sys.intern(f.read())
+            frontmatter, _ = split_frontmatter(overview)
+            metadata = {
+                "name": frontmatter.get("name", "Unknown Skill"),
+                "description": frontmatter.get("description", "")
+            }
+
+        files: Dict[str, SkillFile] = {}
+        references_dir = os.path.join(skill_dir, 'references')
+        if os.path.isdir(references_dir):
+            for filename in sorted(os.listdir(references_dir)):
+                if not filename.endswith('.md'):
+                    continue
+                with open(os.path.join(references_dir, filename), 'r', encoding='utf-8') as f:
+                    frontmatter, body = split_frontmatter(f.read())
+                files[filename] = SkillFile(
+                    filename=filename,
+                    path=f"references/{filename}",
+                    description=frontmatter.get("description", ""),
+                    keywords=tuple(str(kw) for kw in frontmatter.get("keywords", [])),
+                    content=sys.intern(body.strip()),
+                    tokens=estimate_tokens(body)
+                )
+
+        self.overview = overview
+        self.metadata: Mapping[str, str] = MappingProxyType(metadata)
+        self.files: Mapping[str, SkillFile] = MappingProxyType(files)
+        self.overview_block = f"# Skill Overview\n{overview}" if overview else ""
+        self.all_references_content = '\n\n---\n\n'.join(f.content for f in files.values())
+        self.matcher = KeywordMatcher({
+            **{filename: skill_file.keywords for filename, skill_file in files.items()},
+            COMPENSATION_GROUP: COMPENSATION_KEYWORDS,
+            ROLE_GROUP: ROLE_KEYWORDS,
+        })
+        documents = [("SKILL.md", split_frontmatter(overview)[1])] if overview else []
+        documents.extend((skill_file.path, skill_file.content) for skill_file in files.values())
+        self.index = SectionIndex(documents)
+        self.benchmarks = BenchmarkDataset(documents)
+        self._joined: Dict[Tuple[str, ...], str] = {}
+        self._lock = threading.Lock()
+
+        logger.info(
+            f"Skill corpus built from {skill_dir}: {len(files)} reference files, "
+            f"{len(self.benchmarks)} benchmark rows"
+        )
+
+    @staticmethod
+    def _compute_signature(skill_dir: str) -> Tuple[Tuple[str, float], ...]:
+        """Collect (path, mtime) for every skill file, used for hot-reload checks."""
+        entries = []
+        skill_md_path = os.path.join(skill_dir, 'SKILL.md')
+        if os.path.exists(skill_md_path):
+            entries.append((skill_md_path, os.path.getmtime(skill_md_path)))
+
+        references_dir = os.path.join(skill_dir, 'references')
+        if os.path.isdir(references_dir):
+            for filename in sorted(os.listdir(references_dir)):
+                if filename.endswith('.md'):
+                    path = os.path.join(references_dir, filename)
+                    entries.append((path, os.path.getmtime(path)))
+
+        return tuple(entries)
+
+    def is_stale(self) -> bool:
+        """Return True if any file under the skill directory changed since the build."""
+        try:
+            return self._compute_signature(self.skill_dir) != self.signature
+        except OSError:
+            return True
+
+    def get(self, filename: str) -> Optional[SkillFile]:
+        """Look up a reference file by name."""
+        return self.files.get(filename)
+
+    def join(self, filenames: Tuple[str, ...]) -> str:
+        """
+        Return the overview plus the given reference files, joined once and memoized.
+
+        Args:
+            filenames: Reference file names in the order they should appear
+
+        Returns:
+            Combined skill content
+        """
+        joined = self._joined.get(filenames)
+        if joined is None:
+            parts = [self.overview_block] if self.overview_block else []
+            parts.extend(self.files[name].content for name in filenames if name in self.files)
+            joined = '\n\n---\n\n'.join(parts)
+            with self._lock:
+                self._joined[filenames] = joined
+        return joined
+
+
+# Corpus and resolved directory, built once per container
+_corpus: Optional[SkillCorpus] = None
+_skill_dir: Optional[str] = None
+_corpus_lock = threading.Lock()
+
 
 def get_skill_dir() -> str:
-    """Get the skill directory path."""
+    """Get the skill directory path (resolved once outside dev mode)."""
+    global _skill_dir
+    if _skill_dir is not None and ENVIRONMENT_MODE != "dev":
+        return _skill_dir
+
+    resolved = 'Skill'
     paths = ['Skill', '/var/task/Skill', '/tmp/Skill']
     for path in paths:
         if os.path.exists(path):
-            return path
-    return 'Skill'
+            resolved = path
+            break
 
+    _skill_dir = resolved
+    return resolved
 
-def parse_skill_metadata(skill_dir: str) -> Dict[str, str]:
+
+def get_skill_corpus(skill_dir: Optional[str] = None) -> SkillCorpus:
     """
-    Parse SKILL.md frontmatter for metadata.
+    Get the shared skill corpus, building it on first use.
+
+    In dev mode the corpus is rebuilt when the directory or any file mtime changes.
+
+    Args:
+        skill_dir: Optional explicit skill directory (defaults to get_skill_dir())
 
     Returns:
-        Dictionary with 'name' and 'description' from YAML frontmatter
+        The current SkillCorpus
     """
-    skill_md_path = os.path.join(skill_dir, 'SKILL.md')
+    global _corpus
+    skill_dir = skill_dir or get_skill_dir()
 
-    if not os.path.exists(skill_md_path):
-        return {"name": "Unknown Skill", "description": ""}
+    corpus = _corpus
+    if corpus is not None and corpus.skill_dir == skill_dir:
+        if ENVIRONMENT_MODE != "dev" or not corpus.is_stale():
+            return corpus
 
-    with open(skill_md_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    with _corpus_lock:
+        if _corpus is corpus:
+            if corpus is not None and corpus.skill_dir == skill_dir:
+                logger.info(f"Skill files changed in {skill_dir}, rebuilding corpus")
+            _corpus = SkillCorpus(skill_dir)
+        return _corpus
 
-    # Extract YAML frontmatter between --- markers
-    frontmatter_match = re.match(r'^---\s*\n(.*?)\n---', content, re.DOTALL)
-    if frontmatter_match:
-        try:
-            metadata = yaml.safe_load(frontmatter_match.group(1))
-            return {
-                "name": metadata.get("name", "Unknown Skill"),
-                "description": metadata.get("description", "")
-            }
-        except yaml.YAMLError:
-            pass
 
-    return {"name": "Unknown Skill", "description": ""}
+def parse_skill_metadata(skill_dir: str) -> Dict[str, str]:
+    """
+    Parse SKILL.md frontmatter for metadata.
 
+    Returns:
+        Dictionary with 'name' and 'description' from YAML frontmatter
+    """
+    return dict(get_skill_corpus(skill_dir).metadata)
 
-def classify_query(query: str) -> List[str]:
+
+def scan_query(query: str, corpus: Optional[SkillCorpus] = None) -> Dict[str, List[str]]:
     """
-    Classify a query to determine which skill files are relevant.
+    Run the corpus keyword matcher over a query.
 
     Args:
         query: The user's question/request
+        corpus: Skill corpus to classify against (defaults to the shared corpus)
 
     Returns:
-        List of relevant skill file names
+        Mapping of matcher group (reference file name or intent) -> keywords that fired
     """
-    query_lower = query.lower()
-    relevant_files = set()
+    corpus = corpus or get_skill_corpus()
+    fired = corpus.matcher.scan(query)
+    logger.info(f"Keywords fired for query: {fired}")
+    return fired
 
-    # Check for compensation keywords - these often need regional context
-    has_compensation_query = any(kw in query_lower for kw in COMPENSATION_KEYWORDS)
-    has_role_query = any(kw in query_lower for kw in ROLE_KEYWORDS)
 
-    # Check each skill file's keywords
-    for filename, config in SKILL_FILES.items():
-        for keyword in config["keywords"]:
-            if keyword in query_lower:
-                relevant_files.add(filename)
-                break
+def classify_query(query: str, corpus: Optional[SkillCorpus] = None) -> List[str]:
+    """
+    Classify a query to determine which skill files are relevant.
 
-    # If asking about compensation/roles but no specific region, might be general query
-    # In this case, we could load the main SKILL.md which has overview data
+    Args:
+        query: The user's question/request
+        corpus: Skill corpus to classify against (defaults to the shared corpus)
 
-    # If asking about comparison between regions, load multiple
-    comparison_words = ["compare", "comparison", "vs", "versus", "difference", "between"]
-    if any(word in query_lower for word in comparison_words):
-        # Load all mentioned regional files
-        pass  # Already handled by keyword matching
+    Returns:
+        List of relevant skill file names, in corpus order
+    """
+    corpus = corpus or get_skill_corpus()
+    relevant_files = [group for group in scan_query(query, corpus) if group in corpus.files]
 
     logger.info(f"Query classification: {len(relevant_files)} relevant files for query: {query[:50]}...")
-    logger.info(f"Relevant files: {list(relevant_files)}")
+    logger.info(f"Relevant files: {relevant_files}")
 
-    return list(relevant_files)
+    return relevant_files
 
 
 def load_skill_metadata(skill_dir: str) -> str:
@@ -153,15 +310,7 @@ def load_skill_metadata(skill_dir: str) -> str:
     Returns:
         Skill metadata and quick reference section
     """
-    skill_md_path = os.path.join(skill_dir, 'SKILL.md')
-
-    if not os.path.exists(skill_md_path):
-        return ""
-
-    with open(skill_md_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    return content
+    return get_skill_corpus(skill_dir).overview
 
 
 def load_relevant_skills(skill_dir: str, query: str) -> Tuple[str, List[str]]:
@@ -169,51 +318,45 @@ def load_relevant_skills(skill_dir: str, query: str) -> Tuple[str, List[str]]:
     Load skill content relevant to the query using two-tier approach.
 
     Level 1: Always load SKILL.md (metadata + quick reference)
-    Level 2: Load specific reference files based on query classification
+    Level 2: Load specific reference files based on query classification. When
+    the matched files exceed SKILL_TOKEN_BUDGET, or only a compensation/role
+    intent matched, the best BM25 sections within the budget are loaded instead.
 
     Args:
         skill_dir: Path to the Skill directory
         query: The user's question/request
 
     Returns:
-        Tuple of (combined skill content, list of loaded files)
-    """
-    loaded_files = []
-    content_parts = []
-
-    # Level 1: Always load main SKILL.md
-    skill_md_path = os.path.join(skill_dir, 'SKILL.md')
-    if os.path.exists(skill_md_path):
-        with open(skill_md_path, 'r', encoding='utf-8') as f:
-            content_parts.append(f"# Skill Overview\n{f.read()}")
-            loaded_files.append("SKILL.md")
-
-    # Level 2: Load relevant reference files based on query
-    relevant_files = classify_query(query)
-    references_dir = os.path.join(skill_dir, 'references')
-
-    if os.path.exists(references_dir) and relevant_files:
-        for filename in relevant_files:
-            filepath = os.path.join(references_dir, filename)
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content_parts.append(f.read())
-                    loaded_files.append(f"references/{filename}")
-
-    # If no specific files matched but it's a compensation query, load all regional files
-    if not relevant_files:
-        query_lower = query.lower()
-        if any(kw in query_lower for kw in COMPENSATION_KEYWORDS + ROLE_KEYWORDS):
-            logger.info("No specific region detected, loading all reference files for comprehensive response")
-            if os.path.exists(references_dir):
-                for filename in sorted(os.listdir(references_dir)):
-                    if filename.endswith('.md'):
-                        filepath = os.path.join(references_dir, filename)
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content_parts.append(f.read())
-                            loaded_files.append(f"references/{filename}")
-
-    combined_content = '\n\n---\n\n'.join(content_parts)
+        Tuple of (combined skill content, list of loaded files or file#section entries)
+    """
+    corpus = get_skill_corpus(skill_dir)
+    fired = scan_query(query, corpus)
+    selected = [group for group in fired if group in corpus.files]
+    loaded_files = ["SKILL.md"] if corpus.overview else []
+
+    if selected and sum(corpus.files[filename].tokens for filename in selected) <= SKILL_TOKEN_BUDGET:
+        loaded_files.extend(corpus.files[filename].path for filename in selected)
+        combined_content = corpus.join(tuple(selected))
+
+    elif selected or COMPENSATION_GROUP in fired or ROLE_GROUP in fired:
+        paths = [corpus.files[filename].path for filename in (selected or corpus.files)]
+        # Keywords that picked the files say nothing about which section is relevant
+        file_keywords = [keyword for filename in selected for keyword in fired[filename]]
+        sections = corpus.index.search(
+            query,
+            SKILL_TOKEN_BUDGET,
+            paths=paths,
+            exclude_terms=file_keywords,
+            cover_paths=bool(selected)
+        )
+        logger.info(f"Retrieved {len(sections)} sections within {SKILL_TOKEN_BUDGET} token budget")
+        loaded_files.extend(section.provenance for section in sections)
+        combined_content = '\n\n---\n\n'.join(
+            part for part in (corpus.overview_block, render_sections(sections)) if part
+        )
+
+    else:
+        combined_content = corpus.join(())
 
     logger.info(f"Loaded {len(loaded_files)} skill files: {loaded_files}")
 
@@ -233,7 +376,7 @@ def get_available_skills_summary(skill_dir: str) -> str:
     """
     lines = ["## Available Reference Data"]
 
-    for filename, config in SKILL_FILES.items():
-        lines.append(f"- **{filename}**: {config['description']}")
+    for filename, skill_file in get_skill_corpus(skill_dir).files.items():
+        lines.append(f"- **{filename}**: {skill_file.description}")
 
     return "\n".join(lines)
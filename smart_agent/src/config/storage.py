@@ -0,0 +1,131 @@
+"""
+Resolved storage configuration.
+
+STORAGE_BACKEND selects where jobs and threads are stored (see
+src/storage/): "dynamodb" (default) or "sqlite", an embedded database file at
+SQLITE_PATH for ECS/self-hosted deployments and local load testing.
+
+For DynamoDB, jobs, thread turns and legacy threads all live in one region, resolved once:
+STORAGE_REGION, else the runtime's AWS_REGION / AWS_DEFAULT_REGION (set by
+Lambda and ECS to the region the code runs in), else eu-west-2 where the
+tables are deployed. DYNAMODB_ENDPOINT_URL points every table at a local
+stand-in (DynamoDB Local, LocalStack).
+
+storage.check_storage_latency() times a read of a missing key per table; it
+runs at cold start (which also opens the pooled connections) and from
+/health?deep=1. A table answering slower than STORAGE_LATENCY_WARN_MS, or a
+storage region other than the one the code runs in, is logged as a warning:
+cross-region DynamoDB calls cost ~80-150 ms each.
+
+Calls to the jobs and thread tables each go through a circuit breaker
+(STORAGE_BREAKER_*): once too many fail or stall, callers use their in-memory
+fallbacks straight away until a probe call succeeds again.
+
+The response cache table holds answers shared between containers (see
+utils/response_cache.py); its entries expire after RESPONSE_CACHE_TTL_SECONDS.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.aws_clients import get_resource
+
+logger = Logger()
+
+# "dynamodb" or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "dynamodb").lower()
+
+if STORAGE_BACKEND not in ("dynamodb", "sqlite"):
+    logger.warning(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}', using dynamodb")
+    STORAGE_BACKEND = "dynamodb"
+
+# Database file of the sqlite backend
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "/tmp/smart_agent.sqlite3")
+
+# Item lifetimes, applied as DynamoDB TTL attributes or purged by the sqlite backend
+JOB_TTL_DAYS = 7
+THREAD_TTL_DAYS = 30
+
+DEFAULT_STORAGE_REGION = "eu-west-2"
+
+# Region the code runs in, as reported by the runtime
+RUNTIME_REGION = os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION")
+
+STORAGE_REGION = os.environ.get("STORAGE_REGION") or RUNTIME_REGION or DEFAULT_STORAGE_REGION
+DYNAMODB_ENDPOINT_URL = os.environ.get("DYNAMODB_ENDPOINT_URL") or None
+
+# Round trip above which a table is reported as slow
+STORAGE_LATENCY_WARN_MS = float(os.environ.get("STORAGE_LATENCY_WARN_MS", "50"))
+
+# Measure table latency during cold start
+STORAGE_LATENCY_CHECK = os.environ.get("STORAGE_LATENCY_CHECK", "true").lower() in ("1", "true", "yes")
+
+# Per-table circuit breakers (see storage.get_table_breaker): recent calls considered, calls
+# needed before opening, share of failed or slow calls that opens, slow call threshold and
+# time open before a probe call
+STORAGE_BREAKER_WINDOW = int(os.environ.get("STORAGE_BREAKER_WINDOW", "20"))
+STORAGE_BREAKER_MIN_CALLS = int(os.environ.get("STORAGE_BREAKER_MIN_CALLS", "5"))
+STORAGE_BREAKER_FAILURE_RATE = float(os.environ.get("STORAGE_BREAKER_FAILURE_RATE", "0.5"))
+STORAGE_BREAKER_SLOW_MS = float(os.environ.get("STORAGE_BREAKER_SLOW_MS", "1000"))
+STORAGE_BREAKER_OPEN_SECONDS = float(os.environ.get("STORAGE_BREAKER_OPEN_SECONDS", "15"))
+
+# Key probed by the latency check; never written
+PROBE_ID = "__latency_probe__"
+
+
+@dataclass(frozen=True)
+class TableConfig:
+    """
+    A DynamoDB table and where it lives.
+
+    Attributes:
+        name: Table name
+        region: AWS region
+        endpoint_url: Local stand-in endpoint, or None for AWS
+        probe_key: Key of an item that never exists, for latency probes (None to skip)
+    """
+    name: str
+    region: str
+    endpoint_url: Optional[str]
+    probe_key: Optional[Dict[str, Any]]
+
+
+STORAGE_TABLES: Dict[str, TableConfig] = {
+    "jobs": TableConfig(
+        os.environ.get("DYNAMODB_TABLE", "agent-jobs"),
+        STORAGE_REGION, DYNAMODB_ENDPOINT_URL,
+        {"id": PROBE_ID}
+    ),
+    "thread_turns": TableConfig(
+        os.environ.get("THREAD_TURNS_TABLE", "agent-thread-turns"),
+        STORAGE_REGION, DYNAMODB_ENDPOINT_URL,
+        {"thread_id": PROBE_ID, "turn": 0}
+    ),
+    "response_cache": TableConfig(
+        os.environ.get("RESPONSE_CACHE_TABLE", "agent-response-cache"),
+        STORAGE_REGION, DYNAMODB_ENDPOINT_URL,
+        {"cache_key": PROBE_ID}
+    ),
+    # Legacy single-item threads, read for migration only (may already be deleted, so not probed)
+    "threads": TableConfig(
+        os.environ.get("THREADS_TABLE", "agent-threads"),
+        STORAGE_REGION, DYNAMODB_ENDPOINT_URL,
+        None
+    ),
+}
+
+
+def get_storage_table(key: str) -> Any:
+    """
+    Get the DynamoDB Table resource for a configured table.
+
+    Args:
+        key: "jobs", "thread_turns", "response_cache" or "threads"
+
+    Returns:
+        boto3 Table resource on the shared client
+    """
+    config = STORAGE_TABLES[key]
+    return get_resource("dynamodb", config.region, config.endpoint_url).Table(config.name)
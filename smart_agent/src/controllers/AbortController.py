@@ -1,17 +1,31 @@
 """
 Abort Controller for the Old Fashioned Agent.
 
-Handles job cancellation requests.
+Handles job cancellation requests: marks the job aborted and cancels it if
+it is queued or running in this process.
 """
 
 from typing import Dict, Any
 
-from smart_agent.src.utils.temp_db import get_job, update_job_status, delete_job
+from smart_agent.src.utils.job_context import get_job_state, set_job_status
 from smart_agent.src.utils.webhook import call_webhook_with_error
+from smart_agent.src.utils.cancellation import cancel_job
 from smart_agent.src.config.logger import Logger
 
 logger = Logger()
 
+# Final statuses: a job in one of them can no longer be aborted, and the abort never overwrites them
+TERMINAL_STATUSES = ("completed", "error", "aborted", "rejected")
+
+
+def not_abortable(job_id: str, status: str) -> Dict[str, Any]:
+    """Build the response for a job that already reached a final status."""
+    return {
+        "id": job_id,
+        "status": status,
+        "message": f"Job cannot be aborted - current status: {status}"
+    }
+
 
 def abort(job_id: str) -> Dict[str, Any]:
     """
@@ -30,7 +44,7 @@ def abort(job_id: str) -> Dict[str, Any]:
         }
 
     try:
-        job_data = get_job(job_id)
+        job_data = get_job_state(job_id)
 
         if job_data is None:
             return {
@@ -41,25 +55,34 @@ def abort(job_id: str) -> Dict[str, Any]:
 
         current_status = job_data.get("status", "unknown")
 
-        # Can only abort pending or running jobs
-        if current_status in ["completed", "error", "aborted"]:
+        # Can only abort pending or running jobs (a job the scheduler rejected never ran)
+        if current_status in TERMINAL_STATUSES:
+            return not_abortable(job_id, current_status)
+
+        # Update status to aborted, unless the job finished since it was read
+        if not set_job_status(job_id, "aborted", {"reason": "User requested abort"}, unless_status=TERMINAL_STATUSES):
+            job_data = get_job_state(job_id) or {}
+            final_status = job_data.get("status", "unknown")
+            if final_status in TERMINAL_STATUSES:
+                logger.info(f"Job {job_id} finished before it could be aborted: {final_status}")
+                return not_abortable(job_id, final_status)
             return {
-                "id": job_id,
-                "status": current_status,
-                "message": f"Job cannot be aborted - current status: {current_status}"
+                "error": f"Job {job_id} could not be marked aborted",
+                "code": 503
             }
 
-        # Update status to aborted
-        update_job_status(job_id, "aborted", {"reason": "User requested abort"})
+        # Stop the running job; it finishes without overwriting the status
+        cancelled = cancel_job(job_id)
 
         # Send webhook notification
         call_webhook_with_error(job_id, "Job aborted by user", 499)
 
-        logger.info(f"Job {job_id} aborted")
+        logger.info(f"Job {job_id} aborted (cancelled in-flight work: {cancelled})")
 
         return {
             "id": job_id,
             "status": "aborted",
+            "cancelled": cancelled,
             "message": "Job aborted successfully"
         }
 
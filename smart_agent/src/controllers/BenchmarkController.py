@@ -0,0 +1,72 @@
+"""
+Benchmark Controller for the Old Fashioned Agent.
+
+Serves rows of the structured benchmark dataset (see agent/benchmark_data.py)
+as JSON, filtered by metric, role and region or resolved from a question.
+"""
+
+from typing import Any, Dict, Optional
+
+from smart_agent.src.agent.benchmark_data import METRICS, resolve_role
+from smart_agent.src.agent.benchmark_lookup import match_lookup, render_lookup
+from smart_agent.src.agent.skill_loader import get_skill_corpus
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+
+def lookup_benchmark(
+    metric: Optional[str] = None,
+    role: Optional[str] = None,
+    region: Optional[str] = None,
+    question: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Look up benchmark figures.
+
+    Args:
+        metric: One of METRICS (e.g. "salary", "bonus")
+        role: Role name or alias (e.g. "CFO", "chief financial officer")
+        region: Region key or name (e.g. "uk", "Middle East")
+        question: Single-fact question resolved like the agent's fast path; overrides the filters
+
+    Returns:
+        {"metric", "role", "region", "count", "rows"} plus "answer" (markdown) for a question
+    """
+    try:
+        dataset = get_skill_corpus().benchmarks
+        answer = None
+
+        if question:
+            match = match_lookup(question, dataset)
+            if match is None:
+                return {"error": "Question is not a single-fact benchmark lookup", "code": 404}
+            metric, role, region = match.metric, match.role, match.region
+            answer = render_lookup(match, dataset)["markdown"]
+
+        else:
+            if metric is not None and metric not in METRICS:
+                return {"error": f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}", "code": 400}
+            if role is not None:
+                resolved = resolve_role(role)
+                if resolved is None:
+                    return {"error": f"No benchmark data for role {role!r}", "code": 404}
+                role = resolved
+            if region is not None:
+                resolved = dataset.resolve_region(region)
+                if resolved is None:
+                    return {"error": f"No benchmark data for region {region!r}", "code": 404}
+                region = resolved
+
+        rows = dataset.records(dataset.select(metric, role, region))
+        result = {"metric": metric, "role": role, "region": region, "count": len(rows), "rows": rows}
+        if answer is not None:
+            result["answer"] = answer
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in benchmark lookup: {str(e)}")
+        return {
+            "error": f"Failed to look up benchmark data: {str(e)}",
+            "code": 500
+        }
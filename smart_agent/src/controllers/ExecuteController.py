@@ -3,22 +3,71 @@ Execute Controller for the Old Fashioned Agent.
 
 Handles execution requests and returns structured responses with
 output, explanation, and thread ID for conversation continuity.
+Also provides a Server-Sent Events variant that streams the answer.
+
+The async entry points (execute_async, execute_request_async) keep the event
+loop free: the model call and webhooks are awaited natively, and boto3-backed
+job storage runs in worker threads. /execute jobs are admitted through the
+bounded job scheduler and rejected with 429 when it is saturated. A stream
+holds a scheduler worker slot from admit_stream() until it ends.
+
+Running jobs hold a cancellation token so /abort stops them between stages;
+final status writes are conditional and never overwrite "aborted". A turn on
+a thread that another turn holds is rejected with 409 (THREAD_CONCURRENCY).
+
+Each job gets a job context when it is saved (see job_context.py): webhooks
+take its URL from there, and status changes are written through it.
 """
 
 import asyncio
-from typing import Dict, Any, List
-from concurrent.futures import ThreadPoolExecutor
-
-from smart_agent.src.agent.base_agent import base_agent
-from smart_agent.src.utils.webhook import call_webhook_with_success, call_webhook_with_error
-from smart_agent.src.utils.helper import extract_input_value, generate_job_id
-from smart_agent.src.utils.temp_db import save_job, update_job_status
+from typing import Dict, Any, Iterator, List, Optional
+
+from smart_agent.src.agent.base_agent import base_agent, base_agent_async, llm_stream
+from smart_agent.src.utils.webhook import (
+    call_webhook_with_success,
+    call_webhook_with_error,
+    call_webhook_with_success_async,
+    call_webhook_with_error_async,
+)
+from smart_agent.src.utils.helper import extract_input_value, generate_job_id, format_sse
+from smart_agent.src.utils.job_context import create_job_context, set_job_status
+from smart_agent.src.utils.job_scheduler import get_job_scheduler, SchedulerFullError
+from smart_agent.src.utils.thread_lock import ThreadBusyError
+from smart_agent.src.utils.thread_storage import ThreadUnavailableError
+from smart_agent.src.utils.cancellation import (
+    CancellationToken,
+    JobCancelledError,
+    register_job,
+    release_job,
+    run_cancellable,
+)
 from smart_agent.src.config.logger import Logger
 
 logger = Logger()
 
-# Thread pool for async execution
-executor = ThreadPoolExecutor(max_workers=4)
+# Statuses that a finishing job must never overwrite
+PROTECTED_STATUSES = ("aborted",)
+
+
+def aborted_result(job_id: str) -> Dict[str, Any]:
+    """Build the response for a job stopped by /abort."""
+    logger.info(f"Job {job_id} stopped after abort")
+    return {"error": "Job aborted by user", "code": 499}
+
+
+def busy_error(error: ThreadBusyError) -> Dict[str, Any]:
+    """Build the 409 response for a turn on a thread held by another turn."""
+    logger.info(str(error))
+    return {"error": str(error), "code": 409, "retryAfter": error.retry_after}
+
+
+def unavailable_error(error: ThreadUnavailableError) -> Dict[str, Any]:
+    """Build the 503 response for a turn whose thread history cannot be read."""
+    logger.warning(str(error))
+    result = {"error": str(error), "code": 503}
+    if error.retry_after:
+        result["retryAfter"] = error.retry_after
+    return result
 
 
 def execute_sync(
@@ -35,6 +84,7 @@ def execute_sync(
     Returns:
         Result dictionary
     """
+    cancel_token = register_job(job_id)
     try:
         # Extract inputs
         payload = extract_input_value(inputs, 'payload', '')
@@ -55,7 +105,8 @@ def execute_sync(
         }
 
         # Execute agent
-        resp, explanation, new_thread_id = base_agent(agent_payload)
+        resp, explanation, new_thread_id = base_agent(agent_payload, cancel_token)
+        cancel_token.check()
 
         # Send completion webhook
         call_webhook_with_success(job_id, {
@@ -65,12 +116,12 @@ def execute_sync(
             }
         })
 
-        # Update job status
-        update_job_status(job_id, "completed", {
+        # Update job status, unless the job was aborted meanwhile
+        set_job_status(job_id, "completed", {
             "output": resp,
             "explanation": explanation,
             "threadId": new_thread_id
-        })
+        }, unless_status=PROTECTED_STATUSES)
 
         return {
             "result": resp,
@@ -78,29 +129,107 @@ def execute_sync(
             "threadId": new_thread_id
         }
 
+    except JobCancelledError:
+        return aborted_result(job_id)
+
+    except ThreadBusyError as e:
+        # base_agent already sent the 409 error webhook
+        set_job_status(job_id, "rejected", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
+        return busy_error(e)
+
+    except ThreadUnavailableError as e:
+        # base_agent already sent the 503 error webhook
+        set_job_status(job_id, "error", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
+        return unavailable_error(e)
+
     except Exception as e:
         logger.error(f"Execution error for job {job_id}: {str(e)}")
         call_webhook_with_error(job_id, str(e), 500)
-        update_job_status(job_id, "error", {"error": str(e)})
+        set_job_status(job_id, "error", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
         return {"error": str(e), "code": 500}
 
+    finally:
+        release_job(cancel_token)
+
 
 async def execute_async(
     job_id: str,
-    inputs: List[Dict[str, Any]]
+    inputs: List[Dict[str, Any]],
+    cancel_token: Optional[CancellationToken] = None
 ) -> Dict[str, Any]:
     """
     Asynchronously execute the agent.
 
+    Aborting the job cancels the in-flight model request; a job aborted while
+    queued returns without calling the model.
+
     Args:
         job_id: The job identifier
         inputs: List of input dictionaries
+        cancel_token: Token registered when the job was queued (registered here if omitted)
 
     Returns:
         Result dictionary
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(executor, execute_sync, job_id, inputs)
+    cancel_token = cancel_token or register_job(job_id)
+    try:
+        cancel_token.check()
+
+        payload = extract_input_value(inputs, 'payload', '')
+        instructions = extract_input_value(inputs, 'instructions')
+        thread_id = extract_input_value(inputs, 'threadId')
+
+        if not payload:
+            error_msg = "Missing required input: payload"
+            await call_webhook_with_error_async(job_id, error_msg, 400)
+            return {"error": error_msg, "code": 400}
+
+        resp, explanation, new_thread_id = await run_cancellable(base_agent_async({
+            "id": job_id,
+            "payload": payload,
+            "instructions": instructions,
+            "threadId": thread_id
+        }, cancel_token), cancel_token)
+        cancel_token.check()
+
+        await call_webhook_with_success_async(job_id, {
+            "status": "completed",
+            "data": {
+                "output": resp
+            }
+        })
+
+        await asyncio.to_thread(set_job_status, job_id, "completed", {
+            "output": resp,
+            "explanation": explanation,
+            "threadId": new_thread_id
+        }, PROTECTED_STATUSES)
+
+        return {
+            "result": resp,
+            "explanation": explanation,
+            "threadId": new_thread_id
+        }
+
+    except JobCancelledError:
+        return aborted_result(job_id)
+
+    except ThreadBusyError as e:
+        await asyncio.to_thread(set_job_status, job_id, "rejected", {"error": str(e)}, PROTECTED_STATUSES)
+        return busy_error(e)
+
+    except ThreadUnavailableError as e:
+        await asyncio.to_thread(set_job_status, job_id, "error", {"error": str(e)}, PROTECTED_STATUSES)
+        return unavailable_error(e)
+
+    except Exception as e:
+        logger.error(f"Execution error for job {job_id}: {str(e)}")
+        await call_webhook_with_error_async(job_id, str(e), 500)
+        await asyncio.to_thread(set_job_status, job_id, "error", {"error": str(e)}, PROTECTED_STATUSES)
+        return {"error": str(e), "code": 500}
+
+    finally:
+        release_job(cancel_token)
 
 
 def execute(request_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -119,48 +248,226 @@ def execute(request_data: Dict[str, Any]) -> Dict[str, Any]:
     webhook_url = request_data.get('webhookUrl')
 
     # Save job to database with webhook URL
-    save_job(job_id, {
-        "inputs": inputs,
-        "status": "pending",
-        "webhookUrl": webhook_url
-    })
+    create_job_context(job_id, inputs, webhook_url)
 
     # For synchronous execution (default for Lambda)
     result = execute_sync(job_id, inputs)
 
     return {
         "id": job_id,
-        "status": "completed" if "error" not in result else "error",
+        "status": job_status(result),
         **result
     }
 
 
-async def execute_background(request_data: Dict[str, Any]) -> Dict[str, Any]:
+def job_status(result: Dict[str, Any]) -> str:
+    """Map an execution result to the job status reported by /execute."""
+    if "error" not in result:
+        return "completed"
+    if result.get("code") == 409:
+        return "rejected"
+    return "aborted" if result.get("code") == 499 else "error"
+
+
+def capacity_error(retry_after: int) -> Dict[str, Any]:
+    """Build the 429 response for a saturated scheduler."""
+    return {
+        "error": f"Agent is at capacity, retry after {retry_after}s",
+        "code": 429,
+        "retryAfter": retry_after
+    }
+
+
+async def schedule_job(request_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Execute agent in background (for async endpoints).
+    Save a job and queue it on the job scheduler.
+
+    Capacity is checked before the job is saved, so saturation is rejected
+    without touching storage.
 
     Args:
-        request_data: Request data
+        request_data: Request data containing inputs and optional id
 
     Returns:
-        Response with job_id for status polling
+        {"id", "future"} for the queued job, or an error dictionary
     """
+    scheduler = get_job_scheduler()
+    try:
+        scheduler.ensure_capacity()
+    except SchedulerFullError as e:
+        return capacity_error(e.retry_after)
+
     job_id = request_data.get('id') or generate_job_id()
     inputs = request_data.get('inputs', [])
     webhook_url = request_data.get('webhookUrl')
 
     # Save job to database with webhook URL
-    save_job(job_id, {
-        "inputs": inputs,
-        "status": "pending",
-        "webhookUrl": webhook_url
-    })
+    await asyncio.to_thread(create_job_context, job_id, inputs, webhook_url)
+
+    # Registered before queueing so a queued job can be aborted too
+    cancel_token = register_job(job_id)
+    try:
+        future = scheduler.submit(job_id, lambda: execute_async(job_id, inputs, cancel_token))
+    except SchedulerFullError as e:
+        # Filled up while the job was being saved
+        release_job(cancel_token)
+        await asyncio.to_thread(set_job_status, job_id, "rejected", {"error": str(e)})
+        return capacity_error(e.retry_after)
 
-    # Start async execution
-    asyncio.create_task(execute_async(job_id, inputs))
+    return {"id": job_id, "future": future}
+
+
+async def execute_request_async(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async execute entry point: queue the job and wait for its result.
+
+    Args:
+        request_data: Request data containing inputs and optional id
+
+    Returns:
+        Response dictionary with job_id and final status
+    """
+    scheduled = await schedule_job(request_data)
+    if "error" in scheduled:
+        return scheduled
+
+    result = await scheduled["future"]
 
+    return {
+        "id": scheduled["id"],
+        "status": job_status(result),
+        **result
+    }
+
+
+async def execute_background(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queue the agent in the background (202 mode of /execute).
+
+    Args:
+        request_data: Request data
+
+    Returns:
+        Response with job_id for status polling
+    """
+    scheduled = await schedule_job(request_data)
+    if "error" in scheduled:
+        return scheduled
+
+    job_id = scheduled["id"]
     return {
         "id": job_id,
         "status": "pending",
-        "message": "Job started"
+        "message": "Job queued",
+        "queue": get_job_scheduler().job_info(job_id)
     }
+
+
+def admit_stream(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Take a scheduler worker slot for /execute/stream before the response starts.
+
+    Must be called on the event loop. The slot is returned by release_stream().
+
+    Args:
+        request_data: Request data containing inputs and optional id
+
+    Returns:
+        {"id"} of the admitted job, or the 429 error dictionary
+    """
+    job_id = request_data.get('id') or generate_job_id()
+    try:
+        get_job_scheduler().hold(job_id)
+    except SchedulerFullError as e:
+        return capacity_error(e.retry_after)
+    return {"id": job_id}
+
+
+def release_stream(job_id: str) -> None:
+    """Return the worker slot held by a stream (idempotent)."""
+    get_job_scheduler().release(job_id)
+
+
+def execute_stream(request_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Execute the agent and stream the answer as Server-Sent Events.
+
+    Events: "job" (job id), "delta" (raw text), "html" (rendered fragment),
+    "explanation", "threadId", "done" (final output), "aborted" (after /abort
+    closed the upstream stream) or "error".
+
+    Args:
+        request_data: Request data containing inputs and optional id
+
+    Yields:
+        SSE-formatted messages
+    """
+    job_id = request_data.get('id') or generate_job_id()
+    inputs = request_data.get('inputs', [])
+    webhook_url = request_data.get('webhookUrl')
+
+    # Save job to database with webhook URL
+    create_job_context(job_id, inputs, webhook_url)
+
+    yield format_sse("job", {"id": job_id, "status": "inprogress"})
+
+    payload = extract_input_value(inputs, 'payload', '')
+    if not payload:
+        error_msg = "Missing required input: payload"
+        call_webhook_with_error(job_id, error_msg, 400)
+        set_job_status(job_id, "error", {"error": error_msg})
+        yield format_sse("error", {"error": error_msg, "code": 400})
+        return
+
+    cancel_token = register_job(job_id)
+    try:
+        # explanation/threadId values, collected for the final job record
+        outputs: Dict[str, Any] = {}
+
+        for event, data in llm_stream(
+            payload=payload,
+            instructions=extract_input_value(inputs, 'instructions'),
+            thread_id=extract_input_value(inputs, 'threadId'),
+            cancel_token=cancel_token
+        ):
+            if event in ("explanation", "threadId"):
+                outputs[event] = data["output"]["data"]
+                call_webhook_with_success(job_id, {"status": "inprogress", "data": data})
+
+            elif event == "done":
+                call_webhook_with_success(job_id, {
+                    "status": "completed",
+                    "data": {
+                        "output": data["output"]
+                    }
+                })
+                set_job_status(
+                    job_id, "completed", {"output": data["output"], **outputs},
+                    unless_status=PROTECTED_STATUSES
+                )
+
+            yield format_sse(event, data)
+
+    except JobCancelledError:
+        aborted = aborted_result(job_id)
+        yield format_sse("aborted", {"id": job_id, "status": "aborted", "reason": aborted["error"]})
+
+    except ThreadBusyError as e:
+        call_webhook_with_error(job_id, str(e), 409)
+        set_job_status(job_id, "rejected", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
+        yield format_sse("error", busy_error(e))
+
+    except ThreadUnavailableError as e:
+        call_webhook_with_error(job_id, str(e), 503)
+        set_job_status(job_id, "error", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
+        yield format_sse("error", unavailable_error(e))
+
+    except Exception as e:
+        logger.error(f"Streaming execution error for job {job_id}: {str(e)}")
+        call_webhook_with_error(job_id, str(e), 500)
+        set_job_status(job_id, "error", {"error": str(e)}, unless_status=PROTECTED_STATUSES)
+        yield format_sse("error", {"error": str(e), "code": 500})
+
+    finally:
+        release_job(cancel_token)
+        release_stream(job_id)
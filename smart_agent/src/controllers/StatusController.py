@@ -1,12 +1,14 @@
 """
 Status Controller for the Old Fashioned Agent.
 
-Returns the status and results of a job.
+Returns the status and results of a job, from its job context if it ran in
+this container.
 """
 
 from typing import Dict, Any, Optional
 
-from smart_agent.src.utils.temp_db import get_job
+from smart_agent.src.utils.job_context import get_job_state
+from smart_agent.src.utils.job_scheduler import get_job_scheduler
 from smart_agent.src.config.logger import Logger
 
 logger = Logger()
@@ -20,7 +22,9 @@ def get_status(job_id: str) -> Dict[str, Any]:
         job_id: The job identifier
 
     Returns:
-        Status dictionary with job state and results if available
+        Status dictionary with job state and results if available, the job's
+        queue position or run time while the scheduler holds it, and
+        scheduler metrics (queue depth, wait time, active workers)
     """
     if not job_id:
         return {
@@ -29,7 +33,7 @@ def get_status(job_id: str) -> Dict[str, Any]:
         }
 
     try:
-        job_data = get_job(job_id)
+        job_data = get_job_state(job_id)
 
         if job_data is None:
             return {
@@ -38,11 +42,15 @@ def get_status(job_id: str) -> Dict[str, Any]:
                 "message": f"Job {job_id} not found"
             }
 
+        scheduler = get_job_scheduler()
+
         return {
             "id": job_id,
             "status": job_data.get("status", "unknown"),
             "result": job_data.get("result"),
-            "created_at": job_data.get("created_at")
+            "created_at": job_data.get("created_at"),
+            "queue": scheduler.job_info(job_id),
+            "scheduler": scheduler.metrics()
         }
 
     except Exception as e:
@@ -1,17 +1,43 @@
 """
 FastAPI routes for the Old Fashioned Agent.
 
-Defines endpoints: /discover, /execute, /status, /abort, /logs
+Defines endpoints: /discover, /execute, /execute/stream, /status, /abort, /logs,
+/benchmark/lookup
+
+Handlers run on the event loop, so blocking controllers (boto3, file or HTTP
+I/O) are called through asyncio.to_thread and /execute awaits the async agent
+path; /status, /health and /discover stay responsive while model calls are in flight.
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
-from smart_agent.src.controllers.ExecuteController import execute
+from smart_agent.src.controllers.ExecuteController import (
+    execute_request_async,
+    execute_background,
+    execute_stream,
+    admit_stream,
+    release_stream,
+)
 from smart_agent.src.controllers.DiscoverController import discover
 from smart_agent.src.controllers.StatusController import get_status
 from smart_agent.src.controllers.AbortController import abort
+from smart_agent.src.controllers.BenchmarkController import lookup_benchmark
+from smart_agent.src.utils.thread_storage import get_thread_cache_stats, get_local_thread_stats
+from smart_agent.src.utils.temp_db import get_local_job_stats
+from smart_agent.src.utils.job_context import get_job_context_stats
+from smart_agent.src.utils.job_scheduler import get_job_scheduler
+from smart_agent.src.utils.webhook import get_webhook_stats
+from smart_agent.src.utils.response_cache import get_response_cache_stats
+from smart_agent.src.utils.semantic_cache import get_semantic_cache_stats
+from smart_agent.src.agent.benchmark_lookup import get_lookup_stats
+from smart_agent.src.agent.benchmark_tools import get_tool_stats
+from smart_agent.src.storage import check_storage_latency, get_breaker_stats
 
 router = APIRouter()
 
@@ -39,14 +65,17 @@ async def discover_endpoint():
     Discovery endpoint for A2A protocol.
     Returns the agent.json configuration.
     """
-    result = discover()
+    result = await asyncio.to_thread(discover)
     if "error" in result:
         raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
     return result
 
 
 @router.post("/execute")
-async def execute_endpoint(request: ExecuteRequest):
+async def execute_endpoint(
+    request: ExecuteRequest,
+    mode: str = Query("sync", regex="^(sync|async)$", description="sync waits for the answer; async returns 202 with the job id")
+):
     """
     Execute the agent with the provided inputs.
 
@@ -54,28 +83,75 @@ async def execute_endpoint(request: ExecuteRequest):
     - payload (required): The user's question or request
     - instructions (optional): Specific instructions for the query
     - threadId (optional): Thread ID for conversation continuity
+
+    With mode=async the job is queued and 202 Accepted is returned immediately;
+    poll /status or use the webhook for the result. When the worker pool and
+    queue are full the request is rejected with 429 and Retry-After.
     """
     # Convert Pydantic models to dicts
     inputs_list = [{"name": inp.name, "data": inp.data} for inp in request.inputs]
-
-    result = execute({
+    request_data = {
         "id": request.id,
         "inputs": inputs_list,
         "webhookUrl": request.webhookUrl
-    })
+    }
+
+    if mode == "async":
+        result = await execute_background(request_data)
+    else:
+        result = await execute_request_async(request_data)
 
     if "error" in result:
-        raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
+        headers = {"Retry-After": str(result["retryAfter"])} if "retryAfter" in result else None
+        raise HTTPException(status_code=result.get("code", 500), detail=result["error"], headers=headers)
+
+    if mode == "async":
+        return JSONResponse(status_code=202, content=result)
 
     return result
 
 
+@router.post("/execute/stream")
+async def execute_stream_endpoint(request: ExecuteRequest):
+    """
+    Execute the agent and stream the answer as Server-Sent Events.
+
+    Events: job, delta (raw text), html (rendered fragment), explanation,
+    threadId, done (final output) and error. Inputs match /execute.
+
+    The stream holds a job scheduler worker for its lifetime; when none is
+    free the request is rejected with 429 and Retry-After.
+    """
+    inputs_list = [{"name": inp.name, "data": inp.data} for inp in request.inputs]
+    request_data = {
+        "id": request.id,
+        "inputs": inputs_list,
+        "webhookUrl": request.webhookUrl
+    }
+
+    admitted = admit_stream(request_data)
+    if "error" in admitted:
+        raise HTTPException(
+            status_code=admitted["code"], detail=admitted["error"],
+            headers={"Retry-After": str(admitted["retryAfter"])}
+        )
+
+    request_data["id"] = admitted["id"]
+    return StreamingResponse(
+        execute_stream(request_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Frees the slot even if the client left before the stream started
+        background=BackgroundTask(release_stream, admitted["id"])
+    )
+
+
 @router.get("/status")
 async def status_endpoint(id: str = Query(..., description="Job ID")):
     """
     Get the status of a job.
     """
-    result = get_status(id)
+    result = await asyncio.to_thread(get_status, id)
     if "error" in result:
         raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
     return result
@@ -86,7 +162,7 @@ async def abort_endpoint(request: AbortRequest):
     """
     Abort a running job.
     """
-    result = abort(request.id)
+    result = await asyncio.to_thread(abort, request.id)
     if "error" in result:
         raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
     return result
@@ -98,7 +174,7 @@ async def logs_endpoint(id: str = Query(..., description="Job ID")):
     Get logs for a job.
     """
     # For now, logs are included in status response
-    result = get_status(id)
+    result = await asyncio.to_thread(get_status, id)
     if "error" in result:
         raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
     return {
@@ -108,9 +184,52 @@ async def logs_endpoint(id: str = Query(..., description="Job ID")):
     }
 
 
+@router.get("/benchmark/lookup")
+async def benchmark_lookup_endpoint(
+    metric: Optional[str] = Query(None, description="salary, bonus, ceo_salary_by_aum or aum_distribution"),
+    role: Optional[str] = Query(None, description="Role name or alias, e.g. CFO"),
+    region: Optional[str] = Query(None, description="Region key or name, e.g. uk"),
+    q: Optional[str] = Query(None, description="Single-fact question, e.g. 'CFO salary UK'")
+):
+    """
+    Benchmark figures from the structured dataset, without a model call.
+    """
+    result = await asyncio.to_thread(lookup_benchmark, metric, role, region, q)
+    if "error" in result:
+        raise HTTPException(status_code=result.get("code", 500), detail=result["error"])
+    return result
+
+
 @router.get("/health")
-async def health_endpoint():
+async def health_endpoint(deep: bool = Query(False, description="Measure storage round trips")):
     """
-    Health check endpoint.
+    Health check endpoint, with job scheduler metrics (streams included),
+    warm thread cache, job context, webhook queue and response cache counters, the occupancy, evictions and reconciliation counters of
+    the in-memory storage fallbacks and the state of each storage table's
+    circuit breaker. The status is "degraded" while a breaker is not closed.
+
+    With deep=1 each storage table is probed and its round-trip latency
+    reported; the status is "degraded" if a table is unreachable.
     """
-    return {"status": "healthy"}
+    breakers = get_breaker_stats()
+    result = {
+        "status": "healthy",
+        "scheduler": get_job_scheduler().metrics(),
+        "threadCache": get_thread_cache_stats(),
+        "jobContexts": get_job_context_stats(),
+        "webhooks": get_webhook_stats(),
+        "responseCache": get_response_cache_stats(),
+        "semanticCache": get_semantic_cache_stats(),
+        "benchmarkLookup": get_lookup_stats(),
+        "agentTools": get_tool_stats(),
+        "fallback": {"jobs": get_local_job_stats(), "threads": get_local_thread_stats()},
+        "breakers": breakers
+    }
+    if any(breaker["state"] != "closed" for breaker in breakers.values()):
+        result["status"] = "degraded"
+    if deep:
+        storage = await asyncio.to_thread(check_storage_latency, 1)
+        result["storage"] = storage
+        if not all(table["ok"] for table in storage.values()):
+            result["status"] = "degraded"
+    return result
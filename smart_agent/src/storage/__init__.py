@@ -0,0 +1,131 @@
+"""
+Pluggable storage for jobs and conversation threads.
+
+get_storage_backend() returns the backend selected by STORAGE_BACKEND:
+DynamoDBBackend (default) or SQLiteBackend. utils/temp_db.py and
+utils/thread_storage.py build their caches and in-memory fallbacks on it.
+
+get_table_breaker() returns the circuit breaker guarding calls to one table:
+"jobs" for jobs, "thread_turns" for threads and their leases,
+"response_cache" for shared cached responses. While a breaker is open those
+modules skip the backend and use their fallbacks at once.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.config.storage import (
+    DYNAMODB_ENDPOINT_URL,
+    RUNTIME_REGION,
+    STORAGE_BACKEND,
+    STORAGE_BREAKER_FAILURE_RATE,
+    STORAGE_BREAKER_MIN_CALLS,
+    STORAGE_BREAKER_OPEN_SECONDS,
+    STORAGE_BREAKER_SLOW_MS,
+    STORAGE_BREAKER_WINDOW,
+    STORAGE_LATENCY_WARN_MS,
+    STORAGE_REGION,
+)
+from smart_agent.src.storage.base import StorageBackend
+from smart_agent.src.utils.circuit_breaker import CircuitBreaker
+
+logger = Logger()
+
+# Lazy-created backend
+_backend: Optional[StorageBackend] = None
+
+# Lazy-created circuit breakers: table key -> breaker
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_storage_backend() -> StorageBackend:
+    """Get the configured storage backend (lazy initialization)."""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            from smart_agent.src.storage.sqlite import SQLiteBackend
+            _backend = SQLiteBackend()
+        else:
+            from smart_agent.src.storage.dynamodb import DynamoDBBackend
+            _backend = DynamoDBBackend()
+        logger.info(f"Storage backend: {_backend.name}")
+    return _backend
+
+
+def set_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """Replace the storage backend (None re-creates the configured one on next use) and reset the breakers."""
+    global _backend
+    _backend = backend
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def get_table_breaker(table: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker guarding calls to a table (lazy initialization).
+
+    Args:
+        table: "jobs", "thread_turns" or "response_cache"
+
+    Returns:
+        Breaker shared by all callers of that table
+    """
+    breaker = _breakers.get(table)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(table)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    table,
+                    window=STORAGE_BREAKER_WINDOW,
+                    min_calls=STORAGE_BREAKER_MIN_CALLS,
+                    failure_rate=STORAGE_BREAKER_FAILURE_RATE,
+                    slow_seconds=STORAGE_BREAKER_SLOW_MS / 1000,
+                    open_seconds=STORAGE_BREAKER_OPEN_SECONDS
+                )
+                _breakers[table] = breaker
+    return breaker
+
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    State and counters of every table's circuit breaker.
+
+    Returns:
+        Table key -> metrics dictionary for the health API
+    """
+    return {table: get_table_breaker(table).stats() for table in ("jobs", "thread_turns", "response_cache")}
+
+
+def check_storage_latency(samples: int = 3) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure every table and warn on slow or cross-region storage.
+
+    Args:
+        samples: Round trips per table
+
+    Returns:
+        Per-table results from the backend's measure_latency()
+    """
+    backend = get_storage_backend()
+    if backend.name == "dynamodb" and RUNTIME_REGION and RUNTIME_REGION != STORAGE_REGION and not DYNAMODB_ENDPOINT_URL:
+        logger.warning(
+            f"Storage region {STORAGE_REGION} differs from runtime region {RUNTIME_REGION}: "
+            f"every DynamoDB call crosses regions"
+        )
+
+    results = backend.measure_latency(samples)
+    for result in results.values():
+        location = result.get("region") or result.get("path")
+        if not result["ok"]:
+            logger.warning(f"Storage table {result['table']} ({location}) unreachable: {result['error']}")
+        elif result["latencyMs"] > STORAGE_LATENCY_WARN_MS:
+            logger.warning(
+                f"Storage table {result['table']} ({location}) answers in {result['latencyMs']} ms "
+                f"(> {STORAGE_LATENCY_WARN_MS:.0f} ms): check STORAGE_REGION"
+            )
+        else:
+            logger.info(f"Storage table {result['table']} ({location}): {result['latencyMs']} ms")
+    return results
@@ -0,0 +1,246 @@
+"""
+Storage backend interface for jobs and conversation threads.
+
+A backend persists four things:
+- jobs: the saved request data plus a status/result that update_job_status
+  overwrites, optionally conditional on the current status;
+- threads: a header (turn and message counts, running summary, version)
+  and append-only turns of encoded messages;
+- turn leases used by thread_lock.py;
+- shared response cache entries, each expiring after its own TTL.
+
+Backends raise on storage errors; the modules built on them (temp_db.py,
+thread_storage.py, thread_lock.py, response_cache.py) own caching and fall
+back to memory. The helpers below keep turn bookkeeping identical across
+backends.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class WriteConflictError(Exception):
+    """Raised when a conditional write still lost to concurrent writers after every retry."""
+
+
+def first_turn_to_load(header: Dict[str, Any], max_turns: Optional[int]) -> int:
+    """
+    First turn a load needs: after the summarised turns, and within the last `max_turns`.
+
+    Args:
+        header: Thread header with turn_count and summarized_turns
+        max_turns: Optional cap on the number of turns to load
+
+    Returns:
+        Turn number (turns are numbered from 1)
+    """
+    first_turn = int(header.get("summarized_turns", 0)) + 1
+    if max_turns is not None:
+        first_turn = max(first_turn, int(header.get("turn_count", 0)) - max_turns + 1)
+    return first_turn
+
+
+def thread_state_from_turns(header: Dict[str, Any], turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build a thread state from a header and the loaded turns.
+
+    Args:
+        header: Thread header (turn_count, message_count, summary, summarized_count, version)
+        turns: Loaded turns in order, each {"turn", "first_message", "messages"} with decoded messages
+
+    Returns:
+        Thread state dictionary (see thread_storage.empty_thread_state)
+    """
+    messages = [message for turn in turns for message in turn["messages"]]
+    offset = int(turns[0]["first_message"]) if turns else int(header.get("message_count", 0))
+    return {
+        "messages": messages,
+        "summary": header.get("summary", ""),
+        "summarized_count": max(int(header.get("summarized_count", 0)) - offset, 0),
+        "offset": offset,
+        "offset_turns": int(turns[0]["turn"]) - 1 if turns else int(header.get("turn_count", 0)),
+        "persisted_count": len(messages),
+        "version": int(header.get("version", 0))
+    }
+
+
+def merge_header(fields: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge the header fields of a save with a header another writer saved meanwhile.
+
+    Counts come from whichever header is further ahead, the summary from
+    whichever covers more messages.
+
+    Args:
+        fields: turn_count, message_count, summary, summarized_count and summarized_turns being saved
+        current: Header currently stored
+
+    Returns:
+        Merged header fields
+    """
+    merged = dict(fields)
+    if int(current.get("turn_count", 0)) > merged["turn_count"]:
+        merged["turn_count"] = int(current["turn_count"])
+        merged["message_count"] = int(current["message_count"])
+    if int(current.get("summarized_count", 0)) > merged["summarized_count"]:
+        merged["summary"] = current.get("summary", "")
+        merged["summarized_count"] = int(current["summarized_count"])
+        merged["summarized_turns"] = int(current.get("summarized_turns", 0))
+    return merged
+
+
+class StorageBackend(ABC):
+    """Persistence for jobs, threads, thread leases and cached responses."""
+
+    name = "base"
+
+    # Jobs
+
+    @abstractmethod
+    def save_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        """Store a new job's data, replacing any job with the same id."""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a job.
+
+        Returns:
+            {"data", "status", "result", "created_at", "updated_at"} or None if not found
+        """
+
+    @abstractmethod
+    def update_job_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        unless_status: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Set a job's status (and result), unless its current status is in `unless_status`.
+
+        Returns:
+            False if the update was skipped because of `unless_status`
+        """
+
+    @abstractmethod
+    def delete_job(self, job_id: str) -> None:
+        """Delete a job."""
+
+    # Threads
+
+    @abstractmethod
+    def get_thread_header(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a thread header.
+
+        Returns:
+            Header with turn_count, message_count, summary, summarized_count,
+            summarized_turns and version, or None if the thread has no turns
+        """
+
+    def get_thread_version(self, thread_id: str) -> Optional[int]:
+        """Current header version of a thread (None if it has no turns)."""
+        header = self.get_thread_header(thread_id)
+        return int(header.get("version", 0)) if header is not None else None
+
+    @abstractmethod
+    def load_turns(self, thread_id: str, first_turn: int) -> List[Dict[str, Any]]:
+        """
+        Read turns from `first_turn` to the last stored one, including turns
+        appended after the header was last updated.
+
+        Returns:
+            Turns in order, each {"turn", "first_message", "messages"} with decoded messages
+        """
+
+    def load_legacy_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a thread stored in a format this backend has since migrated from.
+
+        Returns:
+            {"messages", "summary", "summarized_count"} or None
+        """
+        return None
+
+    @abstractmethod
+    def append_turns(self, thread_id: str, turns: List[List[Dict[str, Any]]], first_message: int) -> Tuple[int, int]:
+        """
+        Append turns after the last stored turn.
+
+        Turns written concurrently by other savers are kept: the new turns go after them.
+
+        Args:
+            thread_id: UUID of the thread
+            turns: New turns (lists of messages) in order
+            first_message: Index of the first new message if the thread has no turns yet
+
+        Returns:
+            Tuple of (turn_count, message_count) of the thread after the append
+
+        Raises:
+            WriteConflictError: If concurrent writers kept taking the next turn index
+        """
+
+    @abstractmethod
+    def update_thread_header(self, thread_id: str, fields: Dict[str, Any], expected_version: int) -> Optional[int]:
+        """
+        Write the header fields of a save, conditional on the version it was loaded at.
+
+        If another writer saved in between, the headers are merged (see merge_header).
+
+        Args:
+            thread_id: UUID of the thread
+            fields: turn_count, message_count, summary, summarized_count and summarized_turns
+            expected_version: Header version the saved state was loaded at
+
+        Returns:
+            The new header version, or None if the header could not be updated
+        """
+
+    @abstractmethod
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete a thread's header and turns."""
+
+    # Turn leases
+
+    @abstractmethod
+    def acquire_thread_lease(self, thread_id: str, owner: str, lease_seconds: int) -> bool:
+        """
+        Take a thread's turn lease if it is free, expired or already held by `owner`.
+
+        Returns:
+            True if `owner` holds the lease
+        """
+
+    @abstractmethod
+    def release_thread_lease(self, thread_id: str, owner: str) -> None:
+        """Release a thread's turn lease if `owner` holds it."""
+
+    # Response cache
+
+    @abstractmethod
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a cached response.
+
+        Returns:
+            The entry saved by put_cached_response(), or None if missing or expired
+        """
+
+    @abstractmethod
+    def put_cached_response(self, cache_key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        """Store a response under `cache_key`, replacing any entry, until `ttl_seconds` from now."""
+
+    # Health
+
+    @abstractmethod
+    def measure_latency(self, samples: int = 3) -> Dict[str, Dict[str, Any]]:
+        """
+        Time primary-key reads per table.
+
+        Returns:
+            {table_key: {"table", "ok", "latencyMs", "firstMs"} or {"table", "ok", "error"}},
+            plus "region"/"endpoint" or "path" naming where the table lives
+        """
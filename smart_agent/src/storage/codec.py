@@ -0,0 +1,80 @@
+"""
+Versioned codec for stored message lists.
+
+Messages are stored as compact JSON compressed with zlib (default) or lzma
+into a binary value that starts with a two-byte format tag. Plain JSON
+strings written by earlier versions (or with THREAD_CODEC=json) still decode.
+"""
+
+import json
+import lzma
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Union
+
+from boto3.dynamodb.types import Binary
+
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+# Codec for newly written message attributes: "zlib", "lzma" or "json" (uncompressed string)
+THREAD_CODEC = os.environ.get("THREAD_CODEC", "zlib").lower()
+
+# Binary message attributes start with a format tag: codec letter + format version
+CODEC_TAGS = {"zlib": b"Z1", "lzma": b"X1"}
+ZLIB_LEVEL = 6
+# Raw LZMA2 stream: no container header, which matters for per-turn sized payloads
+LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+if THREAD_CODEC not in ("json", *CODEC_TAGS):
+    logger.warning(f"Unknown THREAD_CODEC '{THREAD_CODEC}', using zlib")
+    THREAD_CODEC = "zlib"
+
+
+def encode_messages(messages: List[Dict[str, Any]], codec: Optional[str] = None) -> Union[str, bytes]:
+    """
+    Encode a message list for storage.
+
+    Args:
+        messages: Messages to encode
+        codec: "zlib", "lzma" or "json"; defaults to THREAD_CODEC
+
+    Returns:
+        Tagged compressed bytes, or a JSON string for the "json" codec
+    """
+    codec = codec or THREAD_CODEC
+    payload = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+    if codec == "json":
+        return payload
+
+    data = payload.encode("utf-8")
+    if codec == "zlib":
+        return CODEC_TAGS["zlib"] + zlib.compress(data, ZLIB_LEVEL)
+    if codec == "lzma":
+        return CODEC_TAGS["lzma"] + lzma.compress(data, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    raise ValueError(f"Unknown thread codec: {codec}")
+
+
+def decode_messages(value: Any) -> List[Dict[str, Any]]:
+    """
+    Decode a stored message attribute written by any codec version.
+
+    Args:
+        value: JSON string (legacy or "json" codec), tagged bytes or boto3 Binary
+
+    Returns:
+        List of message dictionaries
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+
+    data = bytes(value.value if isinstance(value, Binary) else value)
+    tag, body = data[:2], data[2:]
+    if tag == CODEC_TAGS["zlib"]:
+        return json.loads(zlib.decompress(body).decode("utf-8"))
+    if tag == CODEC_TAGS["lzma"]:
+        return json.loads(lzma.decompress(body, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS).decode("utf-8"))
+    raise ValueError(f"Unknown thread codec tag: {tag!r}")
@@ -0,0 +1,403 @@
+"""
+DynamoDB storage backend.
+
+Jobs are one item each in the jobs table. Threads are stored append-only in
+the thread turns table (partition key thread_id, numeric sort key turn): one
+item per turn (a user message and the assistant answer) plus a small header
+item at turn 0 with the turn count, the running summary, the version and the
+turn lease. Saving a turn writes one conditional put and one header update,
+so the cost stays constant however long the thread grows, and no item
+approaches the 400 KB limit.
+
+Threads written by earlier versions as a single blob item in the legacy
+threads table are read transparently and migrated to turn items on their
+next save.
+
+Cached responses are one item each in the response cache table, keyed by
+cache_key. DynamoDB deletes expired items lazily, so reads also check the
+ttl attribute.
+"""
+
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.config.storage import JOB_TTL_DAYS, STORAGE_TABLES, THREAD_TTL_DAYS, TableConfig
+from smart_agent.src.storage.base import StorageBackend, WriteConflictError, merge_header
+from smart_agent.src.storage.codec import decode_messages, encode_messages
+from smart_agent.src.utils.aws_clients import get_resource
+from smart_agent.src.utils.circuit_breaker import untimed
+
+logger = Logger()
+
+# Sort key of the thread header item; turns are numbered from 1
+HEADER_TURN = 0
+
+# Attempts to append a turn, or update the header, when another writer got there first.
+# Retries and their backoff are contention, so circuit breakers do not time them.
+APPEND_ATTEMPTS = 10
+# Cap of the jittered exponential backoff between those attempts
+RETRY_BACKOFF_MAX_SECONDS = 1.0
+
+
+def _expires_at(days: int) -> int:
+    return int((datetime.utcnow() + timedelta(days=days)).timestamp())
+
+
+def _is_conditional_failure(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def _backoff(attempt: int) -> None:
+    """Sleep a random time up to an exponentially growing cap, so retrying writers spread out."""
+    time.sleep(random.uniform(0, min(0.02 * 2 ** attempt, RETRY_BACKOFF_MAX_SECONDS)))
+
+
+class DynamoDBBackend(StorageBackend):
+    """Jobs, thread turns and leases in DynamoDB tables."""
+
+    name = "dynamodb"
+
+    def __init__(self, tables: Optional[Dict[str, TableConfig]] = None):
+        """
+        Args:
+            tables: "jobs", "thread_turns", "response_cache" and "threads" table configs; defaults to STORAGE_TABLES
+        """
+        self.tables = tables or STORAGE_TABLES
+        self._resources: Dict[str, Any] = {}
+
+    def table(self, key: str) -> Any:
+        """Get the Table resource for a configured table (lazy initialization)."""
+        resource = self._resources.get(key)
+        if resource is None:
+            config = self.tables[key]
+            resource = get_resource("dynamodb", config.region, config.endpoint_url).Table(config.name)
+            self._resources[key] = resource
+        return resource
+
+    # Jobs
+
+    def save_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        self.table("jobs").put_item(Item={
+            "id": job_id,
+            "data": json.dumps(data),
+            "created_at": datetime.utcnow().isoformat(),
+            "ttl": _expires_at(JOB_TTL_DAYS)
+        })
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table("jobs").get_item(Key={"id": job_id}).get("Item")
+        if item is None:
+            return None
+        return {
+            "data": json.loads(item.get("data", "{}")),
+            "status": item.get("status"),
+            "result": json.loads(item["result"]) if item.get("result") else None,
+            "created_at": item.get("created_at"),
+            "updated_at": item.get("updated_at")
+        }
+
+    def update_job_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        unless_status: Optional[Sequence[str]] = None
+    ) -> bool:
+        update_expression = "SET #status = :status, updated_at = :updated_at"
+        expression_values = {
+            ":status": status,
+            ":updated_at": datetime.utcnow().isoformat()
+        }
+        expression_names = {"#status": "status"}
+
+        if result:
+            update_expression += ", #result = :result"
+            expression_values[":result"] = json.dumps(result)
+            expression_names["#result"] = "result"
+
+        conditions = {}
+        if unless_status:
+            placeholders = []
+            for index, protected in enumerate(unless_status):
+                expression_values[f":protected{index}"] = protected
+                placeholders.append(f":protected{index}")
+            conditions["ConditionExpression"] = (
+                f"attribute_not_exists(#status) OR NOT #status IN ({', '.join(placeholders)})"
+            )
+
+        try:
+            self.table("jobs").update_item(
+                Key={"id": job_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=expression_names,
+                ExpressionAttributeValues=expression_values,
+                **conditions
+            )
+            return True
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False
+            raise
+
+    def delete_job(self, job_id: str) -> None:
+        self.table("jobs").delete_item(Key={"id": job_id})
+
+    # Threads
+
+    def _get_header_item(self, thread_id: str) -> Dict[str, Any]:
+        return self.table("thread_turns").get_item(
+            Key={"thread_id": thread_id, "turn": HEADER_TURN},
+            ConsistentRead=True
+        ).get("Item", {})
+
+    def get_thread_header(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        header = self._get_header_item(thread_id)
+        # A header holding only a turn lease has no turns yet
+        if "turn_count" not in header:
+            return None
+        return {
+            "turn_count": int(header["turn_count"]),
+            "message_count": int(header.get("message_count", 0)),
+            "summary": header.get("summary", ""),
+            "summarized_count": int(header.get("summarized_count", 0)),
+            "summarized_turns": int(header.get("summarized_turns", 0)),
+            "version": int(header.get("version", 0))
+        }
+
+    def get_thread_version(self, thread_id: str) -> Optional[int]:
+        # Projection read: no summary transferred
+        header = self.table("thread_turns").get_item(
+            Key={"thread_id": thread_id, "turn": HEADER_TURN},
+            ProjectionExpression="#version",
+            ExpressionAttributeNames={"#version": "version"},
+            ConsistentRead=True
+        ).get("Item")
+        return int(header.get("version", 0)) if header is not None else None
+
+    def _query_turns(self, thread_id: str, first_turn: int) -> List[Dict[str, Any]]:
+        """Query turn items from first_turn to the end in order, following pagination."""
+        items: List[Dict[str, Any]] = []
+        query = {
+            "KeyConditionExpression": Key("thread_id").eq(thread_id) & Key("turn").gte(first_turn),
+            "ConsistentRead": True,
+        }
+        while True:
+            response = self.table("thread_turns").query(**query)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def load_turns(self, thread_id: str, first_turn: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "turn": int(item["turn"]),
+                "first_message": int(item["first_message"]),
+                "messages": decode_messages(item.get("messages"))
+            }
+            for item in self._query_turns(thread_id, max(first_turn, HEADER_TURN + 1))
+        ]
+
+    def load_legacy_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        item = self.table("threads").get_item(Key={"thread_id": thread_id}).get("Item")
+        if item is None:
+            return None
+        return {
+            "messages": decode_messages(item.get("messages")),
+            "summary": item.get("summary", ""),
+            "summarized_count": int(item.get("summarized_count", 0))
+        }
+
+    def append_turns(self, thread_id: str, turns: List[List[Dict[str, Any]]], first_message: int) -> Tuple[int, int]:
+        """
+        Append turns as items, each put conditional on its turn index being free.
+
+        If another writer took the index, the turns it wrote are read and the
+        append retried after them.
+        """
+        table = self.table("thread_turns")
+        header = self._get_header_item(thread_id)
+        turn_count = int(header.get("turn_count", 0))
+        first_message = int(header.get("message_count", first_message))
+        created_at = datetime.utcnow().isoformat()
+
+        if not turns:
+            # Nothing to append, but count turns stored past a lagging header
+            latest = self._query_turns(thread_id, turn_count + 1)
+            return (
+                turn_count + len(latest),
+                first_message + sum(len(decode_messages(item.get("messages"))) for item in latest)
+            )
+
+        for turn_messages in turns:
+            for attempt in range(APPEND_ATTEMPTS):
+                try:
+                    with untimed(attempt > 0):
+                        table.put_item(
+                            Item={
+                                "thread_id": thread_id,
+                                "turn": turn_count + 1,
+                                "first_message": first_message,
+                                "messages": encode_messages(turn_messages),
+                                "created_at": created_at,
+                                "ttl": _expires_at(THREAD_TTL_DAYS)
+                            },
+                            ConditionExpression="attribute_not_exists(turn)"
+                        )
+                    break
+                except ClientError as e:
+                    if not _is_conditional_failure(e):
+                        raise
+                    if attempt == APPEND_ATTEMPTS - 1:
+                        raise WriteConflictError(
+                            f"Thread {thread_id}: turn {turn_count + 1} still taken after {APPEND_ATTEMPTS} attempts"
+                        ) from e
+                    with untimed():
+                        _backoff(attempt)
+                        latest = self._query_turns(thread_id, turn_count + 1)
+                    logger.warning(
+                        f"Thread {thread_id}: turn {turn_count + 1} written concurrently, appending after it"
+                    )
+                    turn_count += len(latest)
+                    first_message += sum(len(decode_messages(item.get("messages"))) for item in latest)
+            turn_count += 1
+            first_message += len(turn_messages)
+
+        return turn_count, first_message
+
+    def update_thread_header(self, thread_id: str, fields: Dict[str, Any], expected_version: int) -> Optional[int]:
+        """
+        Conditional update of the header item; on a version conflict the
+        stored header is re-read, merged and the update retried.
+        """
+        for attempt in range(APPEND_ATTEMPTS):
+            try:
+                with untimed(attempt > 0):
+                    self.table("thread_turns").update_item(
+                        Key={"thread_id": thread_id, "turn": HEADER_TURN},
+                        UpdateExpression=(
+                            "SET turn_count = :turn_count, message_count = :message_count, summary = :summary, "
+                            "summarized_count = :summarized_count, summarized_turns = :summarized_turns, "
+                            "updated_at = :updated_at, #ttl = :ttl, #version = :version"
+                        ),
+                        ConditionExpression="attribute_not_exists(#version) OR #version = :expected",
+                        ExpressionAttributeNames={"#ttl": "ttl", "#version": "version"},
+                        ExpressionAttributeValues={
+                            **{f":{name}": value for name, value in fields.items()},
+                            ":updated_at": datetime.utcnow().isoformat(),
+                            ":ttl": _expires_at(THREAD_TTL_DAYS),
+                            ":expected": expected_version,
+                            ":version": expected_version + 1
+                        }
+                    )
+                return expected_version + 1
+            except ClientError as e:
+                if not _is_conditional_failure(e):
+                    raise
+
+            with untimed():
+                _backoff(attempt)
+                header = self._get_header_item(thread_id)
+            expected_version = int(header.get("version", 0))
+            logger.warning(f"Thread {thread_id}: header saved concurrently (now version {expected_version}), merging")
+            fields = merge_header(fields, header)
+
+        logger.warning(f"Thread {thread_id}: header left behind after {APPEND_ATTEMPTS} concurrent saves")
+        return None
+
+    def delete_thread(self, thread_id: str) -> None:
+        table = self.table("thread_turns")
+        items = self._query_turns(thread_id, HEADER_TURN)
+        with table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(Key={"thread_id": thread_id, "turn": item["turn"]})
+        self.table("threads").delete_item(Key={"thread_id": thread_id})
+
+    # Turn leases
+
+    def acquire_thread_lease(self, thread_id: str, owner: str, lease_seconds: int) -> bool:
+        now = int(time.time())
+        try:
+            self.table("thread_turns").update_item(
+                Key={"thread_id": thread_id, "turn": HEADER_TURN},
+                UpdateExpression="SET lease_owner = :owner, lease_until = :until",
+                ConditionExpression="attribute_not_exists(lease_until) OR lease_until < :now OR lease_owner = :owner",
+                ExpressionAttributeValues={
+                    ":owner": owner,
+                    ":until": now + lease_seconds,
+                    ":now": now
+                }
+            )
+            return True
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False
+            raise
+
+    def release_thread_lease(self, thread_id: str, owner: str) -> None:
+        try:
+            self.table("thread_turns").update_item(
+                Key={"thread_id": thread_id, "turn": HEADER_TURN},
+                UpdateExpression="REMOVE lease_owner, lease_until",
+                ConditionExpression="lease_owner = :owner",
+                ExpressionAttributeValues={":owner": owner}
+            )
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+
+    # Response cache
+
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        item = self.table("response_cache").get_item(Key={"cache_key": cache_key}).get("Item")
+        if item is None or int(item.get("ttl", 0)) < time.time():
+            return None
+        return json.loads(item["entry"])
+
+    def put_cached_response(self, cache_key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        self.table("response_cache").put_item(Item={
+            "cache_key": cache_key,
+            "entry": json.dumps(entry),
+            "created_at": datetime.utcnow().isoformat(),
+            "ttl": int(time.time()) + ttl_seconds
+        })
+
+    # Health
+
+    def measure_latency(self, samples: int = 3) -> Dict[str, Dict[str, Any]]:
+        """Time GetItem round trips for a key that never exists, per probed table."""
+        results = {}
+        for key, config in self.tables.items():
+            if config.probe_key is None:
+                continue
+
+            result: Dict[str, Any] = {"table": config.name, "region": config.region}
+            if config.endpoint_url:
+                result["endpoint"] = config.endpoint_url
+            try:
+                table = self.table(key)
+                timings = []
+                for _ in range(max(samples, 1)):
+                    started = time.perf_counter()
+                    table.get_item(Key=config.probe_key)
+                    timings.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                results[key] = {**result, "ok": False, "error": str(e)}
+                continue
+
+            steady = timings[1:] or timings
+            results[key] = {
+                **result,
+                "ok": True,
+                "latencyMs": round(statistics.median(steady), 1),
+                "firstMs": round(timings[0], 1)
+            }
+        return results
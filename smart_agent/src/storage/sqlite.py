@@ -0,0 +1,439 @@
+"""
+Embedded SQLite storage backend for ECS/self-hosted deployments and local load testing.
+
+The database runs in WAL mode, so readers never block the writer or each
+other. Each thread reads through its own connection. Writes are handed to one
+writer thread that group-commits them: every write queued while the previous
+transaction committed runs inside its own SAVEPOINT of one BEGIN IMMEDIATE
+transaction, so a burst of job updates costs one commit instead of one each,
+and a failing write rolls back alone. Callers wait for the commit, so their
+next read sees the write. Since writes are serialised, conditional writes
+(job status guards, thread header versions, turn leases) need no retries.
+
+Jobs, thread turns and cached responses carry an expires_at column (indexed,
+like the job primary key), and the writer purges expired rows every
+SQLITE_PURGE_SECONDS, as DynamoDB TTL does for the DynamoDB backend. Expired
+cached responses are never returned, even before they are purged.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.config.storage import JOB_TTL_DAYS, PROBE_ID, SQLITE_PATH, THREAD_TTL_DAYS
+from smart_agent.src.storage.base import StorageBackend, merge_header
+from smart_agent.src.storage.codec import decode_messages, encode_messages
+
+logger = Logger()
+
+# Wait for another process's write lock this long before failing
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Most writes committed in one transaction
+SQLITE_MAX_BATCH = int(os.environ.get("SQLITE_MAX_BATCH", "256"))
+
+# Interval between purges of expired jobs and threads
+SQLITE_PURGE_SECONDS = float(os.environ.get("SQLITE_PURGE_SECONDS", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    data TEXT,
+    status TEXT,
+    result TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    expires_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+
+CREATE TABLE IF NOT EXISTS thread_headers (
+    thread_id TEXT PRIMARY KEY,
+    turn_count INTEGER,
+    message_count INTEGER,
+    summary TEXT,
+    summarized_count INTEGER,
+    summarized_turns INTEGER,
+    version INTEGER,
+    lease_owner TEXT,
+    lease_until INTEGER,
+    updated_at TEXT,
+    expires_at INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS thread_headers_expires_at ON thread_headers (expires_at);
+
+CREATE TABLE IF NOT EXISTS thread_turns (
+    thread_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    first_message INTEGER NOT NULL,
+    message_count INTEGER NOT NULL,
+    messages BLOB,
+    created_at TEXT,
+    expires_at INTEGER,
+    PRIMARY KEY (thread_id, turn)
+);
+CREATE INDEX IF NOT EXISTS thread_turns_expires_at ON thread_turns (expires_at);
+
+CREATE TABLE IF NOT EXISTS response_cache (
+    cache_key TEXT PRIMARY KEY,
+    entry TEXT,
+    created_at TEXT,
+    expires_at INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at);
+"""
+
+
+def _expires_at(days: int) -> int:
+    return int((datetime.utcnow() + timedelta(days=days)).timestamp())
+
+
+class _Write:
+    """A queued write and, once committed, its outcome."""
+
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn: Callable[[sqlite3.Connection], Any]):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SQLiteBackend(StorageBackend):
+    """Jobs, thread turns and leases in an embedded SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Database file; defaults to SQLITE_PATH
+        """
+        self.path = path or SQLITE_PATH
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._writes: "queue.Queue[_Write]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly by the writer
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """Get this thread's read connection (lazy initialization)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def _write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        Run `fn(connection)` in the writer thread and wait for its commit.
+
+        Returns:
+            What `fn` returned
+
+        Raises:
+            Whatever `fn` or the commit raised
+        """
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="sqlite-writer", daemon=True)
+                    self._writer.start()
+
+        write = _Write(fn)
+        self._writes.put(write)
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _run_writer(self) -> None:
+        connection = self._connect()
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < SQLITE_MAX_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(connection, batch)
+
+            if time.monotonic() - self._last_purge >= SQLITE_PURGE_SECONDS:
+                self._last_purge = time.monotonic()
+                self._purge(connection)
+
+    def _commit(self, connection: sqlite3.Connection, batch: List[_Write]) -> None:
+        """Run a batch of writes in one transaction, each in its own savepoint."""
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                connection.execute("SAVEPOINT write")
+                try:
+                    write.result = write.fn(connection)
+                    connection.execute("RELEASE write")
+                except Exception as e:
+                    connection.execute("ROLLBACK TO write")
+                    connection.execute("RELEASE write")
+                    write.error = e
+            connection.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"SQLite commit of {len(batch)} writes failed: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for write in batch:
+                write.error = write.error or e
+        finally:
+            for write in batch:
+                write.done.set()
+
+    def _purge(self, connection: sqlite3.Connection) -> None:
+        now = int(time.time())
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            deleted = sum(
+                connection.execute(f"DELETE FROM {table} WHERE expires_at < ?", (now,)).rowcount
+                for table in ("jobs", "thread_headers", "thread_turns", "response_cache")
+            )
+            connection.execute("COMMIT")
+            if deleted:
+                logger.info(f"Purged {deleted} expired rows from {self.path}")
+        except Exception as e:
+            logger.warning(f"SQLite purge failed: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+
+    # Jobs
+
+    def save_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        row = (job_id, json.dumps(data), datetime.utcnow().isoformat(), _expires_at(JOB_TTL_DAYS))
+        self._write(lambda connection: connection.execute(
+            "INSERT OR REPLACE INTO jobs (id, data, created_at, expires_at) VALUES (?, ?, ?, ?)", row
+        ))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute(
+            "SELECT data, status, result, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "data": json.loads(row["data"] or "{}"),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def update_job_status(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        unless_status: Optional[Sequence[str]] = None
+    ) -> bool:
+        # Upsert, like a DynamoDB update_item; the guard only applies to an existing job
+        statement = (
+            "INSERT INTO jobs (id, status, result, updated_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET status = excluded.status, "
+            "result = COALESCE(excluded.result, jobs.result), updated_at = excluded.updated_at"
+        )
+        parameters: Tuple[Any, ...] = (
+            job_id, status, json.dumps(result) if result else None,
+            datetime.utcnow().isoformat(), _expires_at(JOB_TTL_DAYS)
+        )
+        if unless_status:
+            statement += f" WHERE jobs.status IS NULL OR jobs.status NOT IN ({', '.join('?' * len(unless_status))})"
+            parameters += tuple(unless_status)
+
+        return self._write(lambda connection: connection.execute(statement, parameters).rowcount > 0)
+
+    def delete_job(self, job_id: str) -> None:
+        self._write(lambda connection: connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,)))
+
+    # Threads
+
+    @staticmethod
+    def _header(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        # A header holding only a turn lease has no turns yet
+        if row is None or row["turn_count"] is None:
+            return None
+        return {
+            "turn_count": row["turn_count"],
+            "message_count": row["message_count"],
+            "summary": row["summary"] or "",
+            "summarized_count": row["summarized_count"],
+            "summarized_turns": row["summarized_turns"],
+            "version": row["version"] or 0
+        }
+
+    def get_thread_header(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        return self._header(self._reader().execute(
+            "SELECT * FROM thread_headers WHERE thread_id = ?", (thread_id,)
+        ).fetchone())
+
+    def load_turns(self, thread_id: str, first_turn: int) -> List[Dict[str, Any]]:
+        rows = self._reader().execute(
+            "SELECT turn, first_message, messages FROM thread_turns "
+            "WHERE thread_id = ? AND turn >= ? ORDER BY turn",
+            (thread_id, first_turn)
+        ).fetchall()
+        return [
+            {"turn": row["turn"], "first_message": row["first_message"], "messages": decode_messages(row["messages"])}
+            for row in rows
+        ]
+
+    def append_turns(self, thread_id: str, turns: List[List[Dict[str, Any]]], first_message: int) -> Tuple[int, int]:
+        encoded = [(encode_messages(messages), len(messages)) for messages in turns]
+        created_at = datetime.utcnow().isoformat()
+
+        def append(connection: sqlite3.Connection) -> Tuple[int, int]:
+            # Serialised with every other write: read the end of the thread, then append after it
+            last = connection.execute(
+                "SELECT turn, first_message + message_count AS message_count FROM thread_turns "
+                "WHERE thread_id = ? ORDER BY turn DESC LIMIT 1",
+                (thread_id,)
+            ).fetchone() or connection.execute(
+                "SELECT turn_count AS turn, message_count FROM thread_headers "
+                "WHERE thread_id = ? AND turn_count IS NOT NULL",
+                (thread_id,)
+            ).fetchone()
+            turn_count, message_count = (last["turn"], last["message_count"]) if last else (0, first_message)
+
+            for messages, count in encoded:
+                turn_count += 1
+                connection.execute(
+                    "INSERT INTO thread_turns (thread_id, turn, first_message, message_count, messages, "
+                    "created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, turn_count, message_count, count, messages, created_at, _expires_at(THREAD_TTL_DAYS))
+                )
+                message_count += count
+            return turn_count, message_count
+
+        return self._write(append)
+
+    def update_thread_header(self, thread_id: str, fields: Dict[str, Any], expected_version: int) -> Optional[int]:
+        def update(connection: sqlite3.Connection) -> int:
+            current = self._header(connection.execute(
+                "SELECT * FROM thread_headers WHERE thread_id = ?", (thread_id,)
+            ).fetchone())
+            merged = fields
+            version = expected_version + 1
+            if current is not None and current["version"] != expected_version:
+                logger.warning(
+                    f"Thread {thread_id}: header saved concurrently (now version {current['version']}), merging"
+                )
+                merged = merge_header(fields, current)
+                version = current["version"] + 1
+
+            connection.execute(
+                "INSERT INTO thread_headers (thread_id, turn_count, message_count, summary, summarized_count, "
+                "summarized_turns, version, updated_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET turn_count = excluded.turn_count, "
+                "message_count = excluded.message_count, summary = excluded.summary, "
+                "summarized_count = excluded.summarized_count, summarized_turns = excluded.summarized_turns, "
+                "version = excluded.version, updated_at = excluded.updated_at, expires_at = excluded.expires_at",
+                (
+                    thread_id, merged["turn_count"], merged["message_count"], merged["summary"],
+                    merged["summarized_count"], merged["summarized_turns"], version,
+                    datetime.utcnow().isoformat(), _expires_at(THREAD_TTL_DAYS)
+                )
+            )
+            return version
+
+        return self._write(update)
+
+    def delete_thread(self, thread_id: str) -> None:
+        def delete(connection: sqlite3.Connection) -> None:
+            connection.execute("DELETE FROM thread_turns WHERE thread_id = ?", (thread_id,))
+            connection.execute("DELETE FROM thread_headers WHERE thread_id = ?", (thread_id,))
+
+        self._write(delete)
+
+    # Turn leases
+
+    def acquire_thread_lease(self, thread_id: str, owner: str, lease_seconds: int) -> bool:
+        now = int(time.time())
+        return self._write(lambda connection: connection.execute(
+            "INSERT INTO thread_headers (thread_id, lease_owner, lease_until, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (thread_id) DO UPDATE SET lease_owner = excluded.lease_owner, "
+            "lease_until = excluded.lease_until "
+            "WHERE lease_until IS NULL OR lease_until < ? OR lease_owner = excluded.lease_owner",
+            (thread_id, owner, now + lease_seconds, _expires_at(THREAD_TTL_DAYS), now)
+        ).rowcount > 0)
+
+    def release_thread_lease(self, thread_id: str, owner: str) -> None:
+        self._write(lambda connection: connection.execute(
+            "UPDATE thread_headers SET lease_owner = NULL, lease_until = NULL "
+            "WHERE thread_id = ? AND lease_owner = ?",
+            (thread_id, owner)
+        ))
+
+    # Response cache
+
+    def get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute(
+            "SELECT entry FROM response_cache WHERE cache_key = ? AND expires_at >= ?", (cache_key, int(time.time()))
+        ).fetchone()
+        return json.loads(row["entry"]) if row is not None else None
+
+    def put_cached_response(self, cache_key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        row = (cache_key, json.dumps(entry), datetime.utcnow().isoformat(), int(time.time()) + ttl_seconds)
+        self._write(lambda connection: connection.execute(
+            "INSERT OR REPLACE INTO response_cache (cache_key, entry, created_at, expires_at) VALUES (?, ?, ?, ?)", row
+        ))
+
+    # Health
+
+    def measure_latency(self, samples: int = 3) -> Dict[str, Dict[str, Any]]:
+        """Time primary-key lookups of a missing row per table (reads only; writes queue behind commits)."""
+        probes = {
+            "jobs": "SELECT 1 FROM jobs WHERE id = ?",
+            "thread_turns": "SELECT 1 FROM thread_turns WHERE thread_id = ? AND turn = 0",
+            "response_cache": "SELECT 1 FROM response_cache WHERE cache_key = ?",
+        }
+        results = {}
+        for key, statement in probes.items():
+            result: Dict[str, Any] = {"table": key, "path": self.path}
+            try:
+                connection = self._reader()
+                timings = []
+                for _ in range(max(samples, 1)):
+                    started = time.perf_counter()
+                    connection.execute(statement, (PROBE_ID,)).fetchone()
+                    timings.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                results[key] = {**result, "ok": False, "error": str(e)}
+                continue
+
+            steady = timings[1:] or timings
+            results[key] = {
+                **result,
+                "ok": True,
+                "latencyMs": round(statistics.median(steady), 2),
+                "firstMs": round(timings[0], 2)
+            }
+        return results
@@ -0,0 +1,128 @@
+"""
+Shared AWS session and cached boto3 clients/resources.
+
+Creating a boto3 client or resource loads the service model, resolves the
+endpoint and credentials and opens a new connection pool, which costs tens of
+milliseconds and a TLS handshake on first use. All storage modules therefore
+take their clients and resources from here: one boto3 Session (creation is
+not thread-safe, so it is serialised) and one tuned botocore Config with
+short timeouts, a connection pool sized for the worker threads, TCP
+keep-alive and adaptive retries. prewarm_aws_clients() builds the DynamoDB
+client and resource during cold start (Lambda init) so the first request does
+not pay for it.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+# Timeouts in seconds; DynamoDB calls normally complete in single-digit milliseconds
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "2"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "5"))
+
+# Connections kept per client; storage calls run concurrently in asyncio.to_thread workers
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32"))
+
+# Total attempts per call, with client-side rate limiting on throttling
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
+
+CLIENT_CONFIG = Config(
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS}
+)
+
+# Lazy-created session and (service, region, endpoint) -> client/resource caches
+_session: Optional[boto3.session.Session] = None
+_clients: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+_resources: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+_lock = threading.Lock()
+
+
+def get_session() -> boto3.session.Session:
+    """Get the shared boto3 session (lazy initialization)."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+
+def get_client(service: str, region_name: Optional[str] = None, endpoint_url: Optional[str] = None) -> Any:
+    """
+    Get a cached low-level client.
+
+    Args:
+        service: AWS service name, e.g. "dynamodb" or "ssm"
+        region_name: Region, or None for the session default
+        endpoint_url: Endpoint override for local stand-ins
+
+    Returns:
+        botocore client shared by all callers
+    """
+    key = (service, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = session.client(
+                    service, region_name=region_name, endpoint_url=endpoint_url, config=CLIENT_CONFIG
+                )
+                _clients[key] = client
+    return client
+
+
+def get_resource(service: str, region_name: Optional[str] = None, endpoint_url: Optional[str] = None) -> Any:
+    """
+    Get a cached resource (e.g. for DynamoDB Table objects).
+
+    Args:
+        service: AWS service name, e.g. "dynamodb"
+        region_name: Region, or None for the session default
+        endpoint_url: Endpoint override for local stand-ins
+
+    Returns:
+        boto3 service resource shared by all callers
+    """
+    key = (service, region_name, endpoint_url)
+    resource = _resources.get(key)
+    if resource is None:
+        session = get_session()
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = session.resource(
+                    service, region_name=region_name, endpoint_url=endpoint_url, config=CLIENT_CONFIG
+                )
+                _resources[key] = resource
+    return resource
+
+
+def prewarm_aws_clients(region_name: Optional[str] = None, endpoint_url: Optional[str] = None) -> None:
+    """
+    Build the DynamoDB client and resource and resolve credentials ahead of the first request.
+
+    Args:
+        region_name: Storage region (None for the session default)
+        endpoint_url: Endpoint override for local stand-ins
+    """
+    try:
+        credentials = get_session().get_credentials()
+        get_client("dynamodb", region_name, endpoint_url)
+        get_resource("dynamodb", region_name, endpoint_url)
+        logger.info(
+            f"AWS clients pre-warmed for {region_name} (credentials {'found' if credentials else 'not found'})"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to pre-warm AWS clients: {e}")
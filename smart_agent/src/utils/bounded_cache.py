@@ -0,0 +1,192 @@
+"""
+Thread-safe in-process LRU cache bounded by entry count, byte size and TTL.
+
+Entries are weighed once on insertion with a caller-supplied size function.
+Inserting beyond either bound evicts least-recently-used entries; entries
+older than the TTL are dropped on access. Hit, miss, eviction and expiry
+counters plus current occupancy are available from stats().
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+class BoundedCache:
+    """
+    LRU cache with entry, byte and TTL bounds.
+
+    Args:
+        max_entries: Maximum number of entries (0 disables the cache)
+        max_bytes: Maximum total weight of all entries
+        ttl_seconds: Entry lifetime from insertion (None for no expiry)
+        sizeof: Function returning the weight of a value in bytes
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: Optional[float],
+        sizeof: Callable[[Any], int]
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a value and mark it most recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if self._expired(entry[2], time.monotonic()):
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Insert or replace a value, evicting LRU entries to stay within bounds.
+
+        Args:
+            key: Cache key
+            value: Value to store
+
+        Returns:
+            True if stored, False if the value alone exceeds the byte bound
+        """
+        if self.max_entries <= 0:
+            return False
+
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+        return True
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """
+        Remove and return a value (expired or not).
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The removed value, or None if missing
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._remove(key)
+            return entry[0]
+
+    def discard(self, key: Hashable, value: Any) -> bool:
+        """
+        Remove an entry only if it still holds `value` (compared by identity).
+
+        Args:
+            key: Cache key
+            value: Value previously returned for the key
+
+        Returns:
+            True if the entry was removed, False if it was replaced or is gone
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not value:
+                return False
+            self._remove(key)
+            return True
+
+    def purge_expired(self) -> int:
+        """
+        Drop every expired entry now rather than on its next access.
+
+        Returns:
+            Number of entries dropped
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, _, stored_at) in self._entries.items() if self._expired(stored_at, now)]
+            for key in expired:
+                self._remove(key)
+            self.counters["expirations"] += len(expired)
+        return len(expired)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Snapshot of the unexpired (key, value) pairs, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            snapshot = [
+                (key, value) for key, (value, _, stored_at) in self._entries.items()
+                if not self._expired(stored_at, now)
+            ]
+        return iter(snapshot)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry[2], time.monotonic())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Occupancy and counters.
+
+        Returns:
+            Dictionary with entries, bytes, limits and hit/miss/eviction/expiry counters
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl_seconds,
+                **self.counters
+            }
@@ -0,0 +1,182 @@
+"""
+Cooperative cancellation for running jobs.
+
+Each executing job registers a CancellationToken under its job id. /abort
+cancels the token; the agent checks it between stages (before the model call,
+before persisting the thread, before the final webhooks) and callbacks
+registered on the token interrupt in-flight work, e.g. cancelling the asyncio
+task awaiting the model or closing a response stream.
+
+The registry is per process: an abort only reaches jobs running in the same
+process that received it.
+"""
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+T = TypeVar("T")
+
+_tokens: Dict[str, "CancellationToken"] = {}
+_tokens_lock = threading.Lock()
+
+
+class JobCancelledError(Exception):
+    """Raised at a stage boundary when the job has been aborted."""
+
+    def __init__(self, job_id: Optional[str]):
+        super().__init__(f"Job {job_id} was aborted")
+        self.job_id = job_id
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag with interrupt callbacks.
+
+    Args:
+        job_id: The job identifier
+    """
+
+    def __init__(self, job_id: Optional[str]):
+        self.job_id = job_id
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """
+        Raise if the job has been cancelled.
+
+        Raises:
+            JobCancelledError: If cancel() has been called
+        """
+        if self._event.is_set():
+            raise JobCancelledError(self.job_id)
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback that interrupts in-flight work.
+
+        Runs immediately if the token is already cancelled.
+
+        Args:
+            callback: Zero-argument callable, invoked from the aborting thread
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def bind_task(self, task: asyncio.Task) -> None:
+        """
+        Cancel an asyncio task when the token is cancelled.
+
+        Args:
+            task: Task running on the current event loop
+        """
+        loop = asyncio.get_running_loop()
+        self.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+
+    def cancel(self) -> bool:
+        """
+        Cancel the job and run its interrupt callbacks.
+
+        Returns:
+            True if this call cancelled the token, False if it was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed for job {self.job_id}: {e}")
+        return True
+
+
+def register_job(job_id: str) -> CancellationToken:
+    """
+    Create and register the cancellation token of a job.
+
+    Args:
+        job_id: The job identifier
+
+    Returns:
+        The job's cancellation token
+    """
+    token = CancellationToken(job_id)
+    with _tokens_lock:
+        _tokens[job_id] = token
+    return token
+
+
+def release_job(token: CancellationToken) -> None:
+    """
+    Remove a finished job's token from the registry.
+
+    Args:
+        token: Token returned by register_job
+    """
+    with _tokens_lock:
+        if _tokens.get(token.job_id) is token:
+            del _tokens[token.job_id]
+
+
+def cancel_job(job_id: str) -> bool:
+    """
+    Cancel a job running in this process.
+
+    Args:
+        job_id: The job identifier
+
+    Returns:
+        True if a registered job was cancelled, False otherwise
+    """
+    with _tokens_lock:
+        token = _tokens.get(job_id)
+    if token is None:
+        return False
+    cancelled = token.cancel()
+    if cancelled:
+        logger.info(f"Cancellation requested for job {job_id}")
+    return cancelled
+
+
+async def run_cancellable(coroutine: Awaitable[T], token: CancellationToken) -> T:
+    """
+    Await a coroutine in its own task and cancel that task when the token is cancelled.
+
+    This interrupts in-flight awaits (e.g. the model request) instead of
+    waiting for the next stage boundary.
+
+    Args:
+        coroutine: Coroutine to run
+        token: The job's cancellation token
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        JobCancelledError: If the token was cancelled while the coroutine ran
+    """
+    task = asyncio.ensure_future(coroutine)
+    token.bind_task(task)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if token.cancelled:
+            raise JobCancelledError(token.job_id)
+        raise
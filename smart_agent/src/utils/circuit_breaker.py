@@ -0,0 +1,242 @@
+"""
+Thread-safe circuit breaker for calls to a dependency that can fail or stall.
+
+The breaker keeps the outcomes of the last `window` calls. A call fails if it
+raises or if it takes longer than `slow_seconds`. When at least `min_calls`
+are recorded and the share of failed calls reaches `failure_rate`, the
+breaker opens. While it is open, calls are refused at once with
+CircuitOpenError, so callers can use a fallback in microseconds instead of
+waiting out timeouts and retries. After `open_seconds` the breaker is
+half-open and lets one probe call through. If the probe succeeds the breaker
+closes; if it fails the breaker opens again. State, transition counters and
+the current failure rate are available from stats().
+
+Time a call spends inside untimed() (e.g. backing off before retrying a
+write that lost a race to a concurrent writer) is left out of its duration,
+and guard() can be told which exceptions report contention rather than an
+unhealthy dependency, so busy threads do not open the breaker.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Tuple, Type
+
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Per thread: seconds spent inside untimed() so far
+_untimed = threading.local()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call while the breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _untimed_seconds() -> float:
+    return getattr(_untimed, "seconds", 0.0)
+
+
+@contextmanager
+def untimed(active: bool = True) -> Iterator[None]:
+    """
+    Leave the enclosed time out of the duration that guard() records on this thread.
+
+    Args:
+        active: False to time the block as usual (for the first of several attempts, say)
+    """
+    if not active:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _untimed.seconds = _untimed_seconds() + time.monotonic() - start
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker driven by error rate and latency.
+
+    Args:
+        name: Name reported in errors and stats
+        window: Number of recent calls considered
+        min_calls: Calls needed in the window before the breaker can open
+        failure_rate: Share of failed or slow calls (0-1) that opens the breaker
+        slow_seconds: Duration above which a successful call counts as failed
+        open_seconds: Time the breaker stays open before a probe call is allowed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_seconds: float = 1.0,
+        open_seconds: float = 15.0
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+
+        # True for each failed or slow call, oldest first
+        self._outcomes: Deque[bool] = deque(maxlen=max(window, 1))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "slowCalls": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self) -> bool:
+        """
+        Admit a call, or refuse it while the breaker is open.
+
+        Returns:
+            True if the call is the half-open breaker's probe
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with its probe in flight
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+                self._probing = False
+
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(self.name, max(self._opened_at + self.open_seconds - now, 0.0))
+
+    def record(self, ok: bool, elapsed: float, probe: bool = False) -> None:
+        """
+        Record the outcome of an admitted call.
+
+        Args:
+            ok: False if the call raised
+            elapsed: Duration of the call in seconds
+            probe: True if before_call() admitted the call as the probe
+        """
+        slow = ok and elapsed > self.slow_seconds
+        failed = not ok or slow
+        with self._lock:
+            self.counters["calls"] += 1
+            if not ok:
+                self.counters["failures"] += 1
+            if slow:
+                self.counters["slowCalls"] += 1
+
+            if probe:
+                self._probing = False
+                if failed:
+                    self._open()
+                    logger.warning(f"Circuit {self.name} probe call failed, open for {self.open_seconds:.0f}s")
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit {self.name} closed")
+                return
+
+            if self._state != CLOSED:
+                # Admitted before the breaker opened; the window restarts when it closes
+                return
+
+            self._outcomes.append(failed)
+            rate = self._current_rate()
+            if len(self._outcomes) >= self.min_calls and rate >= self.failure_rate:
+                logger.warning(
+                    f"Circuit {self.name} opened for {self.open_seconds:.0f}s: {rate:.0%} of the last "
+                    f"{len(self._outcomes)} calls failed or were slow"
+                )
+                self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.counters["opened"] += 1
+
+    def _current_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @contextmanager
+    def guard(self, ignore: Tuple[Type[BaseException], ...] = ()) -> Iterator[None]:
+        """
+        Run the enclosed call through the breaker, recording its outcome and duration.
+
+        Time spent in untimed() is not part of the duration.
+
+        Args:
+            ignore: Exceptions that say nothing about the dependency's health; they
+                are re-raised but the call is recorded as a success
+
+        Raises:
+            CircuitOpenError: If the breaker refuses the call
+        """
+        probe = self.before_call()
+        start = time.monotonic()
+        untimed_start = _untimed_seconds()
+        ok = False
+        try:
+            yield
+            ok = True
+        except ignore:
+            ok = True
+            raise
+        finally:
+            elapsed = time.monotonic() - start - (_untimed_seconds() - untimed_start)
+            self.record(ok, max(elapsed, 0.0), probe)
+
+    def reset(self) -> None:
+        """Close the breaker and forget recorded outcomes."""
+        with self._lock:
+            self._state = CLOSED
+            self._probing = False
+            self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current state, failure rate over the window and counters.
+
+        Returns:
+            Metrics dictionary
+        """
+        state = self.state
+        with self._lock:
+            result: Dict[str, Any] = {
+                "state": state,
+                "failureRate": round(self._current_rate(), 3),
+                "windowCalls": len(self._outcomes),
+                **self.counters
+            }
+            if state != CLOSED:
+                result["retryInSeconds"] = round(max(self._opened_at + self.open_seconds - time.monotonic(), 0.0), 1)
+            return result
@@ -3,6 +3,7 @@ Helper utilities for the agent.
 """
 
 import os
+import json
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -63,6 +64,20 @@ def format_output(
     }
 
 
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format a Server-Sent Events message.
+
+    Args:
+        event: Event name
+        data: JSON-serialisable payload
+
+    Returns:
+        SSE message terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 def validate_required_inputs(
     inputs: List[Dict[str, Any]],
     required_fields: List[str]
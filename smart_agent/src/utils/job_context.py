@@ -0,0 +1,209 @@
+"""
+In-process state of the jobs submitted to this container.
+
+create_job_context() saves a new job (one storage write) and registers a
+JobContext carrying its webhook URL, status, result and timestamps for the
+rest of the pipeline. Webhook callbacks take the URL from the context
+instead of reading the job back from storage. /status serves jobs that ran
+here from their context. set_job_status() writes a status change through the
+context: repeating the current status is not written again, and an update
+that a protected status (e.g. "aborted") forbids is refused without a
+storage call.
+
+Jobs aborted by a request that reached another container are only seen here
+once the job's final conditional write is refused; the context is then
+refreshed from storage. Contexts are kept in an LRU bounded by entry count,
+bytes and JOB_CONTEXT_TTL_SECONDS; jobs without one are read from storage
+(JOB_CONTEXT_MAX_ENTRIES=0 disables contexts).
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.bounded_cache import BoundedCache
+from smart_agent.src.utils.temp_db import get_job, save_job, update_job_status
+
+logger = Logger()
+
+# Bounds of the context registry; jobs beyond them are read from storage
+JOB_CONTEXT_MAX_ENTRIES = int(os.environ.get("JOB_CONTEXT_MAX_ENTRIES", "1000"))
+JOB_CONTEXT_MAX_BYTES = int(os.environ.get("JOB_CONTEXT_MAX_BYTES", str(16 * 1024 * 1024)))
+JOB_CONTEXT_TTL_SECONDS = float(os.environ.get("JOB_CONTEXT_TTL_SECONDS", "3600"))
+
+
+class JobContext:
+    """
+    Status, result and webhook URL of a job submitted to this container.
+
+    Args:
+        job_id: The job identifier
+        webhook_url: URL receiving the job's callbacks, or None
+    """
+
+    def __init__(self, job_id: str, webhook_url: Optional[str]):
+        self.job_id = job_id
+        self.webhook_url = webhook_url
+        self.status = "pending"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.updated_at: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set_status(
+        self,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        unless_status: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Record a status change and write it to storage.
+
+        Args:
+            status: New status
+            result: Optional result data
+            unless_status: Optional statuses that must not be overwritten
+
+        Returns:
+            True if the job has the new status, False if the update was refused
+        """
+        with self._lock:
+            if unless_status and self.status in unless_status:
+                logger.info(f"Kept job {self.job_id} status {self.status}, not overwriting with {status}")
+                return False
+            if status == self.status and (result is None or result == self.result):
+                return True
+
+            if not update_job_status(self.job_id, status, result, unless_status):
+                # Changed by another container (e.g. aborted there): take the stored state
+                self._refresh()
+                return False
+
+            self.status = status
+            self.result = result or self.result
+            self.updated_at = datetime.utcnow().isoformat()
+
+        # Re-weigh the context now that it carries a result
+        _contexts.put(self.job_id, self)
+        return True
+
+    def _refresh(self) -> None:
+        job = get_job(self.job_id)
+        if job is not None:
+            self.status = job.get("status", self.status)
+            self.result = job.get("result", self.result)
+            self.updated_at = job.get("updated_at", self.updated_at)
+
+    def to_job(self) -> Dict[str, Any]:
+        """
+        Job record in the shape returned by temp_db.get_job().
+
+        Returns:
+            Dictionary with status, result, webhookUrl and timestamps
+        """
+        with self._lock:
+            return {
+                "status": self.status,
+                "result": self.result,
+                "webhookUrl": self.webhook_url,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at
+            }
+
+
+def _context_size(context: JobContext) -> int:
+    """Approximate in-memory weight of a job context."""
+    return len(json.dumps(context.result, default=str)) + 512
+
+
+_contexts = BoundedCache(JOB_CONTEXT_MAX_ENTRIES, JOB_CONTEXT_MAX_BYTES, JOB_CONTEXT_TTL_SECONDS, _context_size)
+
+
+def create_job_context(job_id: str, inputs: Any, webhook_url: Optional[str]) -> JobContext:
+    """
+    Save a new pending job and register its context.
+
+    Args:
+        job_id: The job identifier
+        inputs: Job inputs, saved with the job
+        webhook_url: URL receiving the job's callbacks, or None
+
+    Returns:
+        The registered context
+    """
+    context = JobContext(job_id, webhook_url)
+    save_job(job_id, {
+        "inputs": inputs,
+        "status": "pending",
+        "webhookUrl": webhook_url
+    })
+    _contexts.put(job_id, context)
+    return context
+
+
+def get_job_context(job_id: Optional[str]) -> Optional[JobContext]:
+    """
+    Get the context of a job submitted to this container.
+
+    Args:
+        job_id: The job identifier
+
+    Returns:
+        The context, or None if the job did not run here or its context was evicted
+    """
+    if not job_id:
+        return None
+    return _contexts.get(job_id)
+
+
+def set_job_status(
+    job_id: str,
+    status: str,
+    result: Optional[Dict[str, Any]] = None,
+    unless_status: Optional[Sequence[str]] = None
+) -> bool:
+    """
+    Update a job's status through its context, or directly in storage if it has none.
+
+    Args:
+        job_id: The job identifier
+        status: New status
+        result: Optional result data
+        unless_status: Optional statuses that must not be overwritten
+
+    Returns:
+        True if successful, False otherwise (including a refused conditional update)
+    """
+    context = get_job_context(job_id)
+    if context is None:
+        return update_job_status(job_id, status, result, unless_status)
+    return context.set_status(status, result, unless_status)
+
+
+def get_job_state(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a job from its context if it ran here, else from storage.
+
+    Args:
+        job_id: The job identifier
+
+    Returns:
+        Job data dictionary or None if not found
+    """
+    context = get_job_context(job_id)
+    if context is not None:
+        return context.to_job()
+    return get_job(job_id)
+
+
+def get_job_context_stats() -> Dict[str, Any]:
+    """
+    Context registry occupancy and hit/miss counters.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    return _contexts.stats()
@@ -0,0 +1,281 @@
+"""
+Bounded job scheduler for agent executions.
+
+A fixed pool of AGENT_EXECUTE_LIMIT workers consumes a queue of at most
+AGENT_QUEUE_LIMIT waiting jobs. Workers are asyncio tasks running the async
+agent path, so each one holds a single in-flight model call and no threads
+pile up under load. When every worker is busy and the queue is full,
+submission fails immediately with SchedulerFullError, which carries a
+Retry-After estimate derived from recent run times.
+
+Streaming requests cannot be queued behind a worker, since the client is
+already waiting on an open response. hold() takes a free worker slot for the
+stream's lifetime instead, and release() returns it; while a stream holds a
+slot, one fewer queued job runs at a time.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from smart_agent.src.config.logger import Logger
+
+logger = Logger()
+
+# Worker pool size (also loaded from SSM by lambda_handler.py)
+AGENT_EXECUTE_LIMIT = max(int(os.environ.get("AGENT_EXECUTE_LIMIT", "4")), 1)
+
+# Jobs allowed to wait for a free worker before new ones are rejected
+AGENT_QUEUE_LIMIT = max(int(os.environ.get("AGENT_QUEUE_LIMIT", str(AGENT_EXECUTE_LIMIT * 4))), 0)
+
+# Retry-After used until run times have been observed
+DEFAULT_RETRY_AFTER = 30
+
+# Number of recent jobs that wait/run statistics are computed over
+STATS_WINDOW = 100
+
+# Lazy-created scheduler
+_scheduler = None
+
+
+class SchedulerFullError(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Agent is at capacity, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Fixed-size asyncio worker pool in front of a bounded job queue.
+
+    Args:
+        workers: Number of jobs executed concurrently
+        queue_limit: Number of jobs allowed to wait for a worker
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+        # job_id -> enqueue/start time; read by the status API from worker threads
+        self._queued: Dict[str, float] = {}
+        self._running: Dict[str, float] = {}
+
+        self._wait_ms: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def _ensure_started(self) -> None:
+        """Start the workers on the running event loop (once per loop)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # Jobs queued on a previous loop cannot run any more
+        with self._lock:
+            self._queued.clear()
+            self._running.clear()
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slot_freed = asyncio.Event()
+        for index in range(self.workers):
+            loop.create_task(self._worker(index))
+        logger.info(f"Job scheduler started: {self.workers} workers, queue limit {self.queue_limit}")
+
+    def ensure_capacity(self) -> None:
+        """
+        Fail fast if a job submitted now would be rejected.
+
+        Raises:
+            SchedulerFullError: If every worker is busy and the queue is full
+        """
+        with self._lock:
+            full = len(self._queued) + len(self._running) >= self.workers + self.queue_limit
+        if full:
+            self.counters["rejected"] += 1
+            raise SchedulerFullError(self.retry_after())
+
+    def retry_after(self) -> int:
+        """
+        Estimate the seconds until a queue slot frees up.
+
+        Returns:
+            Whole seconds, at least 1
+        """
+        with self._lock:
+            run_ms = list(self._run_ms)
+            backlog = len(self._queued) + len(self._running)
+        if not run_ms:
+            return DEFAULT_RETRY_AFTER
+        average_run = sum(run_ms) / len(run_ms) / 1000
+        rounds = max(backlog - self.workers - self.queue_limit + 1, 1) / self.workers
+        return max(int(math.ceil(average_run * rounds)), 1)
+
+    def submit(self, job_id: str, job: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Queue a job for execution.
+
+        Args:
+            job_id: The job identifier
+            job: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            Future resolved with the job's result
+
+        Raises:
+            SchedulerFullError: If every worker is busy and the queue is full
+        """
+        self._ensure_started()
+        self.ensure_capacity()
+
+        future = self._loop.create_future()
+        with self._lock:
+            self._queued[job_id] = time.monotonic()
+        self._queue.put_nowait((job_id, job, future))
+        self.counters["submitted"] += 1
+        return future
+
+    def hold(self, job_id: str) -> None:
+        """
+        Take a worker slot for a job that runs outside the pool (a stream).
+
+        The job is reported as running until release() is called.
+
+        Args:
+            job_id: The job identifier
+
+        Raises:
+            SchedulerFullError: If no worker is free or jobs are already waiting
+        """
+        self._ensure_started()
+        with self._lock:
+            full = bool(self._queued) or len(self._running) >= self.workers
+            if not full:
+                self._running[job_id] = time.monotonic()
+        if full:
+            self.counters["rejected"] += 1
+            raise SchedulerFullError(self.retry_after())
+        self.counters["submitted"] += 1
+
+    def release(self, job_id: str) -> None:
+        """
+        Return the worker slot taken by hold(); safe to call more than once.
+
+        Args:
+            job_id: The job identifier
+        """
+        with self._lock:
+            started = self._running.pop(job_id, None)
+            if started is not None:
+                self._run_ms.append((time.monotonic() - started) * 1000)
+        if started is None:
+            return
+        self.counters["completed"] += 1
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._slot_freed.set)
+
+    async def _take_slot(self, job_id: str) -> float:
+        """Wait until fewer than `workers` jobs run, then mark the job running."""
+        while True:
+            started = time.monotonic()
+            with self._lock:
+                if len(self._running) < self.workers:
+                    self._wait_ms.append((started - self._queued.pop(job_id, started)) * 1000)
+                    self._running[job_id] = started
+                    return started
+            # Only streams holding slots get here; release() wakes the workers
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+    async def _worker(self, index: int) -> None:
+        """Run queued jobs one at a time."""
+        while True:
+            job_id, job, future = await self._queue.get()
+            started = await self._take_slot(job_id)
+
+            try:
+                result = await job()
+                self.counters["completed"] += 1
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Scheduled job {job_id} failed on worker {index}: {str(e)}")
+                self.counters["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+                    self._run_ms.append((time.monotonic() - started) * 1000)
+                self._slot_freed.set()
+                self._queue.task_done()
+
+    def job_info(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Describe a job's place in the scheduler.
+
+        Args:
+            job_id: The job identifier
+
+        Returns:
+            {"state": "queued", "position", "waitMs"} or {"state": "running", "runMs"},
+            or None if the scheduler is not holding the job
+        """
+        now = time.monotonic()
+        with self._lock:
+            if job_id in self._running:
+                return {"state": "running", "runMs": int((now - self._running[job_id]) * 1000)}
+            if job_id in self._queued:
+                return {
+                    "state": "queued",
+                    "position": list(self._queued).index(job_id) + 1,
+                    "waitMs": int((now - self._queued[job_id]) * 1000)
+                }
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of pool utilisation and recent queue wait times.
+
+        Returns:
+            Metrics dictionary for the status API
+        """
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            run_ms = list(self._run_ms)
+            queue_depth = len(self._queued)
+            active_workers = len(self._running)
+
+        return {
+            "workers": self.workers,
+            "activeWorkers": active_workers,
+            "queueDepth": queue_depth,
+            "queueLimit": self.queue_limit,
+            "avgWaitMs": int(sum(wait_ms) / len(wait_ms)) if wait_ms else 0,
+            "maxWaitMs": int(max(wait_ms)) if wait_ms else 0,
+            "avgRunMs": int(sum(run_ms) / len(run_ms)) if run_ms else 0,
+            **self.counters
+        }
+
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    Get or create the process-wide job scheduler (lazy initialization).
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(AGENT_EXECUTE_LIMIT, AGENT_QUEUE_LIMIT)
+    return _scheduler
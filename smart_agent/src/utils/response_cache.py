@@ -0,0 +1,256 @@
+"""
+Exact-match cache of first-turn answers.
+
+Most first-turn traffic repeats a few dozen benchmark questions. An answer
+is cached under a key derived from everything that shapes it: the normalised
+question within a scope (see response_cache_scope) made of the
+instructions, a hash of the skill content selected for the question, a hash
+of the prompt template and the model parameters. Editing a Skill/ file or
+AgentPrompt.yaml therefore changes the key of every affected question, so
+stale answers are never served; they simply age out. Near-duplicate
+questions of the same scope are matched by utils/semantic_cache.py.
+
+Entries carry the answer as markdown and HTML plus its explanation. They
+live in two tiers: a per-process LRU (bounded by entry count, bytes and
+RESPONSE_CACHE_TTL_SECONDS) and a table shared by every container through
+the storage backend, whose entries expire after the same TTL. Shared reads
+and writes go through the table's circuit breaker; storage errors count as
+misses and never fail a request. Follow-up turns (with a threadId) are never
+cached, since their answers depend on the conversation.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.storage import get_storage_backend, get_table_breaker
+from smart_agent.src.utils.bounded_cache import BoundedCache
+from smart_agent.src.utils.circuit_breaker import CircuitOpenError
+
+logger = Logger()
+
+# Cache first-turn answers at all, and share them between containers through storage
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SHARED = os.environ.get("RESPONSE_CACHE_SHARED", "true").lower() in ("1", "true", "yes")
+
+# Bounds of the per-process tier; the TTL also applies to the shared tier
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+
+# Trailing punctuation that does not change a question
+TRAILING_PUNCTUATION = " ?!.,;:"
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    """Approximate in-memory weight of a cached response."""
+    return len(entry.get("markdown", "")) + len(entry.get("html", "")) + len(entry.get("explanation", "")) + 256
+
+
+_local_cache = BoundedCache(
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS, _entry_size
+)
+
+_counters = {"lookups": 0, "localHits": 0, "sharedHits": 0, "stores": 0, "sharedErrors": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def normalize_question(text: Optional[str]) -> str:
+    """
+    Normalise a question for exact matching: case, whitespace and trailing punctuation.
+
+    Args:
+        text: Question or instructions as sent by the client
+
+    Returns:
+        Normalised text
+    """
+    return WHITESPACE_PATTERN.sub(" ", (text or "").casefold()).strip(TRAILING_PUNCTUATION)
+
+
+def content_hash(text: str) -> str:
+    """
+    Short stable hash of a text, used to fingerprint skill content and templates.
+
+    Args:
+        text: Content to hash
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def response_cache_scope(
+    instructions: Optional[str],
+    skill_fingerprint: str,
+    template_hash: str,
+    model_params: Dict[str, Any]
+) -> str:
+    """
+    Identify everything besides the question that shapes a first-turn answer.
+
+    Args:
+        instructions: Optional instructions sent with the question
+        skill_fingerprint: Hash of the skill content selected for the question
+        template_hash: Hash of the prompt template file
+        model_params: Model name, max_tokens and temperature of the call
+
+    Returns:
+        Hex digest shared by the questions whose answers are comparable
+    """
+    material = json.dumps([
+        normalize_question(instructions),
+        skill_fingerprint,
+        template_hash,
+        model_params
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def response_cache_key(payload: str, scope: str) -> str:
+    """
+    Build the cache key of a first-turn question.
+
+    Args:
+        payload: The user's question
+        scope: Scope from response_cache_scope()
+
+    Returns:
+        Hex digest identifying the answer
+    """
+    return hashlib.sha256(f"{scope}\n{normalize_question(payload)}".encode("utf-8")).hexdigest()
+
+
+def get_cached_response(cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Look up an answer, in this process first and then in the shared table.
+
+    Args:
+        cache_key: Key from response_cache_key(), or None when the request is not cacheable
+
+    Returns:
+        {"markdown", "html", "explanation"} or None on a miss
+    """
+    if cache_key is None or not RESPONSE_CACHE:
+        return None
+
+    _count("lookups")
+    entry, tier = _read_tiers(cache_key)
+    if tier is not None:
+        _count(tier)
+    return entry
+
+
+def read_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Read an answer from either tier without counting a lookup (for the semantic cache).
+
+    Args:
+        cache_key: Key of an answer stored by put_cached_response()
+
+    Returns:
+        {"markdown", "html", "explanation"} or None if it has expired or been evicted
+    """
+    return _read_tiers(cache_key)[0]
+
+
+def _read_tiers(cache_key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Read an answer, in this process first; returns it and the counter of the tier that hit."""
+    entry = _local_cache.get(cache_key)
+    if entry is not None:
+        return entry, "localHits"
+
+    if not RESPONSE_CACHE_SHARED:
+        return None, None
+
+    try:
+        with get_table_breaker("response_cache").guard():
+            entry = get_storage_backend().get_cached_response(cache_key)
+
+    except CircuitOpenError:
+        logger.debug("Response cache circuit open, skipping the shared tier")
+        return None, None
+
+    except ClientError as e:
+        _count("sharedErrors")
+        logger.warning(f"Storage error reading cached response: {e}")
+        return None, None
+
+    except Exception as e:
+        _count("sharedErrors")
+        logger.error(f"Unexpected error reading cached response: {e}")
+        return None, None
+
+    if entry is None:
+        return None, None
+    _local_cache.put(cache_key, entry)
+    return entry, "sharedHits"
+
+
+def put_cached_response(cache_key: Optional[str], markdown: str, html: str, explanation: str) -> None:
+    """
+    Cache an answer in both tiers.
+
+    Args:
+        cache_key: Key from response_cache_key(), or None when the request is not cacheable
+        markdown: Answer as generated by the model
+        html: Answer rendered to HTML
+        explanation: Explanation sent with the answer
+    """
+    if cache_key is None or not RESPONSE_CACHE or not markdown:
+        return
+
+    entry = {"markdown": markdown, "html": html, "explanation": explanation}
+    _local_cache.put(cache_key, entry)
+    _count("stores")
+
+    if not RESPONSE_CACHE_SHARED:
+        return
+
+    try:
+        with get_table_breaker("response_cache").guard():
+            get_storage_backend().put_cached_response(cache_key, entry, RESPONSE_CACHE_TTL_SECONDS)
+
+    except CircuitOpenError:
+        logger.debug("Response cache circuit open, answer cached in this process only")
+
+    except ClientError as e:
+        _count("sharedErrors")
+        logger.warning(f"Storage error caching response: {e}")
+
+    except Exception as e:
+        _count("sharedErrors")
+        logger.error(f"Unexpected error caching response: {e}")
+
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """
+    Hit rates of the response cache and occupancy of its per-process tier.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    hits = counters["localHits"] + counters["sharedHits"]
+    return {
+        "enabled": RESPONSE_CACHE,
+        "shared": RESPONSE_CACHE and RESPONSE_CACHE_SHARED,
+        **counters,
+        "hitRate": round(hits / counters["lookups"], 3) if counters["lookups"] else 0.0,
+        "local": _local_cache.stats()
+    }
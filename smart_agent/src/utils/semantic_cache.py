@@ -0,0 +1,567 @@
+"""
+Near-duplicate matching of first-turn questions for the response cache.
+
+Users phrase the same question many ways ("what does a UK FO CEO make",
+"UK family office chief executive pay"), so the exact-match cache in
+utils/response_cache.py misses most repeats. Every first-turn question the
+model answers is also added here, and a question that misses the exact cache
+is answered with the cached answer of its nearest neighbour when their cosine
+similarity reaches SEMANTIC_CACHE_THRESHOLD. Only questions of the same
+scope are compared (same selected skill content, prompt template, model
+parameters and instructions; see response_cache_scope) that also name the
+same roles, metrics, qualifiers and regions (see
+benchmark_lookup.question_entities), so a UK question never borrows a US
+answer and a CEO salary question never borrows a CFO salary, CEO bonus or
+CEO salary increase answer, however close their wording.
+
+Questions are embedded locally, without a network call: stopwords are
+dropped and common abbreviations spelled out ("FO" -> "family office"), then
+the text is cut into character 3- and 4-grams, hashed into 2**18 features
+in one vectorised pass over its code points, and weighted by TF-IDF over the
+indexed questions. The index keeps NumPy
+postings per (scope, feature) pair, so a lookup only touches questions of
+its own scope: it gathers the postings of the query's rarest n-grams (at
+most SEMANTIC_POSTINGS_BUDGET of them) and re-scores the questions of the
+best SEMANTIC_CANDIDATES postings exactly.
+Questions added since the last rebuild are scored directly; once
+SEMANTIC_REBUILD_PENDING of them have accumulated, a background thread
+refits the IDF and rebuilds the postings, keeping the newest
+SEMANTIC_CACHE_MAX_ENTRIES questions that have not expired.
+
+The index holds questions and cache keys only; answers are read from the
+response cache, and a neighbour whose answer has expired there is dropped.
+It is per process and starts empty on every cold start.
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from smart_agent.src.agent.benchmark_lookup import question_entities
+from smart_agent.src.agent.skill_index import normalize_terms
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.response_cache import RESPONSE_CACHE_TTL_SECONDS, read_cached_response
+
+logger = Logger()
+
+# Match near-duplicate questions at all, and the cosine similarity a match needs
+SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.65"))
+
+# Questions kept in the index
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "100000"))
+
+# Questions added before the postings are rebuilt, postings gathered per lookup, and the best-scoring
+# postings whose questions are re-scored exactly
+SEMANTIC_REBUILD_PENDING = 128
+SEMANTIC_POSTINGS_BUDGET = 5000
+SEMANTIC_CANDIDATES = 128
+
+NGRAM_SIZES = (3, 4)
+FEATURE_BITS = 18
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+
+# Multiplier of the n-gram hash (64-bit golden ratio); a feature is the hash's top FEATURE_BITS bits
+NGRAM_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+NGRAM_HASH_SHIFT = np.uint64(64 - FEATURE_BITS)
+
+# Abbreviations spelled out before embedding (keys are singular, as normalize_terms leaves them)
+ABBREVIATIONS = {
+    "fo": "family office",
+    "sfo": "single family office",
+    "mfo": "multi family office",
+    "ceo": "chief executive officer",
+    "cfo": "chief financial officer",
+    "cio": "chief investment officer",
+    "coo": "chief operating officer",
+    "cto": "chief technology officer",
+    "ltip": "long term incentive plan",
+    "aum": "assets under management",
+    "uk": "united kingdom",
+    "usa": "united states",
+    "uae": "united arab emirates",
+}
+
+SPACE_PATTERN = re.compile(r"\s+")
+
+
+def question_features(question: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed character n-gram counts of a question.
+
+    Args:
+        question: Question text
+
+    Returns:
+        Tuple of (sorted feature ids, their counts); both empty if the question has no n-grams
+    """
+    terms = []
+    for term in normalize_terms(question):
+        terms.append(ABBREVIATIONS.get(term, term))
+    text = f" {SPACE_PATTERN.sub(' ', ' '.join(terms))} "
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    hashes = []
+    for size in NGRAM_SIZES:
+        count = codes.size - size + 1
+        if count <= 0:
+            continue
+        # Multiply-xor hash over each window; seeding with the size keeps 3- and 4-grams apart
+        hashed = np.full(count, size, dtype=np.uint64)
+        for offset in range(size):
+            hashed = (hashed ^ codes[offset:offset + count]) * NGRAM_HASH_MULTIPLIER
+        hashes.append(hashed >> NGRAM_HASH_SHIFT)
+    if not hashes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    features, counts = np.unique(np.concatenate(hashes).astype(np.int64), return_counts=True)
+    return features, counts.astype(np.float32)
+
+
+def _gather(indptr: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions covered by the ranges [indptr[i], indptr[i + 1]) of `ids`, and the length of each range."""
+    starts = indptr[ids]
+    lengths = indptr[ids + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(offsets.size), lengths
+
+
+def _dot(
+    features: np.ndarray,
+    weights: np.ndarray,
+    rows: np.ndarray,
+    row_count: int,
+    query_features: np.ndarray,
+    query_weights: np.ndarray
+) -> np.ndarray:
+    """
+    Dot products of sparse rows with a query.
+
+    Args:
+        features: Feature id of each stored (row, feature) weight
+        weights: The weights
+        rows: Row of each weight, from 0 to row_count - 1
+        row_count: Number of rows
+        query_features: Sorted feature ids of the query
+        query_weights: Query weights in the same order
+
+    Returns:
+        One score per row
+    """
+    positions = np.minimum(np.searchsorted(query_features, features), query_features.size - 1)
+    matched = query_features[positions] == features
+    return np.bincount(rows, weights * query_weights[positions] * matched, minlength=row_count)
+
+
+@dataclass(eq=False)
+class _Question:
+    """An indexed question: its n-gram features and counts, scope id, cache key and insertion time."""
+    features: np.ndarray
+    counts: np.ndarray
+    scope: int
+    cache_key: str
+    added_at: float
+
+
+class _Postings:
+    """
+    Immutable TF-IDF postings of the questions indexed at the last rebuild.
+
+    Args:
+        questions: Questions to index
+    """
+
+    def __init__(self, questions: Sequence[_Question]):
+        self.questions = list(questions)
+        self.rows = {question.cache_key: row for row, question in enumerate(self.questions)}
+        self.alive = np.ones(len(self.questions), dtype=bool)
+        self.scopes = np.array([question.scope for question in self.questions], dtype=np.int32)
+        self.added_at = np.array([question.added_at for question in self.questions], dtype=np.float64)
+
+        lengths = np.array([question.features.size for question in self.questions], dtype=np.int64)
+        features = np.concatenate([question.features for question in self.questions] or [np.empty(0, np.int64)])
+        counts = np.concatenate([question.counts for question in self.questions] or [np.empty(0, np.float32)])
+        rows = np.repeat(np.arange(len(self.questions), dtype=np.int32), lengths)
+
+        document_frequency = np.bincount(features, minlength=FEATURE_MASK + 1)
+        self.idf = (np.log((1 + len(self.questions)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        weights = (1 + np.log(counts)) * self.idf[features]
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(self.questions)))
+        weights = (weights / np.maximum(norms, 1e-12)[rows]).astype(np.float32)
+
+        # Row-major copy for exact re-scoring
+        self.row_indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.row_features = features.astype(np.int32)
+        self.row_weights = weights
+
+        # Postings per (scope, feature) key for candidate generation
+        keys = (self.scopes[rows].astype(np.int64) << FEATURE_BITS) | features
+        order = np.argsort(keys, kind="stable")
+        self.keys, starts = np.unique(keys[order], return_index=True)
+        self.indptr = np.append(starts, keys.size)
+        self.posting_rows = rows[order]
+        self.posting_weights = weights[order]
+
+    def query_weights(self, features: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """L2-normalised TF-IDF weights of a query under this index's IDF."""
+        weights = (1 + np.log(counts)) * self.idf[features]
+        return weights / max(float(np.sqrt((weights * weights).sum())), 1e-12)
+
+    def search(
+        self,
+        features: np.ndarray,
+        weights: np.ndarray,
+        scope: int,
+        not_before: float
+    ) -> Tuple[int, float]:
+        """
+        Find the most similar live question of a scope.
+
+        Args:
+            features: Sorted feature ids of the query
+            weights: Query weights from query_weights()
+            scope: Scope id questions must have
+            not_before: Oldest insertion time still live
+
+        Returns:
+            Tuple of (row, similarity), row -1 if no question shares a feature
+        """
+        if not self.questions:
+            return -1, 0.0
+
+        # Posting lists of the query's features within its scope
+        keys = (np.int64(scope) << FEATURE_BITS) | features
+        slots = np.minimum(np.searchsorted(self.keys, keys), self.keys.size - 1)
+        present = self.keys[slots] == keys
+        if not present.any():
+            return -1, 0.0
+        slots, query_weights = slots[present], weights[present]
+
+        # Rarest n-grams first, within the postings budget
+        lengths = self.indptr[slots + 1] - self.indptr[slots]
+        order = np.argsort(lengths, kind="stable")
+        within = np.cumsum(lengths[order]) <= SEMANTIC_POSTINGS_BUDGET
+        within[0] = True
+        selected = order[within]
+
+        positions, selected_lengths = _gather(self.indptr, slots[selected])
+        rows = self.posting_rows[positions]
+        contributions = self.posting_weights[positions] * np.repeat(query_weights[selected], selected_lengths)
+
+        # Best partial scores; a row shares them across its postings, hence the unique()
+        partial = np.bincount(rows, contributions, minlength=len(self.questions))[rows]
+        if partial.size > SEMANTIC_CANDIDATES:
+            top = np.argpartition(partial, -SEMANTIC_CANDIDATES)[-SEMANTIC_CANDIDATES:]
+            rows = rows[top]
+        candidates = np.unique(rows)
+        candidates = candidates[self.alive[candidates] & (self.added_at[candidates] >= not_before)]
+        if not candidates.size:
+            return -1, 0.0
+
+        positions, candidate_lengths = _gather(self.row_indptr, candidates)
+        local_rows = np.repeat(np.arange(candidates.size), candidate_lengths)
+        scores = _dot(
+            self.row_features[positions], self.row_weights[positions], local_rows, candidates.size,
+            features, weights
+        )
+        best = int(np.argmax(scores))
+        return int(candidates[best]), float(scores[best])
+
+
+class SemanticIndex:
+    """
+    Per-process index of answered first-turn questions.
+
+    Args:
+        max_entries: Questions kept at each rebuild (newest first)
+        ttl_seconds: Question lifetime, matching the answers' in the response cache
+        rebuild_pending: Questions added before the postings are rebuilt
+        background: Rebuild in a background thread (False rebuilds in the caller)
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        rebuild_pending: int = SEMANTIC_REBUILD_PENDING,
+        background: bool = True
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.rebuild_pending = rebuild_pending
+        self.background = background
+
+        self._postings = _Postings([])
+        self._pending: List[_Question] = []
+        self._pending_arrays: Optional[Tuple[np.ndarray, ...]] = None
+        self._keys: Dict[str, _Question] = {}
+        self._scopes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self.counters = {"rebuilds": 0, "rebuildMs": 0.0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, question: str, scope: str, cache_key: str) -> None:
+        """
+        Index a question whose answer is cached under `cache_key`.
+
+        Args:
+            question: Question text
+            scope: Scope from response_cache_scope()
+            cache_key: Response cache key of the answer
+        """
+        features, counts = question_features(question)
+        if not features.size:
+            return
+
+        with self._lock:
+            if cache_key in self._keys:
+                return
+            entry = _Question(features, counts, self._scopes.setdefault(scope, len(self._scopes)), cache_key, time.time())
+            self._keys[cache_key] = entry
+            self._pending.append(entry)
+            self._pending_arrays = None
+            due = len(self._pending) >= self.rebuild_pending and not self._rebuilding
+            if due:
+                self._rebuilding = True
+
+        if due:
+            if self.background:
+                threading.Thread(target=self.rebuild, name="semantic-cache-rebuild", daemon=True).start()
+            else:
+                self.rebuild()
+
+    def discard(self, cache_key: str) -> None:
+        """Stop matching the question cached under `cache_key` (its answer is gone)."""
+        with self._lock:
+            entry = self._keys.pop(cache_key, None)
+            if entry is None:
+                return
+            if entry in self._pending:
+                self._pending.remove(entry)
+                self._pending_arrays = None
+                return
+            postings = self._postings
+        row = postings.rows.get(cache_key)
+        if row is not None and postings.questions[row] is entry:
+            postings.alive[row] = False
+
+    def search(self, question: str, scope: str) -> Tuple[Optional[str], float]:
+        """
+        Find the most similar indexed question of a scope.
+
+        Args:
+            question: Question text
+            scope: Scope from response_cache_scope()
+
+        Returns:
+            Tuple of (cache_key, similarity); cache_key is None if no question shares an n-gram
+        """
+        scope_id = self._scopes.get(scope)
+        if scope_id is None:
+            return None, 0.0
+        features, tf = question_features(question)
+        if not features.size:
+            return None, 0.0
+
+        not_before = time.time() - self.ttl_seconds
+
+        with self._lock:
+            postings = self._postings
+            pending = list(self._pending)
+            pending_arrays = self._pending_arrays
+
+        weights = postings.query_weights(features, tf)
+        row, best = postings.search(features, weights, scope_id, not_before)
+        match = postings.questions[row] if row >= 0 else None
+
+        if pending:
+            if pending_arrays is None:
+                pending_arrays = self._build_pending_arrays(pending)
+            pending_row, score = self._search_pending(pending_arrays, postings, features, weights, scope_id, not_before)
+            if pending_row >= 0 and score > best:
+                match, best = pending[pending_row], score
+
+        return (match.cache_key, best) if match is not None else (None, 0.0)
+
+    def _build_pending_arrays(self, pending: List[_Question]) -> Tuple[np.ndarray, ...]:
+        features = np.concatenate([entry.features for entry in pending])
+        counts = np.concatenate([entry.counts for entry in pending])
+        indptr = np.concatenate(([0], np.cumsum([entry.features.size for entry in pending])))
+        scopes = np.array([entry.scope for entry in pending], dtype=np.int32)
+        added_at = np.array([entry.added_at for entry in pending], dtype=np.float64)
+        arrays = (features, counts, indptr, scopes, added_at)
+        with self._lock:
+            if self._pending == pending:
+                self._pending_arrays = arrays
+        return arrays
+
+    @staticmethod
+    def _search_pending(
+        arrays: Tuple[np.ndarray, ...],
+        postings: _Postings,
+        features: np.ndarray,
+        weights: np.ndarray,
+        scope: int,
+        not_before: float
+    ) -> Tuple[int, float]:
+        """Score the live questions of a scope added since the last rebuild directly, under the current IDF."""
+        pending_features, counts, indptr, scopes, added_at = arrays
+        live = np.flatnonzero((scopes == scope) & (added_at >= not_before))
+        if not live.size:
+            return -1, 0.0
+
+        positions, lengths = _gather(indptr, live)
+        rows = np.repeat(np.arange(live.size), lengths)
+        live_features = pending_features[positions]
+        live_weights = (1 + np.log(counts[positions])) * postings.idf[live_features]
+        norms = np.sqrt(np.bincount(rows, live_weights * live_weights, minlength=live.size))
+        scores = _dot(live_features, live_weights, rows, live.size, features, weights) / np.maximum(norms, 1e-12)
+        best = int(np.argmax(scores))
+        return (int(live[best]), float(scores[best])) if scores[best] > 0 else (-1, 0.0)
+
+    def rebuild(self) -> None:
+        """Refit the IDF and rebuild the postings from the live questions, newest first up to max_entries."""
+        with self._rebuild_lock:
+            started = time.perf_counter()
+            not_before = time.time() - self.ttl_seconds
+            with self._lock:
+                postings = self._postings
+                pending = list(self._pending)
+
+            questions = [
+                question for row, question in enumerate(postings.questions)
+                if postings.alive[row] and question.added_at >= not_before
+            ]
+            questions.extend(question for question in pending if question.added_at >= not_before)
+            questions = questions[-self.max_entries:] if self.max_entries > 0 else []
+            rebuilt = _Postings(questions)
+
+            with self._lock:
+                live = {question.cache_key for question in questions}
+                # Questions discarded while rebuilding stay discarded
+                for row, question in enumerate(rebuilt.questions):
+                    if self._keys.get(question.cache_key) is not question:
+                        rebuilt.alive[row] = False
+                added = set(map(id, pending))
+                self._pending = [question for question in self._pending if id(question) not in added]
+                self._pending_arrays = None
+                live.update(question.cache_key for question in self._pending)
+                self._keys = {key: question for key, question in self._keys.items() if key in live}
+                self._postings = rebuilt
+                self._rebuilding = False
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.counters["rebuilds"] += 1
+            self.counters["rebuildMs"] = round(elapsed, 1)
+            logger.info(f"Semantic cache rebuilt: {len(questions)} questions in {elapsed:.0f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Indexed and pending questions plus rebuild counters."""
+        with self._lock:
+            return {
+                "entries": len(self._keys),
+                "pending": len(self._pending),
+                "scopes": len(self._scopes),
+                "maxEntries": self.max_entries,
+                **self.counters
+            }
+
+
+_index = SemanticIndex(SEMANTIC_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+_counters = {"lookups": 0, "hits": 0, "stale": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def entity_scope(question: str, scope: str) -> str:
+    """
+    Narrow a response cache scope to the roles, metrics, qualifiers and regions a question names.
+
+    Args:
+        question: The user's question
+        scope: Scope from response_cache_scope()
+
+    Returns:
+        Scope only questions naming the same entities share
+    """
+    entities = question_entities(question)
+    return "|".join((scope, *(",".join(values) for values in (
+        entities.roles, entities.metrics, entities.qualifiers, entities.regions
+    ))))
+
+
+def get_similar_response(question: str, scope: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Get the cached answer of the most similar earlier question of the same scope.
+
+    Args:
+        question: The user's question
+        scope: Scope from response_cache_scope(), or None when the request is not cacheable
+
+    Returns:
+        {"markdown", "html", "explanation"} or None if no question is similar enough
+    """
+    if scope is None or not SEMANTIC_CACHE:
+        return None
+
+    _count("lookups")
+    cache_key, similarity = _index.search(question, entity_scope(question, scope))
+    if cache_key is None or similarity < SEMANTIC_CACHE_THRESHOLD:
+        return None
+
+    entry = read_cached_response(cache_key)
+    if entry is None:
+        _count("stale")
+        _index.discard(cache_key)
+        return None
+
+    _count("hits")
+    logger.info(f"Near-duplicate question matched with similarity {similarity:.2f}")
+    return entry
+
+
+def add_similar_question(question: str, scope: Optional[str], cache_key: Optional[str]) -> None:
+    """
+    Index an answered question so that its rephrasings can reuse the answer.
+
+    Args:
+        question: The user's question
+        scope: Scope from response_cache_scope()
+        cache_key: Response cache key the answer was stored under
+    """
+    if scope is None or cache_key is None or not SEMANTIC_CACHE:
+        return
+    _index.add(question, entity_scope(question, scope), cache_key)
+
+
+def get_semantic_cache_stats() -> Dict[str, Any]:
+    """
+    Near-duplicate lookups, hits and index size.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "enabled": SEMANTIC_CACHE,
+        "threshold": SEMANTIC_CACHE_THRESHOLD,
+        **counters,
+        "hitRate": round(counters["hits"] / counters["lookups"], 3) if counters["lookups"] else 0.0,
+        "index": _index.stats()
+    }
@@ -1,40 +1,145 @@
 """
-Temporary database utilities using DynamoDB for job state storage.
+Temporary database utilities for job state storage, on the configured
+storage backend (see src/storage/).
+
+When the backend fails, job writes go to an in-memory fallback: an LRU
+bounded by entry count and bytes, whose entries expire after the jobs' own
+TTL (JOB_TTL_DAYS), so a long-lived task stays within its memory during a
+storage outage. Fallback entries are flushed back to the backend once it
+answers again: a job is flushed before it is next read, and after a
+successful write at most every FALLBACK_RECONCILE_SECONDS a batch of the
+oldest entries is flushed.
+
+Backend calls go through the jobs table's circuit breaker (see
+storage.get_table_breaker): while it is open they are not attempted and the
+fallback answers at once, instead of every call waiting out timeouts and
+retries during an outage.
 """
 
-import os
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import boto3
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Sequence
 from botocore.exceptions import ClientError
 
 from smart_agent.src.config.logger import Logger
+from smart_agent.src.config.storage import JOB_TTL_DAYS
+from smart_agent.src.storage import get_storage_backend, get_table_breaker
+from smart_agent.src.utils.bounded_cache import BoundedCache
+from smart_agent.src.utils.circuit_breaker import CircuitOpenError
 
 logger = Logger()
 
-# DynamoDB configuration
-DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "agent-jobs")
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+# Bounds of the in-memory fallback
+LOCAL_JOBS_MAX_ENTRIES = int(os.environ.get("LOCAL_JOBS_MAX_ENTRIES", "10000"))
+LOCAL_JOBS_MAX_BYTES = int(os.environ.get("LOCAL_JOBS_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Minimum interval between reconciliation passes, and fallback entries flushed per pass
+FALLBACK_RECONCILE_SECONDS = float(os.environ.get("FALLBACK_RECONCILE_SECONDS", "30"))
+FALLBACK_RECONCILE_BATCH = int(os.environ.get("FALLBACK_RECONCILE_BATCH", "100"))
+
+
+def _job_size(entry: Dict[str, Any]) -> int:
+    """Approximate in-memory weight of a fallback job entry."""
+    return len(json.dumps(entry, default=str)) + 256
+
 
-# In-memory fallback for local development
-_local_db: Dict[str, Dict[str, Any]] = {}
+# In-memory fallback for local development or when storage is unavailable: job_id ->
+# {"data" (None if only the status was written locally), "status", "result", "created_at", "updated_at",
+#  "unless_status"}
+_local_db = BoundedCache(LOCAL_JOBS_MAX_ENTRIES, LOCAL_JOBS_MAX_BYTES, JOB_TTL_DAYS * 86400, _job_size)
 
+_fallback_counters = {"fallbackWrites": 0, "reconciled": 0, "reconcileFailures": 0}
+_reconcile_lock = threading.Lock()
+_last_reconcile = 0.0
 
-def get_dynamodb_client():
-    """Get DynamoDB client."""
-    return boto3.resource('dynamodb', region_name=AWS_REGION)
 
+def _save_local_job(job_id: str, entry: Dict[str, Any]) -> None:
+    _fallback_counters["fallbackWrites"] += 1
+    if not _local_db.put(job_id, entry):
+        logger.warning(f"Job {job_id} too large for the local fallback, dropped")
+
+
+def _flush_local_job(backend, job_id: str) -> bool:
+    """
+    Write a job held in the fallback to the backend and drop it from the fallback.
+
+    Returns:
+        True if the job was flushed (or was not held), False if it was replaced meanwhile
+
+    Raises:
+        Storage errors from the backend; the entry is kept for a later attempt
+    """
+    with _reconcile_lock:
+        entry = _local_db.get(job_id)
+        if entry is None:
+            return True
+
+        if entry["data"] is not None:
+            backend.save_job(job_id, entry["data"])
+        if entry.get("status") is not None:
+            backend.update_job_status(job_id, entry["status"], entry.get("result"), entry.get("unless_status"))
+
+        if not _local_db.discard(job_id, entry):
+            return False
+        _fallback_counters["reconciled"] += 1
+        logger.info(f"Reconciled job {job_id} from local fallback to {backend.name}")
+        return True
+
+
+def reconcile_local_jobs(limit: int = FALLBACK_RECONCILE_BATCH) -> Dict[str, int]:
+    """
+    Flush the oldest fallback jobs to the backend, stopping at the first failure.
+
+    Args:
+        limit: Maximum number of jobs to flush
+
+    Returns:
+        {"flushed": count, "remaining": entries still held}
+    """
+    global _last_reconcile
+    _last_reconcile = time.monotonic()
+    _local_db.purge_expired()
+
+    flushed = 0
+    backend = get_storage_backend()
+    breaker = get_table_breaker("jobs")
+    for job_id, _ in list(_local_db.items())[:limit]:
+        try:
+            with breaker.guard():
+                if _flush_local_job(backend, job_id):
+                    flushed += 1
+        except CircuitOpenError:
+            break
+        except Exception as e:
+            _fallback_counters["reconcileFailures"] += 1
+            logger.warning(f"Reconciling local jobs stopped, storage still failing: {e}")
+            break
+    return {"flushed": flushed, "remaining": len(_local_db)}
+
+
+def _maybe_reconcile() -> None:
+    """After a successful backend write, flush fallback jobs if a pass is due."""
+    if len(_local_db) and time.monotonic() - _last_reconcile >= FALLBACK_RECONCILE_SECONDS:
+        reconcile_local_jobs()
+
+
+def get_local_job_stats() -> Dict[str, Any]:
+    """
+    Fallback occupancy, evictions and expirations (jobs lost before they could be flushed)
+    and reconciliation counters.
 
-def get_table():
-    """Get DynamoDB table resource."""
-    dynamodb = get_dynamodb_client()
-    return dynamodb.Table(DYNAMODB_TABLE)
+    Returns:
+        Metrics dictionary for the health API
+    """
+    return {**_local_db.stats(), **_fallback_counters}
 
 
 def save_job(job_id: str, data: Dict[str, Any]) -> bool:
     """
-    Save job data to DynamoDB.
+    Save job data.
 
     Args:
         job_id: The job identifier
@@ -44,40 +149,33 @@ def save_job(job_id: str, data: Dict[str, Any]) -> bool:
         True if successful, False otherwise
     """
     try:
-        table = get_table()
-
-        item = {
-            "id": job_id,
-            "data": json.dumps(data),
-            "created_at": datetime.utcnow().isoformat(),
-            "ttl": int((datetime.utcnow() + timedelta(days=7)).timestamp())
-        }
+        backend = get_storage_backend()
+        with get_table_breaker("jobs").guard():
+            backend.save_job(job_id, data)
+        logger.debug(f"Saved job {job_id} to {backend.name}")
+        _maybe_reconcile()
+        return True
 
-        table.put_item(Item=item)
-        logger.debug(f"Saved job {job_id} to DynamoDB")
+    except CircuitOpenError:
+        logger.debug(f"Jobs storage circuit open, saving job {job_id} locally")
+        _save_local_job(job_id, {"data": data, "created_at": datetime.utcnow().isoformat()})
         return True
 
     except ClientError as e:
-        logger.error(f"Failed to save job {job_id} to DynamoDB: {e}")
+        logger.error(f"Failed to save job {job_id} to storage: {e}")
         # Fall back to local storage
-        _local_db[job_id] = {
-            "data": data,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        _save_local_job(job_id, {"data": data, "created_at": datetime.utcnow().isoformat()})
         return True
 
     except Exception as e:
         logger.error(f"Unexpected error saving job {job_id}: {e}")
-        _local_db[job_id] = {
-            "data": data,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        _save_local_job(job_id, {"data": data, "created_at": datetime.utcnow().isoformat()})
         return True
 
 
 def get_job(job_id: str) -> Optional[Dict[str, Any]]:
     """
-    Get job data from DynamoDB.
+    Get job data.
 
     Args:
         job_id: The job identifier
@@ -86,83 +184,128 @@ def get_job(job_id: str) -> Optional[Dict[str, Any]]:
         Job data dictionary or None if not found
     """
     try:
-        table = get_table()
-        response = table.get_item(Key={"id": job_id})
+        backend = get_storage_backend()
+        with get_table_breaker("jobs").guard():
+            if job_id in _local_db:
+                _flush_local_job(backend, job_id)
+            record = backend.get_job(job_id)
 
-        if "Item" in response:
-            item = response["Item"]
-            return json.loads(item.get("data", "{}"))
+        if record is not None:
+            return merge_job_state(record["data"], record)
 
         return None
 
+    except CircuitOpenError:
+        logger.debug(f"Jobs storage circuit open, reading job {job_id} locally")
+        return _get_local_job(job_id)
+
     except ClientError as e:
-        logger.error(f"Failed to get job {job_id} from DynamoDB: {e}")
+        logger.error(f"Failed to get job {job_id} from storage: {e}")
         # Fall back to local storage
-        if job_id in _local_db:
-            return _local_db[job_id].get("data")
-        return None
+        return _get_local_job(job_id)
 
     except Exception as e:
         logger.error(f"Unexpected error getting job {job_id}: {e}")
-        if job_id in _local_db:
-            return _local_db[job_id].get("data")
+        return _get_local_job(job_id)
+
+
+def _get_local_job(job_id: str) -> Optional[Dict[str, Any]]:
+    entry = _local_db.get(job_id)
+    if entry is None:
         return None
+    return merge_job_state(entry["data"] or {}, entry)
 
 
-def update_job_status(job_id: str, status: str, result: Optional[Dict[str, Any]] = None) -> bool:
+def merge_job_state(data: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Update job status in DynamoDB.
+    Overlay the status fields written by update_job_status on the saved job data.
+
+    Args:
+        data: Job data as saved by save_job
+        state: Stored record with optional status, result, created_at and updated_at
+
+    Returns:
+        Job data with the latest status and result
+    """
+    merged = dict(data)
+    for key in ("status", "result", "created_at", "updated_at"):
+        if state.get(key) is not None:
+            merged[key] = state[key]
+    return merged
+
+
+def _update_local_job_status(
+    job_id: str,
+    status: str,
+    result: Optional[Dict[str, Any]],
+    unless_status: Optional[Sequence[str]]
+) -> bool:
+    # Jobs saved to storage before the outage get a status-only entry, applied to them on reconciliation
+    entry = _local_db.get(job_id) or {"data": None}
+    if unless_status and entry.get("status") in unless_status:
+        return False
+
+    _save_local_job(job_id, {
+        **entry,
+        "status": status,
+        "result": result or entry.get("result"),
+        "updated_at": datetime.utcnow().isoformat(),
+        "unless_status": list(unless_status) if unless_status else entry.get("unless_status")
+    })
+    return True
+
+
+def update_job_status(
+    job_id: str,
+    status: str,
+    result: Optional[Dict[str, Any]] = None,
+    unless_status: Optional[Sequence[str]] = None
+) -> bool:
+    """
+    Update job status.
 
     Args:
         job_id: The job identifier
         status: New status
         result: Optional result data
+        unless_status: Optional statuses that must not be overwritten (e.g. "aborted");
+            the update is a conditional write and is skipped if the job is in one
 
     Returns:
-        True if successful, False otherwise
+        True if successful, False otherwise (including a skipped conditional update)
     """
     try:
-        table = get_table()
-
-        update_expression = "SET #status = :status, updated_at = :updated_at"
-        expression_values = {
-            ":status": status,
-            ":updated_at": datetime.utcnow().isoformat()
-        }
-        expression_names = {"#status": "status"}
-
-        if result:
-            update_expression += ", #result = :result"
-            expression_values[":result"] = json.dumps(result)
-            expression_names["#result"] = "result"
-
-        table.update_item(
-            Key={"id": job_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_names,
-            ExpressionAttributeValues=expression_values
-        )
+        backend = get_storage_backend()
+        with get_table_breaker("jobs").guard():
+            if job_id in _local_db:
+                _flush_local_job(backend, job_id)
+            updated = backend.update_job_status(job_id, status, result, unless_status)
+
+        if not updated:
+            logger.info(f"Kept job {job_id} status, not overwriting with {status}")
+            return False
 
         logger.debug(f"Updated job {job_id} status to {status}")
+        _maybe_reconcile()
         return True
 
+    except CircuitOpenError:
+        logger.debug(f"Jobs storage circuit open, updating job {job_id} locally")
+        return _update_local_job_status(job_id, status, result, unless_status)
+
     except ClientError as e:
         logger.error(f"Failed to update job {job_id} status: {e}")
         # Fall back to local storage
-        if job_id in _local_db:
-            _local_db[job_id]["status"] = status
-            if result:
-                _local_db[job_id]["result"] = result
-        return True
+        return _update_local_job_status(job_id, status, result, unless_status)
 
     except Exception as e:
         logger.error(f"Unexpected error updating job {job_id}: {e}")
-        return False
+        return _update_local_job_status(job_id, status, result, unless_status)
 
 
 def delete_job(job_id: str) -> bool:
     """
-    Delete job from DynamoDB.
+    Delete job.
 
     Args:
         job_id: The job identifier
@@ -170,16 +313,19 @@ def delete_job(job_id: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    _local_db.pop(job_id)
     try:
-        table = get_table()
-        table.delete_item(Key={"id": job_id})
+        with get_table_breaker("jobs").guard():
+            get_storage_backend().delete_job(job_id)
         logger.debug(f"Deleted job {job_id}")
         return True
 
+    except CircuitOpenError:
+        logger.warning(f"Jobs storage circuit open, job {job_id} not deleted from storage")
+        return True
+
     except ClientError as e:
         logger.error(f"Failed to delete job {job_id}: {e}")
-        if job_id in _local_db:
-            del _local_db[job_id]
         return True
 
     except Exception as e:
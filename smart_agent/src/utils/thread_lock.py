@@ -0,0 +1,207 @@
+"""
+Per-thread turn leases: what happens when two turns hit one thread at once.
+
+Storage already merges concurrent turns (conditional turn puts plus a
+version-checked header update, see thread_storage.py), so no turn is lost
+whatever the policy. THREAD_CONCURRENCY decides whether a second turn may run
+while another is in flight on the same thread:
+
+- "queue" (default): wait for the running turn to finish, then load the thread
+  including its answer (up to THREAD_QUEUE_TIMEOUT seconds, then reject);
+- "reject": fail immediately with ThreadBusyError (409 with Retry-After);
+- "merge": run both; their turns are appended in completion order.
+
+The lease is a conditional update of lease_owner/lease_until on the thread
+header in the storage backend, so it holds across containers. It expires after
+THREAD_LEASE_SECONDS in case its holder dies without releasing it. While the
+thread table's circuit breaker is open, leases are taken in memory.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.cancellation import CancellationToken
+from smart_agent.src.storage import get_storage_backend, get_table_breaker
+from smart_agent.src.utils.circuit_breaker import CircuitOpenError
+
+logger = Logger()
+
+# "queue", "reject" or "merge"
+THREAD_CONCURRENCY = os.environ.get("THREAD_CONCURRENCY", "queue").lower()
+
+# Lease lifetime; longer than any turn, short enough to recover from a crashed holder
+THREAD_LEASE_SECONDS = int(os.environ.get("THREAD_LEASE_SECONDS", "120"))
+
+# Longest a queued turn waits for the lease before it is rejected
+THREAD_QUEUE_TIMEOUT = float(os.environ.get("THREAD_QUEUE_TIMEOUT", "60"))
+
+# Retry-After suggested to a rejected turn
+BUSY_RETRY_AFTER = 5
+
+# Polling backoff while queued
+POLL_INITIAL_SECONDS = 0.05
+POLL_MAX_SECONDS = 1.0
+
+if THREAD_CONCURRENCY not in ("queue", "reject", "merge"):
+    logger.warning(f"Unknown THREAD_CONCURRENCY '{THREAD_CONCURRENCY}', using queue")
+    THREAD_CONCURRENCY = "queue"
+
+# In-memory leases for local development or when storage is unavailable: thread_id -> (owner, until)
+_local_leases: Dict[str, Tuple[str, float]] = {}
+_local_leases_lock = threading.Lock()
+
+
+class ThreadBusyError(Exception):
+    """Raised when a turn cannot start because another turn holds the thread."""
+
+    def __init__(self, thread_id: str, retry_after: int = BUSY_RETRY_AFTER):
+        super().__init__(f"Thread {thread_id} is busy with another turn, retry after {retry_after}s")
+        self.thread_id = thread_id
+        self.retry_after = retry_after
+
+
+def _acquire_local(thread_id: str, owner: str) -> bool:
+    now = time.time()
+    with _local_leases_lock:
+        holder = _local_leases.get(thread_id)
+        if holder is not None and holder[0] != owner and holder[1] >= now:
+            return False
+        _local_leases[thread_id] = (owner, now + THREAD_LEASE_SECONDS)
+        return True
+
+
+def acquire_thread(thread_id: str, owner: str) -> bool:
+    """
+    Try once to take the lease of a thread.
+
+    Args:
+        thread_id: UUID of the conversation thread
+        owner: Unique identifier of the turn taking the lease
+
+    Returns:
+        True if the lease is held by `owner`, False if another turn holds it
+    """
+    try:
+        with get_table_breaker("thread_turns").guard():
+            return get_storage_backend().acquire_thread_lease(thread_id, owner, THREAD_LEASE_SECONDS)
+
+    except CircuitOpenError:
+        return _acquire_local(thread_id, owner)
+
+    except ClientError as e:
+        logger.warning(f"Storage error leasing thread {thread_id}: {e}")
+        return _acquire_local(thread_id, owner)
+
+    except Exception as e:
+        logger.error(f"Unexpected error leasing thread {thread_id}: {e}")
+        return _acquire_local(thread_id, owner)
+
+
+def release_thread(thread_id: str, owner: str) -> None:
+    """
+    Release a thread lease if `owner` still holds it.
+
+    Args:
+        thread_id: UUID of the conversation thread
+        owner: Identifier passed to acquire_thread()
+    """
+    with _local_leases_lock:
+        if _local_leases.get(thread_id, ("",))[0] == owner:
+            del _local_leases[thread_id]
+
+    try:
+        with get_table_breaker("thread_turns").guard():
+            get_storage_backend().release_thread_lease(thread_id, owner)
+    except CircuitOpenError:
+        pass
+    except ClientError as e:
+        logger.warning(f"Storage error releasing thread {thread_id}: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error releasing thread {thread_id}: {e}")
+
+
+def _needs_lease(thread_id: Optional[str]) -> bool:
+    # New threads get their id on save, so nothing else can be writing to them
+    return bool(thread_id) and THREAD_CONCURRENCY != "merge"
+
+
+@contextmanager
+def hold_thread(
+    thread_id: Optional[str],
+    cancel_token: Optional[CancellationToken] = None
+) -> Iterator[None]:
+    """
+    Hold a thread's lease for the duration of a turn, per THREAD_CONCURRENCY.
+
+    Args:
+        thread_id: UUID of the conversation thread (None for a new thread)
+        cancel_token: Optional token checked while queued
+
+    Raises:
+        ThreadBusyError: If the thread is busy and the policy rejects, or the queue wait timed out
+        JobCancelledError: If the job is aborted while queued
+    """
+    if not _needs_lease(thread_id):
+        yield
+        return
+
+    owner = str(uuid.uuid4())
+    deadline = time.monotonic() + (THREAD_QUEUE_TIMEOUT if THREAD_CONCURRENCY == "queue" else 0)
+    delay = POLL_INITIAL_SECONDS
+    while not acquire_thread(thread_id, owner):
+        if cancel_token is not None:
+            cancel_token.check()
+        if time.monotonic() + delay > deadline:
+            raise ThreadBusyError(thread_id)
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+
+    try:
+        yield
+    finally:
+        release_thread(thread_id, owner)
+
+
+@asynccontextmanager
+async def hold_thread_async(
+    thread_id: Optional[str],
+    cancel_token: Optional[CancellationToken] = None
+) -> AsyncIterator[None]:
+    """
+    Async variant of hold_thread(); waits with asyncio.sleep and leases in worker threads.
+
+    Args:
+        thread_id: UUID of the conversation thread (None for a new thread)
+        cancel_token: Optional token checked while queued
+
+    Raises:
+        ThreadBusyError: If the thread is busy and the policy rejects, or the queue wait timed out
+        JobCancelledError: If the job is aborted while queued
+    """
+    if not _needs_lease(thread_id):
+        yield
+        return
+
+    owner = str(uuid.uuid4())
+    deadline = time.monotonic() + (THREAD_QUEUE_TIMEOUT if THREAD_CONCURRENCY == "queue" else 0)
+    delay = POLL_INITIAL_SECONDS
+    while not await asyncio.to_thread(acquire_thread, thread_id, owner):
+        if cancel_token is not None:
+            cancel_token.check()
+        if time.monotonic() + delay > deadline:
+            raise ThreadBusyError(thread_id)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(release_thread, thread_id, owner)
@@ -1,92 +1,523 @@
 """
-Thread storage utilities using DynamoDB for persistent conversation history.
+Thread storage utilities for persistent conversation history.
 
 Stores conversation threads by UUID, allowing multi-turn conversations
-to persist across Lambda cold starts and instances.
+to persist across Lambda cold starts and instances. Each thread also carries
+a running summary of its older turns (see agent/history.py).
+
+Threads are stored append-only through the configured storage backend (see
+src/storage/): one record per turn (a user message and the assistant answer)
+plus a small header with the turn count, the running summary and a version.
+Saving a turn appends its record and updates the header, so the cost stays
+constant however long the thread grows. Loads read the header and only the
+most recent turns that have not been folded into the summary.
+
+Threads written by earlier versions as a single DynamoDB blob item are read
+transparently and migrated to turns on their next save.
+
+Message lists are stored through a versioned codec (see storage/codec.py):
+compact JSON compressed with zlib (default) or lzma, behind a two-byte
+format tag.
+
+Decoded thread states are kept in a per-process LRU cache (bounded by entry
+count, bytes and TTL) so that a follow-up turn landing on the same warm
+container skips the turn read and decoding. The header carries a version
+that every save increments; a cached state is served after a read of just
+that version matches, or without any read inside the optional
+THREAD_CACHE_TRUST_SECONDS window. Saves write through to the cache.
+
+When the backend fails, saves go to an in-memory fallback bounded like the
+cache, whose entries expire after the threads' own TTL (THREAD_TTL_DAYS).
+Each entry remembers how many of its messages the backend already holds, so
+once the backend answers again only the rest are appended: a thread is
+flushed before it is next loaded or saved, and after a successful save at
+most every FALLBACK_RECONCILE_SECONDS a batch of the oldest entries is
+flushed. Each backend call goes through the thread table's circuit breaker
+(see storage.get_table_breaker) on its own, and writes that lost to
+concurrent saves (conflict retries, their backoff, exhausted retries) do
+not count against it. While it is open the fallback answers at once; a
+thread the fallback does not hold cannot be read then, and loading it
+raises ThreadUnavailableError rather than passing it off as a new thread.
 """
 
 import os
-import json
+import threading
+import time
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
-import boto3
+from typing import Dict, Any, Optional, List, Tuple
 from botocore.exceptions import ClientError
 
 from smart_agent.src.config.logger import Logger
+from smart_agent.src.config.storage import THREAD_TTL_DAYS
+from smart_agent.src.storage import get_storage_backend, get_table_breaker
+from smart_agent.src.storage.base import WriteConflictError, first_turn_to_load, thread_state_from_turns
+from smart_agent.src.utils.bounded_cache import BoundedCache
+from smart_agent.src.utils.circuit_breaker import CircuitOpenError
 
 logger = Logger()
 
-# DynamoDB configuration
-THREADS_TABLE = os.environ.get("THREADS_TABLE", "agent-threads")
-AWS_REGION = os.environ.get("AWS_REGION", "eu-west-2")
+# Warm-container cache of decoded thread states (THREAD_CACHE_MAX_ENTRIES=0 disables it)
+THREAD_CACHE_MAX_ENTRIES = int(os.environ.get("THREAD_CACHE_MAX_ENTRIES", "256"))
+THREAD_CACHE_MAX_BYTES = int(os.environ.get("THREAD_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+THREAD_CACHE_TTL_SECONDS = float(os.environ.get("THREAD_CACHE_TTL_SECONDS", "900"))
+# Serve cached states without re-reading the header version for this long after validation
+THREAD_CACHE_TRUST_SECONDS = float(os.environ.get("THREAD_CACHE_TRUST_SECONDS", "0"))
 
-# In-memory fallback for local development or when DynamoDB unavailable
-_local_threads: Dict[str, List[Dict[str, str]]] = {}
+# Bounds of the in-memory fallback
+LOCAL_THREADS_MAX_ENTRIES = int(os.environ.get("LOCAL_THREADS_MAX_ENTRIES", "1000"))
+LOCAL_THREADS_MAX_BYTES = int(os.environ.get("LOCAL_THREADS_MAX_BYTES", str(64 * 1024 * 1024)))
 
-# Lazy-loaded DynamoDB resource
-_dynamodb = None
+# Minimum interval between reconciliation passes, and fallback threads flushed per pass
+FALLBACK_RECONCILE_SECONDS = float(os.environ.get("FALLBACK_RECONCILE_SECONDS", "30"))
+FALLBACK_RECONCILE_BATCH = int(os.environ.get("FALLBACK_RECONCILE_BATCH", "100"))
 
 
-def get_dynamodb():
-    """Get DynamoDB resource (lazy initialization)."""
-    global _dynamodb
-    if _dynamodb is None:
-        _dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-    return _dynamodb
+class ThreadUnavailableError(Exception):
+    """Raised when a thread's history cannot be read: storage is failing and no local copy is held."""
 
+    def __init__(self, thread_id: str, retry_after: int = 0):
+        super().__init__(f"History of thread {thread_id} is unavailable, storage is not answering")
+        self.thread_id = thread_id
+        self.retry_after = retry_after
 
-def get_threads_table():
-    """Get DynamoDB threads table resource."""
-    dynamodb = get_dynamodb()
-    return dynamodb.Table(THREADS_TABLE)
 
+def empty_thread_state() -> Dict[str, Any]:
+    """
+    Return the state of a thread with no history.
+
+    Besides 'messages', 'summary' and 'summarized_count' (relative to
+    'messages'), the state records where its messages sit in the stored thread:
+    'offset' and 'offset_turns' count the earlier messages and turns that were
+    not loaded (all of them covered by the summary), 'persisted_count' is
+    how many of 'messages' are already stored, so a save only appends the rest,
+    and 'version' is the header version the state was loaded at.
+    """
+    return {
+        "messages": [],
+        "summary": "",
+        "summarized_count": 0,
+        "offset": 0,
+        "offset_turns": 0,
+        "persisted_count": 0,
+        "version": 0
+    }
+
+
+def split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group messages into turns, each starting at a user message.
 
-def get_thread(thread_id: str) -> List[Dict[str, str]]:
+    Args:
+        messages: Messages in conversation order
+
+    Returns:
+        List of turns (lists of messages)
+    """
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if not turns or message.get("role") == "user":
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _state_size(entry: Dict[str, Any]) -> int:
+    """Approximate in-memory weight of a cached thread state."""
+    state = entry["state"]
+    content_size = sum(len(str(message.get("content", ""))) + 64 for message in state["messages"])
+    return content_size + len(state["summary"]) + 256
+
+
+# In-memory fallback for local development or when storage is unavailable: thread_id ->
+# {"state": thread state, "stored_count": leading messages of the state already in the backend}
+_local_threads = BoundedCache(
+    LOCAL_THREADS_MAX_ENTRIES,
+    LOCAL_THREADS_MAX_BYTES,
+    THREAD_TTL_DAYS * 86400,
+    _state_size
+)
+
+_fallback_counters = {"fallbackWrites": 0, "reconciled": 0, "reconcileFailures": 0}
+_reconcile_lock = threading.Lock()
+_last_reconcile = 0.0
+
+_thread_cache = BoundedCache(
+    THREAD_CACHE_MAX_ENTRIES,
+    THREAD_CACHE_MAX_BYTES,
+    THREAD_CACHE_TTL_SECONDS,
+    _state_size
+)
+
+# Outcomes of version checks on cache hits
+_thread_cache_counters = {"validated": 0, "trusted": 0, "stale": 0}
+
+
+def _trim_state(state: Dict[str, Any], max_turns: Optional[int] = None) -> Dict[str, Any]:
     """
-    Retrieve conversation history from DynamoDB by thread UUID.
+    Drop the leading turns a fresh load would not return.
+
+    Whole turns covered by the summary are dropped, then turns beyond the last
+    `max_turns`, shifting the offsets so the state stays consistent.
+    """
+    messages = state["messages"]
+    turns = split_turns(messages)
+    drop = len(split_turns(messages[:state["summarized_count"]]))
+    if max_turns is not None:
+        drop = max(drop, len(turns) - max_turns)
+    if drop <= 0:
+        return {**state, "messages": list(messages)}
+
+    dropped = sum(len(turn) for turn in turns[:drop])
+    return {
+        **state,
+        "messages": messages[dropped:],
+        "summarized_count": max(state["summarized_count"] - dropped, 0),
+        "offset": state["offset"] + dropped,
+        "offset_turns": state["offset_turns"] + drop,
+        "persisted_count": max(state["persisted_count"] - dropped, 0)
+    }
+
+
+def _call_backend(method, *args):
+    """
+    Make one backend call through the thread table's circuit breaker.
+
+    Each call is timed on its own; losing a conditional write to concurrent
+    saves is contention, not a storage failure, so it is not counted.
+    """
+    with get_table_breaker("thread_turns").guard(ignore=(WriteConflictError,)):
+        return method(*args)
+
+
+def _cache_thread_state(thread_id: str, state: Dict[str, Any]) -> None:
+    """Store a fully persisted state in the thread cache."""
+    _thread_cache.put(thread_id, {"state": _trim_state(state), "validated_at": time.monotonic()})
+
+
+def _get_cached_thread_state(backend, thread_id: str, max_turns: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached state of a thread if it is still current.
+
+    Inside the trust window the entry is served as is; otherwise the header
+    version is read (no turn query, no decoding) and the entry is served only
+    if it matches.
+
+    Returns:
+        Thread state, or None on a miss or a stale entry
+    """
+    entry = _thread_cache.get(thread_id)
+    if entry is None:
+        return None
+
+    state = entry["state"]
+    if time.monotonic() - entry["validated_at"] <= THREAD_CACHE_TRUST_SECONDS:
+        _thread_cache_counters["trusted"] += 1
+        return _trim_state(state, max_turns)
+
+    if _call_backend(backend.get_thread_version, thread_id) != state["version"]:
+        _thread_cache_counters["stale"] += 1
+        _thread_cache.pop(thread_id)
+        logger.info(f"Thread {thread_id}: cached version {state['version']} is stale")
+        return None
+
+    _thread_cache_counters["validated"] += 1
+    entry["validated_at"] = time.monotonic()
+    return _trim_state(state, max_turns)
+
+
+def get_thread_cache_stats() -> Dict[str, Any]:
+    """
+    Thread cache occupancy, hit/miss counters and version check outcomes.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    return {**_thread_cache.stats(), **_thread_cache_counters}
+
+
+def _save_local_thread(thread_id: str, state: Dict[str, Any]) -> None:
+    """Keep a state in the fallback, remembering what the backend already holds."""
+    held = _local_threads.get(thread_id)
+    stored_count = held["stored_count"] if held is not None else state.get("persisted_count", 0)
+    _thread_cache.pop(thread_id)
+    _fallback_counters["fallbackWrites"] += 1
+    if not _local_threads.put(thread_id, {
+        "state": {**state, "persisted_count": len(state["messages"])},
+        "stored_count": min(stored_count, len(state["messages"]))
+    }):
+        logger.warning(f"Thread {thread_id} too large for the local fallback, dropped")
+
+
+def _get_local_thread(thread_id: str, error: Exception) -> Dict[str, Any]:
+    """
+    Answer a load from the fallback after the backend failed with `error`.
+
+    Raises:
+        ThreadUnavailableError: If the fallback does not hold the thread
+    """
+    held = _local_threads.get(thread_id)
+    if held is None:
+        retry_after = getattr(error, "retry_in", 0)
+        raise ThreadUnavailableError(thread_id, int(retry_after + 0.999)) from error
+    return held["state"]
+
+
+def _flush_local_thread(backend, thread_id: str) -> bool:
+    """
+    Append the turns of a fallback thread the backend does not hold yet, then drop it from the fallback.
+
+    Returns:
+        True if the thread was flushed (or was not held), False if it was replaced meanwhile
+
+    Raises:
+        Storage errors from the backend; the entry is kept for a later attempt
+    """
+    with _reconcile_lock:
+        held = _local_threads.get(thread_id)
+        if held is None:
+            return True
+
+        _store_thread_state(backend, thread_id, {**held["state"], "persisted_count": held["stored_count"]})
+        if not _local_threads.discard(thread_id, held):
+            return False
+        _fallback_counters["reconciled"] += 1
+        logger.info(f"Reconciled thread {thread_id} from local fallback to {backend.name}")
+        return True
+
+
+def reconcile_local_threads(limit: int = FALLBACK_RECONCILE_BATCH) -> Dict[str, int]:
+    """
+    Flush the oldest fallback threads to the backend, stopping at the first failure.
+
+    Args:
+        limit: Maximum number of threads to flush
+
+    Returns:
+        {"flushed": count, "remaining": entries still held}
+    """
+    global _last_reconcile
+    _last_reconcile = time.monotonic()
+    _local_threads.purge_expired()
+
+    flushed = 0
+    backend = get_storage_backend()
+    for thread_id, _ in list(_local_threads.items())[:limit]:
+        try:
+            if _flush_local_thread(backend, thread_id):
+                flushed += 1
+        except CircuitOpenError:
+            break
+        except Exception as e:
+            _fallback_counters["reconcileFailures"] += 1
+            logger.warning(f"Reconciling local threads stopped, storage still failing: {e}")
+            break
+    return {"flushed": flushed, "remaining": len(_local_threads)}
+
+
+def _maybe_reconcile() -> None:
+    """After a successful backend save, flush fallback threads if a pass is due."""
+    if len(_local_threads) and time.monotonic() - _last_reconcile >= FALLBACK_RECONCILE_SECONDS:
+        reconcile_local_threads()
+
+
+def get_local_thread_stats() -> Dict[str, Any]:
+    """
+    Fallback occupancy, evictions and expirations (threads lost before they could be flushed)
+    and reconciliation counters.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    return {**_local_threads.stats(), **_fallback_counters}
+
+
+def _load_thread_state(backend, thread_id: str, max_turns: Optional[int]) -> Dict[str, Any]:
+    """Load a thread state from the cache or the backend, flushing a fallback copy first."""
+    if thread_id in _local_threads:
+        _flush_local_thread(backend, thread_id)
+
+    cached_state = _get_cached_thread_state(backend, thread_id, max_turns)
+    if cached_state is not None:
+        logger.info(f"Retrieved thread {thread_id} from cache: {len(cached_state['messages'])} messages")
+        return cached_state
+
+    header = _call_backend(backend.get_thread_header, thread_id)
+    if header is None:
+        legacy_state = _call_backend(backend.load_legacy_thread, thread_id)
+        if legacy_state is not None:
+            logger.info(
+                f"Retrieved legacy thread {thread_id}: {len(legacy_state['messages'])} messages "
+                f"(migrated on next save)"
+            )
+            return {**empty_thread_state(), **legacy_state}
+        logger.info(f"Thread {thread_id} not found in {backend.name}")
+        return empty_thread_state()
+
+    # Loads to the last stored turn, so turns whose header update lost to concurrent saves are included
+    turns = _call_backend(backend.load_turns, thread_id, first_turn_to_load(header, max_turns))
+    state = thread_state_from_turns(header, turns)
+    summarized_count = header["summarized_count"]
+
+    if state["offset"] > summarized_count:
+        logger.warning(
+            f"Thread {thread_id}: skipped {state['offset'] - summarized_count} unsummarised messages "
+            f"beyond max_turns"
+        )
+
+    logger.info(
+        f"Retrieved thread {thread_id} from {backend.name}: {len(state['messages'])} of "
+        f"{header['message_count']} messages ({len(turns)} turns)"
+    )
+    # Only a load covering every unsummarised turn can serve later, larger loads
+    if state["offset"] <= summarized_count:
+        _cache_thread_state(thread_id, state)
+    return state
+
+
+def get_thread_state(thread_id: str, max_turns: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Retrieve recent conversation history and its running summary by thread UUID.
+
+    Only turns not yet folded into the summary are loaded, and at most the
+    last `max_turns` of them.
 
     Args:
         thread_id: UUID string identifying the conversation thread
+        max_turns: Optional cap on the number of turns to load
 
     Returns:
-        List of message dictionaries with 'role' and 'content' keys,
-        or empty list if not found
+        Thread state dictionary (see empty_thread_state)
+
+    Raises:
+        ThreadUnavailableError: If storage fails and the local fallback does not hold the thread
     """
     if not thread_id:
-        return []
+        return empty_thread_state()
 
-    # Try DynamoDB first
+    # Try the storage backend first
     try:
-        table = get_threads_table()
-        response = table.get_item(Key={"thread_id": thread_id})
+        return _load_thread_state(get_storage_backend(), thread_id, max_turns)
 
-        if "Item" in response:
-            messages_json = response["Item"].get("messages", "[]")
-            messages = json.loads(messages_json)
-            logger.info(f"Retrieved thread {thread_id} from DynamoDB: {len(messages)} messages")
-            return messages
-
-        logger.info(f"Thread {thread_id} not found in DynamoDB")
-        return []
+    except CircuitOpenError as e:
+        logger.debug(f"Thread storage circuit open, reading thread {thread_id} locally")
+        return _get_local_thread(thread_id, e)
 
     except ClientError as e:
-        logger.warning(f"DynamoDB error getting thread {thread_id}: {e}")
+        logger.warning(f"Storage error getting thread {thread_id}: {e}")
         # Fall back to local storage
-        return _local_threads.get(thread_id, [])
+        return _get_local_thread(thread_id, e)
 
     except Exception as e:
         logger.error(f"Unexpected error getting thread {thread_id}: {e}")
-        return _local_threads.get(thread_id, [])
+        return _get_local_thread(thread_id, e)
+
+
+def get_thread(thread_id: str) -> List[Dict[str, str]]:
+    """
+    Retrieve conversation history by thread UUID.
+
+    Args:
+        thread_id: UUID string identifying the conversation thread
+
+    Returns:
+        List of message dictionaries with 'role' and 'content' keys
+        not yet folded into the summary, or empty list if not found
+    """
+    return get_thread_state(thread_id)["messages"]
+
+
+def _store_thread_state(backend, thread_id: str, state: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Append the unpersisted turns of a state to the backend, update the header and the cache.
+
+    Returns:
+        Tuple of (turn_count, message_count) of the stored thread
+    """
+    messages = state["messages"]
+    offset = state.get("offset", 0)
+    persisted_count = state.get("persisted_count", 0)
+    turn_count, message_count = _call_backend(
+        backend.append_turns, thread_id, split_turns(messages[persisted_count:]), offset + persisted_count
+    )
+
+    version = _call_backend(
+        backend.update_thread_header, thread_id, _header_fields(state, turn_count, message_count), state.get("version", 0)
+    )
+    _write_through(thread_id, state, version, message_count)
+    return turn_count, message_count
+
+
+def _header_fields(state: Dict[str, Any], turn_count: int, message_count: int) -> Dict[str, Any]:
+    """Header fields of a stored state: its counts and its summary in stored-thread positions."""
+    offset = state.get("offset", 0)
+    # Whole turns covered by the summary (it always ends before a user message); loads start after them
+    summarized_turns = state.get("offset_turns", 0) + len(split_turns(state["messages"][:state.get("summarized_count", 0)]))
+    return {
+        "turn_count": turn_count,
+        "message_count": message_count,
+        "summary": state.get("summary", ""),
+        "summarized_count": offset + state.get("summarized_count", 0),
+        "summarized_turns": summarized_turns
+    }
+
+
+def _write_through(thread_id: str, state: Dict[str, Any], version: Optional[int], message_count: int) -> None:
+    """Cache a just-written state, or drop the cached one if another writer saved in between."""
+    if version == state.get("version", 0) + 1 and message_count == state.get("offset", 0) + len(state["messages"]):
+        _cache_thread_state(thread_id, {
+            **empty_thread_state(),
+            **state,
+            "persisted_count": len(state["messages"]),
+            "version": version
+        })
+    else:
+        _thread_cache.pop(thread_id)
+
+
+def save_thread_summary(thread_id: str, state: Dict[str, Any]) -> bool:
+    """
+    Store a new running summary for a fully persisted thread state.
+
+    Only the header is written, conditional on the version the state was
+    loaded at; if another writer saved in between, the headers are merged
+    (see storage.base.merge_header), so neither its turns nor a summary that
+    covers more messages are lost. Nothing is written while the thread is in
+    the local fallback; the next fold retries.
+
+    Args:
+        thread_id: UUID of the thread
+        state: State from get_thread_state() with summary and summarized_count updated
+
+    Returns:
+        True if the header was updated
+    """
+    if thread_id in _local_threads:
+        return False
+    message_count = state.get("offset", 0) + len(state["messages"])
+    turn_count = state.get("offset_turns", 0) + len(split_turns(state["messages"]))
+    try:
+        version = _call_backend(
+            get_storage_backend().update_thread_header, thread_id,
+            _header_fields(state, turn_count, message_count), state.get("version", 0)
+        )
+    except CircuitOpenError:
+        logger.debug(f"Thread storage circuit open, not saving the summary of thread {thread_id}")
+        return False
+    except Exception as e:
+        logger.warning(f"Storage error saving the summary of thread {thread_id}: {e}")
+        return False
+
+    _write_through(thread_id, state, version, message_count)
+    return version is not None
 
 
-def save_thread(thread_id: Optional[str], messages: List[Dict[str, str]]) -> str:
+def save_thread_state(thread_id: Optional[str], state: Dict[str, Any]) -> str:
     """
-    Save conversation history to DynamoDB.
+    Persist a thread state: append its new turns and update the header.
 
     Args:
         thread_id: Existing UUID to update, or None to create new thread
-        messages: List of message dictionaries with 'role' and 'content'
+        state: Thread state from get_thread_state() with new messages appended
 
     Returns:
         UUID string identifying the conversation thread
@@ -96,38 +527,75 @@ def save_thread(thread_id: Optional[str], messages: List[Dict[str, str]]) -> str
         thread_id = str(uuid.uuid4())
         logger.info(f"Created new thread: {thread_id}")
 
-    # Try DynamoDB first
+    # Try the storage backend first
     try:
-        table = get_threads_table()
-
-        item = {
-            "thread_id": thread_id,
-            "messages": json.dumps(messages, ensure_ascii=False),
-            "message_count": len(messages),
-            "updated_at": datetime.utcnow().isoformat(),
-            "ttl": int((datetime.utcnow() + timedelta(days=30)).timestamp())  # 30-day TTL
-        }
-
-        table.put_item(Item=item)
-        logger.info(f"Saved thread {thread_id} to DynamoDB: {len(messages)} messages")
+        backend = get_storage_backend()
+        if thread_id in _local_threads:
+            # Loaded from the fallback: store the turns the backend never received first
+            _flush_local_thread(backend, thread_id)
+        turn_count, message_count = _store_thread_state(backend, thread_id, state)
+
+        logger.info(f"Saved thread {thread_id} to {backend.name}: {turn_count} turns, {message_count} messages")
+        _maybe_reconcile()
+        return thread_id
+
+    except CircuitOpenError:
+        logger.debug(f"Thread storage circuit open, saving thread {thread_id} locally")
+        _save_local_thread(thread_id, state)
         return thread_id
 
     except ClientError as e:
-        logger.warning(f"DynamoDB error saving thread {thread_id}: {e}")
+        logger.warning(f"Storage error saving thread {thread_id}: {e}")
         # Fall back to local storage
-        _local_threads[thread_id] = messages
+        _save_local_thread(thread_id, state)
         logger.info(f"Saved thread {thread_id} to local storage (fallback)")
         return thread_id
 
     except Exception as e:
         logger.error(f"Unexpected error saving thread {thread_id}: {e}")
-        _local_threads[thread_id] = messages
+        _save_local_thread(thread_id, state)
         return thread_id
 
 
+def save_thread(
+    thread_id: Optional[str],
+    messages: List[Dict[str, Any]],
+    summary: str = "",
+    summarized_count: int = 0
+) -> str:
+    """
+    Save a complete conversation history.
+
+    Messages already stored for the thread are skipped; only the rest are
+    appended as new turns.
+
+    Args:
+        thread_id: Existing UUID to update, or None to create new thread
+        messages: Full list of message dictionaries with 'role' and 'content'
+        summary: Running summary of the first `summarized_count` messages
+        summarized_count: Number of leading messages covered by the summary
+
+    Returns:
+        UUID string identifying the conversation thread
+
+    Raises:
+        ThreadUnavailableError: If the stored thread cannot be read to find what it already holds
+    """
+    stored = get_thread_state(thread_id) if thread_id else empty_thread_state()
+    return save_thread_state(thread_id, {
+        "messages": messages,
+        "summary": summary,
+        "summarized_count": summarized_count,
+        "offset": 0,
+        "offset_turns": 0,
+        "persisted_count": min(stored["offset"] + stored["persisted_count"], len(messages)),
+        "version": stored["version"]
+    })
+
+
 def delete_thread(thread_id: str) -> bool:
     """
-    Delete a thread from DynamoDB.
+    Delete a thread (header, turns and any legacy item).
 
     Args:
         thread_id: UUID of the thread to delete
@@ -138,17 +606,17 @@ def delete_thread(thread_id: str) -> bool:
     if not thread_id:
         return False
 
+    _thread_cache.pop(thread_id)
+    _local_threads.pop(thread_id)
     try:
-        table = get_threads_table()
-        table.delete_item(Key={"thread_id": thread_id})
+        _call_backend(get_storage_backend().delete_thread, thread_id)
         logger.info(f"Deleted thread {thread_id}")
-
-        # Also remove from local cache if present
-        if thread_id in _local_threads:
-            del _local_threads[thread_id]
-
         return True
 
+    except CircuitOpenError as e:
+        logger.error(f"Failed to delete thread {thread_id}: {e}")
+        return False
+
     except ClientError as e:
         logger.error(f"Failed to delete thread {thread_id}: {e}")
         return False
@@ -1,74 +1,453 @@
 """
 Webhook utilities for sending status updates and results.
+
+Callbacks are delivered off the request path by a WebhookDispatcher: calling
+call_webhook() only queues the event and returns. WEBHOOK_WORKERS background
+threads deliver the events. Each thread has its own keep-alive
+requests.Session, so a customer endpoint is reached over pooled connections.
+Events of one job are delivered in order, one at a time. While a job's
+events wait, a newer "inprogress" event replaces the older one of the same
+kind (the same named output, or a progress message), and a final event
+replaces waiting progress messages. Failed deliveries (connection errors,
+timeouts, 429 and 5xx) are retried up to WEBHOOK_MAX_ATTEMPTS times with
+jittered exponential backoff, while that job's later events wait.
+
+flush_webhooks() waits for the queue to drain. The Lambda handler calls it
+before returning, because a frozen execution environment would hold
+undelivered events until its next invocation. Under the Lambda Web Adapter
+(run.sh, uvicorn) there is no handler to return from, so
+WebhookFlushMiddleware drains the queue before each response's last body
+chunk is sent. WEBHOOK_WORKERS=0 delivers inline on the calling thread
+instead.
+
+The webhook URL of a job submitted to this container comes from its job
+context (see job_context.py); other jobs are read from storage, by the
+delivering thread.
 """
 
+import asyncio
 import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+
 from smart_agent.src.config.logger import Logger
+from smart_agent.src.utils.job_context import get_job_context
 from smart_agent.src.utils.temp_db import get_job
 
 logger = Logger()
 
+# Delivery threads (0 delivers inline on the calling thread)
+WEBHOOK_WORKERS = max(int(os.environ.get("WEBHOOK_WORKERS", "4")), 0)
+
+# Events waiting for delivery before new ones are dropped
+WEBHOOK_QUEUE_LIMIT = int(os.environ.get("WEBHOOK_QUEUE_LIMIT", "10000"))
+
+# Attempts per event and the cap of the jittered backoff between them
+WEBHOOK_MAX_ATTEMPTS = max(int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "4")), 1)
+WEBHOOK_BACKOFF_SECONDS = float(os.environ.get("WEBHOOK_BACKOFF_SECONDS", "0.5"))
+WEBHOOK_BACKOFF_MAX_SECONDS = float(os.environ.get("WEBHOOK_BACKOFF_MAX_SECONDS", "8"))
+
+# Timeout of one delivery attempt
+WEBHOOK_TIMEOUT = float(os.environ.get("WEBHOOK_TIMEOUT", "10"))
+
+# Longest the Lambda handler waits for queued events before returning
+WEBHOOK_FLUSH_TIMEOUT = float(os.environ.get("WEBHOOK_FLUSH_TIMEOUT", "10"))
+
+# Drain the queue before every response ends (on by default under the Lambda Web Adapter)
+WEBHOOK_FLUSH_PER_REQUEST = os.environ.get(
+    "WEBHOOK_FLUSH_PER_REQUEST", "true" if os.environ.get("AWS_LWA_INVOKE_MODE") else "false"
+).lower() == "true"
+
+# Margin left for finishing the response after flushing webhooks
+FLUSH_MARGIN_MS = 500
+
+
+def coalesce_key(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Kind of an "inprogress" event; a newer event of the same kind supersedes a waiting one.
+
+    Args:
+        payload: Webhook payload
+
+    Returns:
+        "output:<name>" for a named output, "progress" for a progress message, None for other statuses
+    """
+    if payload.get("status") != "inprogress":
+        return None
+    output = (payload.get("data") or {}).get("output")
+    return f"output:{output.get('name')}" if isinstance(output, dict) else "progress"
+
+
+def _retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+class WebhookDispatcher:
+    """
+    Background webhook delivery with per-job ordering, coalescing and retries.
+
+    Args:
+        workers: Delivery threads (0 delivers inline)
+        queue_limit: Waiting events across all jobs before new ones are dropped
+        max_attempts: Delivery attempts per event
+        timeout: Timeout of one attempt in seconds
+    """
+
+    def __init__(
+        self,
+        workers: int = WEBHOOK_WORKERS,
+        queue_limit: int = WEBHOOK_QUEUE_LIMIT,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        timeout: float = WEBHOOK_TIMEOUT
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+        # job_id -> waiting events, oldest first; jobs in _ready have events and no delivering thread
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._ready: Deque[str] = deque()
+        self._active: Set[str] = set()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+        self.counters = {"queued": 0, "delivered": 0, "retried": 0, "failed": 0, "coalesced": 0, "dropped": 0}
+
+    def submit(self, job_id: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """
+        Queue a webhook event for a job.
+
+        Args:
+            job_id: The job identifier
+            payload: The data to send (the job id is added)
+            timeout: Optional timeout of each attempt, instead of the dispatcher's
+
+        Returns:
+            True if queued (or delivered, inline), False if dropped or failed
+        """
+        event = {"payload": payload, "timeout": timeout or self.timeout, "key": coalesce_key(payload)}
+        if self.workers <= 0:
+            webhook_url = get_webhook_url(job_id)
+            if not webhook_url:
+                logger.debug(f"No webhook URL configured for job {job_id}")
+                return True
+            return self._deliver(job_id, webhook_url, event)
+
+        with self._cond:
+            if self._size >= self.queue_limit:
+                self.counters["dropped"] += 1
+                logger.warning(f"Webhook queue full ({self.queue_limit} events), dropped event for job {job_id}")
+                return False
+
+            events = self._pending.setdefault(job_id, deque())
+            superseded = [
+                waiting for waiting in events
+                if waiting["key"] is not None and (
+                    waiting["key"] == event["key"] or (event["key"] is None and waiting["key"] == "progress")
+                )
+            ]
+            for waiting in superseded:
+                events.remove(waiting)
+            self.counters["coalesced"] += len(superseded)
+            self._size += 1 - len(superseded)
+
+            events.append(event)
+            self.counters["queued"] += 1
+            if job_id not in self._active and job_id not in self._ready:
+                self._ready.append(job_id)
+            self._ensure_threads()
+            self._cond.notify()
+        return True
+
+    def _ensure_threads(self) -> None:
+        # Started on first use, under the condition's lock
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"webhook-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                job_id = self._ready.popleft()
+                self._active.add(job_id)
+                events = self._pending[job_id]
+
+            try:
+                self._deliver_job_events(job_id, events)
+            except Exception as e:
+                # Drop the job's remaining events rather than retrying them forever
+                with self._cond:
+                    self.counters["failed"] += len(events)
+                    self._size -= len(events)
+                    events.clear()
+                logger.error(f"Webhook delivery for job {job_id} failed: {e}")
+            finally:
+                with self._cond:
+                    self._active.discard(job_id)
+                    if self._pending.get(job_id):
+                        self._ready.append(job_id)
+                    else:
+                        self._pending.pop(job_id, None)
+                    self._cond.notify_all()
+
+    def _next_event(self, events: Deque[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            if not events:
+                return None
+            self._size -= 1
+            return events.popleft()
+
+    def _deliver_job_events(self, job_id: str, events: Deque[Dict[str, Any]]) -> None:
+        """Deliver a job's waiting events in order, including events queued meanwhile."""
+        webhook_url = get_webhook_url(job_id)
+        while True:
+            event = self._next_event(events)
+            if event is None:
+                return
+            if not webhook_url:
+                logger.debug(f"No webhook URL configured for job {job_id}")
+                continue
+            self._deliver(job_id, webhook_url, event)
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+            session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+            self._local.session = session
+        return session
+
+    def _deliver(self, job_id: str, webhook_url: str, event: Dict[str, Any]) -> bool:
+        """
+        POST one event, retrying transient failures with jittered exponential backoff.
+
+        Returns:
+            True if the endpoint accepted the event
+        """
+        body = json.dumps({"id": job_id, **event["payload"]})
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self._session().post(
+                    webhook_url,
+                    data=body,
+                    timeout=event["timeout"],
+                    headers={"Content-Type": "application/json"}
+                )
+                if 200 <= response.status_code < 300:
+                    logger.debug(f"Webhook callback successful for job {job_id}")
+                    self.counters["delivered"] += 1
+                    return True
+
+                problem = f"Status {response.status_code}, Response: {response.text[:200]}"
+                retry = _retryable(response.status_code)
+
+            except requests.Timeout:
+                problem, retry = "timed out", True
+
+            except requests.RequestException as e:
+                problem, retry = f"error: {str(e)}", True
+
+            if not retry or attempt == self.max_attempts:
+                self.counters["failed"] += 1
+                logger.warning(f"Webhook callback failed for job {job_id} after {attempt} attempt(s): {problem}")
+                return False
+
+            self.counters["retried"] += 1
+            logger.info(f"Webhook callback for job {job_id} {problem}, retrying (attempt {attempt})")
+            time.sleep(random.uniform(0, min(WEBHOOK_BACKOFF_SECONDS * 2 ** (attempt - 1), WEBHOOK_BACKOFF_MAX_SECONDS)))
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued event has been delivered or has failed.
+
+        Args:
+            timeout: Longest wait in seconds (None waits indefinitely)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth, in-flight jobs and delivery counters.
+
+        Returns:
+            Metrics dictionary
+        """
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "queueDepth": self._size,
+                "queueLimit": self.queue_limit,
+                "activeJobs": len(self._active),
+                **self.counters
+            }
+
+
+# Lazy-created dispatcher
+_dispatcher: Optional[WebhookDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Get the shared webhook dispatcher (lazy initialization)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WebhookDispatcher()
+        return _dispatcher
+
+
+def flush_webhooks(timeout: Optional[float] = WEBHOOK_FLUSH_TIMEOUT) -> bool:
+    """
+    Wait for queued webhook events to be delivered.
+
+    Args:
+        timeout: Longest wait in seconds (None waits indefinitely)
+
+    Returns:
+        True if the queue drained, False on timeout
+    """
+    if _dispatcher is None:
+        return True
+    drained = _dispatcher.flush(timeout)
+    if not drained:
+        logger.warning(f"Webhook queue not drained after {timeout}s: {_dispatcher.stats()['queueDepth']} events left")
+    return drained
+
+
+def request_flush_timeout(headers: List[Tuple[bytes, bytes]]) -> float:
+    """
+    Flush timeout for one request, capped by the invocation's remaining time.
+
+    The Lambda Web Adapter passes the invocation context in the
+    x-amzn-lambda-context header; its deadline is in epoch milliseconds.
+
+    Args:
+        headers: Raw ASGI request headers
+
+    Returns:
+        Timeout in seconds
+    """
+    timeout = WEBHOOK_FLUSH_TIMEOUT
+    for name, value in headers:
+        if name.lower() == b"x-amzn-lambda-context":
+            try:
+                deadline_ms = float(json.loads(value)["deadline"])
+            except (ValueError, KeyError, TypeError):
+                break
+            timeout = min(timeout, max(deadline_ms - time.time() * 1000 - FLUSH_MARGIN_MS, 0) / 1000)
+            break
+    return timeout
+
+
+class WebhookFlushMiddleware:
+    """
+    ASGI middleware that drains queued webhooks before a response ends.
+
+    The last body chunk is held back until flush_webhooks() returns, so the
+    Lambda Web Adapter cannot complete the invocation (and let the environment
+    freeze) while events are still queued. Streaming responses send their
+    earlier chunks unchanged. If the app fails before responding, the queue is
+    drained before the error propagates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = request_flush_timeout(scope.get("headers") or [])
+        flushed = False
+
+        async def send_after_flush(message):
+            nonlocal flushed
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not flushed:
+                flushed = True
+                await asyncio.to_thread(flush_webhooks, timeout)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_flush)
+        finally:
+            if not flushed:
+                await asyncio.to_thread(flush_webhooks, timeout)
+
+
+def get_webhook_stats() -> Dict[str, Any]:
+    """
+    Webhook dispatcher metrics.
+
+    Returns:
+        Metrics dictionary for the health API
+    """
+    return get_webhook_dispatcher().stats()
+
+
+def get_webhook_url(job_id: str) -> Optional[str]:
+    """
+    Get the webhook URL of a job, from its context if it has one.
+
+    Args:
+        job_id: The job identifier
+
+    Returns:
+        The URL, or None if the job has none
+    """
+    context = get_job_context(job_id)
+    if context is not None:
+        return context.webhook_url
+
+    job = get_job(job_id)
+    return job.get("webhookUrl") if job else None
+
 
 def call_webhook(
     job_id: Optional[str],
     payload: Dict[str, Any],
-    timeout: int = 30
+    timeout: Optional[float] = None
 ) -> bool:
     """
-    Send a webhook callback with the given payload.
+    Queue a webhook callback with the given payload.
 
     Args:
         job_id: The job identifier
         payload: The data to send
-        timeout: Request timeout in seconds
+        timeout: Optional timeout of each delivery attempt in seconds
 
     Returns:
-        True if successful, False otherwise
+        True if queued, False otherwise
     """
     if not job_id:
         logger.warning("No job ID provided for webhook callback")
         return False
 
-    # Get webhook URL from job storage
-    job = get_job(job_id)
-    webhook_url = job.get("webhookUrl") if job else None
-
-    if not webhook_url:
-        logger.debug(f"No webhook URL configured for job {job_id}")
-        return True
-
-    try:
-        full_payload = json.dumps({
-            "id": job_id,
-            **payload
-        })
-
-        response = requests.post(
-            webhook_url,
-            data=full_payload,
-            timeout=timeout,
-            headers={"Content-Type": "application/json"}
-        )
-
-        if response.status_code >= 200 and response.status_code < 300:
-            logger.debug(f"Webhook callback successful for job {job_id}")
-            return True
-        else:
-            logger.warning(
-                f"Webhook callback failed for job {job_id}: "
-                f"Status {response.status_code}, Response: {response.text}"
-            )
-            return False
-
-    except requests.Timeout:
-        logger.error(f"Webhook callback timed out for job {job_id}")
-        return False
-
-    except requests.RequestException as e:
-        logger.error(f"Webhook callback error for job {job_id}: {str(e)}")
-        return False
+    return get_webhook_dispatcher().submit(job_id, payload, timeout)
 
 
 def call_webhook_with_success(
@@ -83,11 +462,21 @@ def call_webhook_with_success(
         data: The success data to send
 
     Returns:
-        True if successful, False otherwise
+        True if queued, False otherwise
     """
     return call_webhook(job_id, data)
 
 
+def build_error_payload(error_message: str) -> Dict[str, Any]:
+    """Build the payload of a failed-job webhook callback."""
+    return {
+        "status": "failed",
+        "data": {
+            "reason": error_message
+        }
+    }
+
+
 def call_webhook_with_error(
     job_id: Optional[str],
     error_message: str,
@@ -102,12 +491,45 @@ def call_webhook_with_error(
         error_code: The error code
 
     Returns:
-        True if successful, False otherwise
+        True if queued, False otherwise
     """
-    payload = {
-        "status": "failed",
-        "data": {
-            "reason": error_message
-        }
-    }
-    return call_webhook(job_id, payload)
+    return call_webhook(job_id, build_error_payload(error_message))
+
+
+async def call_webhook_async(
+    job_id: Optional[str],
+    payload: Dict[str, Any],
+    timeout: Optional[float] = None
+) -> bool:
+    """
+    Async variant of call_webhook(); queuing never blocks the event loop.
+
+    Args:
+        job_id: The job identifier
+        payload: The data to send
+        timeout: Optional timeout of each delivery attempt in seconds
+
+    Returns:
+        True if queued, False otherwise
+    """
+    if get_webhook_dispatcher().workers <= 0:
+        # Inline delivery blocks, so it runs in a worker thread
+        return await asyncio.to_thread(call_webhook, job_id, payload, timeout)
+    return call_webhook(job_id, payload, timeout)
+
+
+async def call_webhook_with_success_async(
+    job_id: Optional[str],
+    data: Dict[str, Any]
+) -> bool:
+    """Async variant of call_webhook_with_success()."""
+    return await call_webhook_async(job_id, data)
+
+
+async def call_webhook_with_error_async(
+    job_id: Optional[str],
+    error_message: str,
+    error_code: int = 500
+) -> bool:
+    """Async variant of call_webhook_with_error()."""
+    return await call_webhook_async(job_id, build_error_payload(error_message))
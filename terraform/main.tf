@@ -68,9 +68,38 @@ variable "timeout" {
   default     = 900
 }
 
+variable "enable_response_streaming" {
+  description = "Serve the app through Lambda Web Adapter with a RESPONSE_STREAM function URL (needed for /execute/stream to flush incrementally)"
+  type        = bool
+  default     = false
+}
+
+variable "legacy_threads_table" {
+  description = "Single-item threads table used before per-turn storage; read to migrate old threads"
+  type        = string
+  default     = "agent-threads"
+}
+
+variable "lambda_web_adapter_layer_version" {
+  description = "Version of the public Lambda Web Adapter layer used in streaming mode"
+  type        = number
+  default     = 24
+}
+
 # Data sources
 data "aws_caller_identity" "current" {}
 
+locals {
+  lambda_web_adapter_layer_arn = "arn:aws:lambda:${var.aws_region}:753240598075:layer:LambdaAdapterLayerX86:${var.lambda_web_adapter_layer_version}"
+
+  streaming_environment = var.enable_response_streaming ? {
+    AWS_LAMBDA_EXEC_WRAPPER   = "/opt/bootstrap"
+    AWS_LWA_INVOKE_MODE       = "response_stream"
+    PORT                      = "8080"
+    WEBHOOK_FLUSH_PER_REQUEST = "true"
+  } : {}
+}
+
 # IAM Role for Lambda
 resource "aws_iam_role" "lambda_role" {
   name = "${var.function_name}-${var.environment}-role"
@@ -124,7 +153,19 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "dynamodb:DeleteItem",
           "dynamodb:Query"
         ]
-        Resource = aws_dynamodb_table.jobs_table.arn
+        Resource = [
+          aws_dynamodb_table.jobs_table.arn,
+          aws_dynamodb_table.thread_turns_table.arn,
+          aws_dynamodb_table.response_cache_table.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = "arn:aws:dynamodb:${var.aws_region}:${data.aws_caller_identity.current.account_id}:table/${var.legacy_threads_table}"
       }
     ]
   })
@@ -134,22 +175,26 @@ resource "aws_iam_role_policy" "lambda_policy" {
 resource "aws_lambda_function" "agent" {
   function_name = "${var.function_name}-${var.environment}"
   role          = aws_iam_role.lambda_role.arn
-  handler       = "lambda_handler.lambda_handler"
+  handler       = var.enable_response_streaming ? "run.sh" : "lambda_handler.lambda_handler"
   runtime       = "python3.11"
   timeout       = var.timeout
   memory_size   = var.memory_size
+  layers        = var.enable_response_streaming ? [local.lambda_web_adapter_layer_arn] : []
 
   s3_bucket = var.s3_bucket
   s3_key    = var.s3_key
 
   environment {
-    variables = {
-      AGENT_NAME       = var.function_name
-      ENVIRONMENT      = var.environment
-      SSM_PREFIX       = "/app/${var.function_name}/${var.environment}"
-      DYNAMODB_TABLE   = aws_dynamodb_table.jobs_table.name
-      ENVIRONMENT_MODE = "prod"
-    }
+    variables = merge({
+      AGENT_NAME           = var.function_name
+      ENVIRONMENT          = var.environment
+      SSM_PREFIX           = "/app/${var.function_name}/${var.environment}"
+      DYNAMODB_TABLE       = aws_dynamodb_table.jobs_table.name
+      THREAD_TURNS_TABLE   = aws_dynamodb_table.thread_turns_table.name
+      RESPONSE_CACHE_TABLE = aws_dynamodb_table.response_cache_table.name
+      THREADS_TABLE        = var.legacy_threads_table
+      ENVIRONMENT_MODE     = "prod"
+    }, local.streaming_environment)
   }
 
   depends_on = [
@@ -161,6 +206,7 @@ resource "aws_lambda_function" "agent" {
 resource "aws_lambda_function_url" "agent_url" {
   function_name      = aws_lambda_function.agent.function_name
   authorization_type = "NONE"
+  invoke_mode        = var.enable_response_streaming ? "RESPONSE_STREAM" : "BUFFERED"
 
   cors {
     allow_credentials = true
@@ -233,6 +279,56 @@ resource "aws_dynamodb_table" "jobs_table" {
   }
 }
 
+# DynamoDB Table for conversation threads: one item per turn plus a header at turn 0
+resource "aws_dynamodb_table" "thread_turns_table" {
+  name         = "${var.function_name}-${var.environment}-thread-turns"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "thread_id"
+  range_key    = "turn"
+
+  attribute {
+    name = "thread_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "turn"
+    type = "N"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Environment = var.environment
+    Agent       = var.function_name
+  }
+}
+
+# DynamoDB Table for cached first-turn answers shared between containers
+resource "aws_dynamodb_table" "response_cache_table" {
+  name         = "${var.function_name}-${var.environment}-response-cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Environment = var.environment
+    Agent       = var.function_name
+  }
+}
+
 # CloudWatch Log Group
 resource "aws_cloudwatch_log_group" "agent_logs" {
   name              = "/aws/lambda/${var.function_name}-${var.environment}"